@@ -0,0 +1,121 @@
+"""Add background jobs
+
+Revision ID: 7b3e9d1c5a28
+Revises: 4a6d2c8e1f73
+Create Date: 2026-10-17 23:59:37.104862
+
+"""
+
+import warnings
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import op
+from advanced_alchemy.types import EncryptedString, EncryptedText, GUID, ORA_JSONB, DateTimeUTC, StoredObject, PasswordHash, FernetBackend
+from advanced_alchemy.types.encrypted_string import PGCryptoBackend
+from sqlalchemy import Text  # noqa: F401
+from sqlalchemy.dialects import postgresql
+
+try:
+    from advanced_alchemy.types.password_hash.argon2 import Argon2Hasher
+except ImportError:
+    Argon2Hasher = Any  # type: ignore
+try:
+    from advanced_alchemy.types.password_hash.passlib import PasslibHasher
+except ImportError:
+    PasslibHasher = Any  # type: ignore
+try:
+    from advanced_alchemy.types.password_hash.pwdlib import PwdlibHasher
+except ImportError:
+    PwdlibHasher = Any  # type: ignore
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+__all__ = ["downgrade", "upgrade", "schema_upgrades", "schema_downgrades", "data_upgrades", "data_downgrades"]
+
+sa.GUID = GUID
+sa.DateTimeUTC = DateTimeUTC
+sa.ORA_JSONB = ORA_JSONB
+sa.EncryptedString = EncryptedString
+sa.EncryptedText = EncryptedText
+sa.StoredObject = StoredObject
+sa.PasswordHash = PasswordHash
+sa.Argon2Hasher = Argon2Hasher
+sa.PasslibHasher = PasslibHasher
+sa.PwdlibHasher = PwdlibHasher
+sa.FernetBackend = FernetBackend
+sa.PGCryptoBackend = PGCryptoBackend
+
+
+# revision identifiers, used by Alembic.
+revision = "7b3e9d1c5a28"
+down_revision = "4a6d2c8e1f73"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            schema_upgrades()
+            data_upgrades()
+
+def downgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            data_downgrades()
+            schema_downgrades()
+
+def schema_upgrades() -> None:
+    """schema upgrade migrations go here."""
+    op.create_table(
+        "job",
+        sa.Column("id", sa.GUID(length=16), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("params", sa.JSON().with_variant(postgresql.JSONB(astext_type=sa.Text()), "cockroachdb").with_variant(sa.ORA_JSONB(), "oracle").with_variant(postgresql.JSONB(astext_type=sa.Text()), "postgresql"), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("started_at", sa.DateTimeUTC(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTimeUTC(timezone=True), nullable=True),
+        sa.Column("result", sa.JSON().with_variant(postgresql.JSONB(astext_type=sa.Text()), "cockroachdb").with_variant(sa.ORA_JSONB(), "oracle").with_variant(postgresql.JSONB(astext_type=sa.Text()), "postgresql"), nullable=True),
+        sa.Column("sa_orm_sentinel", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTimeUTC(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTimeUTC(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user_account.id"], name=op.f("fk_job_user_id_user_account")),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_job")),
+    )
+    # the queue, claimed oldest first
+    op.create_index(
+        "ix_job_unfinished_created_at",
+        "job",
+        ["created_at"],
+        unique=False,
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+    )
+    op.create_index("ix_job_user_id", "job", ["user_id"], unique=False)
+    op.create_table(
+        "job_data",
+        sa.Column("job_id", sa.UUID(), nullable=False),
+        sa.Column("output", sa.Boolean(), nullable=False),
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("data", postgresql.BYTEA(), nullable=False),
+        sa.ForeignKeyConstraint(["job_id"], ["job.id"], name=op.f("fk_job_data_job_id_job"), ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("job_id", "output", "seq", name=op.f("pk_job_data")),
+    )
+
+def schema_downgrades() -> None:
+    """schema downgrade migrations go here."""
+    op.drop_table("job_data")
+    op.drop_index("ix_job_user_id", table_name="job")
+    op.drop_index("ix_job_unfinished_created_at", table_name="job")
+    op.drop_table("job")
+
+def data_upgrades() -> None:
+    """Add any optional data upgrade migrations here!"""
+
+def data_downgrades() -> None:
+    """Add any optional data downgrade migrations here!"""
@@ -0,0 +1,85 @@
+"""Add job heartbeats
+
+Revision ID: 5f1a7c3d9b62
+Revises: 7b3e9d1c5a28
+Create Date: 2026-10-17 23:59:52.418307
+
+"""
+
+import warnings
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import op
+from advanced_alchemy.types import EncryptedString, EncryptedText, GUID, ORA_JSONB, DateTimeUTC, StoredObject, PasswordHash, FernetBackend
+from advanced_alchemy.types.encrypted_string import PGCryptoBackend
+from sqlalchemy import Text  # noqa: F401
+
+try:
+    from advanced_alchemy.types.password_hash.argon2 import Argon2Hasher
+except ImportError:
+    Argon2Hasher = Any  # type: ignore
+try:
+    from advanced_alchemy.types.password_hash.passlib import PasslibHasher
+except ImportError:
+    PasslibHasher = Any  # type: ignore
+try:
+    from advanced_alchemy.types.password_hash.pwdlib import PwdlibHasher
+except ImportError:
+    PwdlibHasher = Any  # type: ignore
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+__all__ = ["downgrade", "upgrade", "schema_upgrades", "schema_downgrades", "data_upgrades", "data_downgrades"]
+
+sa.GUID = GUID
+sa.DateTimeUTC = DateTimeUTC
+sa.ORA_JSONB = ORA_JSONB
+sa.EncryptedString = EncryptedString
+sa.EncryptedText = EncryptedText
+sa.StoredObject = StoredObject
+sa.PasswordHash = PasswordHash
+sa.Argon2Hasher = Argon2Hasher
+sa.PasslibHasher = PasslibHasher
+sa.PwdlibHasher = PwdlibHasher
+sa.FernetBackend = FernetBackend
+sa.PGCryptoBackend = PGCryptoBackend
+
+
+# revision identifiers, used by Alembic.
+revision = "5f1a7c3d9b62"
+down_revision = "7b3e9d1c5a28"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            schema_upgrades()
+            data_upgrades()
+
+def downgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            data_downgrades()
+            schema_downgrades()
+
+def schema_upgrades() -> None:
+    """schema upgrade migrations go here."""
+    op.add_column("job", sa.Column("heartbeat_at", sa.DateTimeUTC(timezone=True), nullable=True))
+
+def schema_downgrades() -> None:
+    """schema downgrade migrations go here."""
+    op.drop_column("job", "heartbeat_at")
+
+def data_upgrades() -> None:
+    """Add any optional data upgrade migrations here!"""
+    # jobs running now were last known alive when they started
+    op.execute("UPDATE job SET heartbeat_at = started_at WHERE status = 'running'")
+
+def data_downgrades() -> None:
+    """Add any optional data downgrade migrations here!"""
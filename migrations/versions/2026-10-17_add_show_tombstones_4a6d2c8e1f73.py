@@ -0,0 +1,112 @@
+"""Add show tombstones
+
+Revision ID: 4a6d2c8e1f73
+Revises: 9c2f6a7e4b15
+Create Date: 2026-10-17 23:58:14.628305
+
+"""
+
+import warnings
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import op
+from advanced_alchemy.types import EncryptedString, EncryptedText, GUID, ORA_JSONB, DateTimeUTC, StoredObject, PasswordHash, FernetBackend
+from advanced_alchemy.types.encrypted_string import PGCryptoBackend
+from sqlalchemy import Text  # noqa: F401
+
+try:
+    from advanced_alchemy.types.password_hash.argon2 import Argon2Hasher
+except ImportError:
+    Argon2Hasher = Any  # type: ignore
+try:
+    from advanced_alchemy.types.password_hash.passlib import PasslibHasher
+except ImportError:
+    PasslibHasher = Any  # type: ignore
+try:
+    from advanced_alchemy.types.password_hash.pwdlib import PwdlibHasher
+except ImportError:
+    PwdlibHasher = Any  # type: ignore
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+__all__ = ["downgrade", "upgrade", "schema_upgrades", "schema_downgrades", "data_upgrades", "data_downgrades"]
+
+sa.GUID = GUID
+sa.DateTimeUTC = DateTimeUTC
+sa.ORA_JSONB = ORA_JSONB
+sa.EncryptedString = EncryptedString
+sa.EncryptedText = EncryptedText
+sa.StoredObject = StoredObject
+sa.PasswordHash = PasswordHash
+sa.Argon2Hasher = Argon2Hasher
+sa.PasslibHasher = PasslibHasher
+sa.PwdlibHasher = PwdlibHasher
+sa.FernetBackend = FernetBackend
+sa.PGCryptoBackend = PGCryptoBackend
+
+
+# revision identifiers, used by Alembic.
+revision = "4a6d2c8e1f73"
+down_revision = "9c2f6a7e4b15"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            schema_upgrades()
+            data_upgrades()
+
+def downgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            data_downgrades()
+            schema_downgrades()
+
+def schema_upgrades() -> None:
+    """schema upgrade migrations go here."""
+    op.create_table(
+        "show_tombstone",
+        sa.Column("show_id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("deleted_at", sa.DateTimeUTC(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user_account.id"], name=op.f("fk_show_tombstone_user_id_user_account")),
+        sa.PrimaryKeyConstraint("show_id", name=op.f("pk_show_tombstone")),
+    )
+    op.create_index(
+        "ix_show_tombstone_user_id_deleted_at",
+        "show_tombstone",
+        ["user_id", "deleted_at"],
+        unique=False,
+    )
+    # for the shows changed since a given time
+    op.create_index(
+        "ix_show_user_id_updated_at",
+        "show",
+        ["user_id", "updated_at"],
+        unique=False,
+        postgresql_concurrently=True,
+        if_not_exists=True,
+    )
+
+def schema_downgrades() -> None:
+    """schema downgrade migrations go here."""
+    op.drop_index(
+        "ix_show_user_id_updated_at",
+        table_name="show",
+        postgresql_concurrently=True,
+        if_exists=True,
+    )
+    op.drop_index("ix_show_tombstone_user_id_deleted_at", table_name="show_tombstone")
+    op.drop_table("show_tombstone")
+
+def data_upgrades() -> None:
+    """Add any optional data upgrade migrations here!"""
+
+def data_downgrades() -> None:
+    """Add any optional data downgrade migrations here!"""
@@ -0,0 +1,192 @@
+"""Add show user indexes
+
+Revision ID: cdc4192e1442
+Revises: ea0a17dece35
+Create Date: 2026-10-17 16:02:41.208335
+
+"""
+
+import logging
+import warnings
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import op
+from advanced_alchemy.types import EncryptedString, EncryptedText, GUID, ORA_JSONB, DateTimeUTC, StoredObject, PasswordHash, FernetBackend
+from advanced_alchemy.types.encrypted_string import PGCryptoBackend
+from sqlalchemy import Text  # noqa: F401
+from sqlalchemy.dialects import postgresql
+
+try:
+    from advanced_alchemy.types.password_hash.argon2 import Argon2Hasher
+except ImportError:
+    Argon2Hasher = Any  # type: ignore
+try:
+    from advanced_alchemy.types.password_hash.passlib import PasslibHasher
+except ImportError:
+    PasslibHasher = Any  # type: ignore
+try:
+    from advanced_alchemy.types.password_hash.pwdlib import PwdlibHasher
+except ImportError:
+    PwdlibHasher = Any  # type: ignore
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+__all__ = ["downgrade", "upgrade", "schema_upgrades", "schema_downgrades", "data_upgrades", "data_downgrades"]
+
+sa.GUID = GUID
+sa.DateTimeUTC = DateTimeUTC
+sa.ORA_JSONB = ORA_JSONB
+sa.EncryptedString = EncryptedString
+sa.EncryptedText = EncryptedText
+sa.StoredObject = StoredObject
+sa.PasswordHash = PasswordHash
+sa.Argon2Hasher = Argon2Hasher
+sa.PasslibHasher = PasslibHasher
+sa.PwdlibHasher = PwdlibHasher
+sa.FernetBackend = FernetBackend
+sa.PGCryptoBackend = PGCryptoBackend
+
+# revision identifiers, used by Alembic.
+revision = "cdc4192e1442"
+down_revision = "ea0a17dece35"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            schema_upgrades()
+            data_upgrades()
+
+def downgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            data_downgrades()
+            schema_downgrades()
+
+def schema_upgrades() -> None:
+    """schema upgrade migrations go here."""
+    # Nothing used to stop a user adding the same show twice: merge the copies of
+    # each into one, so that the unique index can be created
+    _merge_duplicate_shows()
+
+    # concurrently (possible as we're in an autocommit block), so that the show
+    # table stays writable while the indexes are built
+    op.create_index(
+        op.f("ix_show_user_id"),
+        "show",
+        ["user_id"],
+        unique=False,
+        postgresql_concurrently=True,
+    )
+    op.create_index(
+        "uq_show_user_id_tvmaze_id",
+        "show",
+        ["user_id", "tvmaze_id"],
+        unique=True,
+        postgresql_concurrently=True,
+    )
+
+def schema_downgrades() -> None:
+    """schema downgrade migrations go here."""
+    op.drop_index("uq_show_user_id_tvmaze_id", table_name="show", postgresql_concurrently=True)
+    op.drop_index(op.f("ix_show_user_id"), table_name="show", postgresql_concurrently=True)
+
+# The merge is done here rather than with the app's models, which may change
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+show_table = sa.table(
+    "show",
+    sa.column("id", sa.GUID()),
+    sa.column("user_id", sa.UUID()),
+    sa.column("tvmaze_id", sa.Integer()),
+    sa.column("favorite", sa.Boolean()),
+    sa.column("seasons", postgresql.JSONB()),
+    sa.column("user_channel", sa.String()),
+    sa.column("user_notes", sa.Text()),
+    sa.column("created_at", sa.DateTimeUTC()),
+    sa.column("updated_at", sa.DateTimeUTC()),
+)
+
+
+def _merge_copies(kept: "sa.Row", others: "Sequence[sa.Row]") -> dict:
+    """The state of a show added more than once, with nothing any copy has lost:
+    the most recently updated copy's, favorite if any copy is, with an episode
+    watched if it is (at the same place in its season) in any copy, the first
+    channel set and every different note. Merging again changes nothing, so an
+    interrupted migration can simply be run again."""
+
+    seasons = [[dict(ep) for ep in season] for season in kept.seasons]
+    for other in others:
+        for season, other_season in zip(seasons, other.seasons):
+            for ep, other_ep in zip(season, other_season):
+                ep["watched"] = bool(ep.get("watched")) or bool(other_ep.get("watched"))
+
+    copies = [kept, *others]
+    notes: list[str] = []
+    for copy in copies:
+        note = (copy.user_notes or "").strip()
+        if note and not any(note in kept_note for kept_note in notes):
+            notes.append(note)
+    return {
+        "favorite": any(copy.favorite for copy in copies),
+        "seasons": seasons,
+        "user_channel": next(
+            (copy.user_channel for copy in copies if copy.user_channel), None
+        ),
+        "user_notes": "\n\n".join(notes) if notes else kept.user_notes,
+    }
+
+
+def _merge_duplicate_shows() -> None:
+    conn = op.get_bind()
+    duplicated = (
+        sa.select(show_table.c.user_id, show_table.c.tvmaze_id)
+        .group_by(show_table.c.user_id, show_table.c.tvmaze_id)
+        .having(sa.func.count() > 1)
+    )
+    for user_id, tvmaze_id in conn.execute(duplicated).all():
+        copies = conn.execute(
+            sa.select(show_table)
+            .where(
+                show_table.c.user_id == user_id, show_table.c.tvmaze_id == tvmaze_id
+            )
+            .order_by(
+                show_table.c.updated_at.desc(),
+                show_table.c.created_at.desc(),
+                show_table.c.id,
+            )
+        ).all()
+        kept, others = copies[0], copies[1:]
+        # the kept copy is updated first, so that nothing is lost if the migration
+        # is interrupted before the others are deleted
+        conn.execute(
+            show_table.update()
+            .where(show_table.c.id == kept.id)
+            .values(**_merge_copies(kept, others))
+        )
+        conn.execute(
+            show_table.delete().where(
+                show_table.c.id.in_([other.id for other in others])
+            )
+        )
+        logger.warning(
+            "Merged %d copies of show %d (TVmaze ID) of user %s into show %s",
+            len(copies),
+            tvmaze_id,
+            user_id,
+            kept.id,
+        )
+
+
+def data_upgrades() -> None:
+    """Add any optional data upgrade migrations here!"""
+
+def data_downgrades() -> None:
+    """Add any optional data downgrade migrations here!"""
@@ -0,0 +1,278 @@
+"""Add tvmaze_show catalog
+
+Revision ID: 7b3f9a1c2d4e
+Revises: e5eaec4a0352
+Create Date: 2026-10-17 21:12:07.431906
+
+"""
+
+import logging
+import warnings
+from collections import Counter
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import op
+from advanced_alchemy.types import EncryptedString, EncryptedText, GUID, ORA_JSONB, DateTimeUTC, StoredObject, PasswordHash, FernetBackend
+from advanced_alchemy.types.encrypted_string import PGCryptoBackend
+from sqlalchemy import Text  # noqa: F401
+from sqlalchemy.dialects import postgresql
+
+try:
+    from advanced_alchemy.types.password_hash.argon2 import Argon2Hasher
+except ImportError:
+    Argon2Hasher = Any  # type: ignore
+try:
+    from advanced_alchemy.types.password_hash.passlib import PasslibHasher
+except ImportError:
+    PasslibHasher = Any  # type: ignore
+try:
+    from advanced_alchemy.types.password_hash.pwdlib import PwdlibHasher
+except ImportError:
+    PwdlibHasher = Any  # type: ignore
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+__all__ = ["downgrade", "upgrade", "schema_upgrades", "schema_downgrades", "data_upgrades", "data_downgrades"]
+
+sa.GUID = GUID
+sa.DateTimeUTC = DateTimeUTC
+sa.ORA_JSONB = ORA_JSONB
+sa.EncryptedString = EncryptedString
+sa.EncryptedText = EncryptedText
+sa.StoredObject = StoredObject
+sa.PasswordHash = PasswordHash
+sa.Argon2Hasher = Argon2Hasher
+sa.PasslibHasher = PasslibHasher
+sa.PwdlibHasher = PwdlibHasher
+sa.FernetBackend = FernetBackend
+sa.PGCryptoBackend = PGCryptoBackend
+
+# revision identifiers, used by Alembic.
+revision = "7b3f9a1c2d4e"
+down_revision = "e5eaec4a0352"
+branch_labels = None
+depends_on = None
+
+
+# the show's details from TVmaze, moved from each user's show to the catalog
+CATALOG_COLUMNS = [
+    "title",
+    "source",
+    "duration",
+    "image_sm_url",
+    "image_lg_url",
+    "imdb_id",
+    "thetvdb_id",
+    "seasons",
+]
+
+
+def upgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            schema_upgrades()
+            data_upgrades()
+
+def downgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            data_downgrades()
+            schema_downgrades()
+
+def schema_upgrades() -> None:
+    """schema upgrade migrations go here."""
+    op.create_table(
+        "tvmaze_show",
+        sa.Column("tvmaze_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("title", sa.String(length=100), nullable=False),
+        sa.Column("source", sa.String(length=50), nullable=True),
+        sa.Column("duration", sa.Integer(), nullable=True),
+        sa.Column("image_sm_url", sa.String(length=256), nullable=True),
+        sa.Column("image_lg_url", sa.String(length=256), nullable=True),
+        sa.Column("imdb_id", sa.String(length=32), nullable=True),
+        sa.Column("thetvdb_id", sa.Integer(), nullable=True),
+        sa.Column("seasons", sa.JSON().with_variant(postgresql.JSONB(astext_type=sa.Text()), "cockroachdb").with_variant(sa.ORA_JSONB(), "oracle").with_variant(postgresql.JSONB(astext_type=sa.Text()), "postgresql"), nullable=False),
+        sa.Column("created_at", sa.DateTimeUTC(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTimeUTC(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("tvmaze_id", name=op.f("pk_tvmaze_show")),
+        if_not_exists=True,
+    )
+
+    # Fill the catalog before show's copies of the details are dropped: where users'
+    # copies of a show differ, the most recently updated one is kept (and the others'
+    # watched episodes converted to it)
+    columns = ", ".join(CATALOG_COLUMNS)
+    op.execute(
+        f"""
+        INSERT INTO tvmaze_show (tvmaze_id, {columns}, created_at, updated_at)
+        SELECT DISTINCT ON (tvmaze_id) tvmaze_id, {columns}, now(), now()
+        FROM show
+        ORDER BY tvmaze_id, updated_at DESC
+        ON CONFLICT (tvmaze_id) DO NOTHING
+        """
+    )
+    _convert_to_catalog()
+    op.create_foreign_key(
+        op.f("fk_show_tvmaze_id_tvmaze_show"),
+        "show",
+        "tvmaze_show",
+        ["tvmaze_id"],
+        ["tvmaze_id"],
+    )
+    # in a single statement, so that they are dropped all together or not at all
+    op.execute(
+        "ALTER TABLE show "
+        + ", ".join(f"DROP COLUMN {column}" for column in CATALOG_COLUMNS)
+    )
+
+def schema_downgrades() -> None:
+    """schema downgrade migrations go here."""
+    op.add_column("show", sa.Column("title", sa.String(length=100), nullable=True))
+    op.add_column("show", sa.Column("source", sa.String(length=50), nullable=True))
+    op.add_column("show", sa.Column("duration", sa.Integer(), nullable=True))
+    op.add_column("show", sa.Column("image_sm_url", sa.String(length=256), nullable=True))
+    op.add_column("show", sa.Column("image_lg_url", sa.String(length=256), nullable=True))
+    op.add_column("show", sa.Column("imdb_id", sa.String(length=32), nullable=True))
+    op.add_column("show", sa.Column("thetvdb_id", sa.Integer(), nullable=True))
+    op.add_column("show", sa.Column("seasons", sa.JSON().with_variant(postgresql.JSONB(astext_type=sa.Text()), "cockroachdb").with_variant(sa.ORA_JSONB(), "oracle").with_variant(postgresql.JSONB(astext_type=sa.Text()), "postgresql"), nullable=True))
+
+    # give every user's show its own copy of the details again
+    op.execute(
+        "UPDATE show SET "
+        + ", ".join(f"{column} = tvmaze_show.{column}" for column in CATALOG_COLUMNS)
+        + " FROM tvmaze_show WHERE tvmaze_show.tvmaze_id = show.tvmaze_id"
+    )
+    op.alter_column("show", "title", nullable=False)
+    op.alter_column("show", "seasons", nullable=False)
+
+    op.drop_constraint(op.f("fk_show_tvmaze_id_tvmaze_show"), "show", type_="foreignkey")
+    op.drop_table("tvmaze_show")
+
+# Users' copies of a show whose episodes differ from the copy kept in the catalog
+# have their watched bitmaps converted to its episodes, as otherwise they'd be read
+# against them, position for position. This is done here rather than with the app's
+# models, which may change; bitmaps are numbered as by Postgres's get_bit/set_bit
+# (see db.bitmaps)
+
+BATCH_SIZE = 500
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+show_table = sa.table(
+    "show",
+    sa.column("id", sa.GUID()),
+    sa.column("tvmaze_id", sa.Integer()),
+    sa.column("seasons", postgresql.JSONB()),
+    sa.column("watched", postgresql.ARRAY(postgresql.BYTEA())),
+)
+
+tvmaze_show_table = sa.table(
+    "tvmaze_show",
+    sa.column("tvmaze_id", sa.Integer()),
+    sa.column("seasons", postgresql.JSONB()),
+)
+
+
+def _pack_bits(flags: "Sequence[bool]") -> bytes:
+    bitmap = bytearray((len(flags) + 7) // 8)
+    for n, flag in enumerate(flags):
+        if flag:
+            bitmap[n // 8] |= 1 << (n % 8)
+    return bytes(bitmap)
+
+
+def _unpack_bits(bitmap: bytes, count: int) -> list[bool]:
+    return [
+        n // 8 < len(bitmap) and bool(bitmap[n // 8] >> (n % 8) & 1)
+        for n in range(count)
+    ]
+
+
+def _convert_watched(watched: list, seasons: list, catalog_seasons: list) -> list[bytes]:
+    # moves each episode's flag to where the episode is in the catalog's seasons:
+    # found in the same season by its number, or a special (which has none) by its
+    # title; the flags of episodes not there are dropped
+    def key(season_idx: int, episode: dict) -> tuple:
+        return season_idx, (
+            episode["ep_num"] if episode["ep_num"] is not None else episode["title"]
+        )
+
+    catalog_places: dict[tuple, tuple[int, int]] = {}
+    for season_idx, season in enumerate(catalog_seasons):
+        for ep_idx, episode in enumerate(season):
+            catalog_places.setdefault(key(season_idx, episode), (season_idx, ep_idx))
+
+    flags = [[False] * len(season) for season in catalog_seasons]
+    for season_idx, season in enumerate(seasons):
+        bitmap = (watched[season_idx] if season_idx < len(watched) else None) or b""
+        for episode, flag in zip(season, _unpack_bits(bitmap, len(season))):
+            place = catalog_places.get(key(season_idx, episode))
+            if flag and place is not None:
+                flags[place[0]][place[1]] = True
+    return [_pack_bits(season_flags) for season_flags in flags]
+
+
+def _convert_to_catalog() -> None:
+    """Converts the watched bitmaps of the shows whose episodes differ from their
+    catalog entry's to the entry's episodes, a batch of shows at a time, and reports
+    the shows (by TVmaze ID) that had differing copies. This runs in autocommit
+    mode, so each show is committed as it goes: its episodes are made the entry's
+    too, so that an interrupted conversion can simply be run again."""
+
+    conn = op.get_bind()
+    converted: Counter[int] = Counter()
+    last_id = None
+    while True:
+        query = (
+            sa.select(
+                show_table.c.id,
+                show_table.c.tvmaze_id,
+                show_table.c.seasons,
+                show_table.c.watched,
+                tvmaze_show_table.c.seasons.label("catalog_seasons"),
+            )
+            .join(
+                tvmaze_show_table,
+                tvmaze_show_table.c.tvmaze_id == show_table.c.tvmaze_id,
+            )
+            .where(show_table.c.seasons != tvmaze_show_table.c.seasons)
+            .order_by(show_table.c.id)
+            .limit(BATCH_SIZE)
+        )
+        if last_id is not None:
+            query = query.where(show_table.c.id > last_id)
+        rows = conn.execute(query).all()
+        if not rows:
+            break
+        for row in rows:
+            conn.execute(
+                show_table.update()
+                .where(show_table.c.id == row.id)
+                .values(
+                    seasons=row.catalog_seasons,
+                    watched=_convert_watched(
+                        row.watched, row.seasons, row.catalog_seasons
+                    ),
+                )
+            )
+            converted[row.tvmaze_id] += 1
+        last_id = rows[-1].id
+
+    for tvmaze_id, count in sorted(converted.items()):
+        logger.warning(
+            "Converted the watched episodes of %d copies of show %d (TVmaze ID) "
+            "to the differing episodes of the copy kept in the catalog",
+            count,
+            tvmaze_id,
+        )
+
+
+def data_upgrades() -> None:
+    """Add any optional data upgrade migrations here!"""
+
+def data_downgrades() -> None:
+    """Add any optional data downgrade migrations here!"""
@@ -0,0 +1,188 @@
+"""Store watched status as bitmaps
+
+Revision ID: e5eaec4a0352
+Revises: cdc4192e1442
+Create Date: 2026-10-17 19:40:12.583019
+
+"""
+
+import warnings
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import op
+from advanced_alchemy.types import EncryptedString, EncryptedText, GUID, ORA_JSONB, DateTimeUTC, StoredObject, PasswordHash, FernetBackend
+from advanced_alchemy.types.encrypted_string import PGCryptoBackend
+from sqlalchemy import Text  # noqa: F401
+from sqlalchemy.dialects import postgresql
+
+try:
+    from advanced_alchemy.types.password_hash.argon2 import Argon2Hasher
+except ImportError:
+    Argon2Hasher = Any  # type: ignore
+try:
+    from advanced_alchemy.types.password_hash.passlib import PasslibHasher
+except ImportError:
+    PasslibHasher = Any  # type: ignore
+try:
+    from advanced_alchemy.types.password_hash.pwdlib import PwdlibHasher
+except ImportError:
+    PwdlibHasher = Any  # type: ignore
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+__all__ = ["downgrade", "upgrade", "schema_upgrades", "schema_downgrades", "data_upgrades", "data_downgrades"]
+
+sa.GUID = GUID
+sa.DateTimeUTC = DateTimeUTC
+sa.ORA_JSONB = ORA_JSONB
+sa.EncryptedString = EncryptedString
+sa.EncryptedText = EncryptedText
+sa.StoredObject = StoredObject
+sa.PasswordHash = PasswordHash
+sa.Argon2Hasher = Argon2Hasher
+sa.PasslibHasher = PasslibHasher
+sa.PwdlibHasher = PwdlibHasher
+sa.FernetBackend = FernetBackend
+sa.PGCryptoBackend = PGCryptoBackend
+
+# revision identifiers, used by Alembic.
+revision = "e5eaec4a0352"
+down_revision = "cdc4192e1442"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            schema_upgrades()
+            data_upgrades()
+
+def downgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            data_downgrades()
+            schema_downgrades()
+
+def schema_upgrades() -> None:
+    """schema upgrade migrations go here."""
+    # filled in by data_upgrades
+    op.add_column(
+        "show",
+        sa.Column(
+            "watched",
+            postgresql.ARRAY(postgresql.BYTEA()),
+            server_default="{}",
+            nullable=False,
+        ),
+    )
+
+def schema_downgrades() -> None:
+    """schema downgrade migrations go here."""
+    op.drop_column("show", "watched")
+
+# The conversion is done here rather than with the app's models, which may change;
+# bitmaps are numbered as by Postgres's get_bit/set_bit (see db.bitmaps)
+
+BATCH_SIZE = 500
+
+show_table = sa.table(
+    "show",
+    sa.column("id", sa.GUID()),
+    sa.column("seasons", postgresql.JSONB()),
+    sa.column("watched", postgresql.ARRAY(postgresql.BYTEA())),
+)
+
+
+def _pack_bits(flags: "Sequence[bool]") -> bytes:
+    bitmap = bytearray((len(flags) + 7) // 8)
+    for n, flag in enumerate(flags):
+        if flag:
+            bitmap[n // 8] |= 1 << (n % 8)
+    return bytes(bitmap)
+
+
+def _unpack_bits(bitmap: bytes, count: int) -> list[bool]:
+    return [
+        n // 8 < len(bitmap) and bool(bitmap[n // 8] >> (n % 8) & 1)
+        for n in range(count)
+    ]
+
+
+def _convert_shows(convert: "Callable[[list, list], dict | None]") -> None:
+    """Rewrites every show's seasons and watched columns with `convert`, a batch of
+    shows at a time. This runs in autocommit mode, so each show is committed as it
+    goes: `convert` returns None for shows already converted, so that an interrupted
+    conversion can simply be run again."""
+
+    conn = op.get_bind()
+    last_id = None
+    while True:
+        query = (
+            sa.select(show_table.c.id, show_table.c.seasons, show_table.c.watched)
+            .order_by(show_table.c.id)
+            .limit(BATCH_SIZE)
+        )
+        if last_id is not None:
+            query = query.where(show_table.c.id > last_id)
+        rows = conn.execute(query).all()
+        if not rows:
+            break
+        for row in rows:
+            values = convert(row.seasons, row.watched)
+            if values is not None:
+                conn.execute(
+                    show_table.update()
+                    .where(show_table.c.id == row.id)
+                    .values(**values)
+                )
+        last_id = rows[-1].id
+
+
+def _has_watched_keys(seasons: list) -> bool:
+    # i.e. in the old layout; shows without episodes are the same in both
+    return any("watched" in ep for season in seasons for ep in season)
+
+
+def data_upgrades() -> None:
+    """Add any optional data upgrade migrations here!"""
+
+    def convert(seasons: list, watched: list) -> dict | None:
+        if not _has_watched_keys(seasons):
+            return None
+        return {
+            "seasons": [
+                [{"title": ep["title"], "ep_num": ep["ep_num"]} for ep in season]
+                for season in seasons
+            ],
+            "watched": [
+                _pack_bits([ep.get("watched", False) for ep in season])
+                for season in seasons
+            ],
+        }
+
+    _convert_shows(convert)
+
+def data_downgrades() -> None:
+    """Add any optional data downgrade migrations here!"""
+
+    def convert(seasons: list, watched: list) -> dict | None:
+        if _has_watched_keys(seasons):
+            return None
+        bitmaps = watched + [b""] * (len(seasons) - len(watched))
+        return {
+            "seasons": [
+                [
+                    {"title": ep["title"], "ep_num": ep["ep_num"], "watched": flag}
+                    for ep, flag in zip(season, _unpack_bits(bitmap, len(season)))
+                ]
+                for season, bitmap in zip(seasons, bitmaps)
+            ],
+            "watched": [],
+        }
+
+    _convert_shows(convert)
@@ -0,0 +1,139 @@
+"""Stamp shows and tombstones with the transactions that wrote them
+
+Revision ID: 2c7e5a9f4d18
+Revises: 8d4b2f6a1c39
+Create Date: 2026-10-18 02:13:52.408617
+
+"""
+
+import warnings
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import op
+from advanced_alchemy.types import EncryptedString, EncryptedText, GUID, ORA_JSONB, DateTimeUTC, StoredObject, PasswordHash, FernetBackend
+from advanced_alchemy.types.encrypted_string import PGCryptoBackend
+from sqlalchemy import Text  # noqa: F401
+
+try:
+    from advanced_alchemy.types.password_hash.argon2 import Argon2Hasher
+except ImportError:
+    Argon2Hasher = Any  # type: ignore
+try:
+    from advanced_alchemy.types.password_hash.passlib import PasslibHasher
+except ImportError:
+    PasslibHasher = Any  # type: ignore
+try:
+    from advanced_alchemy.types.password_hash.pwdlib import PwdlibHasher
+except ImportError:
+    PwdlibHasher = Any  # type: ignore
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+__all__ = ["downgrade", "upgrade", "schema_upgrades", "schema_downgrades", "data_upgrades", "data_downgrades"]
+
+sa.GUID = GUID
+sa.DateTimeUTC = DateTimeUTC
+sa.ORA_JSONB = ORA_JSONB
+sa.EncryptedString = EncryptedString
+sa.EncryptedText = EncryptedText
+sa.StoredObject = StoredObject
+sa.PasswordHash = PasswordHash
+sa.Argon2Hasher = Argon2Hasher
+sa.PasslibHasher = PasslibHasher
+sa.PwdlibHasher = PwdlibHasher
+sa.FernetBackend = FernetBackend
+sa.PGCryptoBackend = PGCryptoBackend
+# revision identifiers, used by Alembic.
+revision = "2c7e5a9f4d18"
+down_revision = "8d4b2f6a1c39"
+branch_labels = None
+depends_on = None
+
+# the current transaction's ID (see `db.models.CURRENT_XID`)
+CURRENT_XID = "pg_current_xact_id()::text::bigint"
+
+
+def upgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            schema_upgrades()
+            data_upgrades()
+
+def downgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            data_downgrades()
+            schema_downgrades()
+
+def schema_upgrades() -> None:
+    """schema upgrade migrations go here."""
+    # existing rows are all stamped with this migration's transaction: clients'
+    # timestamp cursors are no longer accepted, so they sync in full once anyway
+    op.add_column(
+        "show",
+        sa.Column("change_xid", sa.BigInteger(), server_default=sa.text(CURRENT_XID), nullable=False),
+    )
+    op.add_column(
+        "show_tombstone",
+        sa.Column("change_xid", sa.BigInteger(), server_default=sa.text(CURRENT_XID), nullable=False),
+    )
+    op.create_table(
+        "show_tombstone_horizon",
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("pruned_xid", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user_account.id"], name=op.f("fk_show_tombstone_horizon_user_id_user_account")),
+        sa.PrimaryKeyConstraint("user_id", name=op.f("pk_show_tombstone_horizon")),
+    )
+    # for the shows changed since a sync
+    op.create_index(
+        "ix_show_user_id_change_xid",
+        "show",
+        ["user_id", "change_xid"],
+        unique=False,
+        postgresql_concurrently=True,
+        if_not_exists=True,
+    )
+    op.drop_index("ix_show_tombstone_user_id_deleted_at", table_name="show_tombstone")
+    op.create_index(
+        "ix_show_tombstone_user_id_change_xid",
+        "show_tombstone",
+        ["user_id", "change_xid"],
+        unique=False,
+    )
+    # tombstones, deleted once expired
+    op.create_index(
+        "ix_show_tombstone_deleted_at",
+        "show_tombstone",
+        ["deleted_at"],
+        unique=False,
+    )
+
+def schema_downgrades() -> None:
+    """schema downgrade migrations go here."""
+    op.drop_index("ix_show_tombstone_deleted_at", table_name="show_tombstone")
+    op.drop_index("ix_show_tombstone_user_id_change_xid", table_name="show_tombstone")
+    op.create_index(
+        "ix_show_tombstone_user_id_deleted_at",
+        "show_tombstone",
+        ["user_id", "deleted_at"],
+        unique=False,
+    )
+    op.drop_index(
+        "ix_show_user_id_change_xid",
+        table_name="show",
+        postgresql_concurrently=True,
+        if_exists=True,
+    )
+    op.drop_table("show_tombstone_horizon")
+    op.drop_column("show_tombstone", "change_xid")
+    op.drop_column("show", "change_xid")
+
+def data_upgrades() -> None:
+    """Add any optional data upgrade migrations here!"""
+
+def data_downgrades() -> None:
+    """Add any optional data downgrade migrations here!"""
@@ -3,10 +3,15 @@ Defines:
 - APP_ENV: string designating the current backend environment; fetchable via /env
 - DATABASE_URL: db connection string, constructed from environment variables
 - JWT_ENCODING_SECRET: for signing JWTs
+- TVMAZE_*: tuning for the app-lifetime HTTP client used to call TVmaze (all optional)
+- EPISODE_CACHE_*: where and how long TVmaze episode details are cached (all optional)
+- JOB_*: how background jobs are run (all optional)
 """
 
+import importlib.util
 import json
 import os
+from dataclasses import dataclass
 
 from dotenv import dotenv_values, load_dotenv
 
@@ -93,3 +98,170 @@ def get_csrf_secret() -> str:
     if secret is None:
         raise ConfigurationError("CSRF_SECRET must be set in the environment")
     return secret
+
+
+@dataclass(frozen=True)
+class TVmazeHTTPSettings:
+    """Connection pool and timeout settings for the shared TVmaze HTTP client"""
+
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0  # seconds an idle connection is kept open
+    http2: bool = False
+    timeout: float = 10.0  # seconds
+
+
+def get_tvmaze_http_settings() -> TVmazeHTTPSettings:
+    check_loaded()
+    defaults = TVmazeHTTPSettings()
+
+    http2 = _get_bool_env("TVMAZE_HTTP2", defaults.http2)
+    if http2 and importlib.util.find_spec("h2") is None:
+        raise ConfigurationError(
+            "TVMAZE_HTTP2 requires the h2 package: install the http2 extra "
+            "(uv sync --extra http2)"
+        )
+
+    return TVmazeHTTPSettings(
+        max_connections=_get_int_env(
+            "TVMAZE_MAX_CONNECTIONS", defaults.max_connections
+        ),
+        max_keepalive_connections=_get_int_env(
+            "TVMAZE_MAX_KEEPALIVE_CONNECTIONS", defaults.max_keepalive_connections
+        ),
+        keepalive_expiry=_get_float_env(
+            "TVMAZE_KEEPALIVE_EXPIRY", defaults.keepalive_expiry
+        ),
+        http2=http2,
+        timeout=_get_float_env("TVMAZE_TIMEOUT", defaults.timeout),
+    )
+
+
+@dataclass(frozen=True)
+class TVmazeRateLimitSettings:
+    """Client-side throttling of TVmaze requests, per process. With several worker
+    processes, divide the rate and burst among them to stay under TVmaze's limit."""
+
+    per_second: float = 1.5
+    burst: int = 5
+
+
+def get_tvmaze_rate_limit_settings() -> TVmazeRateLimitSettings:
+    check_loaded()
+    defaults = TVmazeRateLimitSettings()
+
+    settings = TVmazeRateLimitSettings(
+        per_second=_get_float_env("TVMAZE_RATE_LIMIT_PER_SECOND", defaults.per_second),
+        burst=_get_int_env("TVMAZE_RATE_LIMIT_BURST", defaults.burst),
+    )
+    if settings.per_second <= 0 or settings.burst < 1:
+        raise ConfigurationError(
+            "TVMAZE_RATE_LIMIT_PER_SECOND must be positive and "
+            "TVMAZE_RATE_LIMIT_BURST at least 1"
+        )
+    return settings
+
+
+@dataclass(frozen=True)
+class EpisodeCacheSettings:
+    """Where TVmaze episode details are cached: "memory" (per worker process, lost
+    on restart), "sqlite" (a file shared by the workers on one host) or "postgres"
+    (a table in the app database, shared by all workers)"""
+
+    backend: str = "memory"
+    ttl: float = 86400.0  # seconds
+    memory_max_episodes: int = 100_000  # summed over all shows; memory backend only
+    sqlite_path: str = "episode_cache.sqlite3"  # sqlite backend only
+
+
+def get_episode_cache_settings() -> EpisodeCacheSettings:
+    check_loaded()
+    defaults = EpisodeCacheSettings()
+
+    backend = os.getenv("EPISODE_CACHE_BACKEND") or defaults.backend
+    if backend not in ("memory", "sqlite", "postgres"):
+        raise ConfigurationError(
+            "EPISODE_CACHE_BACKEND must be one of memory, sqlite, postgres"
+        )
+
+    return EpisodeCacheSettings(
+        backend=backend,
+        ttl=_get_float_env("EPISODE_CACHE_TTL", defaults.ttl),
+        memory_max_episodes=_get_int_env(
+            "EPISODE_CACHE_MEMORY_MAX_EPISODES", defaults.memory_max_episodes
+        ),
+        sqlite_path=os.getenv("EPISODE_CACHE_SQLITE_PATH") or defaults.sqlite_path,
+    )
+
+
+@dataclass(frozen=True)
+class JobSettings:
+    """How background jobs are run: by `workers` workers in each app process (none,
+    to leave them to separate `scripts.run_jobs` processes), each checking for new
+    jobs every `poll_interval` seconds. A worker reports that its job is still running
+    every quarter of `timeout`; a job it hasn't for `timeout` seconds is taken to have
+    been abandoned (by a worker that stopped), and is run again, up to `max_attempts`
+    times in all. A job is deleted, with any output, `retention` seconds after it
+    finished."""
+
+    workers: int = 1
+    poll_interval: float = 2.0  # seconds
+    timeout: float = 300.0  # seconds
+    max_attempts: int = 3
+    retention: float = 86400.0  # seconds
+
+
+def get_job_settings() -> JobSettings:
+    check_loaded()
+    defaults = JobSettings()
+
+    settings = JobSettings(
+        workers=_get_int_env("JOB_WORKERS", defaults.workers),
+        poll_interval=_get_float_env("JOB_POLL_INTERVAL", defaults.poll_interval),
+        timeout=_get_float_env("JOB_TIMEOUT", defaults.timeout),
+        max_attempts=_get_int_env("JOB_MAX_ATTEMPTS", defaults.max_attempts),
+        retention=_get_float_env("JOB_RETENTION", defaults.retention),
+    )
+    if (
+        settings.workers < 0
+        or settings.poll_interval <= 0
+        or settings.timeout <= 0
+        or settings.max_attempts < 1
+        or settings.retention <= 0
+    ):
+        raise ConfigurationError(
+            "JOB_WORKERS must not be negative, JOB_POLL_INTERVAL, JOB_TIMEOUT and "
+            "JOB_RETENTION must be positive and JOB_MAX_ATTEMPTS at least 1"
+        )
+    return settings
+
+
+def _get_int_env(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ConfigurationError(f"{name} must be an integer")
+
+
+def _get_float_env(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ConfigurationError(f"{name} must be a number")
+
+
+def _get_bool_env(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if not value:
+        return default
+    if value.casefold() in ("1", "true", "yes", "on"):
+        return True
+    if value.casefold() in ("0", "false", "no", "off"):
+        return False
+    raise ConfigurationError(f"{name} must be true or false")
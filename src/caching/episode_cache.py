@@ -0,0 +1,377 @@
+"""
+Caches of TVmaze episode details, keyed by TVmaze show ID (so shared by every user
+tracking the show), with interchangeable backends:
+
+- `InMemoryEpisodeCache`: per process, lost on restart
+- `SQLiteEpisodeCache`: a file on local disk, shared by every worker process on the
+  host and surviving restarts
+- `PostgresEpisodeCache`: a table in the app database, shared by every worker
+  process on every host
+
+Each entry holds the validators (ETag, Last-Modified) TVmaze sent with the episode
+list, so that it can later be revalidated with a conditional request instead of
+fetched again in full.
+
+Hit/miss counts in `stats` are per process and per backend instance, even when the
+underlying storage is shared.
+
+No backend takes a lock around reads or writes: the in-memory backend's operations
+never yield to the event loop partway through, and the others rely on their
+database's own concurrency control. Populating the cache goes through
+`get_or_fetch`/`refresh`, which make concurrent fetches for the same show share one
+fetch, without holding up fetches or reads for other shows.
+"""
+
+import asyncio
+import datetime
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+
+from cachetools import TTLCache
+from pydantic import BaseModel
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from caching.single_flight import SingleFlight
+from caching.stats import CacheStats
+from db.models import DbEpisodeCacheEntry
+from models.show import EpisodeDetails
+
+type Episodes = list[list[EpisodeDetails]]
+
+DEFAULT_TTL = 86400  # seconds
+
+
+class CachedEpisodes(BaseModel):
+    """A show's episodes, as lists of seasons of episodes, with the validators of the
+    TVmaze response they came from"""
+
+    episodes: Episodes
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+# Produces the entry to cache, given the current one (if any) to revalidate: the
+# current entry itself if it's still valid as it is
+type EpisodesFetcher = Callable[[CachedEpisodes | None], Awaitable[CachedEpisodes]]
+
+
+class EpisodeCacheBackend(ABC):
+    """Stores the episode details of shows for a limited time."""
+
+    def __init__(self) -> None:
+        self.stats = CacheStats()
+        self._fetches: SingleFlight[str, CachedEpisodes] = SingleFlight()
+
+    async def get(self, key: str) -> CachedEpisodes | None:
+        """Returns the cached entry for `key`, or None if there is none or it has
+        expired."""
+        entry = await self._get(key)
+        if entry is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return entry
+
+    async def get_or_fetch(self, key: str, fetch: EpisodesFetcher) -> CachedEpisodes:
+        """Returns the cached entry for `key`, fetching and caching one if there
+        isn't one, as with `refresh`."""
+        entry = await self.get(key)
+        if entry is not None:
+            return entry
+        return await self.refresh(key, fetch, revalidate=False)
+
+    async def refresh(
+        self, key: str, fetch: EpisodesFetcher, revalidate: bool = True
+    ) -> CachedEpisodes:
+        """Fetches an entry with `fetch`, caches it under `key` (restarting its time
+        to live), and returns it.
+
+        Args:
+            fetch: called with the current unexpired entry if `revalidate` is set and
+                there is one, else None. If it returns that entry, unchanged, the
+                entry isn't stored again: only its time to live is restarted.
+            revalidate: whether to look up the current entry for `fetch`
+
+        Concurrent calls for the same key share a single fetch; exceptions raised by
+        `fetch` propagate to all of them and the cache is left unchanged.
+        """
+
+        async def fetch_and_set() -> CachedEpisodes:
+            current = await self._get(key) if revalidate else None
+            entry = await fetch(current)
+            if current is not None and entry is current:
+                await self.touch(key)
+            else:
+                await self.set(key, entry)
+            return entry
+
+        return await self._fetches.do(key, fetch_and_set)
+
+    @abstractmethod
+    async def set(self, key: str, entry: CachedEpisodes) -> None:
+        """Caches `entry` under `key`, replacing any existing entry."""
+
+    @abstractmethod
+    async def touch(self, key: str) -> None:
+        """Restarts the time to live of the entry for `key`, if there is one,
+        without reading or writing the entry itself."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Removes the entry for `key`, if there is one."""
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Removes all entries."""
+
+    @abstractmethod
+    async def _get(self, key: str) -> CachedEpisodes | None: ...
+
+
+def episode_count(entry: CachedEpisodes) -> int:
+    return sum(len(season) for season in entry.episodes)
+
+
+class _CountingTTLCache[K, V](TTLCache[K, V]):
+    """TTLCache that counts entries evicted to make room (not expired ones)"""
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        timer: Callable[[], float],
+        getsizeof: Callable[[V], float],
+        stats: CacheStats,
+    ):
+        super().__init__(maxsize=maxsize, ttl=ttl, timer=timer, getsizeof=getsizeof)
+        self._stats = stats
+
+    def popitem(self) -> tuple[K, V]:
+        item = super().popitem()
+        self._stats.evictions += 1
+        return item
+
+
+class InMemoryEpisodeCache(EpisodeCacheBackend):
+    """Bounded cache in this process's memory. Shows vary from a handful of episodes
+    to thousands, so the bound is on the total number of episodes cached rather than
+    the number of shows: least recently used shows are evicted to stay within
+    `max_episodes`."""
+
+    def __init__(
+        self,
+        max_episodes: int = 100_000,
+        ttl: float = DEFAULT_TTL,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__()
+        self.max_episodes = max_episodes
+        self._entries: _CountingTTLCache[str, CachedEpisodes] = _CountingTTLCache(
+            maxsize=max_episodes,
+            ttl=ttl,
+            timer=clock,
+            getsizeof=episode_count,
+            stats=self.stats,
+        )
+
+    async def _get(self, key: str) -> CachedEpisodes | None:
+        return self._entries.get(key)
+
+    async def set(self, key: str, entry: CachedEpisodes) -> None:
+        if episode_count(entry) > self.max_episodes:
+            await self.delete(key)  # too big to cache at all; don't keep an old copy
+            return
+        self._entries[key] = entry
+
+    async def touch(self, key: str) -> None:
+        # storing the same object again is all it takes
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries[key] = entry
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def cached_episode_count(self) -> int:
+        return int(self._entries.currsize)
+
+
+class SQLiteEpisodeCache(EpisodeCacheBackend):
+    """Cache in an SQLite database file. Queries run in worker threads, on a fresh
+    connection each time, so that the event loop is never blocked on disk.
+
+    The file holds nothing that can't be fetched again, so when its layout changes
+    (`SCHEMA_VERSION`), files in an older layout are simply emptied.
+    """
+
+    SCHEMA_VERSION = 2
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = DEFAULT_TTL,
+        *,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            path: database file, created if necessary
+            ttl: seconds an entry is kept
+            clock: wall-clock time source in seconds, comparable across processes
+                (replaceable for testing)
+        """
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self._clock = clock
+        self._initialized = False
+
+    async def _get(self, key: str) -> CachedEpisodes | None:
+        row = await self._run(
+            "SELECT value FROM episode_cache WHERE key = ? AND expires_at > ?",
+            (key, self._clock()),
+            fetch=True,
+        )
+        return CachedEpisodes.model_validate_json(row[0]) if row else None
+
+    async def set(self, key: str, entry: CachedEpisodes) -> None:
+        await self._run(
+            "INSERT OR REPLACE INTO episode_cache (key, value, expires_at) "
+            "VALUES (?, ?, ?)",
+            (key, entry.model_dump_json(), self._clock() + self.ttl),
+        )
+
+    async def touch(self, key: str) -> None:
+        await self._run(
+            "UPDATE episode_cache SET expires_at = ? WHERE key = ?",
+            (self._clock() + self.ttl, key),
+        )
+
+    async def delete(self, key: str) -> None:
+        await self._run("DELETE FROM episode_cache WHERE key = ?", (key,))
+
+    async def clear(self) -> None:
+        await self._run("DELETE FROM episode_cache", ())
+
+    async def _run(
+        self, sql: str, params: tuple[object, ...], fetch: bool = False
+    ) -> tuple | None:
+        return await asyncio.to_thread(self._run_sync, sql, params, fetch)
+
+    def _run_sync(
+        self, sql: str, params: tuple[object, ...], fetch: bool
+    ) -> tuple | None:
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            if not self._initialized:
+                self._initialize(conn)
+                self._initialized = True
+            with conn:  # commits, or rolls back on error
+                cursor = conn.execute(sql, params)
+                return cursor.fetchone() if fetch else None
+        finally:
+            conn.close()
+
+    def _initialize(self, conn: sqlite3.Connection) -> None:
+        # WAL lets readers in other processes proceed while one writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            (version,) = conn.execute("PRAGMA user_version").fetchone()
+            if version != self.SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS episode_cache")
+                conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION:d}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS episode_cache "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+
+class PostgresEpisodeCache(EpisodeCacheBackend):
+    """Cache in the `episode_cache` table of the app database. Each operation runs in
+    its own short transaction, independent of any request's session, so cache
+    writes never depend on (or roll back with) the request's own changes.
+
+    Expiry is measured by the database's clock, which all workers share. Expired
+    rows are ignored and overwritten when the show is next cached.
+    """
+
+    def __init__(self, engine: AsyncEngine, ttl: float = DEFAULT_TTL):
+        super().__init__()
+        self.engine = engine
+        self.ttl = ttl
+
+    async def _get(self, key: str) -> CachedEpisodes | None:
+        async with self.engine.connect() as conn:
+            row = (
+                await conn.execute(
+                    select(
+                        DbEpisodeCacheEntry.value,
+                        DbEpisodeCacheEntry.etag,
+                        DbEpisodeCacheEntry.last_modified,
+                    ).where(
+                        DbEpisodeCacheEntry.key == key,
+                        DbEpisodeCacheEntry.expires_at > func.now(),
+                    )
+                )
+            ).one_or_none()
+        if row is None:
+            return None
+        return CachedEpisodes.model_validate(
+            {
+                "episodes": row.value,
+                "etag": row.etag,
+                "last_modified": row.last_modified,
+            }
+        )
+
+    async def set(self, key: str, entry: CachedEpisodes) -> None:
+        expires_at = func.now() + datetime.timedelta(seconds=self.ttl)
+        stmt = insert(DbEpisodeCacheEntry).values(
+            key=key,
+            value=entry.model_dump(mode="json")["episodes"],
+            etag=entry.etag,
+            last_modified=entry.last_modified,
+            expires_at=expires_at,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DbEpisodeCacheEntry.key],
+            set_={
+                "value": stmt.excluded.value,
+                "etag": stmt.excluded.etag,
+                "last_modified": stmt.excluded.last_modified,
+                "expires_at": stmt.excluded.expires_at,
+            },
+        )
+        async with self.engine.begin() as conn:
+            await conn.execute(stmt)
+
+    async def touch(self, key: str) -> None:
+        expires_at = func.now() + datetime.timedelta(seconds=self.ttl)
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                update(DbEpisodeCacheEntry)
+                .where(DbEpisodeCacheEntry.key == key)
+                .values(expires_at=expires_at)
+            )
+
+    async def delete(self, key: str) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                delete(DbEpisodeCacheEntry).where(DbEpisodeCacheEntry.key == key)
+            )
+
+    async def clear(self) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(delete(DbEpisodeCacheEntry))
@@ -0,0 +1,57 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+
+@dataclass
+class _Call[V]:
+    task: asyncio.Future[V]
+    waiters: int = field(default=0)
+
+
+class SingleFlight[K, V]:
+    """Coalesces concurrent calls for the same key: while a call for a key is in
+    flight, further calls for that key wait for and share its outcome (result or
+    exception) instead of starting their own.
+
+    Cancelling one caller doesn't affect the others; the underlying call is
+    cancelled only if every caller waiting on it is. Once a call finishes, the next
+    call for its key starts afresh (nothing is cached).
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[K, _Call[V]] = {}
+
+    def in_flight(self, key: K) -> bool:
+        return key in self._calls
+
+    async def do(self, key: K, fn: Callable[[], Awaitable[V]]) -> V:
+        """Runs `fn` for `key`, or joins the call for `key` already in flight.
+
+        Returns:
+            The result of the (shared) call. Exceptions raised by the call propagate
+            to every caller sharing it.
+        """
+
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(task=asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+
+        call.waiters += 1
+        try:
+            # shielded, so that one caller being cancelled doesn't cancel the call
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # every caller gave up: nobody needs the result. Forgotten now, not
+                # once the cancellation completes, so that a caller arriving in the
+                # meantime starts a call of its own rather than joining this one
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: K, call: _Call[V]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
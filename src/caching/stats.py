@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class CacheStats:
+    """Running counters for a cache; `stale_hits` counts hits served from entries
+    past their freshness lifetime."""
+
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.stale_hits + self.misses
+
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of lookups served from the cache, stale or not."""
+        return (self.hits + self.stale_hits) / self.lookups if self.lookups else 0.0
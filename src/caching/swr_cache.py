@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from caching.stats import CacheStats
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry[V]:
+    value: V
+    stored_at: float
+
+
+class StaleWhileRevalidateCache[K, V]:
+    """Bounded in-process LRU cache whose entries expire after a time-to-live, with
+    a grace period during which expired ("stale") entries are still served while
+    they are refreshed in the background.
+
+    Entry lifecycle, measured from when a value was stored:
+    - up to `ttl` seconds: fresh, served from the cache
+    - up to `ttl + stale_ttl` seconds: stale, served from the cache while a
+      background task fetches a replacement
+    - after that: treated as missing, fetched before returning
+
+    When more than `maxsize` entries are stored, the least recently used are evicted.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        stale_ttl: float,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            maxsize: maximum number of entries
+            ttl: seconds an entry is fresh
+            stale_ttl: further seconds an expired entry may be served while refreshing
+            clock: monotonic time source in seconds (replaceable for testing)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stats = CacheStats()
+        self._clock = clock
+        self._entries: OrderedDict[K, _Entry[V]] = OrderedDict()
+        self._refreshes: dict[K, asyncio.Task[None]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_fetch(
+        self,
+        key: K,
+        fetch: Callable[[], Awaitable[V]],
+        refresh: Callable[[], Awaitable[V]] | None = None,
+    ) -> V:
+        """Returns the cached value for `key` if there is a usable one, otherwise
+        fetches, caches and returns it.
+
+        Args:
+            key: cache key
+            fetch: produces the value when it isn't cached; exceptions propagate
+                and nothing is cached
+            refresh: produces a replacement for a stale value in the background;
+                defaults to `fetch`. Failures are logged and the stale value kept.
+        """
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = self._clock() - entry.stored_at
+            if age <= self.ttl:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return entry.value
+            if age <= self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stats.stale_hits += 1
+                self._start_refresh(key, refresh or fetch)
+                return entry.value
+            del self._entries[key]  # too old to serve
+
+        self.stats.misses += 1
+        value = await fetch()
+        self._store(key, value)
+        return value
+
+    def clear(self) -> None:
+        """Removes all entries and resets the stats; background refreshes already
+        underway are left to finish."""
+        self._entries.clear()
+        self.stats = CacheStats()
+
+    async def wait_for_refreshes(self) -> None:
+        """Waits for any background refreshes underway to finish."""
+        await asyncio.gather(*self._refreshes.values())
+
+    def _store(self, key: K, value: V) -> None:
+        self._entries[key] = _Entry(value=value, stored_at=self._clock())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def _start_refresh(self, key: K, refresh: Callable[[], Awaitable[V]]) -> None:
+        if key in self._refreshes:
+            return  # already underway
+
+        async def run() -> None:
+            try:
+                self._store(key, await refresh())
+            except Exception:
+                logger.warning("Background cache refresh failed", exc_info=True)
+            finally:
+                del self._refreshes[key]
+
+        self._refreshes[key] = asyncio.create_task(run())
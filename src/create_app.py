@@ -1,3 +1,6 @@
+import asyncio
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
 from typing import Literal
 
 from advanced_alchemy.config import AsyncSessionConfig
@@ -9,12 +12,23 @@ from advanced_alchemy.extensions.litestar import (
 from litestar import Litestar
 from litestar.config.cors import CORSConfig
 from litestar.config.csrf import CSRFConfig
+from litestar.datastructures import State
+from litestar.di import Provide
 from litestar.middleware.rate_limit import RateLimitConfig
 from litestar.security.jwt import JWTCookieAuth
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
 import app_config
 import litestar_users_setup.plugin
-from routes import all_routes
+from caching.episode_cache import (
+    EpisodeCacheBackend,
+    InMemoryEpisodeCache,
+    PostgresEpisodeCache,
+    SQLiteEpisodeCache,
+)
+from routes import NEXT_CURSOR_HEADER, all_routes
+from services.job_service import JobWorker
+from tvmaze_api.client import TVmazeAPIClient, create_http_client
 
 """
 Main app: API backend for TV tracker
@@ -34,6 +48,35 @@ RATE_LIMIT_REQ_PER_MIN = 50
 MAX_FILE_UPLOAD_BYTES = 50_000_000
 
 
+# --- dependencies ---
+
+
+def provide_tvmaze_client(state: State) -> TVmazeAPIClient:
+    """Provides the app-lifetime TVmaze client created at startup"""
+    client: TVmazeAPIClient = state.tvmaze_client
+    return client
+
+
+def provide_episodes_cache(state: State) -> EpisodeCacheBackend:
+    """Provides the app-lifetime episode details cache created at startup"""
+    cache: EpisodeCacheBackend = state.episodes_cache
+    return cache
+
+
+def create_episodes_cache(
+    settings: app_config.EpisodeCacheSettings, engine: AsyncEngine
+) -> EpisodeCacheBackend:
+    match settings.backend:
+        case "sqlite":
+            return SQLiteEpisodeCache(path=settings.sqlite_path, ttl=settings.ttl)
+        case "postgres":
+            return PostgresEpisodeCache(engine=engine, ttl=settings.ttl)
+        case _:
+            return InMemoryEpisodeCache(
+                max_episodes=settings.memory_max_episodes, ttl=settings.ttl
+            )
+
+
 # --- app ---
 
 
@@ -65,10 +108,19 @@ def create_app() -> Litestar:
         ),
     )
 
+    # For sessions that outlast the request's, which is closed once the response
+    # starts: a streamed response reads its content after that
+    def provide_db_session_maker(state: State) -> Callable[[], AsyncSession]:
+        session_maker: Callable[[], AsyncSession] = state[
+            sqlAlchemyConfig.session_maker_app_state_key
+        ]
+        return session_maker
+
     cors_config = CORSConfig(
         # FIXME: replace allowed origins with config setting
         allow_origins=app_config.get_cors_allowed_origins(),
         allow_credentials=True,
+        expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
     )
 
     csrf_config = CSRFConfig(
@@ -80,6 +132,61 @@ def create_app() -> Litestar:
         cookie_samesite="lax",
     )
 
+    tvmaze_rate_limit_settings = app_config.get_tvmaze_rate_limit_settings()
+    TVmazeAPIClient.configure_rate_limit(
+        rate=tvmaze_rate_limit_settings.per_second,
+        burst=tvmaze_rate_limit_settings.burst,
+    )
+
+    tvmaze_http_settings = app_config.get_tvmaze_http_settings()
+    episode_cache_settings = app_config.get_episode_cache_settings()
+    job_settings = app_config.get_job_settings()
+
+    # One pooled HTTP client for all TVmaze calls, so that requests reuse open
+    # (keep-alive) connections instead of paying for a new handshake every time
+    @asynccontextmanager
+    async def tvmaze_client_lifespan(app: Litestar) -> AsyncIterator[None]:
+        async with create_http_client(
+            max_connections=tvmaze_http_settings.max_connections,
+            max_keepalive_connections=tvmaze_http_settings.max_keepalive_connections,
+            keepalive_expiry=tvmaze_http_settings.keepalive_expiry,
+            http2=tvmaze_http_settings.http2,
+            timeout=tvmaze_http_settings.timeout,
+        ) as http_client:
+            app.state.tvmaze_client = TVmazeAPIClient(http_client=http_client)
+            yield
+
+    @asynccontextmanager
+    async def episodes_cache_lifespan(app: Litestar) -> AsyncIterator[None]:
+        app.state.episodes_cache = create_episodes_cache(
+            episode_cache_settings, engine=sqlAlchemyConfig.get_engine()
+        )
+        yield
+
+    # Workers for background jobs, run in the app process alongside requests (unless
+    # there are none, leaving the jobs to `scripts.run_jobs`). The session maker is
+    # looked up as they need it: it's only stored once the app has started
+    @asynccontextmanager
+    async def jobs_lifespan(app: Litestar) -> AsyncIterator[None]:
+        app.state.job_worker = JobWorker(
+            session_maker=lambda: app.state[
+                sqlAlchemyConfig.session_maker_app_state_key
+            ](),
+            settings=job_settings,
+            tvmaze_client=app.state.tvmaze_client,
+            episodes_cache=app.state.episodes_cache,
+        )
+        tasks = [
+            asyncio.create_task(app.state.job_worker.run())
+            for _ in range(job_settings.workers)
+        ]
+        try:
+            yield
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
     return Litestar(
         debug=True,
         plugins=[
@@ -96,5 +203,11 @@ def create_app() -> Litestar:
             RateLimitConfig(rate_limit=("minute", RATE_LIMIT_REQ_PER_MIN)).middleware
         ],
         request_max_body_size=MAX_FILE_UPLOAD_BYTES,
+        lifespan=[tvmaze_client_lifespan, episodes_cache_lifespan, jobs_lifespan],
+        dependencies={
+            "tvmaze_client": Provide(provide_tvmaze_client, sync_to_thread=False),
+            "episodes_cache": Provide(provide_episodes_cache, sync_to_thread=False),
+            "db_session_maker": Provide(provide_db_session_maker, sync_to_thread=False),
+        },
         route_handlers=all_routes,
     )
@@ -0,0 +1,25 @@
+"""
+Bitmaps of boolean flags, stored as Postgres bytea values.
+
+Bits are numbered the way Postgres's `get_bit` and `set_bit` number them, so that
+bitmaps can be read and changed in SQL as well as here: bit n is bit n % 8 (counting
+from the least significant) of byte n // 8.
+"""
+
+from collections.abc import Sequence
+
+
+def pack_bits(flags: Sequence[bool]) -> bytes:
+    bitmap = bytearray((len(flags) + 7) // 8)
+    for n, flag in enumerate(flags):
+        if flag:
+            bitmap[n // 8] |= 1 << (n % 8)
+    return bytes(bitmap)
+
+
+def unpack_bits(bitmap: bytes, count: int) -> list[bool]:
+    """Returns the first `count` flags of the bitmap; any beyond its end are unset."""
+    return [
+        n // 8 < len(bitmap) and bool(bitmap[n // 8] >> (n % 8) & 1)
+        for n in range(count)
+    ]
@@ -1,104 +1,344 @@
+import datetime
+from collections.abc import Sequence
 from typing import Self
 from uuid import UUID
 
-from advanced_alchemy.base import UUIDAuditBase
-from advanced_alchemy.types import JsonB
+from advanced_alchemy.base import DefaultBase, UUIDAuditBase
+from advanced_alchemy.mixins import AuditColumns
+from advanced_alchemy.types import DateTimeUTC, JsonB
 from pydantic import HttpUrl
-from sqlalchemy import Boolean, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, BYTEA, JSONB
 from sqlalchemy.dialects.postgresql import UUID as SQLA_UUID
 from sqlalchemy.ext.mutable import MutableList
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from db.bitmaps import pack_bits, unpack_bits
+from models.job import Job, JobKind, JobStatus
 from models.prefs import UserPrefs
 from models.show import EpisodeDescriptor, Show, ShowCreate
 
+# The ID of the current transaction, as a bigint: set on each show and tombstone it
+# writes, so that clients syncing their copy of a user's shows can be sent the changes
+# since any transactions they had already seen (see `ShowService.get_show_changes_json`).
+# Unlike a timestamp or a sequence's value, taken when a row is written, it can be
+# compared with the IDs of the transactions still in progress, which may commit later
+CURRENT_XID = text("pg_current_xact_id()::text::bigint")
 
-class DbShow(UUIDAuditBase):
-    __tablename__ = "show"
 
-    user_id: Mapped[UUID] = mapped_column(
-        SQLA_UUID(as_uuid=True), ForeignKey("user_account.id")
-    )
-    tvmaze_id: Mapped[int]
+class DbTVmazeShow(AuditColumns, DefaultBase):
+    """A show's details from TVmaze, shared by every user who has saved it; each
+    user's own state for the show is in a `DbShow`
+    """
+
+    __tablename__ = "tvmaze_show"
+
+    tvmaze_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
     title: Mapped[str] = mapped_column(String(100))
-    favorite: Mapped[bool] = mapped_column(Boolean)
     source: Mapped[str] = mapped_column(String(50), nullable=True)
     duration: Mapped[int] = mapped_column(nullable=True)
     image_sm_url: Mapped[str] = mapped_column(String(256), nullable=True)
     image_lg_url: Mapped[str] = mapped_column(String(256), nullable=True)
     imdb_id: Mapped[str] = mapped_column(String(32), nullable=True)
     thetvdb_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    # episode titles and numbers, by season: {"title", "ep_num"}
     seasons: Mapped[list[list[dict]]] = mapped_column(
         MutableList.as_mutable(JsonB), default=list
     )
-    user_channel: Mapped[str] = mapped_column(String(50), nullable=True)
-    user_notes: Mapped[str] = mapped_column(Text, nullable=True)
 
-    @classmethod
-    def from_show_model(cls, show: Show | ShowCreate, owner_id: UUID) -> Self:
-        json_seasons = [
+    @staticmethod
+    def seasons_to_json(seasons: list[list[EpisodeDescriptor]]) -> list[list[dict]]:
+        return [
             [
                 {
                     "title": episode_descriptor.title,
                     "ep_num": episode_descriptor.ep_num,
-                    "watched": episode_descriptor.watched,
                 }
                 for episode_descriptor in season
             ]
-            for season in show.seasons
+            for season in seasons
         ]
 
-        id = show.id if isinstance(show, Show) else None
-
+    @classmethod
+    def from_show_model(cls, show: Show | ShowCreate) -> Self:
         return cls(
-            id=id,
-            user_id=owner_id,
             tvmaze_id=show.tvmaze_id,
             title=show.title,
-            favorite=show.favorite,
             source=show.source,
             duration=show.duration,
             image_sm_url=str(show.image_sm_url),
             image_lg_url=str(show.image_lg_url),
             imdb_id=show.imdb_id,
             thetvdb_id=show.thetvdb_id,
-            seasons=json_seasons,
-            user_channel=show.user_channel,
-            user_notes=show.user_notes,
+            seasons=cls.seasons_to_json(show.seasons),
         )
 
-    def to_show_model(self) -> Show:
-        # Build list of lists of episodes for the seasons
+    def to_show_create_model(self) -> ShowCreate:
+        """The show as a new user's show: a favorite, with nothing watched"""
+
+        return ShowCreate(
+            tvmaze_id=self.tvmaze_id,
+            title=self.title,
+            favorite=True,
+            source=self.source,
+            duration=self.duration,
+            image_sm_url=HttpUrl(self.image_sm_url),
+            image_lg_url=HttpUrl(self.image_lg_url),
+            imdb_id=self.imdb_id,
+            thetvdb_id=self.thetvdb_id,
+            seasons=self.episode_descriptors(watched=[]),
+            user_channel=None,
+            user_notes=None,
+        )
+
+    def episode_descriptors(
+        self, watched: Sequence[bytes | None]
+    ) -> list[list[EpisodeDescriptor]]:
+        """The show's seasons of episodes, with their watched status taken from the
+        given bitmaps (one per season, see `DbShow.watched`; any missing count as
+        empty)"""
+
         model_seasons = []
-        for season in self.seasons:
+        for season_idx, season in enumerate(self.seasons):
+            bitmap = (watched[season_idx] if season_idx < len(watched) else None) or b""
             current_season_descriptors: list[EpisodeDescriptor] = []
-            for episode in season:
+            for episode, ep_watched in zip(season, unpack_bits(bitmap, len(season))):
                 current_season_descriptors.append(
                     EpisodeDescriptor(
                         title=episode["title"],
                         ep_num=episode["ep_num"],
-                        watched=episode["watched"],
+                        watched=ep_watched,
                     )
                 )
             model_seasons.append(current_season_descriptors)
+        return model_seasons
+
+    def keeps_watched_for(self, seasons: list[list[dict]]) -> bool:
+        """Whether the watched bitmaps of this entry's seasons hold for the given
+        seasons (the show's episodes as they've changed since) as they are: whether
+        every episode is still where it was (see `watched_for`)"""
+
+        return all(
+            place == new_place
+            for place, new_place in _episode_moves(self.seasons, seasons)
+        )
+
+    def watched_for(
+        self, watched: Sequence[bytes | None], seasons: list[list[dict]]
+    ) -> list[bytes]:
+        """Converts the watched bitmaps of this entry's seasons to bitmaps of the
+        given seasons (the show's episodes as they've changed since), moving each
+        episode's flag to where the episode is now: found in the same season by its
+        number, or a special (which has none) by its title. The flags of episodes no
+        longer there are dropped."""
+
+        flags = [
+            [episode.watched for episode in season]
+            for season in self.episode_descriptors(watched)
+        ]
+        return _moved_watched(flags, self.seasons, seasons)
+
+
+def _moved_watched(
+    flags: list[list[bool]],
+    old_seasons: list[list[dict]],
+    new_seasons: list[list[dict]],
+) -> list[bytes]:
+    # the watched bitmaps of the new seasons, from the flags of the old seasons'
+    # episodes, each moved to where its episode is (see `_episode_moves`)
+    new_flags = [[False] * len(season) for season in new_seasons]
+    for (season_idx, ep_idx), new_place in _episode_moves(old_seasons, new_seasons):
+        if new_place is not None and flags[season_idx][ep_idx]:
+            new_flags[new_place[0]][new_place[1]] = True
+    return [pack_bits(season_flags) for season_flags in new_flags]
+
+
+def _episode_moves(
+    old_seasons: list[list[dict]], new_seasons: list[list[dict]]
+) -> list[tuple[tuple[int, int], tuple[int, int] | None]]:
+    # where each of the old seasons' episodes (season index, episode index) is in the
+    # new ones, or None if it isn't: episodes are told apart within a season by
+    # number, or a special by title (and any listed twice are taken to be the first)
+    def key(season_idx: int, episode: dict) -> tuple[int, int | str]:
+        return season_idx, (
+            episode["ep_num"] if episode["ep_num"] is not None else episode["title"]
+        )
+
+    new_places: dict[tuple[int, int | str], tuple[int, int]] = {}
+    for season_idx, season in enumerate(new_seasons):
+        for ep_idx, episode in enumerate(season):
+            new_places.setdefault(key(season_idx, episode), (season_idx, ep_idx))
+    seen: set[tuple[int, int | str]] = set()
+    moves: list[tuple[tuple[int, int], tuple[int, int] | None]] = []
+    for season_idx, season in enumerate(old_seasons):
+        for ep_idx, episode in enumerate(season):
+            episode_key = key(season_idx, episode)
+            new_place = None if episode_key in seen else new_places.get(episode_key)
+            seen.add(episode_key)
+            moves.append(((season_idx, ep_idx), new_place))
+    return moves
+
+
+class DbShow(UUIDAuditBase):
+    """A show saved by a user: the user's own state for it, with the show's details
+    in the shared catalog (`DbTVmazeShow`)
+    """
+
+    __tablename__ = "show"
+    __table_args__ = (
+        # a user can add a show only once
+        Index("uq_show_user_id_tvmaze_id", "user_id", "tvmaze_id", unique=True),
+        # nearly every query is for one user's shows; with the ID, pages of them can
+        # be read in ID order straight from the index
+        Index("ix_show_user_id_id", "user_id", "id"),
+        # the same for just the favorites, as many users list only those
+        Index(
+            "ix_show_user_id_id_favorite",
+            "user_id",
+            "id",
+            postgresql_where=text("favorite"),
+        ),
+        # for when the user's shows were last changed
+        Index("ix_show_user_id_updated_at", "user_id", "updated_at"),
+        # for the user's shows changed since a sync
+        Index("ix_show_user_id_change_xid", "user_id", "change_xid"),
+    )
+
+    user_id: Mapped[UUID] = mapped_column(
+        SQLA_UUID(as_uuid=True), ForeignKey("user_account.id")
+    )
+    tvmaze_id: Mapped[int] = mapped_column(ForeignKey("tvmaze_show.tvmaze_id"))
+    favorite: Mapped[bool] = mapped_column(Boolean)
+    # watched status of the episodes, as one bitmap per season (see `db.bitmaps`),
+    # so that it can be changed without rewriting the episode details
+    watched: Mapped[list[bytes]] = mapped_column(
+        ARRAY(BYTEA, zero_indexes=True), default=list
+    )
+    user_channel: Mapped[str] = mapped_column(String(50), nullable=True)
+    user_notes: Mapped[str] = mapped_column(Text, nullable=True)
+    # the transaction that last changed the show (see `CURRENT_XID`), by any kind of
+    # statement: COPY takes the server default, and UPDATEs the `onupdate` one
+    change_xid: Mapped[int] = mapped_column(
+        BigInteger, server_default=CURRENT_XID, onupdate=CURRENT_XID
+    )
+
+    # loaded in the same query as the show, by a join
+    catalog: Mapped[DbTVmazeShow] = relationship(lazy="joined", innerjoin=True)
+
+    @staticmethod
+    def seasons_to_watched(
+        seasons: list[list[EpisodeDescriptor]],
+        catalog_seasons: list[list[dict]] | None = None,
+    ) -> list[bytes]:
+        """Packs the episodes' watched status into bitmaps, one per season.
+
+        Args:
+            catalog_seasons: the seasons of the show's catalog entry, if they may
+                differ from `seasons` (a show imported, say, since when the catalog
+                has changed): the bitmaps are then of the catalog's episodes, each
+                episode's flag moved to where it is in them, matched as by
+                `DbTVmazeShow.watched_for`. The flags of episodes not in them are
+                dropped, and those of episodes only in them left unset.
+        """
 
+        flags = [[episode.watched for episode in season] for season in seasons]
+        if catalog_seasons is None:
+            return [pack_bits(season_flags) for season_flags in flags]
+        return _moved_watched(
+            flags, DbTVmazeShow.seasons_to_json(seasons), catalog_seasons
+        )
+
+    @classmethod
+    def from_show_model(
+        cls,
+        show: Show | ShowCreate,
+        owner_id: UUID,
+        catalog: DbTVmazeShow | None = None,
+    ) -> Self:
+        """Converts the show, with its details in `catalog` if given (the show's
+        existing catalog entry) or else in a new catalog entry made from the show
+        """
+
+        id = show.id if isinstance(show, Show) else None
+        catalog = catalog or DbTVmazeShow.from_show_model(show)
+
+        return cls(
+            id=id,
+            user_id=owner_id,
+            tvmaze_id=show.tvmaze_id,
+            favorite=show.favorite,
+            watched=cls.seasons_to_watched(show.seasons, catalog.seasons),
+            user_channel=show.user_channel,
+            user_notes=show.user_notes,
+            catalog=catalog,
+        )
+
+    def to_show_model(self) -> Show:
         return Show(
             id=self.id,
             tvmaze_id=self.tvmaze_id,
-            title=self.title,
+            title=self.catalog.title,
             favorite=self.favorite,
-            source=self.source,
-            duration=self.duration,
-            image_sm_url=HttpUrl(self.image_sm_url),
-            image_lg_url=HttpUrl(self.image_lg_url),
-            imdb_id=self.imdb_id,
-            thetvdb_id=self.thetvdb_id,
-            seasons=model_seasons,
+            source=self.catalog.source,
+            duration=self.catalog.duration,
+            image_sm_url=HttpUrl(self.catalog.image_sm_url),
+            image_lg_url=HttpUrl(self.catalog.image_lg_url),
+            imdb_id=self.catalog.imdb_id,
+            thetvdb_id=self.catalog.thetvdb_id,
+            seasons=self.catalog.episode_descriptors(watched=self.watched or []),
             user_channel=self.user_channel,
             user_notes=self.user_notes,
         )
 
 
+class DbShowTombstone(DefaultBase):
+    """A record of a show a user deleted, so that clients keeping a copy of their
+    shows can be told of the deletion (see `ShowService.get_show_changes_json`)
+    """
+
+    __tablename__ = "show_tombstone"
+    __table_args__ = (
+        # read as the user's deletions since a sync
+        Index("ix_show_tombstone_user_id_change_xid", "user_id", "change_xid"),
+        # deleted once older than their retention
+        Index("ix_show_tombstone_deleted_at", "deleted_at"),
+    )
+
+    show_id: Mapped[UUID] = mapped_column(
+        SQLA_UUID(as_uuid=True), primary_key=True, autoincrement=False
+    )
+    user_id: Mapped[UUID] = mapped_column(
+        SQLA_UUID(as_uuid=True), ForeignKey("user_account.id")
+    )
+    deleted_at: Mapped[datetime.datetime] = mapped_column(DateTimeUTC(timezone=True))
+    # the transaction that deleted the show (see `CURRENT_XID`)
+    change_xid: Mapped[int] = mapped_column(BigInteger, server_default=CURRENT_XID)
+
+
+class DbShowTombstoneHorizon(DefaultBase):
+    """How far a user's tombstones have been deleted (see
+    `ShowService.delete_expired_tombstones`): a sync from a cursor no later than
+    `pruned_xid` may have missed deletions, so must be a full one
+    """
+
+    __tablename__ = "show_tombstone_horizon"
+
+    user_id: Mapped[UUID] = mapped_column(
+        SQLA_UUID(as_uuid=True), ForeignKey("user_account.id"), primary_key=True
+    )
+    # the latest `change_xid` of the user's tombstones deleted
+    pruned_xid: Mapped[int] = mapped_column(BigInteger)
+
+
 class DbUserPrefs(UUIDAuditBase):
     __tablename__ = "user_prefs"
 
@@ -113,3 +353,89 @@ class DbUserPrefs(UUIDAuditBase):
     @classmethod
     def from_user_prefs_model(cls, user_prefs: UserPrefs, owner_id: UUID) -> Self:
         return cls(user_id=owner_id, show_favorites_only=user_prefs.show_favorites_only)
+
+
+class DbEpisodeCacheEntry(DefaultBase):
+    """Cached TVmaze episode details for a show; see `caching.episode_cache`"""
+
+    __tablename__ = "episode_cache"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[list[list[dict]]] = mapped_column(JsonB)
+    etag: Mapped[str | None] = mapped_column(String(256), nullable=True)
+    last_modified: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    expires_at: Mapped[datetime.datetime] = mapped_column(DateTimeUTC(timezone=True))
+
+
+class DbJob(UUIDAuditBase):
+    """A job run in the background for a user (see `services.job_service`); a file
+    it takes or makes is stored in chunks, as `DbJobData`
+    """
+
+    __tablename__ = "job"
+    __table_args__ = (
+        # the queue, claimed oldest first; the condition is in the claiming query too
+        # (see `JobWorker.claim`) so that the index can be used
+        Index(
+            "ix_job_unfinished_created_at",
+            "created_at",
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+        Index("ix_job_user_id", "user_id"),
+        # finished jobs, deleted once expired (see `JobWorker.delete_expired`)
+        Index(
+            "ix_job_finished_at",
+            "finished_at",
+            postgresql_where=text("finished_at IS NOT NULL"),
+        ),
+    )
+
+    user_id: Mapped[UUID] = mapped_column(
+        SQLA_UUID(as_uuid=True), ForeignKey("user_account.id")
+    )
+    kind: Mapped[str] = mapped_column(String(20))
+    status: Mapped[str] = mapped_column(String(20), default=JobStatus.QUEUED)
+    # JSONB rather than JsonB: the seasons of `DbTVmazeShow` make every column of
+    # JsonB itself a MutableList, which wouldn't take these dicts
+    params: Mapped[dict] = mapped_column(JSONB, default=dict)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    started_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTimeUTC(timezone=True), nullable=True
+    )
+    # when the worker running the job last reported that it still was
+    heartbeat_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTimeUTC(timezone=True), nullable=True
+    )
+    finished_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTimeUTC(timezone=True), nullable=True
+    )
+    result: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+
+    def to_job_model(self) -> Job:
+        return Job(
+            id=self.id,
+            kind=JobKind(self.kind),
+            status=JobStatus(self.status),
+            attempts=self.attempts,
+            created_at=self.created_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            result=self.result,
+            has_output=self.kind == JobKind.EXPORT
+            and self.status == JobStatus.SUCCEEDED,
+        )
+
+
+class DbJobData(DefaultBase):
+    """A chunk of a job's input (an imported file) or output (an exported one)"""
+
+    __tablename__ = "job_data"
+
+    job_id: Mapped[UUID] = mapped_column(
+        SQLA_UUID(as_uuid=True),
+        ForeignKey("job.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    output: Mapped[bool] = mapped_column(Boolean, primary_key=True)
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    data: Mapped[bytes] = mapped_column(BYTEA)
@@ -0,0 +1,278 @@
+"""
+Shows encoded as JSON straight from database rows, for the routes that return many of
+them: no ORM objects or `Show` models are built, and the episode lists are decoded
+from the database's JSON text by msgspec rather than `json.loads`. For lists that
+need less, `encode_show_fields` encodes just some of the fields, selecting just the
+columns they need. `encode_show_changes` wraps shows encoded either way with the IDs of those
+deleted, for clients keeping a copy of the user's shows in sync.
+
+The JSON is exactly what encoding the equivalent `Show` models gives, field for field
+and in the same order. The image URLs are passed through as stored, which is as
+`HttpUrl` formats them (see `DbTVmazeShow.from_show_model`).
+"""
+
+from collections.abc import Iterable, Sequence
+from typing import Any
+from uuid import UUID
+
+import msgspec
+from sqlalchemy import (
+    ARRAY,
+    ColumnElement,
+    Integer,
+    Text,
+    cast,
+    column,
+    func,
+    literal,
+    select,
+)
+from sqlalchemy.dialects.postgresql import BIT, JSONB, array
+from sqlalchemy.orm import QueryableAttribute
+
+from db.models import DbShow, DbTVmazeShow
+from models.show import Show
+
+
+class EpisodeStruct(msgspec.Struct):
+    """An `EpisodeDescriptor`; decoded from the catalog's JSON, which leaves out
+    `watched`"""
+
+    title: str | None
+    ep_num: int | None
+    watched: bool = False
+
+
+class ShowStruct(msgspec.Struct):
+    """A `Show`, with the fields in the same order"""
+
+    tvmaze_id: int
+    title: str
+    favorite: bool
+    source: str | None
+    duration: int | None
+    image_sm_url: str | None
+    image_lg_url: str | None
+    imdb_id: str | None
+    thetvdb_id: int | None
+    seasons: list[list[EpisodeStruct]]
+    user_channel: str | None
+    user_notes: str | None
+    id: UUID
+
+
+# The columns `encode_shows` expects, in order: select them from DbShow joined to
+# DbTVmazeShow
+SHOW_COLUMNS = (
+    DbShow.id,
+    DbShow.tvmaze_id,
+    DbTVmazeShow.title,
+    DbShow.favorite,
+    DbTVmazeShow.source,
+    DbTVmazeShow.duration,
+    DbTVmazeShow.image_sm_url,
+    DbTVmazeShow.image_lg_url,
+    DbTVmazeShow.imdb_id,
+    DbTVmazeShow.thetvdb_id,
+    # as text, to be decoded by msgspec (the driver would decode it with json.loads)
+    cast(DbTVmazeShow.seasons, Text),
+    DbShow.watched,
+    DbShow.user_channel,
+    DbShow.user_notes,
+)
+
+type ShowRow = tuple[
+    UUID,
+    int,
+    str,
+    bool,
+    str | None,
+    int | None,
+    str | None,
+    str | None,
+    str | None,
+    int | None,
+    str,
+    Sequence[bytes | None] | None,
+    str | None,
+    str | None,
+]
+
+_seasons_decoder = msgspec.json.Decoder(list[list[EpisodeStruct]])
+_shows_encoder = msgspec.json.Encoder()
+
+
+def _set_watched(season: list[EpisodeStruct], bitmap: bytes) -> None:
+    # only the set bits need visiting: episodes are decoded as unwatched
+    for byte_idx, byte in enumerate(bitmap):
+        if not byte:
+            continue
+        for bit in range(8):
+            ep_idx = byte_idx * 8 + bit
+            if byte >> bit & 1 and ep_idx < len(season):
+                season[ep_idx].watched = True
+
+
+def _set_watched_seasons(
+    seasons: list[list[EpisodeStruct]], watched: Sequence[bytes | None] | None
+) -> None:
+    for season, bitmap in zip(seasons, watched or []):
+        if bitmap:
+            _set_watched(season, bitmap)
+
+
+def encode_shows(rows: Iterable[ShowRow]) -> bytes:
+    """Encodes rows of `SHOW_COLUMNS` as a JSON object of shows by ID, as the
+    `dict[UUID, Show]` they represent would be encoded"""
+
+    shows: dict[UUID, ShowStruct] = {}
+    for (
+        id,
+        tvmaze_id,
+        title,
+        favorite,
+        source,
+        duration,
+        image_sm_url,
+        image_lg_url,
+        imdb_id,
+        thetvdb_id,
+        seasons_json,
+        watched,
+        user_channel,
+        user_notes,
+    ) in rows:
+        seasons = _seasons_decoder.decode(seasons_json)
+        _set_watched_seasons(seasons, watched)
+        shows[id] = ShowStruct(
+            tvmaze_id=tvmaze_id,
+            title=title,
+            favorite=favorite,
+            source=source,
+            duration=duration,
+            image_sm_url=image_sm_url,
+            image_lg_url=image_lg_url,
+            imdb_id=imdb_id,
+            thetvdb_id=thetvdb_id,
+            seasons=seasons,
+            user_channel=user_channel,
+            user_notes=user_notes,
+            id=id,
+        )
+    return _shows_encoder.encode(shows)
+
+
+class SeasonCounts(msgspec.Struct):
+    """How many of a season's episodes have been watched, out of how many"""
+
+    watched: int
+    total: int
+
+
+def _season_counts() -> ColumnElement[list[list[int]]]:
+    # [watched, total] for each of the show's seasons, counted by Postgres. Bits past
+    # the end of a season aren't expected to be set, but are masked off all the same:
+    # the season's whole bytes are counted, then the bits of the partial byte after
+    # them that are within the season (see `db.bitmaps` for how bits are numbered)
+    seasons = (
+        func.jsonb_array_elements(DbTVmazeShow.seasons)
+        .table_valued(column("season", JSONB), with_ordinality="season_num")
+        .render_derived(with_types=False)
+    )
+    total = func.jsonb_array_length(seasons.c.season, type_=Integer)
+    bitmap = func.coalesce(DbShow.watched[cast(seasons.c.season_num, Integer) - 1], b"")
+    whole_bytes = func.substring(bitmap, 1, total // 8)
+    # the partial byte, or 0 if there's none (or the bitmap is too short for it)
+    partial_byte = func.get_byte(
+        func.substring(bitmap, total // 8 + 1, 1).op("||")(b"\x00"), 0
+    )
+    partial_mask = literal(1).op("<<")(total % 8) - 1
+    watched = func.bit_count(whole_bytes) + func.bit_count(
+        cast(partial_byte.op("&")(partial_mask), BIT(8))
+    )
+    counts = (
+        select(array([watched, total]))
+        .select_from(seasons)
+        .order_by(seasons.c.season_num)
+        .scalar_subquery()
+    )
+    return func.array(counts, type_=ARRAY(Integer, dimensions=2))
+
+
+type _Column = ColumnElement[Any] | QueryableAttribute[Any]
+
+# The fields `encode_show_fields` can encode, and the columns each is encoded from:
+# the `Show` fields and, for summaries, the seasons' counts of watched episodes
+SHOW_FIELDS = tuple(Show.model_fields)
+_FIELD_COLUMNS: dict[str, tuple[_Column, ...]] = {
+    "tvmaze_id": (DbShow.tvmaze_id,),
+    "title": (DbTVmazeShow.title,),
+    "favorite": (DbShow.favorite,),
+    "source": (DbTVmazeShow.source,),
+    "duration": (DbTVmazeShow.duration,),
+    "image_sm_url": (DbTVmazeShow.image_sm_url,),
+    "image_lg_url": (DbTVmazeShow.image_lg_url,),
+    "imdb_id": (DbTVmazeShow.imdb_id,),
+    "thetvdb_id": (DbTVmazeShow.thetvdb_id,),
+    "seasons": (cast(DbTVmazeShow.seasons, Text), DbShow.watched),
+    "season_counts": (_season_counts(),),
+    "user_channel": (DbShow.user_channel,),
+    "user_notes": (DbShow.user_notes,),
+    "id": (DbShow.id,),
+}
+SELECTABLE_FIELDS = frozenset(_FIELD_COLUMNS)
+
+
+def show_field_columns(fields: Sequence[str]) -> list[_Column]:
+    """The columns `encode_show_fields` expects for the given fields (in order, after
+    the show's ID): select them from DbShow joined to DbTVmazeShow"""
+
+    return [DbShow.id, *(col for field in fields for col in _FIELD_COLUMNS[field])]
+
+
+def encode_show_fields(rows: Iterable[Sequence[Any]], fields: Sequence[str]) -> bytes:
+    """Encodes rows of `show_field_columns(fields)` as a JSON object of shows by ID,
+    like `encode_shows` but with just the given fields, in the given order"""
+
+    shows: dict[UUID, dict[str, Any]] = {}
+    for id, *values in rows:
+        columns = iter(values)
+        show: dict[str, Any] = {}
+        for field in fields:
+            if field == "seasons":
+                seasons = _seasons_decoder.decode(next(columns))
+                _set_watched_seasons(seasons, next(columns))
+                show[field] = seasons
+            elif field == "season_counts":
+                show[field] = [
+                    SeasonCounts(watched=watched, total=total)
+                    for watched, total in next(columns)
+                ]
+            else:
+                show[field] = next(columns)
+        shows[id] = show
+    return _shows_encoder.encode(shows)
+
+
+class ShowChangesStruct(msgspec.Struct):
+    """Shows changed since a sync, and the IDs of those deleted since: the next sync
+    is from `cursor`. If `full`, the changed shows are all of the user's shows, and
+    replace the client's copy"""
+
+    changed: msgspec.Raw
+    deleted: list[UUID]
+    cursor: int
+    full: bool
+
+
+def encode_show_changes(
+    changed: bytes, deleted: list[UUID], cursor: int, full: bool
+) -> bytes:
+    """Encodes changed shows (already encoded as a JSON object of shows by ID) and
+    deleted shows' IDs as a JSON object `{"changed": ..., "deleted": [...],
+    "cursor": ..., "full": ...}`"""
+
+    changes = ShowChangesStruct(
+        changed=msgspec.Raw(changed), deleted=deleted, cursor=cursor, full=full
+    )
+    return _shows_encoder.encode(changes)
@@ -0,0 +1,34 @@
+import datetime
+from enum import StrEnum
+from typing import Any
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class JobKind(StrEnum):
+    IMPORT = "import"
+    EXPORT = "export"
+    REFRESH = "refresh"  # of the episode details of all the user's shows
+
+
+class JobStatus(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job(BaseModel):
+    """A job run in the background for a user; its result is what the equivalent
+    request would have responded with (for an export, the file is its output)"""
+
+    id: UUID
+    kind: JobKind
+    status: JobStatus
+    attempts: int
+    created_at: datetime.datetime
+    started_at: datetime.datetime | None
+    finished_at: datetime.datetime | None
+    result: dict[str, Any] | None
+    has_output: bool
@@ -1,9 +1,10 @@
 import datetime
 from dataclasses import dataclass
 from enum import StrEnum
+from typing import Annotated, Literal
 from uuid import UUID
 
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl
 
 
 class EpisodeType(StrEnum):
@@ -43,3 +44,54 @@ class ShowCreate(BaseModel):
 
 class Show(ShowCreate):
     id: UUID
+
+
+# The most operations a batch of them can hold
+MAX_SHOW_OPERATIONS = 500
+
+
+class ToggleWatchedOperation(BaseModel):
+    op: Literal["toggle_watched"]
+    show_id: UUID
+    episodes: list[tuple[int, int]]  # (season index, episode index)
+
+
+class ToggleFavoriteOperation(BaseModel):
+    op: Literal["toggle_favorite"]
+    show_id: UUID
+
+
+class UpdateUserFieldsOperation(BaseModel):
+    op: Literal["update_user_fields"]
+    show_id: UUID
+    user_channel: str | None
+    user_notes: str | None
+
+
+ShowOperation = Annotated[
+    ToggleWatchedOperation | ToggleFavoriteOperation | UpdateUserFieldsOperation,
+    Field(discriminator="op"),
+]
+
+
+class ShowOperations(BaseModel):
+    """A batch of changes to a user's shows, applied in order"""
+
+    operations: Annotated[list[ShowOperation], Field(max_length=MAX_SHOW_OPERATIONS)]
+
+
+class ShowOperationError(StrEnum):
+    SHOW_NOT_FOUND = "show_not_found"
+    EPISODE_NOT_FOUND = "episode_not_found"
+    FAILED = "failed"
+
+
+class ShowOperationResult(BaseModel):
+    """The outcome of one of a batch's operations: the error if it failed (and so
+    changed nothing), otherwise what it changed to, for the operations that toggle
+    something"""
+
+    ok: bool
+    error: ShowOperationError | None = None
+    favorite: bool | None = None
+    episodes: list[tuple[int, int, bool]] | None = None  # as toggle_episodes returns
@@ -1,28 +1,91 @@
 import datetime
+import hashlib
+from collections.abc import AsyncIterator, Callable
 from dataclasses import dataclass
-from typing import Annotated
+from typing import Annotated, Any
 from uuid import UUID
 
 from litestar import Request, Response, delete, get, post, put
 from litestar.datastructures import UploadFile
-from litestar.enums import RequestEncodingType
-from litestar.params import Body
-from litestar.status_codes import HTTP_204_NO_CONTENT, HTTP_400_BAD_REQUEST
+from litestar.enums import MediaType, RequestEncodingType
+from litestar.exceptions import HTTPException, NotFoundException
+from litestar.openapi import ResponseSpec
+from litestar.params import Body, Parameter
+from litestar.response import Stream
+from litestar.status_codes import (
+    HTTP_200_OK,
+    HTTP_202_ACCEPTED,
+    HTTP_204_NO_CONTENT,
+    HTTP_304_NOT_MODIFIED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_409_CONFLICT,
+    HTTP_429_TOO_MANY_REQUESTS,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import app_config
+from caching.episode_cache import EpisodeCacheBackend
+from db.show_json import SHOW_FIELDS
+from models.job import Job
 from models.prefs import UserPrefs
 from models.search import SearchResults
-from models.show import EpisodeDetails, Show
+from models.show import EpisodeDetails, Show, ShowOperationResult, ShowOperations
 from services.export_service import ExportService
-from services.import_service import ImportService, InvalidImportDataError
+from services.import_service import ImportMode, ImportService, import_error_result
+from services.job_service import JobNotFound, JobService, TooManyJobs
 from services.prefs_service import PrefsService
 from services.search_service import SearchService
-from services.show_service import ShowService
+from services.show_service import ShowAlreadyExists, ShowService, UnknownShowFields
+from tvmaze_api.client import TVmazeAPIClient
+
+# The response header with the cursor for the next page of /shows, if there is one
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# How much of an uploaded import file is read at a time
+IMPORT_CHUNK_BYTES = 64 * 1024
+
+
+def datetime_filename_suffix(at: datetime.datetime | None = None) -> str:
+    at = at if at is not None else datetime.datetime.now(datetime.UTC)
+    return at.astimezone(datetime.UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def make_etag(*version: object) -> str:
+    """A strong ETag for the version of a response identified by the given values"""
+
+    digest = hashlib.blake2b(repr(version).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match header matches the ETag (by the weak
+    comparison it calls for), so that the response would be 304 Not Modified"""
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is None:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
 
+def upload_chunks(upload: UploadFile) -> AsyncIterator[bytes]:
+    """An upload (spooled to disk if it's large), read a chunk at a time"""
 
-def datetime_filename_suffix() -> str:
-    return datetime.datetime.now(datetime.UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+    async def chunks() -> AsyncIterator[bytes]:
+        while chunk := await upload.read(IMPORT_CHUNK_BYTES):
+            yield chunk
+
+    return chunks()
+
+
+def attachment_headers(filename: str) -> dict[str, str]:
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+
+def not_modified(etag: str) -> Response[Any]:
+    # no content, for any route
+    return Response(
+        content=None, status_code=HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+    )
 
 
 # Health check
@@ -49,35 +112,126 @@ async def logout() -> Response[str]:
 # Run a search against TVmaze for shows by title
 # Possible new URI: /tvmaze/search
 @get("/search")
-async def search(q: str) -> SearchResults:
-    result = await SearchService().search(q)
+async def search(q: str, tvmaze_client: TVmazeAPIClient) -> SearchResults:
+    result = await SearchService(tvmaze_client).search(q)
     return result
 
 
-# List all of the user's saved shows
-@get(path="/shows")
+# List all of the user's saved shows, or a page of them (`limit`, then the previous
+# page's NEXT_CURSOR_HEADER as `cursor`) with just some of their fields (`fields`, a
+# comma-separated list) and/or with each season's watched and total episode counts in
+# place of its episodes (`summary`). Only favorites are listed if `favorites` is true,
+# or by default if the user's prefs say so
+@get(
+    path="/shows",
+    # returned as already encoded JSON, so declared for the OpenAPI schema
+    responses={
+        HTTP_200_OK: ResponseSpec(
+            data_container=dict[UUID, Show],
+            generate_examples=False,
+            description="The shows by ID; with `fields` or `summary`, just those "
+            "fields of each, or its seasons' episode counts",
+        )
+    },
+)
 async def shows(
     request: Request,
     db_session: AsyncSession,
-) -> dict[UUID, Show]:
+    limit: Annotated[int | None, Parameter(gt=0)] = None,
+    cursor: UUID | None = None,
+    fields: str | None = None,
+    summary: bool = False,
+    favorites: bool | None = None,
+) -> Response[bytes]:
+    if favorites is None:
+        prefs = await PrefsService(db_session, request.user.id).get_prefs()
+        favorites = prefs.show_favorites_only
+
+    # checked before any show is loaded; and taken before the shows are, so that it
+    # can only be older than the response, and never hide a change
     svc = ShowService(db_session, request.user.id)
-    return await svc.get_shows()
+    version = await svc.get_shows_version(favorites_only=favorites)
+    etag = make_etag(
+        "shows", request.user.id, *version, favorites, limit, cursor, fields, summary
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    headers = {"ETag": etag}
+
+    # the JSON for a dict[UUID, Show], encoded straight from the database rows
+    if limit is None and cursor is None and fields is None and not summary:
+        return Response(
+            content=await svc.get_shows_json(favorites_only=favorites),
+            media_type=MediaType.JSON,
+            headers=headers,
+        )
+
+    selected = fields.split(",") if fields is not None else list(SHOW_FIELDS)
+    if summary:
+        selected = ["season_counts" if f == "seasons" else f for f in selected]
+    try:
+        content, last_id = await svc.get_shows_page_json(
+            list(dict.fromkeys(selected)),
+            limit=limit,
+            after=cursor,
+            favorites_only=favorites,
+        )
+    except UnknownShowFields as e:
+        raise HTTPException(
+            status_code=HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(e.fields)}",
+        )
+    if last_id is not None:
+        headers[NEXT_CURSOR_HEADER] = str(last_id)
+    return Response(content=content, media_type=MediaType.JSON, headers=headers)
+
+
+# The user's shows added or changed since `since`, and the IDs of those deleted since,
+# for clients keeping a copy of them: {"changed": {...}, "deleted": [...], "cursor":
+# ..., "full": ...}, the shows as /shows lists them, and `cursor` the `since` for the
+# next sync. With no `since`, or one too old for the deletions since to be known,
+# all of the user's shows, with `full` true: they replace the client's copy
+@get(path="/shows/changes")
+async def show_changes(
+    request: Request, db_session: AsyncSession, since: int | None = None
+) -> Response[bytes]:
+    svc = ShowService(db_session, request.user.id)
+    return Response(
+        content=await svc.get_show_changes_json(since), media_type=MediaType.JSON
+    )
 
 
 # Get a single show from the user's saved shows
 @get(path="/shows/{id:uuid}")
-async def get_show(request: Request, db_session: AsyncSession, id: UUID) -> Show:
+async def get_show(
+    request: Request, db_session: AsyncSession, id: UUID
+) -> Response[Show]:
     svc = ShowService(db_session, request.user.id)
-    return await svc.get_show(id)
+    # as for /shows, checked before the show is loaded
+    updated_at = await svc.get_show_version(id)
+    etag = make_etag("show", id, updated_at)
+    if updated_at is not None and etag_matches(request, etag):
+        return not_modified(etag)
+    return Response(content=await svc.get_show(id), headers={"ETag": etag})
 
 
 # Add a show to the user's saved shows from TVmaze
 # Possible new URI: POST /shows/from-tvmaze/{tvmaze_id} (empty body)
-# FIXME: send 409 if selected show already exists
 @get(path="/add-show")
-async def add_show(tvmaze_id: int, request: Request, db_session: AsyncSession) -> Show:
-    svc = ShowService(db_session, request.user.id)
-    return await svc.add_show_from_tvmaze(tvmaze_id=tvmaze_id)
+async def add_show(
+    tvmaze_id: int,
+    request: Request,
+    db_session: AsyncSession,
+    tvmaze_client: TVmazeAPIClient,
+    episodes_cache: EpisodeCacheBackend,
+) -> Show:
+    svc = ShowService(db_session, request.user.id, tvmaze_client, episodes_cache)
+    try:
+        return await svc.add_show_from_tvmaze(tvmaze_id=tvmaze_id)
+    except ShowAlreadyExists:
+        raise HTTPException(
+            status_code=HTTP_409_CONFLICT, detail="Show has already been added"
+        )
 
 
 # FIXME: when part of a user-instigated "refresh show" action, should also refetch show and
@@ -89,12 +243,14 @@ async def get_episodes(
     request: Request,
     db_session: AsyncSession,
     show_id: UUID,
+    tvmaze_client: TVmazeAPIClient,
+    episodes_cache: EpisodeCacheBackend,
     forcerefresh: bool = False,
 ) -> list[list[EpisodeDetails]]:
-    svc = ShowService(db_session, request.user.id)
+    svc = ShowService(db_session, request.user.id, tvmaze_client, episodes_cache)
     show = await svc.get_show(show_id)
     # FIXME Return 404 if not found
-    return await svc.get_episodes(show, force_refresh=True)
+    return await svc.get_episodes(show, force_refresh=forcerefresh)
 
 
 @dataclass
@@ -103,15 +259,21 @@ class SetWatchedStatusBody:
     episodes: list[tuple[int, int]]  # (season_num, ep_index)
 
 
+@dataclass
+class WatchedStatusChanges:
+    show_id: UUID
+    episodes: list[tuple[int, int, bool]]  # (season_num, ep_index, watched)
+
+
 # Possible new URL: POST /shows/{show_id}/toggle-watched (empty body)
-# Return new value in some form
-# FIXME: any need to return the updated show in full?
+# Returns only the toggled episodes' new status, not the whole show
 @post(path="/toggle-watched-status")
 async def toggle_watched_status(
     data: SetWatchedStatusBody, db_session: AsyncSession, request: Request
-) -> Show:
+) -> WatchedStatusChanges:
     svc = ShowService(db_session, request.user.id)
-    return await svc.toggle_episodes(data.show_id, data.episodes)
+    changes = await svc.toggle_episodes(data.show_id, data.episodes)
+    return WatchedStatusChanges(show_id=data.show_id, episodes=changes)
 
 
 # FIXME ensure no error is raised when a deleted resources is deleted again
@@ -163,6 +325,17 @@ async def update_user_fields(
     )
 
 
+# Apply a batch of changes to the user's shows (toggling episodes' watched status or a
+# show's favorite status, setting its user fields) in one request and transaction,
+# with a result for each: one that fails doesn't stop the others
+@post(path="/shows/batch", status_code=200)
+async def apply_show_operations(
+    data: ShowOperations, db_session: AsyncSession, request: Request
+) -> list[ShowOperationResult]:
+    svc = ShowService(db_session, request.user.id)
+    return await svc.apply_operations(data.operations)
+
+
 @get(path="/user-prefs")
 async def get_user_prefs(db_session: AsyncSession, request: Request) -> UserPrefs:
     prefsService = PrefsService(db_session=db_session, user_id=request.user.id)
@@ -178,18 +351,28 @@ async def update_user_prefs(
 
 
 # Possible new URL: /data/export
+# Streamed as it's read from the database, in a session of its own (see
+# `provide_db_session_maker`)
 @get(path="/data/export")
-async def export_data(db_session: AsyncSession, request: Request) -> Response:
-    svc = ExportService(show_service=ShowService(db_session, request.user.id))
-    result = await svc.export()
+async def export_data(
+    db_session_maker: Callable[[], AsyncSession], request: Request
+) -> Stream:
+    user_id = request.user.id
+
+    async def export() -> AsyncIterator[str]:
+        async with db_session_maker() as session:
+            svc = ExportService(show_service=ShowService(session, user_id))
+            async for fragment in svc.export_stream():
+                yield fragment
+
     filename = f"couch-potato-backup-{datetime_filename_suffix()}.json"
-    return Response(
-        content=result,
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-    )
+    return Stream(export(), headers=attachment_headers(filename))
 
 
 # Possible new URL: /data/import
+# The file's shows are merged into the user's (see `ImportMode`), unless `mode` is
+# "replace"; the response has the counts of shows imported and of the user's shows
+# inserted, updated, left unchanged and deleted
 @post(
     path="/data/import",
 )
@@ -197,35 +380,94 @@ async def import_data(
     data: Annotated[UploadFile, Body(media_type=RequestEncodingType.MULTI_PART)],
     db_session: AsyncSession,
     request: Request,
+    mode: ImportMode = ImportMode.MERGE,
 ) -> dict | Response:
-    raw = await data.read()
-    try:
-        json_text = raw.decode("utf-8")
-    except UnicodeDecodeError as e:
-        return Response(
-            {"error": "invalid UTF-8 content", "message": e.reason, "details": None},
-            status_code=HTTP_400_BAD_REQUEST,
-        )
-
+    # parsed and imported as it's read
     try:
         svc = ImportService(show_service=ShowService(db_session, request.user.id))
-        imported = await svc.import_(json_text)
-        return {"imported_count": len(imported)}
+        counts = await svc.import_stream(upload_chunks(data), mode=mode)
+        return counts.as_result()
     except Exception as e:
-        if isinstance(e, InvalidImportDataError):
-            return Response(
-                {
-                    "error": "invalid or malformed JSON",
-                    "message": e.message,
-                    "details": e.details,
-                },
-                status_code=HTTP_400_BAD_REQUEST,
-            )
-        else:
-            return Response(
-                {"error": "unknown error", "message": None, "details": None},
-                status_code=HTTP_400_BAD_REQUEST,
-            )
+        return Response(import_error_result(e), status_code=HTTP_400_BAD_REQUEST)
+
+
+def too_many_jobs() -> HTTPException:
+    return HTTPException(
+        status_code=HTTP_429_TOO_MANY_REQUESTS, detail="Too many unfinished jobs"
+    )
+
+
+# Background jobs (see `JobWorker`): an import or export, as /data/import and
+# /data/export do, or a refresh of all the user's shows' episode details, run after
+# the request rather than in it. Each responds with the job, whose status (and when
+# finished, result) is polled at /jobs/{job_id}; the result is what the equivalent
+# request would have responded with. An export job's file is its output. A finished
+# job is kept, output and all, for the jobs' retention (see `JobSettings`)
+@post(path="/jobs/import", status_code=HTTP_202_ACCEPTED)
+async def submit_import_job(
+    data: Annotated[UploadFile, Body(media_type=RequestEncodingType.MULTI_PART)],
+    db_session: AsyncSession,
+    request: Request,
+    mode: ImportMode = ImportMode.MERGE,
+) -> Job:
+    svc = JobService(db_session, request.user.id)
+    try:
+        return await svc.submit_import(upload_chunks(data), mode=mode)
+    except TooManyJobs:
+        raise too_many_jobs()
+
+
+@post(path="/jobs/export", status_code=HTTP_202_ACCEPTED)
+async def submit_export_job(db_session: AsyncSession, request: Request) -> Job:
+    svc = JobService(db_session, request.user.id)
+    try:
+        return await svc.submit_export()
+    except TooManyJobs:
+        raise too_many_jobs()
+
+
+@post(path="/jobs/refresh", status_code=HTTP_202_ACCEPTED)
+async def submit_refresh_job(db_session: AsyncSession, request: Request) -> Job:
+    svc = JobService(db_session, request.user.id)
+    try:
+        return await svc.submit_refresh()
+    except TooManyJobs:
+        raise too_many_jobs()
+
+
+@get(path="/jobs/{job_id:uuid}")
+async def get_job(job_id: UUID, db_session: AsyncSession, request: Request) -> Job:
+    svc = JobService(db_session, request.user.id)
+    try:
+        return await svc.get_job(job_id)
+    except JobNotFound:
+        raise NotFoundException(detail="Job not found")
+
+
+# Streamed from the database in a session of its own, as /data/export is
+@get(path="/jobs/{job_id:uuid}/output")
+async def get_job_output(
+    job_id: UUID,
+    db_session: AsyncSession,
+    db_session_maker: Callable[[], AsyncSession],
+    request: Request,
+) -> Stream:
+    user_id = request.user.id
+    try:
+        job = await JobService(db_session, user_id).get_job(job_id)
+    except JobNotFound:
+        raise NotFoundException(detail="Job not found")
+    if not job.has_output:
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail="Job has no output")
+
+    async def output() -> AsyncIterator[bytes]:
+        async with db_session_maker() as session:
+            async for chunk in JobService(session, user_id).read_output(job_id):
+                yield chunk
+
+    # named for when the export was submitted
+    filename = f"couch-potato-backup-{datetime_filename_suffix(job.created_at)}.json"
+    return Stream(output(), headers=attachment_headers(filename))
 
 
 all_routes = [
@@ -234,6 +476,7 @@ all_routes = [
     logout,
     search,
     shows,
+    show_changes,
     get_show,
     add_show,
     get_episodes,
@@ -241,8 +484,14 @@ all_routes = [
     delete_show,
     toggle_favorite,
     update_user_fields,
+    apply_show_operations,
     get_user_prefs,
     update_user_prefs,
     export_data,
     import_data,
+    submit_import_job,
+    submit_export_job,
+    submit_refresh_job,
+    get_job,
+    get_job_output,
 ]
@@ -0,0 +1,93 @@
+# run from src as python -m scripts.generate_import_file <path> [--shows N]
+
+"""
+Writes a synthetic import data file of any size, for trying out and benchmarking
+/data/import with large libraries. The file is written a show at a time, so it can
+be much larger than memory.
+"""
+
+import argparse
+import json
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from services.export_service import EXPORT_VERSION
+
+SEASON_LENGTHS = [12] * 5
+
+
+def generate_show(tvmaze_id: int, season_lengths: list[int] = SEASON_LENGTHS) -> Any:
+    """A show, as it appears in an import data file"""
+
+    return {
+        "tvmaze_id": tvmaze_id,
+        "title": f"Show {tvmaze_id}",
+        "favorite": tvmaze_id % 2 == 0,
+        "source": "Somewhere",
+        "duration": 30,
+        "image_sm_url": f"https://images.example.com/{tvmaze_id}/sm.jpg",
+        "image_lg_url": f"https://images.example.com/{tvmaze_id}/lg.jpg",
+        "imdb_id": None,
+        "thetvdb_id": None,
+        "seasons": [
+            [
+                {
+                    "title": f"Episode {ep_num}",
+                    "ep_num": ep_num,
+                    "watched": season_idx < tvmaze_id % len(season_lengths),
+                }
+                for ep_num in range(1, length + 1)
+            ]
+            for season_idx, length in enumerate(season_lengths)
+        ],
+        "user_channel": None,
+        "user_notes": "Notes",
+    }
+
+
+def generate_import_file(
+    show_count: int, season_lengths: list[int] = SEASON_LENGTHS
+) -> Iterator[str]:
+    """The text of an import data file of `show_count` shows, a show at a time"""
+
+    yield '{"version": ' + json.dumps(EXPORT_VERSION) + ', "shows": ['
+    for tvmaze_id in range(1, show_count + 1):
+        prefix = ", " if tvmaze_id > 1 else ""
+        yield prefix + json.dumps(generate_show(tvmaze_id, season_lengths))
+    yield "]}"
+
+
+def write_import_file(
+    path: Path, show_count: int, season_lengths: list[int] = SEASON_LENGTHS
+) -> int:
+    """Writes an import data file of `show_count` shows; returns its size in bytes"""
+
+    with path.open("w", encoding="utf-8") as f:
+        f.writelines(generate_import_file(show_count, season_lengths))
+    return path.stat().st_size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", type=Path, help="the file to write")
+    parser.add_argument(
+        "--shows", type=int, default=10_000, help="the number of shows (10,000)"
+    )
+    parser.add_argument(
+        "--seasons", type=int, default=len(SEASON_LENGTHS), help="seasons per show (5)"
+    )
+    parser.add_argument(
+        "--episodes",
+        type=int,
+        default=SEASON_LENGTHS[0],
+        help="episodes per season (12)",
+    )
+    args = parser.parse_args()
+
+    size = write_import_file(args.path, args.shows, [args.episodes] * args.seasons)
+    print(f"Wrote {args.shows} shows to {args.path} ({size / 2**20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
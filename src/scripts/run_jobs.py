@@ -0,0 +1,76 @@
+# run from src as python -m scripts.run_jobs [--workers N]
+
+"""
+Runs background jobs (see `services.job_service`) in a process of its own, until
+interrupted, so that they can be run apart from the app's (with JOB_WORKERS=0 there)
+and throttled independently of requests. Any number of these can be run at once.
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app_config
+from create_app import create_episodes_cache
+from services.job_service import JobWorker
+from tvmaze_api.client import TVmazeAPIClient, create_http_client
+
+
+async def main(worker_count: int | None) -> None:
+    app_config.load()
+    job_settings = app_config.get_job_settings()
+    tvmaze_rate_limit_settings = app_config.get_tvmaze_rate_limit_settings()
+    TVmazeAPIClient.configure_rate_limit(
+        rate=tvmaze_rate_limit_settings.per_second,
+        burst=tvmaze_rate_limit_settings.burst,
+    )
+    tvmaze_http_settings = app_config.get_tvmaze_http_settings()
+
+    engine = create_async_engine(app_config.get_db_url())
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        async with create_http_client(
+            max_connections=tvmaze_http_settings.max_connections,
+            max_keepalive_connections=tvmaze_http_settings.max_keepalive_connections,
+            keepalive_expiry=tvmaze_http_settings.keepalive_expiry,
+            http2=tvmaze_http_settings.http2,
+            timeout=tvmaze_http_settings.timeout,
+        ) as http_client:
+            worker = JobWorker(
+                session_maker=session_maker,
+                settings=job_settings,
+                tvmaze_client=TVmazeAPIClient(http_client=http_client),
+                episodes_cache=create_episodes_cache(
+                    app_config.get_episode_cache_settings(), engine=engine
+                ),
+            )
+            if worker_count is None:
+                worker_count = max(job_settings.workers, 1)
+            tasks = [asyncio.create_task(worker.run()) for _ in range(worker_count)]
+
+            # a job interrupted is left running, to be claimed again once abandoned
+            def stop() -> None:
+                for task in tasks:
+                    task.cancel()
+
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, stop)
+            print(f"Running background jobs with {worker_count} worker(s)")
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await engine.dispose()
+
+
+logging.basicConfig(level=logging.INFO)
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument(
+    "--workers",
+    type=int,
+    default=None,
+    help="the number of jobs run at a time (JOB_WORKERS, or at least 1)",
+)
+asyncio.run(main(parser.parse_args().workers))
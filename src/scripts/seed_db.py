@@ -1,5 +1,6 @@
-# run from src as python -m scripts.seed_db
+# run from src as python -m scripts.seed_db [--shows N]
 
+import argparse
 import asyncio
 
 from litestar_users.password import PasswordManager
@@ -7,11 +8,26 @@ from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
 import app_config
-from db.models import DbShow, DbUserPrefs
+from db.models import (
+    DbJob,
+    DbShow,
+    DbShowTombstone,
+    DbShowTombstoneHorizon,
+    DbTVmazeShow,
+    DbUserPrefs,
+)
 from litestar_users_setup.models import User
+from models.show import EpisodeDescriptor, ShowCreate
+from scripts.generate_import_file import generate_show
+from services.show_service import ShowService
 
 password_manager = PasswordManager()
 
+# Synthetic shows are loaded this many at a time, and numbered from this TVmaze ID
+# so as not to take the sample shows' catalog entries
+SYNTHETIC_BATCH_SIZE = 1000
+SYNTHETIC_FIRST_TVMAZE_ID = 1_000_000
+
 
 def create_users(db_session: AsyncSession) -> list[User]:
     user = User(
@@ -32,12 +48,14 @@ def create_users(db_session: AsyncSession) -> list[User]:
 
 
 def create_shows(db_session: AsyncSession, owning_user: User) -> None:
-    def make_episode(index: int, episode_number: int | None, watched: bool) -> dict:
-        return {
-            "title": f"Episode index {index} title",
-            "ep_num": episode_number,
-            "watched": watched,
-        }
+    def make_episode(
+        index: int, episode_number: int | None, watched: bool
+    ) -> EpisodeDescriptor:
+        return EpisodeDescriptor(
+            title=f"Episode index {index} title",
+            ep_num=episode_number,
+            watched=watched,
+        )
 
     # Pluribus
 
@@ -47,23 +65,26 @@ def create_shows(db_session: AsyncSession, owning_user: User) -> None:
 
     pluribus = DbShow(
         user_id=owning_user.id,
-        tvmaze_id=86175,
-        title="Pluribus",
         favorite=True,
-        source="Apple TV",
-        duration=60,
-        image_sm_url="https://static.tvmaze.com/uploads/images/medium_portrait/592/1481086.jpg",
-        image_lg_url="https://static.tvmaze.com/uploads/images/original_untouched/592/1481086.jpg",
-        imdb_id="tt22202452",
-        thetvdb_id=436457,
-        seasons=pluribus_seasons,
+        watched=DbShow.seasons_to_watched(pluribus_seasons),
         user_notes="Not quite as good as Breaking Bad or Better Call Saul",
+        catalog=DbTVmazeShow(
+            tvmaze_id=86175,
+            title="Pluribus",
+            source="Apple TV",
+            duration=60,
+            image_sm_url="https://static.tvmaze.com/uploads/images/medium_portrait/592/1481086.jpg",
+            image_lg_url="https://static.tvmaze.com/uploads/images/original_untouched/592/1481086.jpg",
+            imdb_id="tt22202452",
+            thetvdb_id=436457,
+            seasons=DbTVmazeShow.seasons_to_json(pluribus_seasons),
+        ),
     )
     db_session.add(pluribus)
 
     # All Creatures Great & Small
 
-    def all_creatures_season(sn: int) -> list[dict]:
+    def all_creatures_season(sn: int) -> list[EpisodeDescriptor]:
         season = []
         next_episode_number = 1
         for i in range(0, 7):
@@ -86,16 +107,19 @@ def create_shows(db_session: AsyncSession, owning_user: User) -> None:
 
     all_creatures = DbShow(
         user_id=owning_user.id,
-        tvmaze_id=42836,
-        title="All Creatures Great & Small",
         favorite=True,
-        source="PBS",
-        duration=60,
-        image_sm_url="https://static.tvmaze.com/uploads/images/medium_portrait/593/1483974.jpg",
-        image_lg_url="https://static.tvmaze.com/uploads/images/original_untouched/593/1483974.jpg",
-        thetvdb_id=378982,
-        imdb_id="tt10590066",
-        seasons=all_creatures_seasons,
+        watched=DbShow.seasons_to_watched(all_creatures_seasons),
+        catalog=DbTVmazeShow(
+            tvmaze_id=42836,
+            title="All Creatures Great & Small",
+            source="PBS",
+            duration=60,
+            image_sm_url="https://static.tvmaze.com/uploads/images/medium_portrait/593/1483974.jpg",
+            image_lg_url="https://static.tvmaze.com/uploads/images/original_untouched/593/1483974.jpg",
+            thetvdb_id=378982,
+            imdb_id="tt10590066",
+            seasons=DbTVmazeShow.seasons_to_json(all_creatures_seasons),
+        ),
     )
     db_session.add(all_creatures)
 
@@ -107,17 +131,20 @@ def create_shows(db_session: AsyncSession, owning_user: User) -> None:
 
     the_americans = DbShow(
         user_id=owning_user.id,
-        tvmaze_id=157,
-        title="The Americans",
         favorite=False,
-        source="FX",
-        duration=60,
-        image_sm_url="https://static.tvmaze.com/uploads/images/medium_portrait/146/366911.jpg",
-        image_lg_url="https://static.tvmaze.com/uploads/images/original_untouched/146/366911.jpg",
-        thetvdb_id=261690,
-        imdb_id="tt2149175",
-        seasons=the_americans_seasons,
+        watched=DbShow.seasons_to_watched(the_americans_seasons),
         user_channel="Hulu",
+        catalog=DbTVmazeShow(
+            tvmaze_id=157,
+            title="The Americans",
+            source="FX",
+            duration=60,
+            image_sm_url="https://static.tvmaze.com/uploads/images/medium_portrait/146/366911.jpg",
+            image_lg_url="https://static.tvmaze.com/uploads/images/original_untouched/146/366911.jpg",
+            thetvdb_id=261690,
+            imdb_id="tt2149175",
+            seasons=DbTVmazeShow.seasons_to_json(the_americans_seasons),
+        ),
     )
 
     db_session.add(the_americans)
@@ -135,17 +162,20 @@ def create_shows(db_session: AsyncSession, owning_user: User) -> None:
 
     bojack = DbShow(
         user_id=owning_user.id,
-        tvmaze_id=184,
-        title="BoJack Horseman",
         favorite=True,
-        source="Netflix",
-        duration=30,
-        image_sm_url="https://static.tvmaze.com/uploads/images/medium_portrait/405/1012627.jpg",
-        image_lg_url="https://static.tvmaze.com/uploads/images/original_untouched/405/1012627.jpg",
-        thetvdb_id=282254,
-        imdb_id="tt3398228",
-        seasons=bojack_seasons,
+        watched=DbShow.seasons_to_watched(bojack_seasons),
         user_notes="Masterful combination of tones",
+        catalog=DbTVmazeShow(
+            tvmaze_id=184,
+            title="BoJack Horseman",
+            source="Netflix",
+            duration=30,
+            image_sm_url="https://static.tvmaze.com/uploads/images/medium_portrait/405/1012627.jpg",
+            image_lg_url="https://static.tvmaze.com/uploads/images/original_untouched/405/1012627.jpg",
+            thetvdb_id=282254,
+            imdb_id="tt3398228",
+            seasons=DbTVmazeShow.seasons_to_json(bojack_seasons),
+        ),
     )
     db_session.add(bojack)
 
@@ -163,36 +193,62 @@ def create_shows(db_session: AsyncSession, owning_user: User) -> None:
 
     mad_men = DbShow(
         user_id=owning_user.id,
-        tvmaze_id=385,
-        title="Mad Men",
         favorite=True,
-        source="AMC",
-        duration=60,
-        image_sm_url="https://static.tvmaze.com/uploads/images/medium_portrait/2/5589.jpg",
-        image_lg_url="https://static.tvmaze.com/uploads/images/original_untouched/2/5589.jpg",
-        thetvdb_id=80337,
-        imdb_id="tt0804503",
-        seasons=mad_men_seasons,
+        watched=DbShow.seasons_to_watched(mad_men_seasons),
         user_channel="HBO",
         user_notes="Great show but a little slow-paced; don't binge",
+        catalog=DbTVmazeShow(
+            tvmaze_id=385,
+            title="Mad Men",
+            source="AMC",
+            duration=60,
+            image_sm_url="https://static.tvmaze.com/uploads/images/medium_portrait/2/5589.jpg",
+            image_lg_url="https://static.tvmaze.com/uploads/images/original_untouched/2/5589.jpg",
+            thetvdb_id=80337,
+            imdb_id="tt0804503",
+            seasons=DbTVmazeShow.seasons_to_json(mad_men_seasons),
+        ),
     )
     db_session.add(mad_men)
 
 
-async def main() -> None:
+async def load_synthetic_shows(
+    db_session: AsyncSession, owning_user: User, count: int
+) -> None:
+    """Adds many made-up shows, a batch at a time by bulk copy, for trying out large
+    libraries"""
+
+    svc = ShowService(db_session, owning_user.id)
+    first = SYNTHETIC_FIRST_TVMAZE_ID
+    for start in range(first, first + count, SYNTHETIC_BATCH_SIZE):
+        stop = min(start + SYNTHETIC_BATCH_SIZE, first + count)
+        await svc.load_shows(
+            [
+                ShowCreate.model_validate(generate_show(tvmaze_id))
+                for tvmaze_id in range(start, stop)
+            ]
+        )
+
+
+async def main(synthetic_show_count: int) -> None:
     app_config.load()
     engine = create_async_engine(app_config.get_db_url())
 
     async with AsyncSession(engine) as db_session:
         try:
+            await db_session.execute(delete(DbJob))  # and their data, by cascade
             await db_session.execute(delete(DbUserPrefs))
             await db_session.execute(delete(DbShow))
+            await db_session.execute(delete(DbShowTombstone))
+            await db_session.execute(delete(DbShowTombstoneHorizon))
+            await db_session.execute(delete(DbTVmazeShow))
             await db_session.execute(delete(User))
 
             users = create_users(db_session)
             await db_session.flush()  # get user ids
 
             create_shows(db_session, users[0])
+            await load_synthetic_shows(db_session, users[1], synthetic_show_count)
 
             await db_session.commit()
 
@@ -201,4 +257,11 @@ async def main() -> None:
             print("Database record creation failed:", e)
 
 
-asyncio.run(main())
+parser = argparse.ArgumentParser(description="Seeds the database with sample records")
+parser.add_argument(
+    "--shows",
+    type=int,
+    default=0,
+    help="the number of made-up shows to add for the second user (none)",
+)
+asyncio.run(main(parser.parse_args().shows))
@@ -1,4 +1,5 @@
 import json
+from collections.abc import AsyncIterator
 from typing import Any
 
 from models.show import EpisodeDescriptor, Show
@@ -15,10 +16,28 @@ class ExportService:
         shows = await self.show_service.get_shows()
         exportable = {
             "version": EXPORT_VERSION,
-            "shows" : [self.__exportable_show(show) for show in shows.values()]
+            "shows" : [
+                self.__exportable_show(show)
+                for show in sorted(shows.values(), key=lambda show: show.tvmaze_id)
+            ]
         }
         return json.dumps(exportable)
 
+    async def export_stream(self, page_size: int = 100) -> AsyncIterator[str]:
+        """The same JSON as `export`, character for character, a page of shows at a
+        time, so that neither the whole document nor all the shows are ever in
+        memory at once (see `ShowService.stream_shows`)"""
+
+        yield '{"version": ' + json.dumps(EXPORT_VERSION) + ', "shows": ['
+        # a fragment per page, rather than per show, to keep the writes few
+        separator = ""
+        async for shows in self.show_service.stream_shows(page_size):
+            yield separator + ", ".join(
+                json.dumps(self.__exportable_show(show)) for show in shows
+            )
+            separator = ", "
+        yield "]}"
+
     def __exportable_show(self, show: Show) -> dict[str, Any]:
         show_dict = show.__dict__.copy()
         del show_dict["id"]
@@ -0,0 +1,272 @@
+"""
+Reads an import data file incrementally, so that files of any size are imported in
+bounded memory: the shows are parsed and validated one at a time as the file is
+read. Everything else in the file (the version, and any other top-level keys) is
+collected into a skeleton of the file, with its list of shows left empty, which is
+validated by itself once the file has been read.
+
+Errors are the `ValidationError`s validating the whole file with `ImportModel` would
+raise, with a show's errors located at its place in the file's list of shows. JSON
+syntax errors are found by pydantic too, but their positions are within the show
+(or the skeleton) they're in, not the file.
+"""
+
+import codecs
+import json
+import re
+from collections.abc import AsyncIterable, AsyncIterator
+from typing import Any, Self
+
+from pydantic import BaseModel, ValidationError, model_validator
+from pydantic_core import InitErrorDetails
+
+from models.show import ShowCreate
+
+# The most characters a single show, or the whole file but for its shows, can take
+MAX_SHOW_CHARS = 2_000_000
+MAX_SKELETON_CHARS = 100_000
+
+_whitespace = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+
+class ImportModel(BaseModel):
+    version: str
+    shows: list[ShowCreate]
+
+    @model_validator(mode="after")
+    def check_no_duplicate_shows(self) -> Self:
+        # a user can save each show only once; checked here, before the user's current
+        # shows are deleted, rather than left to fail partway through the import
+        tvmaze_ids: set[int] = set()
+        for show in self.shows:
+            if show.tvmaze_id in tvmaze_ids:
+                raise ValueError(f"Duplicate show: TVmaze ID {show.tvmaze_id}")
+            tvmaze_ids.add(show.tvmaze_id)
+        return self
+
+
+class _Incomplete(Exception):
+    # a value that isn't valid JSON, or is too long to be read whole
+    pass
+
+
+def _json_invalid(message: str) -> ValidationError:
+    return ValidationError.from_exception_data(
+        ImportModel.__name__,
+        [
+            InitErrorDetails(
+                type="json_invalid", loc=(), input="", ctx={"error": message}
+            )
+        ],
+    )
+
+
+def _located(error: ValidationError, loc: tuple[int | str, ...]) -> ValidationError:
+    """The error, as raised for a value at the given location in the file"""
+
+    details: list[InitErrorDetails] = []
+    for detail in error.errors():
+        located = InitErrorDetails(
+            type=detail["type"], loc=(*loc, *detail["loc"]), input=detail["input"]
+        )
+        if "ctx" in detail:
+            located["ctx"] = detail["ctx"]
+        details.append(located)
+    return ValidationError.from_exception_data(ImportModel.__name__, details)
+
+
+def _validation_error(
+    model: type[BaseModel], text: str, loc: tuple[int | str, ...] = ()
+) -> ValidationError:
+    """The error validating JSON text known to be invalid (malformed or incomplete)
+    as the model gives, located as given"""
+
+    try:
+        model.model_validate_json(text, strict=True, extra="forbid")
+    except ValidationError as e:
+        return _located(e, loc)
+    return _json_invalid(f"malformed {model.__name__} at {'.'.join(map(str, loc))}")
+
+
+class ImportReader:
+    """Reads the shows from an import data file, given as chunks of its bytes.
+
+    Iterate over `read_shows()` for the shows, each validated as `ImportModel` would
+    validate it (including that no show is listed twice); then call
+    `read_skeleton()` for the rest of the file. The version is `version` as soon as
+    it's been read, which is before any show if it comes first in the file.
+
+    Raises:
+        `ValidationError` if the file isn't valid, from either method.
+        `UnicodeDecodeError` if it isn't UTF-8.
+    """
+
+    def __init__(self, chunks: AsyncIterable[bytes]):
+        self.version: Any = None
+        self._chunks = aiter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._skeleton: list[str] = []
+        self._tvmaze_ids: set[int] = set()
+        self._finished = False
+
+    async def read_shows(self) -> AsyncIterator[ShowCreate]:
+        if await self._peek() != "{":
+            raise await self._skeleton_error()
+        self._take("{")
+        if await self._peek() == "}":
+            self._take("}")
+        else:
+            while True:
+                if await self._peek() != '"':
+                    raise await self._skeleton_error()
+                key_text = await self._skeleton_value()
+                if await self._peek() != ":":
+                    raise await self._skeleton_error()
+                self._take(":")
+                key = json.loads(key_text)
+                if key == "shows" and await self._peek() == "[":
+                    self._pos += 1
+                    self._skeleton.append("[]")
+                    async for show in self._read_show_list():
+                        yield show
+                else:
+                    value_text = await self._skeleton_value()
+                    if key == "version":
+                        self.version = json.loads(value_text)
+
+                next_char = await self._peek()
+                if next_char == "}":
+                    self._take("}")
+                    break
+                if next_char != ",":
+                    raise await self._skeleton_error()
+                self._take(",")
+        if await self._peek() != "":
+            raise await self._skeleton_error()
+        self._finished = True
+
+    def read_skeleton(self) -> ImportModel:
+        """The file but for its shows, validated, once they've all been read"""
+
+        if not self._finished:
+            raise RuntimeError("The shows must be read first")
+        return ImportModel.model_validate_json(
+            "".join(self._skeleton), strict=True, extra="forbid"
+        )
+
+    async def _read_show_list(self) -> AsyncIterator[ShowCreate]:
+        if await self._peek() == "]":
+            self._pos += 1
+            return
+        index = 0
+        while True:
+            loc = ("shows", index)
+            try:
+                text = await self._value(MAX_SHOW_CHARS)
+            except _Incomplete:
+                raise _validation_error(ShowCreate, self._buffer[self._pos :], loc)
+            try:
+                show = ShowCreate.model_validate_json(text, strict=True, extra="forbid")
+            except ValidationError as e:
+                raise _located(e, loc)
+            # as `ImportModel.check_no_duplicate_shows` checks
+            if show.tvmaze_id in self._tvmaze_ids:
+                error = ValueError(f"Duplicate show: TVmaze ID {show.tvmaze_id}")
+                raise ValidationError.from_exception_data(
+                    ImportModel.__name__,
+                    [
+                        InitErrorDetails(
+                            type="value_error",
+                            loc=(*loc, "tvmaze_id"),
+                            input=show.tvmaze_id,
+                            ctx={"error": error},
+                        )
+                    ],
+                )
+            self._tvmaze_ids.add(show.tvmaze_id)
+            yield show
+
+            index += 1
+            next_char = await self._peek()
+            if next_char == "]":
+                self._pos += 1
+                return
+            if next_char != ",":
+                raise _json_invalid(f"expected ',' or ']' after shows.{index - 1}")
+            self._pos += 1
+
+    def _take(self, char: str) -> None:
+        # the (already peeked) character, kept in the skeleton
+        self._pos += 1
+        self._skeleton.append(char)
+
+    async def _skeleton_value(self) -> str:
+        # the next value, kept in the skeleton
+        try:
+            text = await self._value(MAX_SKELETON_CHARS)
+        except _Incomplete:
+            raise await self._skeleton_error()
+        self._skeleton.append(text)
+        if sum(map(len, self._skeleton)) > MAX_SKELETON_CHARS:
+            raise _json_invalid("too much data besides the shows")
+        return text
+
+    async def _skeleton_error(self) -> ValidationError:
+        # what's been read of the skeleton and what follows are invalid: read ahead a
+        # little, so the error doesn't depend on where the file's chunks end
+        while len(self._buffer) - self._pos < MAX_SKELETON_CHARS and await self._fill():
+            pass
+        text = "".join(self._skeleton) + self._buffer[self._pos :]
+        return _validation_error(ImportModel, text)
+
+    async def _peek(self) -> str:
+        """Skips to the next character that isn't whitespace and returns it (without
+        taking it), or "" at the end of the file"""
+
+        while True:
+            match = _whitespace.match(self._buffer, self._pos)
+            assert match is not None  # matches the empty string too
+            self._pos = match.end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not await self._fill():
+                return ""
+
+    async def _value(self, max_chars: int) -> str:
+        """Takes the next JSON value, reading as much of the file as it needs (but not
+        more than `max_chars` of it), and returns its text"""
+
+        await self._peek()
+        while True:
+            try:
+                _, end = _decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._eof or len(self._buffer) - self._pos > max_chars:
+                    raise _Incomplete()
+            else:
+                # a number at the end of the buffer may go on in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    text = self._buffer[self._pos : end]
+                    self._pos = end
+                    return text
+            await self._fill()
+
+    async def _fill(self) -> bool:
+        """Adds the next chunk of the file to the buffer, dropping what's been taken
+        from it: False if there are none left"""
+
+        if self._eof:
+            return False
+        self._buffer = self._buffer[self._pos :]
+        self._pos = 0
+        chunk = await anext(self._chunks, None)
+        if chunk is None:
+            self._eof = True
+            self._buffer += self._utf8.decode(b"", final=True)
+            return False
+        self._buffer += self._utf8.decode(chunk)
+        return True
@@ -1,10 +1,49 @@
+from collections.abc import AsyncIterable, AsyncIterator, Callable
+from dataclasses import dataclass
+from enum import StrEnum
 from typing import Any
 
-from pydantic import BaseModel, ValidationError
+from pydantic import ValidationError
 
-from models.show import Show, ShowCreate
+from models.show import ShowCreate
+from services.import_reader import ImportModel, ImportReader
 from services.show_service import ShowService
 
+# The most shows imported at a time, and so held in memory at a time, by an import
+IMPORT_BATCH_SIZE = 200
+
+KNOWN_VERSIONS = frozenset({"0.0.1"})
+
+
+class ImportMode(StrEnum):
+    """How an import changes the user's shows to the file's: by deleting them all
+    and inserting the file's, or by merging the file's into them, matched by TVmaze
+    ID, so that only the shows that differ are changed (and the rest keep their
+    rows and IDs)"""
+
+    REPLACE = "replace"
+    MERGE = "merge"
+
+
+@dataclass
+class ImportCounts:
+    imported: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+
+    def as_result(self) -> dict[str, int]:
+        """The counts as an import's response (or job's result) gives them"""
+
+        return {
+            "imported_count": self.imported,
+            "inserted_count": self.inserted,
+            "updated_count": self.updated,
+            "unchanged_count": self.unchanged,
+            "deleted_count": self.deleted,
+        }
+
 
 class InvalidImportDataError(Exception):
     def __init__(self, message: str, details: Any) -> None:
@@ -16,14 +55,28 @@ class InvalidImportVersionError(Exception):
     pass
 
 
-class ImportModel(BaseModel):
-    version: str
-    shows: list[ShowCreate]
+def import_error_result(e: Exception) -> dict[str, Any]:
+    """What an import's error response (or failed job's result) says of the error
+    the import raised"""
+
+    if isinstance(e, UnicodeDecodeError):
+        return {"error": "invalid UTF-8 content", "message": e.reason, "details": None}
+    if isinstance(e, InvalidImportDataError):
+        return {
+            "error": "invalid or malformed JSON",
+            "message": e.message,
+            "details": e.details,
+        }
+    return {"error": "unknown error", "message": None, "details": None}
+
+
+async def _single_chunk(data: bytes) -> AsyncIterator[bytes]:
+    yield data
 
 
 class ImportService:
-    """Service for importing previously updated data files, replacing the user's
-    current show data.
+    """Service for importing previously exported data files into the user's shows:
+    merged into them by TVmaze ID, or replacing them (see `ImportMode`).
     """
 
     @classmethod
@@ -46,31 +99,109 @@ class ImportService:
     def __init__(self, show_service: ShowService):
         self.show_service = show_service
 
-    async def import_(self, data: str) -> list[Show]:
-        try:
-            data_parsed = self.validate_import_data(data)
+    async def import_(
+        self, data: str, mode: ImportMode = ImportMode.MERGE
+    ) -> ImportCounts:
+        """Imports an import data file, as `import_stream` does"""
+
+        return await self.import_stream(_single_chunk(data.encode()), mode=mode)
+
+    async def import_stream(
+        self,
+        chunks: AsyncIterable[bytes],
+        on_progress: Callable[[int], None] | None = None,
+        batch_size: int = IMPORT_BATCH_SIZE,
+        mode: ImportMode = ImportMode.MERGE,
+    ) -> ImportCounts:
+        """Imports an import data file, given as chunks of its bytes, so that the
+        user's shows are the file's, all in one transaction. The file is parsed as
+        it's read, and the shows imported `batch_size` at a time, so only a batch of
+        them is ever in memory (see `ImportReader`).
+
+        A file with no more than a batch of shows is validated in full before the
+        user's shows are changed at all; the changes to them are rolled back if a
+        later batch turns out to be invalid.
+
+        Args:
+            on_progress: called with the number of shows imported so far after each
+                batch.
+            mode: whether to merge the file's shows into the user's (see
+                `ImportMode`).
+
+        Returns:
+            The number of shows imported, and of the user's shows inserted, updated,
+            left unchanged and deleted to import them.
 
-            match data_parsed.version:
-                case "0.0.1":
-                    return await self._import_v0_0_1(data_parsed)
-                case _:
-                    raise InvalidImportVersionError
+        Raises:
+            `InvalidImportDataError` if the file is malformed JSON, fails validation
+            or has an unknown version.
+            `UnicodeDecodeError` if the file isn't UTF-8.
+        """
 
+        reader = ImportReader(chunks)
+        counts = ImportCounts()
+        # the TVmaze IDs of the shows merged, whose saved shows are kept
+        merged_ids: set[int] = set()
+        changed = False
+        batch: list[ShowCreate] = []
+
+        async def import_batch() -> None:
+            nonlocal changed, batch
+            if not changed and mode == ImportMode.REPLACE:
+                counts.deleted = await self.show_service.delete_all_shows(
+                    auto_commit=False
+                )
+            changed = True
+            if not batch:
+                return
+            if mode == ImportMode.MERGE:
+                inserted, updated = await self.show_service.merge_shows(batch)
+                merged_ids.update(show.tvmaze_id for show in batch)
+            else:
+                inserted, updated = await self.show_service.load_shows(batch), 0
+            counts.imported += len(batch)
+            counts.inserted += inserted
+            counts.updated += updated
+            counts.unchanged += len(batch) - inserted - updated
+            batch = []
+            if on_progress is not None:
+                on_progress(counts.imported)
+
+        try:
+            async for show in reader.read_shows():
+                # checked as soon as it's known, before anything is changed
+                if reader.version is not None:
+                    self._check_version(reader.version)
+                batch.append(show)
+                if len(batch) == batch_size:
+                    await import_batch()
+            self._check_version(reader.read_skeleton().version)
+            await import_batch()
+            if mode == ImportMode.MERGE:
+                counts.deleted = await self.show_service.delete_shows_except(merged_ids)
+            await self.show_service.db_session.commit()
+            return counts
+
+        except UnicodeDecodeError:
+            await self._roll_back(changed)
+            raise
         except Exception as e:
+            await self._roll_back(changed)
             message = ""
             details: str | None = None
             if isinstance(e, ValidationError):
                 message = "Import file validation failed"
                 details = str(e)
             if isinstance(e, InvalidImportVersionError):
-                message = (
-                    f'Unknown import file version identifier: "{data_parsed.version}"'
-                )
+                message = f'Unknown import file version identifier: "{e.args[0]}"'
                 details = None
             raise InvalidImportDataError(message=message, details=details) from e
 
-    async def _import_v0_0_1(self, data_parsed: ImportModel) -> list[Show]:
-        # replace all saved shows with the new ones
-        await self.show_service.delete_all_shows()
-        shows = await self.show_service.add_many_shows(data_parsed.shows)
-        return shows
+    def _check_version(self, version: object) -> None:
+        # a version that isn't a string fails the file's validation instead
+        if isinstance(version, str) and version not in KNOWN_VERSIONS:
+            raise InvalidImportVersionError(version)
+
+    async def _roll_back(self, changed: bool) -> None:
+        if changed:
+            await self.show_service.db_session.rollback()
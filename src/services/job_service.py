@@ -0,0 +1,521 @@
+import asyncio
+import datetime
+import logging
+from collections.abc import AsyncIterable, AsyncIterator, Callable
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app_config import JobSettings
+from caching.episode_cache import EpisodeCacheBackend
+from db.models import DbJob, DbJobData
+from models.job import Job, JobKind, JobStatus
+from services.export_service import ExportService
+from services.import_service import (
+    ImportMode,
+    ImportService,
+    InvalidImportDataError,
+    import_error_result,
+)
+from services.show_service import ShowService
+from tvmaze_api.client import (
+    ConnectionError,
+    InvalidResponseError,
+    RateLimitedError,
+    TVmazeAPIClient,
+)
+from tvmaze_api.rate_limiter import RequestPriority
+
+logger = logging.getLogger(__name__)
+
+# The most jobs a user can have queued or running at a time
+MAX_UNFINISHED_JOBS = 5
+# How much of an export's file is stored per row
+OUTPUT_CHUNK_BYTES = 64 * 1024
+# How many times a worker reports that its job is still running per timeout (see
+# `JobSettings`), so that a late report or two doesn't get the job run again
+HEARTBEATS_PER_TIMEOUT = 4
+
+UNFINISHED_STATUSES = (JobStatus.QUEUED, JobStatus.RUNNING)
+
+
+class JobServiceError(Exception):
+    pass
+
+
+class JobNotFound(JobServiceError):
+    pass
+
+
+class JobHasNoOutput(JobServiceError):
+    pass
+
+
+class TooManyJobs(JobServiceError):
+    pass
+
+
+class _AttemptSuperseded(Exception):
+    """The job has been claimed again (as abandoned) since this attempt was"""
+
+
+def _user_lock_key(user_id: UUID) -> int:
+    """The key of the user's advisory lock (a bigint, taken from the user's ID)"""
+
+    return int.from_bytes(user_id.bytes[:8], "big", signed=True)
+
+
+def _error_result(error: str, message: str | None = None) -> dict[str, Any]:
+    return {"error": error, "message": message, "details": None}
+
+
+async def _read_job_data(
+    session: AsyncSession, job_id: UUID, output: bool
+) -> AsyncIterator[bytes]:
+    # a chunk per query, so that only one is ever in memory
+    seq = 0
+    while True:
+        stmt = select(DbJobData.data).where(
+            DbJobData.job_id == job_id,
+            DbJobData.output == output,
+            DbJobData.seq == seq,
+        )
+        data = await session.scalar(stmt)
+        if data is None:
+            return
+        yield data
+        seq += 1
+
+
+class _JobDataWriter:
+    """Stores a job's file as it's written, in chunks of at least `chunk_bytes`
+    (except the last)"""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        job_id: UUID,
+        output: bool,
+        chunk_bytes: int = OUTPUT_CHUNK_BYTES,
+    ):
+        self.session = session
+        self.job_id = job_id
+        self.output = output
+        self.chunk_bytes = chunk_bytes
+        self.size = 0
+        self._seq = 0
+        self._buffer = bytearray()
+
+    async def write(self, data: bytes) -> None:
+        self._buffer += data
+        self.size += len(data)
+        if len(self._buffer) >= self.chunk_bytes:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+        # a Core insert: the chunk isn't kept by the session once it's stored
+        stmt = insert(DbJobData).values(
+            job_id=self.job_id,
+            output=self.output,
+            seq=self._seq,
+            data=bytes(self._buffer),
+        )
+        await self.session.execute(stmt)
+        self._seq += 1
+        self._buffer.clear()
+
+
+class JobService:
+    """Submits a user's jobs, to be run in the background by a `JobWorker`, and
+    reports on them"""
+
+    def __init__(self, db_session: AsyncSession, user_id: UUID):
+        self.db_session = db_session
+        self.user_id = user_id
+
+    async def submit_import(
+        self, chunks: AsyncIterable[bytes], mode: ImportMode = ImportMode.MERGE
+    ) -> Job:
+        """Submits an import of an import data file, given as chunks of its bytes,
+        which are stored with the job as they're read.
+
+        Raises:
+            `TooManyJobs` if the user already has `MAX_UNFINISHED_JOBS` unfinished.
+        """
+
+        db_job = await self._add_job(JobKind.IMPORT, {"mode": mode.value})
+        writer = _JobDataWriter(self.db_session, db_job.id, output=False)
+        async for chunk in chunks:
+            await writer.write(chunk)
+        await writer.flush()
+        await self.db_session.commit()
+        return db_job.to_job_model()
+
+    async def submit_export(self) -> Job:
+        """Submits an export of the user's shows, whose file is the job's output.
+
+        Raises:
+            `TooManyJobs` if the user already has `MAX_UNFINISHED_JOBS` unfinished.
+        """
+
+        db_job = await self._add_job(JobKind.EXPORT)
+        await self.db_session.commit()
+        return db_job.to_job_model()
+
+    async def submit_refresh(self) -> Job:
+        """Submits a refresh of the episode details of all the user's shows.
+
+        Raises:
+            `TooManyJobs` if the user already has `MAX_UNFINISHED_JOBS` unfinished.
+        """
+
+        db_job = await self._add_job(JobKind.REFRESH)
+        await self.db_session.commit()
+        return db_job.to_job_model()
+
+    async def get_job(self, job_id: UUID) -> Job:
+        """Raises:
+        `JobNotFound` if the user has no job with that ID.
+        """
+
+        return (await self._get_db_job(job_id)).to_job_model()
+
+    async def read_output(self, job_id: UUID) -> AsyncIterator[bytes]:
+        """The job's output (an export's file), a chunk at a time.
+
+        Needs the session's transaction for as long as the chunks are being read.
+
+        Raises:
+            `JobNotFound` if the user has no job with that ID.
+            `JobHasNoOutput` if the job has none, or not yet.
+        """
+
+        if not (await self.get_job(job_id)).has_output:
+            raise JobHasNoOutput()
+        async for chunk in _read_job_data(self.db_session, job_id, output=True):
+            yield chunk
+
+    async def _add_job(
+        self, kind: JobKind, params: dict[str, Any] | None = None
+    ) -> DbJob:
+        # one submission of the user's at a time, until its transaction ends, so
+        # that two at once can't both count fewer than the maximum
+        lock = func.pg_advisory_xact_lock(_user_lock_key(self.user_id))
+        await self.db_session.execute(select(lock))
+        stmt = select(func.count()).where(
+            DbJob.user_id == self.user_id, DbJob.status.in_(UNFINISHED_STATUSES)
+        )
+        if (await self.db_session.execute(stmt)).scalar_one() >= MAX_UNFINISHED_JOBS:
+            raise TooManyJobs()
+        db_job = DbJob(
+            user_id=self.user_id,
+            kind=kind,
+            status=JobStatus.QUEUED,
+            params=params or {},
+            attempts=0,
+        )
+        self.db_session.add(db_job)
+        await self.db_session.flush()
+        return db_job
+
+    async def _get_db_job(self, job_id: UUID) -> DbJob:
+        stmt = select(DbJob).where(DbJob.id == job_id, DbJob.user_id == self.user_id)
+        db_job = await self.db_session.scalar(stmt)
+        if db_job is None:
+            raise JobNotFound()
+        return db_job
+
+
+@dataclass(frozen=True)
+class _ClaimedJob:
+    id: UUID
+    user_id: UUID
+    kind: JobKind
+    params: dict[str, Any]
+    attempt: int
+
+
+class JobWorker:
+    """Runs queued jobs, oldest first, one at a time. Any number of workers, in any
+    number of processes, can share the queue: each claims a job by locking its row,
+    skipping any that another is claiming (`SELECT ... FOR UPDATE SKIP LOCKED`).
+
+    A job that raises fails. While a job runs, its worker keeps reporting that it's
+    still running (its heartbeat); one left running by a worker that stopped is
+    claimed again once there's been no report for the settings' timeout, as long as
+    it hasn't been tried its maximum number of times already. An attempt changes
+    nothing once the job has been claimed again, and the job can't be claimed again
+    while an attempt is storing what it changes.
+    """
+
+    def __init__(
+        self,
+        session_maker: Callable[[], AsyncSession],
+        settings: JobSettings,
+        tvmaze_client: TVmazeAPIClient | None = None,
+        episodes_cache: EpisodeCacheBackend | None = None,
+    ):
+        self.session_maker = session_maker
+        self.settings = settings
+        self.tvmaze_client = tvmaze_client
+        self.episodes_cache = episodes_cache
+
+    async def run(self) -> None:
+        """Runs jobs until cancelled, checking for new ones (and deleting expired
+        ones, and expired show tombstones) every poll interval (first after one has
+        passed). A job cancelled while running is left running, to be claimed again
+        once abandoned."""
+
+        while True:
+            await asyncio.sleep(self.settings.poll_interval)
+            try:
+                while await self.run_next():
+                    pass
+                await self.delete_expired()
+                await self.delete_expired_tombstones()
+            except Exception:
+                logger.warning("Background jobs could not be run", exc_info=True)
+
+    async def run_next(self) -> bool:
+        """Claims and runs the next job, if there is one; returns whether there was"""
+
+        job = await self.claim()
+        if job is None:
+            return False
+        await self.run_job(job)
+        return True
+
+    async def run_job(self, job: _ClaimedJob) -> None:
+        """Runs a claimed job, reporting that it's running until it has finished,
+        and records how it did, unless it has been claimed again meanwhile"""
+
+        heartbeat = asyncio.create_task(self._beat(job))
+        try:
+            status, result = await self._run(job)
+        except _AttemptSuperseded:
+            logger.warning(
+                "Job %s was claimed again before attempt %s finished",
+                job.id,
+                job.attempt,
+            )
+            return
+        except Exception:
+            logger.warning("Job %s failed", job.id, exc_info=True)
+            status, result = JobStatus.FAILED, _error_result("unknown error")
+        finally:
+            heartbeat.cancel()
+        await self._finish(job, status, result)
+
+    async def claim(self) -> _ClaimedJob | None:
+        """Marks the next job (the oldest queued, or abandoned) as running, and
+        returns it; None if there's none. An abandoned job that has been tried its
+        maximum number of times is marked as failed instead."""
+
+        async with self.session_maker() as session:
+            while True:
+                now = datetime.datetime.now(datetime.UTC)
+                abandoned_before = now - datetime.timedelta(
+                    seconds=self.settings.timeout
+                )
+                stmt = (
+                    select(DbJob)
+                    # as in the index of unfinished jobs, so that it can be used
+                    .where(
+                        DbJob.status.in_(UNFINISHED_STATUSES),
+                        or_(
+                            DbJob.status == JobStatus.QUEUED,
+                            DbJob.heartbeat_at < abandoned_before,
+                        ),
+                    )
+                    .order_by(DbJob.created_at)
+                    .limit(1)
+                    .with_for_update(skip_locked=True)
+                )
+                db_job = await session.scalar(stmt)
+                if db_job is None:
+                    return None
+
+                if db_job.attempts >= self.settings.max_attempts:
+                    db_job.status = JobStatus.FAILED
+                    db_job.finished_at = now
+                    db_job.result = _error_result(
+                        "abandoned", f"Not finished in {db_job.attempts} attempts"
+                    )
+                    await session.commit()
+                    continue
+
+                db_job.status = JobStatus.RUNNING
+                db_job.started_at = db_job.heartbeat_at = now
+                db_job.attempts += 1
+                # taken before the commit, which may expire the row's attributes
+                job = _ClaimedJob(
+                    id=db_job.id,
+                    user_id=db_job.user_id,
+                    kind=JobKind(db_job.kind),
+                    params=db_job.params,
+                    attempt=db_job.attempts,
+                )
+                await session.commit()
+                return job
+
+    async def delete_expired(self) -> int:
+        """Deletes the jobs that finished longer ago than the settings' retention,
+        with their output; returns how many"""
+
+        finished_before = datetime.datetime.now(datetime.UTC) - datetime.timedelta(
+            seconds=self.settings.retention
+        )
+        async with self.session_maker() as session:
+            stmt = (
+                delete(DbJob)
+                .where(DbJob.finished_at < finished_before)
+                .returning(DbJob.id)
+            )
+            count = len((await session.scalars(stmt)).all())
+            await session.commit()
+        return count
+
+    async def delete_expired_tombstones(self) -> int:
+        """Deletes the tombstones of deleted shows that are past their retention (see
+        `ShowService.delete_expired_tombstones`); returns how many"""
+
+        async with self.session_maker() as session:
+            count = await ShowService.delete_expired_tombstones(session)
+            await session.commit()
+        return count
+
+    async def _beat(self, job: _ClaimedJob) -> None:
+        """Reports that the job is still running, every so often, until cancelled"""
+
+        interval = self.settings.timeout / HEARTBEATS_PER_TIMEOUT
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with self.session_maker() as session:
+                    stmt = (
+                        update(DbJob)
+                        .where(DbJob.id == job.id, DbJob.attempts == job.attempt)
+                        .values(heartbeat_at=datetime.datetime.now(datetime.UTC))
+                    )
+                    await session.execute(stmt)
+                    await session.commit()
+            except Exception:
+                # the next may well be made in time
+                logger.warning("Job %s's heartbeat failed", job.id, exc_info=True)
+
+    async def _hold(self, session: AsyncSession, job: _ClaimedJob) -> None:
+        """Makes sure that the job hasn't been claimed again since this attempt was,
+        and keeps it from being claimed until the session's transaction ends: called
+        in the transaction that stores what the attempt changes, before it does.
+        (The lock, FOR KEY SHARE, doesn't hold up the job's heartbeats or finishing.)
+
+        Raises:
+            `_AttemptSuperseded` if the job has been claimed again.
+        """
+
+        stmt = (
+            select(DbJob.attempts)
+            .where(DbJob.id == job.id)
+            .with_for_update(key_share=True)
+        )
+        if await session.scalar(stmt) != job.attempt:
+            raise _AttemptSuperseded()
+
+    async def _run(self, job: _ClaimedJob) -> tuple[JobStatus, dict[str, Any]]:
+        match job.kind:
+            case JobKind.IMPORT:
+                return await self._run_import(job)
+            case JobKind.EXPORT:
+                return await self._run_export(job)
+            case JobKind.REFRESH:
+                return await self._run_refresh(job)
+
+    async def _run_import(self, job: _ClaimedJob) -> tuple[JobStatus, dict[str, Any]]:
+        async with self.session_maker() as session:
+            # held until the import commits
+            await self._hold(session, job)
+            svc = ImportService(show_service=ShowService(session, job.user_id))
+            chunks = _read_job_data(session, job.id, output=False)
+            try:
+                counts = await svc.import_stream(
+                    chunks, mode=ImportMode(job.params["mode"])
+                )
+            except (InvalidImportDataError, UnicodeDecodeError) as e:
+                return JobStatus.FAILED, import_error_result(e)
+            return JobStatus.SUCCEEDED, counts.as_result()
+
+    async def _run_export(self, job: _ClaimedJob) -> tuple[JobStatus, dict[str, Any]]:
+        # the file is written through a session of its own, as the shows are read
+        # through a server-side cursor in the other's
+        async with self.session_maker() as out_session:
+            await self._hold(out_session, job)
+            # left by an earlier attempt
+            await out_session.execute(
+                delete(DbJobData).where(
+                    DbJobData.job_id == job.id, DbJobData.output.is_(True)
+                )
+            )
+            writer = _JobDataWriter(out_session, job.id, output=True)
+            async with self.session_maker() as session:
+                svc = ExportService(show_service=ShowService(session, job.user_id))
+                async for fragment in svc.export_stream():
+                    await writer.write(fragment.encode())
+            await writer.flush()
+            await out_session.commit()
+        return JobStatus.SUCCEEDED, {"exported_bytes": writer.size}
+
+    async def _run_refresh(self, job: _ClaimedJob) -> tuple[JobStatus, dict[str, Any]]:
+        async with self.session_maker() as session:
+            svc = ShowService(
+                session, job.user_id, self.tvmaze_client, self.episodes_cache
+            )
+            shows = await svc.get_shows()
+
+            # one show at a time, behind anything a user is waiting on; a show that
+            # can't be refreshed is counted, rather than failing the rest. Each
+            # show's catalog entry is committed as soon as it's updated, rather than
+            # kept locked until the end
+            refreshed = failed = 0
+            for show in shows.values():
+                try:
+                    await svc.get_episodes(
+                        show, force_refresh=True, priority=RequestPriority.BACKGROUND
+                    )
+                    refreshed += 1
+                except (ConnectionError, RateLimitedError, InvalidResponseError):
+                    failed += 1
+                await session.commit()
+        return JobStatus.SUCCEEDED, {
+            "refreshed_count": refreshed,
+            "failed_count": failed,
+        }
+
+    async def _finish(
+        self, job: _ClaimedJob, status: JobStatus, result: dict[str, Any]
+    ) -> None:
+        async with self.session_maker() as session:
+            # unless the job was claimed again meanwhile, as abandoned: then it's the
+            # later attempt's to finish
+            stmt = (
+                update(DbJob)
+                .where(DbJob.id == job.id, DbJob.attempts == job.attempt)
+                .values(
+                    status=status,
+                    finished_at=datetime.datetime.now(datetime.UTC),
+                    result=result,
+                )
+                .returning(DbJob.id)
+            )
+            if await session.scalar(stmt) is None:
+                return
+            await session.execute(
+                delete(DbJobData).where(
+                    DbJobData.job_id == job.id, DbJobData.output.is_(False)
+                )
+            )
+            await session.commit()
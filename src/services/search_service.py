@@ -1,5 +1,10 @@
+import unicodedata
+from typing import ClassVar
+
+from caching.swr_cache import StaleWhileRevalidateCache
 from models.search import SearchResults
 from tvmaze_api.client import TVmazeAPIClient
+from tvmaze_api.rate_limiter import RequestPriority
 
 
 class SearchError(Exception):
@@ -11,7 +16,24 @@ class SearchError(Exception):
     pass
 
 
+def normalize_query(query: str) -> str:
+    """Reduces a search query to a canonical form, so that queries differing only in
+    case, whitespace or Unicode representation share a cache entry (TVmaze's
+    search is insensitive to these anyway)."""
+
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
 class SearchService:
+    # Type-ahead UIs send the same prefixes over and over, across users. Results are
+    # fresh for an hour, then served stale for up to a day while being refreshed.
+    results_cache: ClassVar[StaleWhileRevalidateCache[str, SearchResults]] = (
+        StaleWhileRevalidateCache(maxsize=2000, ttl=3600, stale_ttl=86400)
+    )
+
+    def __init__(self, tvmaze_client: TVmazeAPIClient | None = None):
+        self.tvmaze_client = tvmaze_client or TVmazeAPIClient()
+
     async def search(self, query: str) -> SearchResults:
         """Search for TV shows matching the query.
 
@@ -23,8 +45,20 @@ class SearchService:
             `SearchError` if the search cannot be completed successfully.
         """
 
+        normalized_query = normalize_query(query)
         try:
-            tvmaze_results = await TVmazeAPIClient().search_shows(query)
-            return tvmaze_results.to_search_results_model()
+            return await SearchService.results_cache.get_or_fetch(
+                normalized_query,
+                fetch=lambda: self._fetch(
+                    normalized_query, RequestPriority.INTERACTIVE
+                ),
+                refresh=lambda: self._fetch(
+                    normalized_query, RequestPriority.BACKGROUND
+                ),
+            )
         except Exception as e:
             raise SearchError from e
+
+    async def _fetch(self, query: str, priority: RequestPriority) -> SearchResults:
+        tvmaze_results = await self.tvmaze_client.search_shows(query, priority=priority)
+        return tvmaze_results.to_search_results_model()
@@ -1,14 +1,75 @@
 import asyncio
-from uuid import UUID
+import datetime
+import functools
+from collections import Counter
+from collections.abc import AsyncIterator, Collection, Sequence
+from typing import Any, ClassVar
+from uuid import UUID, uuid4
 
 import advanced_alchemy.exceptions
-from cachetools import TTLCache
+from sqlalchemy import (
+    ARRAY,
+    BigInteger,
+    BindParameter,
+    ColumnElement,
+    Integer,
+    LargeBinary,
+    Text,
+    Update,
+    all_,
+    bindparam,
+    cast,
+    delete,
+    func,
+    literal,
+    select,
+    true,
+    update,
+)
+from sqlalchemy.dialects.postgresql import Insert, insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import QueryableAttribute
 
-from db.models import DbShow
+from caching.episode_cache import (
+    CachedEpisodes,
+    EpisodeCacheBackend,
+    InMemoryEpisodeCache,
+)
+from db.models import (
+    DbShow,
+    DbShowTombstone,
+    DbShowTombstoneHorizon,
+    DbTVmazeShow,
+)
 from db.repositories import DbShowRepository
-from models.show import EpisodeDetails, Show, ShowCreate
-from tvmaze_api.client import TVmazeAPIClient
+from db.show_json import (
+    SELECTABLE_FIELDS,
+    SHOW_COLUMNS,
+    SHOW_FIELDS,
+    encode_show_changes,
+    encode_show_fields,
+    encode_shows,
+    show_field_columns,
+)
+from models.show import (
+    EpisodeDescriptor,
+    EpisodeDetails,
+    EpisodeType,
+    Show,
+    ShowCreate,
+    ShowOperation,
+    ShowOperationError,
+    ShowOperationResult,
+    ToggleFavoriteOperation,
+    ToggleWatchedOperation,
+    UpdateUserFieldsOperation,
+)
+from tvmaze_api.client import (
+    InvalidResponseError,
+    ResponseValidators,
+    TVmazeAPIClient,
+)
+from tvmaze_api.rate_limiter import RequestPriority
 
 
 class ShowServiceError(Exception):
@@ -19,6 +80,18 @@ class ShowNotFound(ShowServiceError):
     pass
 
 
+class ShowAlreadyExists(ShowServiceError):
+    def __init__(self, tvmaze_id: int):
+        self.tvmaze_id = tvmaze_id
+        super().__init__()
+
+
+class UnknownShowFields(ShowServiceError):
+    def __init__(self, fields: list[str]):
+        self.fields = fields
+        super().__init__()
+
+
 class EpisodeNotFound(ShowServiceError):
     def __init__(self, season: int, episode_index: int):
         self.season = season
@@ -26,21 +99,383 @@ class EpisodeNotFound(ShowServiceError):
         super().__init__()
 
 
-class ShowService:
-    episodes_cache: TTLCache[UUID, list[list[EpisodeDetails]]] = TTLCache(
-        maxsize=500, ttl=86400
+# The columns of the show table `load_shows` copies in, in its records' order (the
+# rest are left NULL)
+LOADED_SHOW_COLUMNS = [
+    "id",
+    "user_id",
+    "tvmaze_id",
+    "favorite",
+    "watched",
+    "user_channel",
+    "user_notes",
+    "created_at",
+    "updated_at",
+]
+
+# The show details in a catalog entry, besides its episodes, that `_update_catalog`
+# updates
+CATALOG_DETAIL_COLUMNS = [
+    "title",
+    "source",
+    "duration",
+    "image_sm_url",
+    "image_lg_url",
+    "imdb_id",
+    "thetvdb_id",
+]
+
+# The columns `merge_shows` compares a saved show by (with its ID and TVmaze ID)
+MERGED_SHOW_COLUMNS = [
+    DbShow.id,
+    DbShow.tvmaze_id,
+    DbShow.favorite,
+    DbShow.watched,
+    DbShow.user_channel,
+    DbShow.user_notes,
+]
+
+
+def _episode_path(season_idx: int, ep_idx: int) -> BindParameter:
+    # Path to an episode within the seasons JSONB column, for #>
+    return literal([str(season_idx), str(ep_idx)], ARRAY(Text))
+
+
+def _padded_bitmap(bitmap: ColumnElement, length: int) -> ColumnElement:
+    # The bitmap extended with unset bits to at least `length` bytes; a missing one
+    # (NULL) counts as empty
+    bitmap = func.coalesce(bitmap, literal(b"", LargeBinary))
+    padding = func.substring(
+        literal(bytes(length), LargeBinary),
+        1,
+        func.greatest(0, length - func.length(bitmap)),
+    )
+    return bitmap.op("||")(padding)
+
+
+@functools.lru_cache(maxsize=1024)
+def _toggle_statement(
+    toggled: tuple[tuple[int, int], ...], episode_indices: tuple[tuple[int, int], ...]
+) -> Update:
+    """The UPDATE for `ShowService._toggle_episodes`, flipping the `toggled` episodes'
+    bits (season index, episode index) if all the `episode_indices` exist, and
+    returning their new values; for the show `b_show_id` of the user `b_user_id`,
+    with `b_updated_at` as its time, passed as parameters (not named after the
+    columns, which SQLAlchemy reserves for their new values).
+
+    Cached, as building the statement costs more than running it, and most toggles
+    are of a single episode, so share a few statements. It's of the tables rather
+    than the models, so that SQLAlchemy runs it as it is, rather than a copy made
+    for the ORM, and its cache key is only worked out once too.
+    """
+
+    show_table = DbShow.metadata.tables[DbShow.__tablename__]
+    show = show_table.c
+    catalog = DbTVmazeShow.__table__.c
+
+    # a season's bitmap may not cover all its episodes (if the show's episodes in
+    # the catalog have changed), so is padded to cover the toggled ones
+    bitmap_lengths: dict[int, int] = {}
+    for season_idx, ep_idx in toggled:
+        bitmap_lengths[season_idx] = max(
+            bitmap_lengths.get(season_idx, 0), ep_idx // 8 + 1
+        )
+    current = {
+        season_idx: _padded_bitmap(show.watched[season_idx], length)
+        for season_idx, length in bitmap_lengths.items()
+    }
+
+    # one assignment per season changed (each array element can only be assigned
+    # once), flipping each toggled episode's bit
+    bitmaps: dict[int, Any] = dict(current)
+    for season_idx, ep_idx in toggled:
+        bit = func.get_bit(current[season_idx], ep_idx)
+        bitmaps[season_idx] = func.set_bit(bitmaps[season_idx], ep_idx, 1 - bit)
+
+    return (
+        update(show_table)
+        .where(
+            show.user_id == bindparam("b_user_id"),
+            show.id == bindparam("b_show_id"),
+            # every episode must exist, or nothing is changed
+            catalog.tvmaze_id == show.tvmaze_id,
+            *(
+                catalog.seasons.op("#>")(_episode_path(*indices)).is_not(None)
+                for indices in episode_indices
+            ),
+        )
+        .values(
+            {
+                show.updated_at: bindparam("b_updated_at"),
+                **{
+                    show.watched[season_idx]: bitmap
+                    for season_idx, bitmap in bitmaps.items()
+                },
+            }
+        )
+        .returning(
+            show.id,
+            *(
+                func.get_bit(show.watched[season_idx], ep_idx)
+                for season_idx, ep_idx in toggled
+            ),
+        )
     )
-    episodes_cache_lock = asyncio.Lock()
 
-    def __init__(self, db_session: AsyncSession, user_id: UUID):
+
+def _episode_descriptors(
+    episodes: list[list[EpisodeDetails]],
+) -> list[list[EpisodeDescriptor]]:
+    # The seasons' episodes as the catalog lists them, numbered as TVmaze's episode
+    # lists are when converted (see `TVmazeEpisodeList.to_episode_descriptor_models`):
+    # the regular episodes in order, the specials not at all
+    seasons: list[list[EpisodeDescriptor]] = []
+    for season in episodes:
+        descriptors: list[EpisodeDescriptor] = []
+        next_ep_num = 1
+        for episode in season:
+            ep_num = None
+            if episode.type == EpisodeType.EPISODE:
+                ep_num = next_ep_num
+                next_ep_num += 1
+            descriptors.append(EpisodeDescriptor(episode.title, ep_num, False))
+        seasons.append(descriptors)
+    return seasons
+
+
+def _episodes_cache_key(tvmaze_id: int) -> str:
+    # Episode details come from TVmaze and don't depend on the user, so every user's
+    # copy of a show shares one entry
+    return str(tvmaze_id)
+
+
+class ShowService:
+    # Used when no cache is passed in; the app passes in the backend it's configured with
+    default_episodes_cache: ClassVar[EpisodeCacheBackend] = InMemoryEpisodeCache()
+    # How long deleted shows' tombstones are kept for syncs of changes: a client that
+    # hasn't synced for longer has to sync all of the user's shows again
+    tombstone_retention: ClassVar[datetime.timedelta] = datetime.timedelta(days=30)
+    # How long a show's details in the catalog are taken as they are, when another
+    # user adds the show, before they're fetched from TVmaze again
+    catalog_ttl: ClassVar[datetime.timedelta] = datetime.timedelta(days=1)
+
+    def __init__(
+        self,
+        db_session: AsyncSession,
+        user_id: UUID,
+        tvmaze_client: TVmazeAPIClient | None = None,
+        episodes_cache: EpisodeCacheBackend | None = None,
+    ):
         self.db_session = db_session
         self.user_id = user_id
+        self.tvmaze_client = tvmaze_client or TVmazeAPIClient()
+        self.episodes_cache = (
+            episodes_cache
+            if episodes_cache is not None
+            else ShowService.default_episodes_cache
+        )
 
-    async def get_shows(self) -> dict[UUID, Show]:
+    async def get_shows_version(
+        self, favorites_only: bool = False
+    ) -> tuple[int, datetime.datetime | None]:
+        """How many shows the user has (or favorite shows), and when one was last
+        changed: between them, these change whenever the list of shows does (a
+        deletion lowers the count), so identify its version without any show being
+        loaded
+        """
+
+        stmt = select(func.count(), func.max(DbShow.updated_at)).where(
+            *self._user_shows(favorites_only)
+        )
+        count, last_updated = (await self.db_session.execute(stmt)).one()
+        return count, last_updated
+
+    async def get_show_version(self, show_id: UUID) -> datetime.datetime | None:
+        """When the user's show was last changed, or None if they have no such show"""
+
+        stmt = select(DbShow.updated_at).where(
+            DbShow.user_id == self.user_id, DbShow.id == show_id
+        )
+        updated_at: datetime.datetime | None = await self.db_session.scalar(stmt)
+        return updated_at
+
+    async def get_shows(self, favorites_only: bool = False) -> dict[UUID, Show]:
         repository = DbShowRepository(session=self.db_session)
-        db_shows = await repository.list(DbShow.user_id == self.user_id)
+        db_shows = await repository.list(*self._user_shows(favorites_only))
         return {db_show.id: db_show.to_show_model() for db_show in db_shows}
 
+    async def stream_shows(self, page_size: int = 100) -> AsyncIterator[list[Show]]:
+        """The user's shows, in TVmaze ID order, a page at a time: read through a
+        server-side cursor, and not kept by the session once converted, so that only
+        a page of them is ever in memory however many the user has.
+
+        Needs the session's transaction for as long as the pages are being read.
+        """
+
+        stmt = (
+            select(DbShow)
+            .where(*self._user_shows())
+            .order_by(DbShow.tvmaze_id)
+            .execution_options(yield_per=page_size)
+        )
+        result = await self.db_session.stream_scalars(stmt)
+        async for db_shows in result.partitions():
+            yield [db_show.to_show_model() for db_show in db_shows]
+            for db_show in db_shows:
+                self.db_session.expunge(db_show.catalog)
+                self.db_session.expunge(db_show)
+
+    async def get_shows_json(self, favorites_only: bool = False) -> bytes:
+        """The user's shows, as `get_shows` returns them but encoded as JSON: built
+        straight from the database rows, without ORM objects or models (see
+        `db.show_json`)
+
+        Args:
+            favorites_only: just the user's favorite shows.
+        """
+
+        stmt = (
+            select(*SHOW_COLUMNS)
+            .join(DbShow.catalog)
+            .where(*self._user_shows(favorites_only))
+        )
+        rows = await self.db_session.execute(stmt)
+        return encode_shows(rows.tuples())
+
+    async def get_shows_page_json(
+        self,
+        fields: Sequence[str] = SHOW_FIELDS,
+        limit: int | None = None,
+        after: UUID | None = None,
+        favorites_only: bool = False,
+    ) -> tuple[bytes, UUID | None]:
+        """A page of the user's shows, in ID order, encoded as JSON like
+        `get_shows_json` but with just the given fields.
+
+        Args:
+            fields: any of the `Show` fields, and "season_counts", the number of
+                episodes watched and in all of each season, counted by the database
+                (see `db.show_json.SELECTABLE_FIELDS`).
+            limit: the most shows to return (at least 1), or None for all of them.
+            after: the ID of the previous page's last show, for the page after it.
+            favorites_only: just the user's favorite shows.
+
+        Returns:
+            The page's JSON, and the ID of its last show if there are more after it.
+
+        Raises:
+            `UnknownShowFields` if any of the fields can't be selected.
+        """
+
+        if unknown := [field for field in fields if field not in SELECTABLE_FIELDS]:
+            raise UnknownShowFields(unknown)
+
+        stmt = (
+            select(*show_field_columns(fields))
+            .join(DbShow.catalog)
+            .where(*self._user_shows(favorites_only))
+            .order_by(DbShow.id)
+        )
+        if after is not None:
+            stmt = stmt.where(DbShow.id > after)
+        if limit is not None:
+            # one more than the page, to tell whether there's another after it
+            stmt = stmt.limit(limit + 1)
+        rows = (await self.db_session.execute(stmt)).all()
+
+        last_id = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            last_id = rows[-1][0]
+        return encode_show_fields(rows, fields), last_id
+
+    async def get_show_changes_json(self, since: int | None = None) -> bytes:
+        """The user's shows added or changed since the given sync, and the IDs of
+        those deleted since, encoded as JSON: `{"changed": {...}, "deleted": [...],
+        "cursor": ..., "full": ...}`, with the shows as `get_shows_json` encodes
+        them.
+
+        Args:
+            since: the `cursor` of the previous sync, or None for all of the user's
+                shows.
+
+        Returns:
+            The changes, with the `since` for the next sync as their `cursor`: the
+            oldest transaction still in progress (see `CURRENT_XID`), so that changes
+            committed after this sync are sent by the next one, however long before
+            they were made. Some changes may be sent again, which is harmless, as each
+            is the show's whole current state. If the previous sync was from before
+            the deletions since then were forgotten (see `tombstone_retention`),
+            `full` is true, and all of the user's shows are sent, with no deletions,
+            to replace the client's copy.
+        """
+
+        # taken before the changes are read: every transaction before it has ended
+        cursor_stmt = select(
+            cast(
+                cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text),
+                BigInteger,
+            )
+        )
+        cursor: int = (await self.db_session.execute(cursor_stmt)).scalar_one()
+
+        deleted: list[UUID] = []
+        full = since is None
+        if since is not None:
+            deleted_stmt = select(DbShowTombstone.show_id).where(
+                DbShowTombstone.user_id == self.user_id,
+                DbShowTombstone.change_xid >= since,
+            )
+            deleted = list(await self.db_session.scalars(deleted_stmt))
+            # checked after the deletions are read, so that any deleted meanwhile are
+            # seen to have been
+            horizon_stmt = select(DbShowTombstoneHorizon.pruned_xid).where(
+                DbShowTombstoneHorizon.user_id == self.user_id
+            )
+            pruned_xid = await self.db_session.scalar(horizon_stmt)
+            full = pruned_xid is not None and since <= pruned_xid
+
+        stmt = select(*SHOW_COLUMNS).join(DbShow.catalog).where(*self._user_shows())
+        if full:
+            deleted = []
+        else:
+            stmt = stmt.where(DbShow.change_xid >= since)
+        changed = encode_shows((await self.db_session.execute(stmt)).tuples())
+        return encode_show_changes(changed, deleted, cursor, full)
+
+    @classmethod
+    async def delete_expired_tombstones(cls, db_session: AsyncSession) -> int:
+        """Deletes every user's tombstones older than `tombstone_retention`, and
+        records how far each user's have been deleted, for `get_show_changes_json`;
+        leaves the changes for the caller to commit, and returns how many were
+        deleted"""
+
+        deleted_before = datetime.datetime.now(datetime.UTC) - cls.tombstone_retention
+        deleted = (
+            delete(DbShowTombstone)
+            .where(DbShowTombstone.deleted_at < deleted_before)
+            .returning(DbShowTombstone.user_id, DbShowTombstone.change_xid)
+            .cte("deleted")
+        )
+        horizon = insert(DbShowTombstoneHorizon).from_select(
+            ["user_id", "pruned_xid"],
+            select(deleted.c.user_id, func.max(deleted.c.change_xid)).group_by(
+                deleted.c.user_id
+            ),
+        )
+        horizon = horizon.on_conflict_do_update(
+            index_elements=[DbShowTombstoneHorizon.user_id],
+            set_={
+                "pruned_xid": func.greatest(
+                    DbShowTombstoneHorizon.pruned_xid, horizon.excluded.pruned_xid
+                )
+            },
+        )
+        # in the same statement as the deletion, whose rows it's given
+        stmt = select(func.count()).select_from(deleted).add_cte(horizon.cte("horizon"))
+        count: int = (await db_session.execute(stmt)).scalar_one()
+        return count
+
     async def get_show(self, show_id: UUID) -> Show:
         repository = DbShowRepository(session=self.db_session)
         try:
@@ -51,122 +486,635 @@ class ShowService:
         except advanced_alchemy.exceptions.NotFoundError:
             raise ShowNotFound()
 
-    async def add_show(self, show: ShowCreate) -> Show:
+    async def has_show(self, tvmaze_id: int) -> bool:
         repository = DbShowRepository(session=self.db_session)
-        db_show = await repository.add(
-            DbShow.from_show_model(show, owner_id=self.user_id), auto_commit=True
+        return await repository.exists(
+            DbShow.user_id == self.user_id, DbShow.tvmaze_id == tvmaze_id
         )
+
+    async def add_show(self, show: ShowCreate) -> Show:
+        """Adds the show to the user's saved shows.
+
+        The show's details are taken from the catalog if it's already there (saved
+        by any user), and otherwise added to it.
+
+        Raises:
+            `ShowAlreadyExists` if the user has already saved a show with the same
+            TVmaze ID.
+        """
+
+        catalog = await self._add_to_catalog([show])
+        repository = DbShowRepository(session=self.db_session)
+        try:
+            db_show = await repository.add(
+                DbShow.from_show_model(
+                    show, owner_id=self.user_id, catalog=catalog[show.tvmaze_id]
+                ),
+                auto_commit=True,
+            )
+        except advanced_alchemy.exceptions.DuplicateKeyError:
+            raise ShowAlreadyExists(tvmaze_id=show.tvmaze_id)
         return db_show.to_show_model()
 
-    async def add_many_shows(self, shows: list[ShowCreate]) -> list[Show]:
+    async def add_many_shows(
+        self, shows: list[ShowCreate], auto_commit: bool = True
+    ) -> list[Show]:
+        """Adds the shows to the user's saved shows, like `add_show`; without
+        `auto_commit`, leaves the changes for the caller to commit"""
+
+        catalog = await self._add_to_catalog(shows)
         repository = DbShowRepository(session=self.db_session)
         db_shows = [
-            DbShow.from_show_model(show, owner_id=self.user_id) for show in shows
+            DbShow.from_show_model(
+                show, owner_id=self.user_id, catalog=catalog[show.tvmaze_id]
+            )
+            for show in shows
         ]
-        created_db_shows = await repository.add_many(db_shows, auto_commit=True)
+        created_db_shows = await repository.add_many(db_shows, auto_commit=auto_commit)
         return [db_show.to_show_model() for db_show in created_db_shows]
 
+    async def load_shows(self, shows: list[ShowCreate]) -> int:
+        """Adds the shows to the user's saved shows, like `add_many_shows`, but copies
+        them into the table in bulk (with COPY), without loading them into the session
+        or converting them back: for adding many shows at a time, when only their
+        number is needed. Leaves the changes for the caller to commit.
+
+        Returns:
+            The number of shows added.
+
+        Raises:
+            `asyncpg.UniqueViolationError` (not wrapped by SQLAlchemy) if the user has
+            already saved any of the shows.
+        """
+
+        if not shows:
+            return 0
+        catalog_seasons = await self._load_catalog(shows)
+        now = datetime.datetime.now(datetime.UTC)
+        records = [
+            (
+                uuid4(),
+                self.user_id,
+                show.tvmaze_id,
+                show.favorite,
+                DbShow.seasons_to_watched(
+                    show.seasons, catalog_seasons[show.tvmaze_id]
+                ),
+                show.user_channel,
+                show.user_notes,
+                now,
+                now,
+            )
+            for show in shows
+        ]
+        # on the session's connection, so in its transaction (which adding to the
+        # catalog has begun)
+        connection = await self.db_session.connection()
+        raw_connection = await connection.get_raw_connection()
+        asyncpg_connection = raw_connection.driver_connection
+        assert asyncpg_connection is not None
+        await asyncpg_connection.copy_records_to_table(
+            DbShow.__tablename__, columns=LOADED_SHOW_COLUMNS, records=records
+        )
+        return len(records)
+
+    async def merge_shows(self, shows: list[ShowCreate]) -> tuple[int, int]:
+        """Makes the user's saved shows with the given shows' TVmaze IDs match them,
+        leaving the changes for the caller to commit: the shows the user hasn't saved
+        are added (by `load_shows`), and those they have are updated, keeping their
+        IDs, but only if they differ. As with `add_show`, the shows' details are taken
+        from the catalog if they're in it. A show listed more than once is merged as
+        it's listed last.
+
+        Returns:
+            The number of shows added, and the number updated.
+        """
+
+        if not shows:
+            return 0, 0
+        # (each TVmaze ID can only be saved once)
+        shows = list({show.tvmaze_id: show for show in shows}.values())
+        stmt = (
+            select(*MERGED_SHOW_COLUMNS, DbTVmazeShow.seasons)
+            .join(DbShow.catalog)
+            .where(
+                *self._user_shows(),
+                DbShow.tvmaze_id.in_({show.tvmaze_id for show in shows}),
+            )
+        )
+        saved = {row.tvmaze_id: row for row in await self.db_session.execute(stmt)}
+
+        new_shows: list[ShowCreate] = []
+        changes: list[dict[str, Any]] = []
+        now = datetime.datetime.now(datetime.UTC)
+        for show in shows:
+            row = saved.get(show.tvmaze_id)
+            if row is None:
+                new_shows.append(show)
+                continue
+            values = {
+                "favorite": show.favorite,
+                "watched": DbShow.seasons_to_watched(show.seasons, row.seasons),
+                "user_channel": show.user_channel,
+                "user_notes": show.user_notes,
+            }
+            if any(getattr(row, name) != value for name, value in values.items()):
+                changes.append({"id": row.id, **values, "updated_at": now})
+
+        if changes:
+            # an executemany UPDATE by primary key (which updates any loaded copies)
+            await self.db_session.execute(update(DbShow), changes)
+        added = await self.load_shows(new_shows)
+        return added, len(changes)
+
+    async def _add_to_catalog(self, shows: list[ShowCreate]) -> dict[int, DbTVmazeShow]:
+        """Adds the shows' details to the catalog, except for shows already in it,
+        whose details are left as they are.
+
+        Returns:
+            The shows' catalog entries, by TVmaze ID.
+        """
+
+        if not shows:
+            return {}
+        await self.db_session.execute(self._catalog_insert(shows))
+
+        entries = await self.db_session.scalars(
+            select(DbTVmazeShow).where(
+                DbTVmazeShow.tvmaze_id.in_({show.tvmaze_id for show in shows})
+            )
+        )
+        return {entry.tvmaze_id: entry for entry in entries}
+
+    async def _load_catalog(
+        self, shows: list[ShowCreate]
+    ) -> dict[int, list[list[dict]] | None]:
+        """Adds the shows' details to the catalog, as `_add_to_catalog` does, without
+        loading the entries.
+
+        Returns:
+            The seasons of the shows' catalog entries, by TVmaze ID; None for those
+            just added, whose seasons are the shows' own.
+        """
+
+        added = set(
+            await self.db_session.scalars(
+                self._catalog_insert(shows).returning(DbTVmazeShow.tvmaze_id)
+            )
+        )
+        catalog_seasons: dict[int, list[list[dict]] | None] = dict.fromkeys(added)
+        existing = {show.tvmaze_id for show in shows} - added
+        if existing:
+            rows = await self.db_session.execute(
+                select(DbTVmazeShow.tvmaze_id, DbTVmazeShow.seasons).where(
+                    DbTVmazeShow.tvmaze_id.in_(existing)
+                )
+            )
+            catalog_seasons |= {
+                tvmaze_id: seasons for tvmaze_id, seasons in rows.tuples()
+            }
+        return catalog_seasons
+
+    @staticmethod
+    def _catalog_insert(shows: list[ShowCreate]) -> Insert:
+        # adds catalog entries for the shows not already in the catalog
+        return (
+            insert(DbTVmazeShow)
+            .values(
+                [
+                    {
+                        "tvmaze_id": show.tvmaze_id,
+                        "title": show.title,
+                        "source": show.source,
+                        "duration": show.duration,
+                        "image_sm_url": str(show.image_sm_url),
+                        "image_lg_url": str(show.image_lg_url),
+                        "imdb_id": show.imdb_id,
+                        "thetvdb_id": show.thetvdb_id,
+                        "seasons": DbTVmazeShow.seasons_to_json(show.seasons),
+                    }
+                    for show in shows
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=[DbTVmazeShow.tvmaze_id])
+        )
+
     async def add_show_from_tvmaze(self, tvmaze_id: int) -> Show:
-        client = TVmazeAPIClient()
+        """Adds the show with the given TVmaze ID to the user's saved shows,
+        fetching its details from TVmaze, unless they're in the catalog and no older
+        than `catalog_ttl`. Details fetched for a show already in the catalog update
+        it, for every user who has saved the show (see `_update_catalog`).
+
+        Raises:
+            `ShowAlreadyExists` if the user has already saved the show.
+        """
+
+        # don't trouble TVmaze if the show would be rejected anyway (though another
+        # request could still add it meanwhile: `add_show` catches that)
+        if await self.has_show(tvmaze_id):
+            raise ShowAlreadyExists(tvmaze_id=tvmaze_id)
+
+        # nor if another user has already added it, recently enough
+        catalog_entry = await self.db_session.get(DbTVmazeShow, tvmaze_id)
+        fresh_after = datetime.datetime.now(datetime.UTC) - self.catalog_ttl
+        if catalog_entry is not None and catalog_entry.updated_at > fresh_after:
+            return await self.add_show(catalog_entry.to_show_create_model())
 
         # fetch show and episode metadata
         show_rsp, episodes_rsp = await asyncio.gather(
-            client.get_show(tvmaze_id=tvmaze_id),
-            client.get_show_episodes(tvmaze_id=tvmaze_id),
+            self.tvmaze_client.get_show(tvmaze_id=tvmaze_id),
+            self.tvmaze_client.get_show_episodes(tvmaze_id=tvmaze_id),
         )
 
         # insert new show in db
         addable = show_rsp.to_show_create_model(
             with_episodes=episodes_rsp.to_episode_descriptor_models()
         )
+        if catalog_entry is not None:
+            await self._update_catalog(tvmaze_id, addable.seasons, details=addable)
         show = await self.add_show(addable)
 
         # Cache episode details for future use
-        async with ShowService.episodes_cache_lock:
-            ShowService.episodes_cache[show.id] = (
-                episodes_rsp.to_episode_details_models()
-            )
+        await self.episodes_cache.set(
+            _episodes_cache_key(tvmaze_id),
+            CachedEpisodes(episodes=episodes_rsp.to_episode_details_models()),
+        )
 
         return show
 
+    async def _update_catalog(
+        self,
+        tvmaze_id: int,
+        seasons: list[list[EpisodeDescriptor]],
+        details: ShowCreate | None = None,
+    ) -> None:
+        """Updates the show's catalog entry, if it's in the catalog, with its
+        episodes (and with `details`, its other details) as just fetched from TVmaze,
+        marking it as up to date, and leaves the changes for the caller to commit.
+        Without `details`, an entry whose episodes are the same is left as it is.
+
+        If its episodes have changed, so has every user's copy of the show: each is
+        marked as changed, and if any episode has moved, its watched bitmaps are
+        converted to match (see `DbTVmazeShow.watched_for`).
+        """
+
+        # locked, so that concurrent updates convert the bitmaps one after the other
+        entry = await self.db_session.get(
+            DbTVmazeShow, tvmaze_id, with_for_update=True, populate_existing=True
+        )
+        if entry is None:
+            return
+        now = datetime.datetime.now(datetime.UTC)
+        new_seasons = DbTVmazeShow.seasons_to_json(seasons)
+        changed = new_seasons != entry.seasons
+        if details is not None:
+            new_details = DbTVmazeShow.from_show_model(details)
+            for name in CATALOG_DETAIL_COLUMNS:
+                if getattr(entry, name) != getattr(new_details, name):
+                    setattr(entry, name, getattr(new_details, name))
+                    changed = True
+        elif not changed:
+            # brought up to date by another request meanwhile
+            return
+
+        if changed and not entry.keeps_watched_for(new_seasons):
+            rows = await self.db_session.execute(
+                select(DbShow.id, DbShow.watched)
+                .where(DbShow.tvmaze_id == tvmaze_id)
+                .with_for_update()
+            )
+            conversions = [
+                {
+                    "id": show_id,
+                    "watched": entry.watched_for(watched or [], new_seasons),
+                    "updated_at": now,
+                }
+                for show_id, watched in rows.tuples()
+            ]
+            if conversions:
+                # an executemany UPDATE by primary key (which updates any loaded
+                # copies)
+                await self.db_session.execute(update(DbShow), conversions)
+        elif changed:
+            await self.db_session.execute(
+                update(DbShow)
+                .where(DbShow.tvmaze_id == tvmaze_id)
+                .values(updated_at=now)
+            )
+        entry.seasons = new_seasons
+        entry.updated_at = now
+        await self.db_session.flush()
+
     async def delete_show(self, show_id: UUID) -> Show:
+        # loaded first, as the rows returned by the delete don't include the show's
+        # details from the catalog
+        show = await self.get_show(show_id)
         repository = DbShowRepository(session=self.db_session)
         deleted_shows = await repository.delete_where(
-            DbShow.user_id == self.user_id, DbShow.id == show_id, auto_commit=True
+            DbShow.user_id == self.user_id, DbShow.id == show_id
         )
         if not deleted_shows:
             raise ShowNotFound()
-        return deleted_shows[0].to_show_model()
+        await self._add_tombstones([db_show.id for db_show in deleted_shows])
+        await self.db_session.commit()
+        return show
 
-    async def delete_all_shows(self) -> None:
-        repository = DbShowRepository(session=self.db_session)
-        await repository.delete_where(DbShow.user_id == self.user_id, auto_commit=True)
+    async def delete_all_shows(self, auto_commit: bool = True) -> int:
+        """Deletes all the user's shows; returns how many there were"""
+
+        # only their IDs are returned: the shows (and their catalog entries) aren't
+        # loaded, however many there are
+        stmt = delete(DbShow).where(*self._user_shows()).returning(DbShow.id)
+        deleted_ids = list(await self.db_session.scalars(stmt))
+        await self._add_tombstones(deleted_ids)
+        if auto_commit:
+            await self.db_session.commit()
+        return len(deleted_ids)
+
+    async def delete_shows_except(self, tvmaze_ids: Collection[int]) -> int:
+        """Deletes the user's shows but those with the given TVmaze IDs, leaving the
+        changes for the caller to commit; returns how many were deleted"""
+
+        stmt = (
+            delete(DbShow)
+            .where(
+                *self._user_shows(),
+                # one parameter, however many IDs there are
+                DbShow.tvmaze_id != all_(literal(list(tvmaze_ids), ARRAY(Integer))),
+            )
+            .returning(DbShow.id)
+        )
+        deleted_ids = list(await self.db_session.scalars(stmt))
+        await self._add_tombstones(deleted_ids)
+        return len(deleted_ids)
 
     async def get_episodes(
-        self, show: Show, force_refresh: bool = False
+        self,
+        show: Show,
+        force_refresh: bool = False,
+        priority: RequestPriority = RequestPriority.NORMAL,
     ) -> list[list[EpisodeDetails]]:
-        if not force_refresh:
-            async with ShowService.episodes_cache_lock:
-                cached = ShowService.episodes_cache.get(show.id)
-            if cached:
-                return cached
+        """Returns the show's episode details, from the cache if possible.
+
+        With `force_refresh`, checks TVmaze for changes even if cached; unchanged
+        episode lists aren't downloaded again. `priority` is that of any request to
+        TVmaze. If the episode list fetched (by this call, or one it shared the
+        fetch of) differs from the show's catalog entry's, it updates the entry (see
+        `_update_catalog`), leaving the changes for the caller to commit.
+        """
 
-        client = TVmazeAPIClient()
-        tvmaze_episodes = await client.get_show_episodes(tvmaze_id=show.tvmaze_id)
-        episodes = tvmaze_episodes.to_episode_details_models()
+        key = _episodes_cache_key(show.tvmaze_id)
 
-        # always update cache with freshly reloaded episodes
-        async with ShowService.episodes_cache_lock:
-            ShowService.episodes_cache[show.id] = episodes
+        async def fetch(current: CachedEpisodes | None) -> CachedEpisodes:
+            validators = (
+                ResponseValidators(
+                    etag=current.etag, last_modified=current.last_modified
+                )
+                if current is not None
+                else ResponseValidators()
+            )
+            rsp = await self.tvmaze_client.get_show_episodes_if_modified(
+                tvmaze_id=show.tvmaze_id, validators=validators, priority=priority
+            )
+            if rsp.model is not None:
+                episodes = rsp.model.to_episode_details_models()
+            elif current is not None:
+                if rsp.validators == validators:
+                    # unchanged: the cache only has to keep it for longer
+                    return current
+                episodes = current.episodes  # nothing to parse or convert
+            else:
+                raise InvalidResponseError(
+                    "Not Modified response to unconditional request"
+                )
+            return CachedEpisodes(
+                episodes=episodes,
+                etag=rsp.validators.etag,
+                last_modified=rsp.validators.last_modified,
+            )
 
-        return episodes
+        # concurrent requests for the same show share one fetch, which only fetches
+        # (it isn't the sharers' to use their sessions): each brings the catalog up
+        # to date afterwards, in its own session
+        entry = None if force_refresh else await self.episodes_cache.get(key)
+        if entry is None:
+            entry = await self.episodes_cache.refresh(
+                key, fetch, revalidate=force_refresh
+            )
+            await self._sync_catalog_episodes(show.tvmaze_id, entry.episodes)
+        return entry.episodes
+
+    async def _sync_catalog_episodes(
+        self, tvmaze_id: int, episodes: list[list[EpisodeDetails]]
+    ) -> None:
+        # updates the show's catalog entry with the episodes fetched, only if they
+        # differ from its own (so a fetch shared by many requests is applied once)
+        seasons = _episode_descriptors(episodes)
+        stmt = select(DbTVmazeShow.seasons).where(DbTVmazeShow.tvmaze_id == tvmaze_id)
+        current = await self.db_session.scalar(stmt)
+        if current is None or current == DbTVmazeShow.seasons_to_json(seasons):
+            return
+        await self._update_catalog(tvmaze_id, seasons)
 
     async def toggle_episodes(
         self, show_id: UUID, episode_indices: list[tuple[int, int]]
-    ) -> Show:
-        shows = await self.get_shows()
-        show = shows[show_id]
+    ) -> list[tuple[int, int, bool]]:
+        """Toggles the watched status of the given episodes (season index, episode
+        index) of a show, all or none of them.
 
-        # validate requested episodes before making any changes
-        for season_idx, ep_idx in episode_indices:
-            try:
-                show.seasons[season_idx][ep_idx]
-            except IndexError:
-                raise EpisodeNotFound(season=season_idx + 1, episode_index=ep_idx)
+        The flags are flipped by the database, within the seasons' watched bitmaps, so
+        that nothing else about the show is read or written and concurrent toggles
+        can't undo each other.
+
+        Returns:
+            The new status of each toggled episode, as (season index, episode index,
+            watched). An episode listed twice is toggled twice, i.e. left as it was,
+            and isn't included.
+
+        Raises:
+            `ShowNotFound` if the user has no show with that ID.
+            `EpisodeNotFound` if the show has no such episode.
+        """
 
+        changes = await self._toggle_episodes(show_id, episode_indices)
+        await self.db_session.commit()
+        return changes
+
+    async def _toggle_episodes(
+        self, show_id: UUID, episode_indices: list[tuple[int, int]]
+    ) -> list[tuple[int, int, bool]]:
+        # `toggle_episodes`, left uncommitted
         for season_idx, ep_idx in episode_indices:
-            old = show.seasons[season_idx][ep_idx].watched
-            show.seasons[season_idx][ep_idx].watched = not old
+            if season_idx < 0 or ep_idx < 0:
+                raise EpisodeNotFound(season=season_idx + 1, episode_index=ep_idx)
 
-        repository = DbShowRepository(session=self.db_session)
-        updated_db_show = await repository.update(
-            DbShow.from_show_model(show, owner_id=self.user_id), auto_commit=True
-        )
-        return updated_db_show.to_show_model()
+        toggled = [
+            indices for indices, count in Counter(episode_indices).items() if count % 2
+        ]
 
-    async def toggle_favorite(self, show_id: UUID) -> Show:
-        shows = await self.get_shows()
-        show = shows[show_id]
+        stmt = _toggle_statement(tuple(toggled), tuple(episode_indices))
+        params = {
+            "b_user_id": self.user_id,
+            "b_show_id": show_id,
+            "b_updated_at": datetime.datetime.now(datetime.UTC),
+        }
+        row = (await self.db_session.execute(stmt, params)).one_or_none()
+        if row is None:
+            # find out why
+            show = await self.get_show(show_id)
+            for season_idx, ep_idx in episode_indices:
+                if season_idx >= len(show.seasons) or ep_idx >= len(
+                    show.seasons[season_idx]
+                ):
+                    raise EpisodeNotFound(season=season_idx + 1, episode_index=ep_idx)
+            raise ShowServiceError("Show's episodes changed during update")
 
-        show.favorite = not show.favorite
+        self._expire_loaded_show(show_id, ["watched", "updated_at"])
+        return [
+            (season_idx, ep_idx, bool(bit))
+            for (season_idx, ep_idx), bit in zip(toggled, row[1:], strict=True)
+        ]
 
-        repository = DbShowRepository(session=self.db_session)
-        updated_db_show = await repository.update(
-            DbShow.from_show_model(show, owner_id=self.user_id), auto_commit=True
-        )
-        return updated_db_show.to_show_model()
+    async def toggle_favorite(self, show_id: UUID) -> Show:
+        return await self._update_show(show_id, favorite=~DbShow.favorite)
 
     async def update_user_fields(
         self, show_id: UUID, user_channel: str | None, user_notes: str | None
     ) -> Show:
-        shows = await self.get_shows()
-        show = shows[show_id]
+        return await self._update_show(
+            show_id, user_channel=user_channel, user_notes=user_notes
+        )
 
-        show.user_channel = user_channel
-        show.user_notes = user_notes
+    async def apply_operations(
+        self, operations: Sequence[ShowOperation]
+    ) -> list[ShowOperationResult]:
+        """Applies a batch of changes to the user's shows, in order, in a single
+        transaction, each with a single UPDATE that returns just what the result
+        needs (no show is loaded).
 
-        repository = DbShowRepository(session=self.db_session)
-        updated_db_show = await repository.update(
-            DbShow.from_show_model(show, owner_id=self.user_id), auto_commit=True
+        An operation that fails changes nothing, but doesn't stop the others, so the
+        results say which failed and why: one per operation, in the same order.
+        """
+
+        results: list[ShowOperationResult] = []
+        for operation in operations:
+            try:
+                match operation:
+                    case ToggleWatchedOperation():
+                        episodes = await self._toggle_episodes(
+                            operation.show_id, operation.episodes
+                        )
+                        result = ShowOperationResult(ok=True, episodes=episodes)
+                    case ToggleFavoriteOperation():
+                        favorite = await self._update_show_column(
+                            operation.show_id,
+                            DbShow.favorite,
+                            favorite=~DbShow.favorite,
+                        )
+                        result = ShowOperationResult(ok=True, favorite=favorite)
+                    case UpdateUserFieldsOperation():
+                        await self._update_show_column(
+                            operation.show_id,
+                            DbShow.id,
+                            user_channel=operation.user_channel,
+                            user_notes=operation.user_notes,
+                        )
+                        result = ShowOperationResult(ok=True)
+            except ShowNotFound:
+                result = ShowOperationResult(
+                    ok=False, error=ShowOperationError.SHOW_NOT_FOUND
+                )
+            except EpisodeNotFound:
+                result = ShowOperationResult(
+                    ok=False, error=ShowOperationError.EPISODE_NOT_FOUND
+                )
+            except ShowServiceError:
+                result = ShowOperationResult(ok=False, error=ShowOperationError.FAILED)
+            results.append(result)
+        await self.db_session.commit()
+        return results
+
+    async def _update_show_column[T](
+        self, show_id: UUID, returned: QueryableAttribute[T], **values: Any
+    ) -> T:
+        """Sets columns of one of the user's shows with a single UPDATE, left
+        uncommitted, returning the (new) value of one column.
+
+        Raises:
+            `ShowNotFound` if the user has no show with that ID.
+        """
+
+        stmt = (
+            self._show_update(show_id)
+            .values(**values)
+            .returning(returned)
+            .execution_options(synchronize_session=False)
+        )
+        row = (await self.db_session.execute(stmt)).one_or_none()
+        if row is None:
+            raise ShowNotFound()
+        self._expire_loaded_show(show_id, [*values, "updated_at"])
+        value: T = row[0]
+        return value
+
+    def _expire_loaded_show(self, show_id: UUID, attribute_names: list[str]) -> None:
+        # for UPDATEs that can't be applied to a loaded copy of the show
+        loaded = self.db_session.identity_map.get(
+            self.db_session.identity_key(DbShow, show_id)
+        )
+        if loaded is not None:
+            self.db_session.expire(loaded, attribute_names)
+
+    async def _update_show(self, show_id: UUID, **values: Any) -> Show:
+        """Sets columns of one of the user's shows with a single UPDATE, touching
+        no other rows (nor loading them).
+
+        Raises:
+            `ShowNotFound` if the user has no show with that ID.
+        """
+
+        stmt = self._show_update(show_id).values(**values).returning(DbShow)
+        db_show = (await self.db_session.scalars(stmt)).one_or_none()
+        if db_show is None:
+            raise ShowNotFound()
+        # not loaded by the UPDATE's RETURNING
+        await self.db_session.refresh(db_show, ["catalog"])
+        await self.db_session.commit()
+        return db_show.to_show_model()
+
+    async def _add_tombstones(self, deleted_ids: Sequence[UUID]) -> None:
+        # records the deletions for `get_show_changes_json`, in the deletions'
+        # transaction
+        if not deleted_ids:
+            return
+        deleted_at = datetime.datetime.now(datetime.UTC)
+        await self.db_session.execute(
+            insert(DbShowTombstone),
+            [
+                {
+                    "show_id": show_id,
+                    "user_id": self.user_id,
+                    "deleted_at": deleted_at,
+                }
+                for show_id in deleted_ids
+            ],
+        )
+
+    def _user_shows(self, favorites_only: bool = False) -> list[ColumnElement[bool]]:
+        # the conditions for the user's shows, or just their favorites (Postgres
+        # simplifies "favorite = true" to "favorite", the favorite shows' partial
+        # index's condition, so sees that the index can be used)
+        conditions = [DbShow.user_id == self.user_id]
+        if favorites_only:
+            conditions.append(DbShow.favorite == true())
+        return conditions
+
+    def _show_update(self, show_id: UUID) -> Update:
+        """An UPDATE of just the given show of the user's"""
+
+        return (
+            update(DbShow)
+            .where(DbShow.user_id == self.user_id, DbShow.id == show_id)
+            # set explicitly: only changes made through the ORM update it automatically
+            .values(updated_at=datetime.datetime.now(datetime.UTC))
         )
-        return updated_db_show.to_show_model()
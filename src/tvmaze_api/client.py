@@ -1,10 +1,13 @@
 import asyncio
-from typing import Final
+from dataclasses import dataclass
+from typing import Any, ClassVar, Final, Self
 
 import httpx
 import pydantic
 
+from caching.single_flight import SingleFlight
 from tvmaze_api.models import TVmazeEpisodeList, TVmazeSearchResultList, TVmazeShow
+from tvmaze_api.rate_limiter import RequestPriority, TokenBucketRateLimiter
 
 
 class ConnectionError(Exception):
@@ -39,53 +42,148 @@ class _TVmazeURL:
         return (f"/shows/{tvmaze_id}/episodes", {"specials": "1"})
 
 
+# Identifies a GET request: relative URL, sorted query params and sorted headers
+type _RequestKey = tuple[str, tuple[tuple[str, str], ...], tuple[tuple[str, str], ...]]
+
+
+@dataclass(frozen=True)
+class ResponseValidators:
+    """Validators sent with a TVmaze response, which a later request for the same
+    resource can send back to get the resource only if it has changed since"""
+
+    etag: str | None = None
+    last_modified: str | None = None
+
+    @classmethod
+    def from_response(cls, rsp: httpx.Response, fallback: Self) -> Self:
+        """Validators from `rsp`, or those in `fallback` where `rsp` has none (a
+        304 Not Modified response need not repeat them all)"""
+        return cls(
+            etag=rsp.headers.get("ETag", fallback.etag),
+            last_modified=rsp.headers.get("Last-Modified", fallback.last_modified),
+        )
+
+    def to_request_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass(frozen=True)
+class ConditionalResponse[M]:
+    """Result of a conditional request"""
+
+    model: M | None  # None if the resource hasn't changed (304 Not Modified)
+    validators: ResponseValidators  # for the next conditional request
+
+
+def create_http_client(
+    *,
+    max_connections: int,
+    max_keepalive_connections: int,
+    keepalive_expiry: float,
+    http2: bool,
+    timeout: float,
+) -> httpx.AsyncClient:
+    """Creates an HTTP client suitable for sharing among `TVmazeAPIClient`s for the
+    lifetime of the app. The caller owns the client and must close it (`aclose()`, or
+    use it as an async context manager).
+
+    Args:
+        max_connections: maximum number of concurrent connections to TVmaze
+        max_keepalive_connections: maximum number of idle connections kept open
+        keepalive_expiry: seconds an idle connection is kept open
+        http2: multiplex requests over HTTP/2 (requires the h2 package, from the
+            project's http2 extra)
+        timeout: request timeout in seconds
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        http2=http2,
+        timeout=timeout,
+    )
+
+
 class TVmazeAPIClient:
     BASE_URL: Final[str] = "https://api.tvmaze.com"
 
-    # In the unlikely event that we exceed request limits on TVmaze, they have a
-    # fairly harsh retry policy, currently something like 20 calls per 10 seconds.
-    # So we're going with a fairly large backoff interval to maximize our chance of
-    # eventually succeeding.
+    # TVmaze allows something like 20 calls per 10 seconds. We throttle ourselves
+    # proactively to stay under that: a bucket of 5 refilling at 1.5/second lets
+    # through at most 5 + 15 = 20 calls in any 10 seconds. The limiter is shared by
+    # all instances in the process; see `configure_rate_limit`.
+    DEFAULT_RATE_LIMIT_PER_SECOND = 1.5
+    DEFAULT_RATE_LIMIT_BURST = 5
+    rate_limiter: ClassVar[TokenBucketRateLimiter] = TokenBucketRateLimiter(
+        rate=DEFAULT_RATE_LIMIT_PER_SECOND, burst=DEFAULT_RATE_LIMIT_BURST
+    )
+
+    # In the unlikely event that we exceed request limits on TVmaze anyway, they
+    # have a fairly harsh retry policy. So we're going with a fairly large backoff
+    # interval to maximize our chance of eventually succeeding.
     RETRY_LIMIT = 4  # including the first try
     RETRY_BACKOFF_FACTOR = 3
 
-    async def _get(self, relative_url: str, params: dict[str, str] | None) -> str:
+    def __init__(self, http_client: httpx.AsyncClient | None = None):
+        """
+        Args:
+            http_client: client to make requests with, ordinarily the app-lifetime
+                client from `create_http_client`, so that connections are pooled and
+                kept alive. If omitted, a new client (and connection) is opened for
+                each request.
+        """
+        self.http_client = http_client
+        self._in_flight: SingleFlight[_RequestKey, Any] = SingleFlight()
+
+    @classmethod
+    def configure_rate_limit(cls, rate: float, burst: int) -> None:
+        """Replaces the process-wide rate limiter shared by all instances.
+
+        Args:
+            rate: sustained requests per second
+            burst: number of requests that may be made at once after a quiet period
+        """
+        cls.rate_limiter = TokenBucketRateLimiter(rate=rate, burst=burst)
+
+    async def _get(
+        self,
+        relative_url: str,
+        params: dict[str, str] | None,
+        priority: RequestPriority = RequestPriority.NORMAL,
+        headers: dict[str, str] | None = None,
+    ) -> httpx.Response:
         """Make a GET request to TVmaze.
 
-        If rate-limited by server, retries some number of times with exponential
-        backoff before giving up.
+        Waits for the shared rate limiter before each attempt. If rate-limited by
+        server nonetheless, retries some number of times with exponential backoff
+        before giving up.
 
         Args:
             relative_url: URL to fetch, relative to `BASE_URL`
             params: query params
+            priority: precedence over other requests waiting on the rate limiter
+            headers: additional request headers
 
         Returns:
-            str: the unparsed response from the server
+            httpx.Response: the response from the server, which is successful or
+                (only for conditional requests) 304 Not Modified
         """
         try:
-            async with httpx.AsyncClient() as client:
-                # couldn't get httpx-retries to work, had to roll my own retry logic
-                try_count = 1
-                while True:
-                    try:
-                        rsp = await client.get(
-                            self.BASE_URL + relative_url, params=params
-                        )
-                        rsp.raise_for_status()
-
-                    except httpx.HTTPStatusError as e:  # check for rate-limiting
-                        if e.response.status_code == httpx.codes.TOO_MANY_REQUESTS:
-                            if try_count >= self.RETRY_LIMIT:
-                                raise  # ran out of retries
-
-                            delay = self.RETRY_BACKOFF_FACTOR * (2 ** (try_count - 1))
-                            await asyncio.sleep(delay)
-                            try_count += 1
-                            continue
-
-                        raise  # something went wrong but it wasn't rate-limiting
-
-                    break  # no error: end the retry loop
+            if self.http_client is not None:
+                rsp = await self._get_with_retries(
+                    self.http_client, relative_url, params, priority, headers
+                )
+            else:
+                async with httpx.AsyncClient() as client:
+                    rsp = await self._get_with_retries(
+                        client, relative_url, params, priority, headers
+                    )
 
         except httpx.HTTPError as e:
             if isinstance(e, httpx.HTTPStatusError):
@@ -93,47 +191,151 @@ class TVmazeAPIClient:
                     raise RateLimitedError from e
             raise ConnectionError from e
 
-        return rsp.text
+        return rsp
+
+    async def _get_with_retries(
+        self,
+        client: httpx.AsyncClient,
+        relative_url: str,
+        params: dict[str, str] | None,
+        priority: RequestPriority,
+        headers: dict[str, str] | None,
+    ) -> httpx.Response:
+        # couldn't get httpx-retries to work, had to roll my own retry logic
+        try_count = 1
+        while True:
+            await self.rate_limiter.acquire(priority)
+            try:
+                rsp = await client.get(
+                    self.BASE_URL + relative_url, params=params, headers=headers
+                )
+                if rsp.status_code == httpx.codes.NOT_MODIFIED:
+                    return rsp  # not an error (raise_for_status treats it as one)
+                rsp.raise_for_status()
+
+            except httpx.HTTPStatusError as e:  # check for rate-limiting
+                if e.response.status_code == httpx.codes.TOO_MANY_REQUESTS:
+                    if try_count >= self.RETRY_LIMIT:
+                        raise  # ran out of retries
+
+                    delay = self.RETRY_BACKOFF_FACTOR * (2 ** (try_count - 1))
+                    await asyncio.sleep(delay)
+                    try_count += 1
+                    continue
+
+                raise  # something went wrong but it wasn't rate-limiting
+
+            return rsp  # no error: end the retry loop
 
     async def test_query(self) -> None:
         """Makes a test query to TVmaze, for testing purposes only. The content
         of the request doesn't matter."""
         await self._get(*_TVmazeURL.test())
 
-    async def search_shows(self, query: str) -> TVmazeSearchResultList:
+    async def search_shows(
+        self, query: str, priority: RequestPriority = RequestPriority.INTERACTIVE
+    ) -> TVmazeSearchResultList:
         """Searches TVmaze for the given query string.
 
         Returns:
             List of `TVmazeSearchResult`s encapsulating the search results
         """
-        try:
-            rsp_text = await self._get(*_TVmazeURL.search(query))
-            return TVmazeSearchResultList.model_validate_json(rsp_text)
-        except pydantic.ValidationError as e:
-            raise InvalidResponseError from e
+        return await self._get_model(
+            _TVmazeURL.search(query), TVmazeSearchResultList, priority
+        )
 
-    async def get_show(self, tvmaze_id: int) -> TVmazeShow:
+    async def get_show(
+        self, tvmaze_id: int, priority: RequestPriority = RequestPriority.NORMAL
+    ) -> TVmazeShow:
         """Fetches metadata for the given show from TVmaze.
 
         Returns:
             `TVMazeShow` instance.
         """
-        try:
-            rsp_text = await self._get(*_TVmazeURL.get_show(tvmaze_id=tvmaze_id))
-            return TVmazeShow.model_validate_json(rsp_text)
-        except pydantic.ValidationError as e:
-            raise InvalidResponseError from e
+        return await self._get_model(
+            _TVmazeURL.get_show(tvmaze_id=tvmaze_id), TVmazeShow, priority
+        )
 
-    async def get_show_episodes(self, tvmaze_id: int) -> TVmazeEpisodeList:
+    async def get_show_episodes(
+        self, tvmaze_id: int, priority: RequestPriority = RequestPriority.NORMAL
+    ) -> TVmazeEpisodeList:
         """Fetches metadata for all episodes of the given show from TVmaze.
 
         Returns:
             `TVmazeEpisodeList` instance.
         """
-        try:
-            rsp_text = await self._get(
-                *_TVmazeURL.get_show_episodes(tvmaze_id=tvmaze_id)
-            )
-            return TVmazeEpisodeList.model_validate_json(rsp_text)
-        except pydantic.ValidationError as e:
-            raise InvalidResponseError from e
+        return await self._get_model(
+            _TVmazeURL.get_show_episodes(tvmaze_id=tvmaze_id),
+            TVmazeEpisodeList,
+            priority,
+        )
+
+    async def get_show_episodes_if_modified(
+        self,
+        tvmaze_id: int,
+        validators: ResponseValidators,
+        priority: RequestPriority = RequestPriority.NORMAL,
+    ) -> ConditionalResponse[TVmazeEpisodeList]:
+        """Fetches metadata for all episodes of the given show from TVmaze, unless it
+        hasn't changed since it was fetched with the given validators. When it
+        hasn't, the response has no body to parse.
+
+        Returns:
+            `ConditionalResponse` with a `TVmazeEpisodeList`, or with None if
+            unchanged.
+        """
+        return await self._get_model_if_modified(
+            _TVmazeURL.get_show_episodes(tvmaze_id=tvmaze_id),
+            TVmazeEpisodeList,
+            validators,
+            priority,
+        )
+
+    async def _get_model[M: pydantic.BaseModel](
+        self,
+        url: _TVmazeURL.TVmazeURLType,
+        model_type: type[M],
+        priority: RequestPriority,
+    ) -> M:
+        """Fetches a URL and parses the response into `model_type`.
+
+        Concurrent requests for the same URL share a single request to TVmaze and a
+        single parsed result, so callers must not mutate the returned model.
+        """
+        rsp = await self._get_model_if_modified(
+            url, model_type, ResponseValidators(), priority
+        )
+        if rsp.model is None:
+            raise InvalidResponseError("Not Modified response to unconditional request")
+        return rsp.model
+
+    async def _get_model_if_modified[M: pydantic.BaseModel](
+        self,
+        url: _TVmazeURL.TVmazeURLType,
+        model_type: type[M],
+        validators: ResponseValidators,
+        priority: RequestPriority,
+    ) -> ConditionalResponse[M]:
+        """Like `_get_model`, but makes a conditional request with `validators`."""
+
+        relative_url, params = url
+        headers = validators.to_request_headers()
+
+        async def get_and_parse() -> ConditionalResponse[M]:
+            rsp = await self._get(relative_url, params, priority, headers)
+            new_validators = ResponseValidators.from_response(rsp, fallback=validators)
+            if rsp.status_code == httpx.codes.NOT_MODIFIED:
+                return ConditionalResponse(model=None, validators=new_validators)
+            try:
+                model = model_type.model_validate_json(rsp.text)
+            except pydantic.ValidationError as e:
+                raise InvalidResponseError from e
+            return ConditionalResponse(model=model, validators=new_validators)
+
+        key = (
+            relative_url,
+            tuple(sorted(params.items())),
+            tuple(sorted(headers.items())),
+        )
+        result: ConditionalResponse[M] = await self._in_flight.do(key, get_and_parse)
+        return result
@@ -0,0 +1,147 @@
+"""
+Client-side rate limiting for outbound TVmaze requests.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from enum import IntEnum
+
+
+class RequestPriority(IntEnum):
+    """Priority of a request waiting on the rate limiter; lower values are served
+    first. Requests of equal priority are served in arrival order."""
+
+    INTERACTIVE = 0  # a user is waiting on the result, e.g. search
+    NORMAL = 1
+    BACKGROUND = 2  # bulk refreshes and other work nobody is waiting on
+
+
+@dataclass(frozen=True)
+class RateLimiterStats:
+    """Snapshot of a rate limiter's metrics."""
+
+    queue_depth: int  # requests currently waiting for a token
+    acquired_count: int  # tokens handed out so far
+    waited_count: int  # of those, how many had to wait at all
+    total_wait: float  # seconds spent waiting, summed over all requests
+    max_wait: float  # longest single wait, in seconds
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.acquired_count if self.acquired_count else 0.0
+
+
+class TokenBucketRateLimiter:
+    """Async token bucket: allows bursts of up to `burst` requests, refilling at
+    `rate` tokens per second.
+
+    Requests that find the bucket empty queue up and are granted tokens by priority,
+    then first-come-first-served, as tokens become available. Over any period of
+    `t` seconds at most `burst + rate * t` requests are let through.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        """
+        Args:
+            rate: tokens added per second
+            burst: bucket capacity; the bucket starts full
+            clock: monotonic time source in seconds (replaceable for testing)
+            sleep: async sleep function (replaceable for testing)
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+
+        self._tokens = float(burst)
+        self._last_refill = clock()
+        self._sequence = itertools.count()  # FIFO tiebreaker within a priority
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._dispatcher: asyncio.Task[None] | None = None
+
+        self._acquired_count = 0
+        self._waited_count = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def acquire(self, priority: RequestPriority = RequestPriority.NORMAL) -> None:
+        """Waits until a request may be made, consuming a token."""
+
+        start = self._clock()
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            self._record_wait(0.0)
+            return
+
+        granted = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), granted))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        try:
+            await granted
+        except asyncio.CancelledError:
+            if granted.done() and not granted.cancelled():
+                # token was granted just as we were cancelled: give it back
+                self._tokens = min(self._tokens + 1, self.burst)
+            else:
+                granted.cancel()  # dispatcher will skip it
+            raise
+
+        self._record_wait(self._clock() - start)
+
+    def stats(self) -> RateLimiterStats:
+        return RateLimiterStats(
+            queue_depth=sum(1 for _, _, fut in self._waiters if not fut.done()),
+            acquired_count=self._acquired_count,
+            waited_count=self._waited_count,
+            total_wait=self._total_wait,
+            max_wait=self._max_wait,
+        )
+
+    async def _dispatch(self) -> None:
+        """Hands out tokens to queued requests as they become available; runs as a
+        task while the queue is nonempty."""
+
+        while True:
+            # discard requests that were cancelled while waiting
+            while self._waiters and self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+            if not self._waiters:
+                return
+
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                _, _, granted = heapq.heappop(self._waiters)
+                granted.set_result(None)
+            else:
+                await self._sleep((1 - self._tokens) / self.rate)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(self._tokens + elapsed * self.rate, self.burst)
+
+    def _record_wait(self, wait: float) -> None:
+        self._acquired_count += 1
+        if wait > 0:
+            self._waited_count += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
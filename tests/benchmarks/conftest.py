@@ -0,0 +1,43 @@
+import asyncio
+from collections.abc import AsyncIterator, Iterator
+
+import pytest
+import pytest_asyncio
+from advanced_alchemy.base import UUIDAuditBase
+from sqlalchemy import NullPool
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from testcontainers.postgres import PostgresContainer
+
+import db.models  # noqa: F401 (registers the app's tables)
+import litestar_users_setup.models  # noqa: F401
+
+TESTCONTAINER_POSTGRES_VERSION = 18
+
+
+async def _create_schema(container: PostgresContainer) -> None:
+    engine = create_async_engine(container.get_connection_url(), poolclass=NullPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(UUIDAuditBase.metadata.create_all)
+    await engine.dispose()
+
+
+@pytest.fixture(scope="package")
+def bench_db_container() -> Iterator[PostgresContainer]:
+    """Creates a testcontainer running Postgres with the app's tables (but no data),
+    for benchmarks that need a database, and yields its PostgresContainer object
+    """
+
+    with PostgresContainer(
+        f"postgres:{TESTCONTAINER_POSTGRES_VERSION}", driver="asyncpg"
+    ) as postgres:
+        asyncio.run(_create_schema(postgres))
+        yield postgres
+
+
+@pytest_asyncio.fixture
+async def bench_db_engine(
+    bench_db_container: PostgresContainer,
+) -> AsyncIterator[AsyncEngine]:
+    engine = create_async_engine(bench_db_container.get_connection_url())
+    yield engine
+    await engine.dispose()
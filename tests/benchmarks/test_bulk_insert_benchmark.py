@@ -0,0 +1,76 @@
+"""Benchmark of adding 10,000 shows, in batches as imports add them: through the ORM
+with `ShowService.add_many_shows` (as imports used to), compared with the bulk copy of
+`ShowService.load_shows`. Each adds its own shows, new to the catalog too.
+
+Needs docker, for the database. Not run by default: use `pytest -m benchmark -s` (or
+`mise run bench`) to see the results.
+"""
+
+import time
+from collections.abc import Awaitable, Callable
+from uuid import UUID
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from litestar_users_setup.models import User
+from models.show import ShowCreate
+from scripts.generate_import_file import generate_show
+from services.show_service import ShowService
+
+SHOW_COUNT = 10_000
+BATCH_SIZE = 500
+
+
+async def _orm(svc: ShowService, batch: list[ShowCreate]) -> None:
+    await svc.add_many_shows(batch, auto_commit=False)
+
+
+async def _copy(svc: ShowService, batch: list[ShowCreate]) -> None:
+    await svc.load_shows(batch)
+
+
+PATHS: dict[str, Callable[[ShowService, list[ShowCreate]], Awaitable[None]]] = {
+    "orm": _orm,
+    "copy": _copy,
+}
+
+
+async def _add_user(engine: AsyncEngine, name: str) -> UUID:
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        user = User(
+            email=f"bulk-{name}@example.com",
+            password_hash="not used",
+            is_active=True,
+            is_verified=True,
+        )
+        session.add(user)
+        await session.commit()
+        return user.id
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_bulk_insert(bench_db_engine: AsyncEngine) -> None:
+    print(f"\n{SHOW_COUNT} shows, {BATCH_SIZE} at a time")
+
+    rates: dict[str, float] = {}
+    for path_idx, (name, path) in enumerate(PATHS.items()):
+        user_id = await _add_user(bench_db_engine, name)
+        first = (path_idx + 1) * SHOW_COUNT
+        shows = [
+            ShowCreate.model_validate(generate_show(tvmaze_id))
+            for tvmaze_id in range(first, first + SHOW_COUNT)
+        ]
+        async with AsyncSession(bench_db_engine, expire_on_commit=False) as session:
+            svc = ShowService(session, user_id)
+            start = time.perf_counter()
+            for batch_start in range(0, SHOW_COUNT, BATCH_SIZE):
+                await path(svc, shows[batch_start : batch_start + BATCH_SIZE])
+            await session.commit()
+            elapsed = time.perf_counter() - start
+            assert len(await svc.get_shows()) == SHOW_COUNT
+        rates[name] = SHOW_COUNT / elapsed
+        print(f"{name:<6} {elapsed:6.2f}s  {rates[name]:8.0f} shows/s")
+
+    assert rates["copy"] > rates["orm"]
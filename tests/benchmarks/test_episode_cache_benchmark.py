@@ -0,0 +1,126 @@
+"""Benchmark of episode cache memory use and TVmaze fetches for a synthetic population
+of users, many of whom track the same popular shows.
+
+Not run by default: use `pytest -m benchmark -s` (or `mise run bench`) to see the
+results.
+"""
+
+import random
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass
+from uuid import UUID, uuid4
+
+import pytest
+from cachetools import TTLCache
+from helpers.episode_cache_contract import make_entry
+
+from caching.episode_cache import CachedEpisodes, InMemoryEpisodeCache
+
+USERS = 1000
+SHOWS_PER_USER = 20
+CATALOG_SIZE = 300  # distinct TVmaze shows, with Zipf-like popularity
+VIEWS_PER_SHOW = 2  # times each user opens each of their shows' episode lists
+
+
+@dataclass(frozen=True)
+class _UserShow:
+    id: UUID  # the user's own show record
+    tvmaze_id: int
+
+
+def _population(rng: random.Random) -> list[list[_UserShow]]:
+    ranks = list(range(1, CATALOG_SIZE + 1))
+    weights = [1 / rank for rank in ranks]
+    users = []
+    for _ in range(USERS):
+        tvmaze_ids: set[int] = set()
+        while len(tvmaze_ids) < SHOWS_PER_USER:
+            tvmaze_ids.add(rng.choices(ranks, weights)[0])
+        users.append([_UserShow(id=uuid4(), tvmaze_id=t) for t in tvmaze_ids])
+    return users
+
+
+def _season_lengths(tvmaze_id: int) -> list[int]:
+    rng = random.Random(tvmaze_id)
+    return [rng.randint(6, 24) for _ in range(rng.randint(1, 6))]
+
+
+class _LegacyCache:
+    """The cache as it was: a TTLCache bounded by number of shows"""
+
+    def __init__(self, maxsize: int):
+        self.entries: TTLCache[str, CachedEpisodes] = TTLCache(
+            maxsize=maxsize, ttl=86400
+        )
+
+    async def get(self, key: str) -> CachedEpisodes | None:
+        return self.entries.get(key)
+
+    async def set(self, key: str, entry: CachedEpisodes) -> None:
+        self.entries[key] = entry
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+async def _run(
+    label: str,
+    cache: InMemoryEpisodeCache | _LegacyCache,
+    key: Callable[[_UserShow], str],
+    lookups: list[_UserShow],
+) -> int:
+    """Replays the lookups against the cache, fetching (building fresh episode lists,
+    as parsing a TVmaze response would) on misses; prints and returns the number of
+    fetches."""
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    fetches = 0
+    for show in lookups:
+        if await cache.get(key(show)) is None:
+            fetches += 1
+            await cache.set(key(show), make_entry(_season_lengths(show.tvmaze_id)))
+
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    print(
+        f"{label:<42} fetches={fetches:<6} hit ratio={1 - fetches / len(lookups):6.1%}"
+        f"  shows cached={len(cache):<6} memory={retained / 2**20:7.1f}MiB"
+    )
+    return fetches
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_episode_cache_memory_and_fetches() -> None:
+    rng = random.Random(42)
+    lookups = [show for shows in _population(rng) for show in shows] * VIEWS_PER_SHOW
+    rng.shuffle(lookups)
+    print(
+        f"\n{USERS} users tracking {SHOWS_PER_USER} shows each, out of {CATALOG_SIZE}; "
+        f"{len(lookups)} lookups"
+    )
+
+    legacy = await _run(
+        "per-user show id, 500 shows (before)",
+        _LegacyCache(maxsize=500),
+        lambda show: str(show.id),
+        lookups,
+    )
+    await _run(
+        "per-user show id, 100k episodes",
+        InMemoryEpisodeCache(max_episodes=100_000),
+        lambda show: str(show.id),
+        lookups,
+    )
+    shared = await _run(
+        "tvmaze_id, 100k episodes (after)",
+        InMemoryEpisodeCache(max_episodes=100_000),
+        lambda show: str(show.tvmaze_id),
+        lookups,
+    )
+
+    assert shared <= CATALOG_SIZE < legacy
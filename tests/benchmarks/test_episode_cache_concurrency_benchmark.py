@@ -0,0 +1,159 @@
+"""Benchmark of concurrent episode list requests for different shows, with and
+without a global lock around episode cache access.
+
+Not run by default: use `pytest -m benchmark -s` (or `mise run bench`) to see the
+results.
+"""
+
+import asyncio
+import time
+from pathlib import Path
+from typing import Any, cast
+from uuid import uuid4
+
+import pytest
+from helpers.episode_cache_contract import make_entry
+from helpers.utils.bench_utils import format_latencies
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from caching.episode_cache import (
+    CachedEpisodes,
+    EpisodeCacheBackend,
+    SQLiteEpisodeCache,
+)
+from models.show import EpisodeDetails, Show
+from services.show_service import ShowService
+from tvmaze_api.client import ConditionalResponse, ResponseValidators, TVmazeAPIClient
+from tvmaze_api.rate_limiter import RequestPriority
+
+REQUESTS = 500
+CONCURRENCY_LEVELS = [1, 10, 100]
+TVMAZE_LATENCY = 0.02  # seconds
+
+
+class _GloballyLockedCache(EpisodeCacheBackend):
+    """Reproduces the old arrangement: one lock held around every cache read and
+    write, whatever the show"""
+
+    def __init__(self, inner: EpisodeCacheBackend):
+        super().__init__()
+        self.inner = inner
+        self.lock = asyncio.Lock()
+
+    async def _get(self, key: str) -> CachedEpisodes | None:
+        async with self.lock:
+            return await self.inner.get(key)
+
+    async def set(self, key: str, entry: CachedEpisodes) -> None:
+        async with self.lock:
+            await self.inner.set(key, entry)
+
+    async def touch(self, key: str) -> None:
+        async with self.lock:
+            await self.inner.touch(key)
+
+    async def delete(self, key: str) -> None:
+        async with self.lock:
+            await self.inner.delete(key)
+
+    async def clear(self) -> None:
+        async with self.lock:
+            await self.inner.clear()
+
+
+class _StubTVmazeEpisodes:
+    """Answers episode requests after a fixed delay, like a remote API"""
+
+    async def get_show_episodes_if_modified(
+        self,
+        tvmaze_id: int,
+        validators: ResponseValidators,
+        priority: RequestPriority = RequestPriority.NORMAL,
+    ) -> ConditionalResponse["_StubTVmazeEpisodes"]:
+        await asyncio.sleep(TVMAZE_LATENCY)
+        return ConditionalResponse(model=self, validators=ResponseValidators())
+
+    def to_episode_details_models(self) -> list[list[EpisodeDetails]]:
+        return make_entry([10, 10]).episodes
+
+
+class _EpisodesOnlyShowService(ShowService):
+    """Leaves the catalog alone: there's no database here"""
+
+    async def _sync_catalog_episodes(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+
+def _show(tvmaze_id: int) -> Show:
+    return Show(
+        id=uuid4(),
+        tvmaze_id=tvmaze_id,
+        title=f"Show {tvmaze_id}",
+        favorite=False,
+        source="Somewhere",
+        duration=30,
+        image_sm_url=None,
+        image_lg_url=None,
+        imdb_id=None,
+        thetvdb_id=None,
+        seasons=[],
+        user_channel=None,
+        user_notes=None,
+    )
+
+
+async def _run(label: str, cache: EpisodeCacheBackend, concurrency: int) -> None:
+    """Requests the episodes of REQUESTS different shows, `concurrency` at a time,
+    and prints throughput and latencies."""
+
+    svc = _EpisodesOnlyShowService(
+        db_session=cast(AsyncSession, None),  # not used for episodes
+        user_id=uuid4(),
+        tvmaze_client=cast(TVmazeAPIClient, _StubTVmazeEpisodes()),
+        episodes_cache=cache,
+    )
+    shows = asyncio.Queue[Show]()
+    for tvmaze_id in range(REQUESTS):
+        shows.put_nowait(_show(tvmaze_id))
+    latencies: list[float] = []
+
+    async def worker() -> None:
+        while not shows.empty():
+            show = shows.get_nowait()
+            start = time.perf_counter()
+            await svc.get_episodes(show)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    print(
+        format_latencies(f"{label}, {concurrency} concurrent", latencies)
+        + f"  {REQUESTS / elapsed:8.0f} req/s"
+    )
+
+
+async def _warm(cache: EpisodeCacheBackend) -> None:
+    for tvmaze_id in range(REQUESTS):
+        await cache.set(str(tvmaze_id), make_entry([10, 10]))
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_concurrent_episode_requests(tmp_path: Path) -> None:
+    print(f"\nSQLite cache; TVmaze latency {TVMAZE_LATENCY * 1000:.0f}ms")
+    for concurrency in CONCURRENCY_LEVELS:
+        for label, locked in [("global lock", True), ("lock-free", False)]:
+            path = str(tmp_path / f"{label}-{concurrency}.sqlite3")
+
+            cold: EpisodeCacheBackend = SQLiteEpisodeCache(path)
+            if locked:
+                cold = _GloballyLockedCache(cold)
+            await _run(f"{label}, misses", cold, concurrency)
+
+            warm: EpisodeCacheBackend = SQLiteEpisodeCache(path + "-warm")
+            await _warm(warm)
+            if locked:
+                warm = _GloballyLockedCache(warm)
+            await _run(f"{label}, hits", warm, concurrency)
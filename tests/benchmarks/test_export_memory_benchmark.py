@@ -0,0 +1,112 @@
+"""Benchmark of the memory used to export a library of 10,000 shows: the whole
+document built by `ExportService.export`, compared with the stream of it from
+`ExportService.export_stream` (what /data/export sends), which is consumed fragment by
+fragment as a response would be.
+
+Needs docker, for the database. Not run by default: use `pytest -m benchmark -s` (or
+`mise run bench`) to see the results.
+"""
+
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from uuid import UUID
+
+import pytest
+from pydantic import HttpUrl
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from litestar_users_setup.models import User
+from models.show import EpisodeDescriptor, ShowCreate
+from services.export_service import ExportService
+from services.show_service import ShowService
+
+SHOW_COUNT = 10_000
+SEASON_LENGTHS = [12] * 5
+# shows added per call, to keep each INSERT's parameters within asyncpg's limit
+ADD_BATCH_SIZE = 500
+
+
+async def _whole(svc: ExportService) -> int:
+    return len(await svc.export())
+
+
+async def _streamed(svc: ExportService) -> int:
+    return sum([len(fragment) async for fragment in svc.export_stream()])
+
+
+PATHS: dict[str, Callable[[ExportService], Awaitable[int]]] = {
+    "whole": _whole,
+    "streamed": _streamed,
+}
+
+
+def _show(tvmaze_id: int) -> ShowCreate:
+    return ShowCreate(
+        tvmaze_id=tvmaze_id,
+        title=f"Show {tvmaze_id}",
+        favorite=tvmaze_id % 2 == 0,
+        source="Somewhere",
+        duration=30,
+        image_sm_url=HttpUrl(f"https://images.example.com/{tvmaze_id}/sm.jpg"),
+        image_lg_url=HttpUrl(f"https://images.example.com/{tvmaze_id}/lg.jpg"),
+        imdb_id=None,
+        thetvdb_id=None,
+        seasons=[
+            [
+                EpisodeDescriptor(
+                    title=f"Episode {ep_num}",
+                    ep_num=ep_num,
+                    watched=season_idx < tvmaze_id % len(SEASON_LENGTHS),
+                )
+                for ep_num in range(1, length + 1)
+            ]
+            for season_idx, length in enumerate(SEASON_LENGTHS)
+        ],
+        user_channel=None,
+        user_notes="Notes",
+    )
+
+
+async def _add_user_with_shows(engine: AsyncEngine) -> UUID:
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        user = User(
+            email="export@example.com",
+            password_hash="not used",
+            is_active=True,
+            is_verified=True,
+        )
+        session.add(user)
+        await session.commit()
+        svc = ShowService(db_session=session, user_id=user.id)
+        for start in range(0, SHOW_COUNT, ADD_BATCH_SIZE):
+            await svc.add_many_shows(
+                [_show(tvmaze_id) for tvmaze_id in range(start, start + ADD_BATCH_SIZE)]
+            )
+        return user.id
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_export_memory(bench_db_engine: AsyncEngine) -> None:
+    user_id = await _add_user_with_shows(bench_db_engine)
+    print(f"\n{SHOW_COUNT} shows; {len(SEASON_LENGTHS)} seasons per show")
+
+    peaks: dict[str, int] = {}
+    lengths: dict[str, int] = {}
+    for name, path in PATHS.items():
+        async with AsyncSession(bench_db_engine, expire_on_commit=False) as session:
+            svc = ExportService(show_service=ShowService(session, user_id))
+            tracemalloc.start()
+            start = time.perf_counter()
+            lengths[name] = await path(svc)
+            elapsed = time.perf_counter() - start
+            peaks[name] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        print(
+            f"{f'export ({name})':<20} {lengths[name] / 2**20:8.1f} MiB exported  "
+            f"peak {peaks[name] / 2**20:8.1f} MiB  {elapsed:6.2f}s"
+        )
+
+    assert lengths["streamed"] == lengths["whole"]
+    assert peaks["streamed"] < peaks["whole"] / 4
@@ -0,0 +1,99 @@
+"""Benchmark of the memory used to import a file of 10,000 shows, written by
+`scripts.generate_import_file`: validating the whole file and inserting all of its
+shows, as /data/import used to, compared with `ImportService.import_stream` (what
+/data/import does now), reading the file in chunks as an upload would be read.
+
+Peak memory is measured with tracemalloc rather than the process's peak RSS, which
+only ever goes up, so couldn't tell the two imports apart in one process.
+
+Needs docker, for the database. Not run by default: use `pytest -m benchmark -s` (or
+`mise run bench`) to see the results.
+"""
+
+import time
+import tracemalloc
+from collections.abc import AsyncIterator, Awaitable, Callable
+from pathlib import Path
+from uuid import UUID
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from litestar_users_setup.models import User
+from scripts.generate_import_file import write_import_file
+from services.import_service import ImportMode, ImportService
+from services.show_service import ShowService
+
+SHOW_COUNT = 10_000
+CHUNK_BYTES = 64 * 1024
+# shows added per call, to keep each INSERT's parameters within asyncpg's limit
+ADD_BATCH_SIZE = 500
+
+
+async def _whole(svc: ImportService, path: Path) -> int:
+    import_data = svc.validate_import_data(path.read_text())
+    show_service = svc.show_service
+    await show_service.delete_all_shows(auto_commit=False)
+    for start in range(0, len(import_data.shows), ADD_BATCH_SIZE):
+        batch = import_data.shows[start : start + ADD_BATCH_SIZE]
+        await show_service.add_many_shows(batch, auto_commit=False)
+    await show_service.db_session.commit()
+    return len(import_data.shows)
+
+
+async def _chunks(path: Path) -> AsyncIterator[bytes]:
+    with path.open("rb") as f:
+        while chunk := f.read(CHUNK_BYTES):
+            yield chunk
+
+
+async def _streamed(svc: ImportService, path: Path) -> int:
+    # replacing the shows, as the whole-file import does
+    counts = await svc.import_stream(_chunks(path), mode=ImportMode.REPLACE)
+    return counts.imported
+
+
+PATHS: dict[str, Callable[[ImportService, Path], Awaitable[int]]] = {
+    "whole": _whole,
+    "streamed": _streamed,
+}
+
+
+async def _add_user(engine: AsyncEngine) -> UUID:
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        user = User(
+            email="import@example.com",
+            password_hash="not used",
+            is_active=True,
+            is_verified=True,
+        )
+        session.add(user)
+        await session.commit()
+        return user.id
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_import_memory(bench_db_engine: AsyncEngine, tmp_path: Path) -> None:
+    user_id = await _add_user(bench_db_engine)
+    path = tmp_path / "import.json"
+    size = write_import_file(path, SHOW_COUNT)
+    print(f"\n{SHOW_COUNT} shows; {size / 2**20:.1f} MiB file")
+
+    peaks: dict[str, int] = {}
+    for name, import_path in PATHS.items():
+        async with AsyncSession(bench_db_engine, expire_on_commit=False) as session:
+            svc = ImportService(show_service=ShowService(session, user_id))
+            tracemalloc.start()
+            start = time.perf_counter()
+            imported = await import_path(svc, path)
+            elapsed = time.perf_counter() - start
+            peaks[name] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        print(
+            f"{f'import ({name})':<20} {imported:8} shows  "
+            f"peak {peaks[name] / 2**20:8.1f} MiB  {elapsed:6.2f}s"
+        )
+        assert imported == SHOW_COUNT
+
+    assert peaks["streamed"] < peaks["whole"] / 4
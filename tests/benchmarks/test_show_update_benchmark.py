@@ -0,0 +1,168 @@
+"""Benchmark of single-show updates (favorite, user fields, watched episodes) for
+users with libraries of different sizes, comparing loading every one of the user's
+shows to change one with updating just that show.
+
+Needs docker, for the database. Not run by default: use `pytest -m benchmark -s` (or
+`mise run bench`) to see the results.
+"""
+
+import random
+import time
+from collections.abc import Awaitable, Callable
+from uuid import UUID
+
+import pytest
+from helpers.utils.bench_utils import format_latencies
+from pydantic import HttpUrl
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from db.models import DbShow, DbTVmazeShow
+from db.repositories import DbShowRepository
+from litestar_users_setup.models import User
+from models.show import EpisodeDescriptor, Show, ShowCreate
+from services.show_service import ShowService
+
+LIBRARY_SIZES = [10, 100, 1000]
+SEASON_LENGTHS = [12] * 5
+UPDATES = 100
+
+type Update = Callable[[ShowService, UUID], Awaitable[object]]
+
+
+def _show(tvmaze_id: int) -> ShowCreate:
+    return ShowCreate(
+        tvmaze_id=tvmaze_id,
+        title=f"Show {tvmaze_id}",
+        favorite=False,
+        source="Somewhere",
+        duration=30,
+        image_sm_url=HttpUrl(f"https://images.example.com/{tvmaze_id}/sm.jpg"),
+        image_lg_url=HttpUrl(f"https://images.example.com/{tvmaze_id}/lg.jpg"),
+        imdb_id=None,
+        thetvdb_id=None,
+        seasons=[
+            [
+                EpisodeDescriptor(
+                    title=f"Episode {ep_num}", ep_num=ep_num, watched=False
+                )
+                for ep_num in range(1, length + 1)
+            ]
+            for length in SEASON_LENGTHS
+        ],
+        user_channel=None,
+        user_notes=None,
+    )
+
+
+async def _add_user_with_shows(engine: AsyncEngine, show_count: int) -> UUID:
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        user = User(
+            email=f"user{show_count}@example.com",
+            password_hash="not used",
+            is_active=True,
+            is_verified=True,
+        )
+        session.add(user)
+        await session.commit()
+        svc = ShowService(db_session=session, user_id=user.id)
+        await svc.add_many_shows([_show(tvmaze_id) for tvmaze_id in range(show_count)])
+        return user.id
+
+
+async def _legacy_update(
+    svc: ShowService, show_id: UUID, change: Callable[[Show], None]
+) -> None:
+    """Updates a show as the service used to: by loading all the user's shows,
+    changing one and writing it back in full"""
+
+    show = (await svc.get_shows())[show_id]
+    change(show)
+    # the show's existing catalog entry (a new one couldn't be merged)
+    catalog = await svc.db_session.get(DbTVmazeShow, show.tvmaze_id)
+    await DbShowRepository(session=svc.db_session).update(
+        DbShow.from_show_model(show, owner_id=svc.user_id, catalog=catalog),
+        auto_commit=True,
+    )
+
+
+def _toggle_favorite(show: Show) -> None:
+    show.favorite = not show.favorite
+
+
+def _set_user_fields(show: Show) -> None:
+    show.user_channel = "Channel"
+    show.user_notes = "Notes"
+
+
+def _toggle_first_episode(show: Show) -> None:
+    show.seasons[0][0].watched = not show.seasons[0][0].watched
+
+
+UPDATES_BEFORE: dict[str, Update] = {
+    "toggle favorite": lambda svc, id: _legacy_update(svc, id, _toggle_favorite),
+    "update user fields": lambda svc, id: _legacy_update(svc, id, _set_user_fields),
+    "toggle episode": lambda svc, id: _legacy_update(svc, id, _toggle_first_episode),
+}
+UPDATES_AFTER: dict[str, Update] = {
+    "toggle favorite": lambda svc, id: svc.toggle_favorite(id),
+    "update user fields": lambda svc, id: svc.update_user_fields(
+        id, user_channel="Channel", user_notes="Notes"
+    ),
+    "toggle episode": lambda svc, id: svc.toggle_episodes(id, [(0, 0)]),
+}
+
+
+async def _run(
+    label: str,
+    engine: AsyncEngine,
+    user_id: UUID,
+    show_ids: list[UUID],
+    update: Update,
+) -> float:
+    """Applies the update to UPDATES randomly chosen shows, each in its own session
+    (as each request gets its own), and prints and returns the median latency."""
+
+    rng = random.Random(42)
+    latencies: list[float] = []
+    for _ in range(UPDATES):
+        show_id = rng.choice(show_ids)
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            svc = ShowService(db_session=session, user_id=user_id)
+            start = time.perf_counter()
+            await update(svc, show_id)
+            latencies.append(time.perf_counter() - start)
+
+    print(format_latencies(label, latencies))
+    return sorted(latencies)[len(latencies) // 2]
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_show_update_latency_by_library_size(
+    bench_db_engine: AsyncEngine,
+) -> None:
+    print(f"\n{UPDATES} updates per operation; {len(SEASON_LENGTHS)} seasons per show")
+    medians: dict[tuple[str, int, str], float] = {}
+    for show_count in LIBRARY_SIZES:
+        user_id = await _add_user_with_shows(bench_db_engine, show_count)
+        async with AsyncSession(bench_db_engine) as session:
+            show_ids = list(await ShowService(session, user_id).get_shows())
+
+        for operation in UPDATES_AFTER:
+            for version, updates in [
+                ("before", UPDATES_BEFORE),
+                ("after", UPDATES_AFTER),
+            ]:
+                medians[operation, show_count, version] = await _run(
+                    f"{operation}, {show_count} shows ({version})",
+                    bench_db_engine,
+                    user_id,
+                    show_ids,
+                    updates[operation],
+                )
+
+    largest = LIBRARY_SIZES[-1]
+    for operation in UPDATES_AFTER:
+        assert (
+            medians[operation, largest, "after"] < medians[operation, largest, "before"]
+        )
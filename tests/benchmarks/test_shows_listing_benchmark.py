@@ -0,0 +1,124 @@
+"""Benchmark of building the /shows response body for users with libraries of
+different sizes, database query included: from `Show` models encoded by Litestar,
+and from the rows encoded with msgspec (what /shows does).
+
+Needs docker, for the database. Not run by default: use `pytest -m benchmark -s` (or
+`mise run bench`) to see the results.
+"""
+
+import json
+import time
+from collections.abc import Awaitable, Callable
+from uuid import UUID
+
+import pytest
+from helpers.utils.bench_utils import format_latencies
+from litestar.plugins.pydantic import PydanticInitPlugin
+from litestar.serialization import encode_json, get_serializer
+from pydantic import HttpUrl
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from litestar_users_setup.models import User
+from models.show import EpisodeDescriptor, ShowCreate
+from services.show_service import ShowService
+
+LIBRARY_SIZES = [10, 100, 1000]
+SEASON_LENGTHS = [12] * 5
+REPEATS = 50
+
+_litestar_serializer = get_serializer(PydanticInitPlugin.encoders())
+
+
+async def _from_models(svc: ShowService) -> bytes:
+    return encode_json(await svc.get_shows(), serializer=_litestar_serializer)
+
+
+PATHS: dict[str, Callable[[ShowService], Awaitable[bytes]]] = {
+    "models": _from_models,
+    "rows": lambda svc: svc.get_shows_json(),
+}
+
+
+def _show(tvmaze_id: int) -> ShowCreate:
+    return ShowCreate(
+        tvmaze_id=tvmaze_id,
+        title=f"Show {tvmaze_id}",
+        favorite=tvmaze_id % 2 == 0,
+        source="Somewhere",
+        duration=30,
+        image_sm_url=HttpUrl(f"https://images.example.com/{tvmaze_id}/sm.jpg"),
+        image_lg_url=HttpUrl(f"https://images.example.com/{tvmaze_id}/lg.jpg"),
+        imdb_id=None,
+        thetvdb_id=None,
+        seasons=[
+            [
+                EpisodeDescriptor(
+                    title=f"Episode {ep_num}",
+                    ep_num=ep_num,
+                    watched=season_idx < tvmaze_id % len(SEASON_LENGTHS),
+                )
+                for ep_num in range(1, length + 1)
+            ]
+            for season_idx, length in enumerate(SEASON_LENGTHS)
+        ],
+        user_channel=None,
+        user_notes="Notes",
+    )
+
+
+async def _add_user_with_shows(engine: AsyncEngine, show_count: int) -> UUID:
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        user = User(
+            email=f"listing{show_count}@example.com",
+            password_hash="not used",
+            is_active=True,
+            is_verified=True,
+        )
+        session.add(user)
+        await session.commit()
+        svc = ShowService(db_session=session, user_id=user.id)
+        await svc.add_many_shows([_show(tvmaze_id) for tvmaze_id in range(show_count)])
+        return user.id
+
+
+async def _run(
+    label: str,
+    engine: AsyncEngine,
+    user_id: UUID,
+    path: Callable[[ShowService], Awaitable[bytes]],
+) -> None:
+    """Builds the body REPEATS times, each in its own session (as each request gets
+    its own), and prints the latencies"""
+
+    latencies: list[float] = []
+    for _ in range(REPEATS):
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            svc = ShowService(db_session=session, user_id=user_id)
+            start = time.perf_counter()
+            await path(svc)
+            latencies.append(time.perf_counter() - start)
+
+    print(format_latencies(label, latencies))
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_shows_listing_by_library_size(bench_db_engine: AsyncEngine) -> None:
+    print(f"\n{REPEATS} runs per path; {len(SEASON_LENGTHS)} seasons per show")
+    for show_count in LIBRARY_SIZES:
+        user_id = await _add_user_with_shows(bench_db_engine, show_count)
+
+        bodies = {}
+        async with AsyncSession(bench_db_engine) as session:
+            svc = ShowService(db_session=session, user_id=user_id)
+            for name, path in PATHS.items():
+                bodies[name] = json.loads(await path(svc))
+        assert bodies["rows"] == bodies["models"]
+
+        for name, path in PATHS.items():
+            await _run(
+                f"/shows body, {show_count} shows ({name})",
+                bench_db_engine,
+                user_id,
+                path,
+            )
@@ -0,0 +1,121 @@
+"""Microbenchmark of turning a user's shows, as fetched from the database, into the
+/shows response body: building ORM objects and `Show` models and having Litestar
+encode them, compared with encoding the rows directly (`db.show_json`).
+
+The database isn't involved: both paths start from the same rows, as the driver
+returns them.
+
+Not run by default: use `pytest -m benchmark -s` (or `mise run bench`) to see the
+results.
+"""
+
+import json
+import time
+from collections.abc import Callable
+from uuid import UUID, uuid4
+
+import pytest
+from helpers.utils.bench_utils import format_latencies
+from litestar.plugins.pydantic import PydanticInitPlugin
+from litestar.serialization import encode_json, get_serializer
+
+from db.bitmaps import pack_bits
+from db.models import DbShow, DbTVmazeShow
+from db.show_json import ShowRow, encode_shows
+from models.show import Show
+
+LIBRARY_SIZES = [10, 100, 1000]
+SEASON_LENGTHS = [12] * 5
+# total shows encoded per path and library size, so each gets comparable run time
+SHOWS_ENCODED = 20_000
+
+_litestar_serializer = get_serializer(PydanticInitPlugin.encoders())
+
+
+def _rows(show_count: int) -> list[ShowRow]:
+    return [
+        (
+            uuid4(),
+            tvmaze_id,
+            f"Show {tvmaze_id}",
+            tvmaze_id % 2 == 0,
+            "Somewhere",
+            30,
+            f"https://images.example.com/{tvmaze_id}/sm.jpg",
+            f"https://images.example.com/{tvmaze_id}/lg.jpg",
+            f"tt{tvmaze_id}",
+            tvmaze_id,
+            json.dumps(
+                [
+                    [
+                        {"title": f"Episode {ep_num}", "ep_num": ep_num}
+                        for ep_num in range(1, length + 1)
+                    ]
+                    for length in SEASON_LENGTHS
+                ]
+            ),
+            [
+                pack_bits([season_idx < tvmaze_id % 5] * length)
+                for season_idx, length in enumerate(SEASON_LENGTHS)
+            ],
+            None,
+            "Notes",
+        )
+        for tvmaze_id in range(show_count)
+    ]
+
+
+def _legacy_encode(rows: list[ShowRow]) -> bytes:
+    """The previous path: the driver decodes the JSON, the ORM builds objects from
+    the rows, they're converted to `Show` models and Litestar encodes those"""
+
+    shows: dict[UUID, Show] = {}
+    for row in rows:
+        db_show = DbShow(
+            id=row[0],
+            tvmaze_id=row[1],
+            favorite=row[3],
+            watched=row[11],
+            user_channel=row[12],
+            user_notes=row[13],
+            catalog=DbTVmazeShow(
+                tvmaze_id=row[1],
+                title=row[2],
+                source=row[4],
+                duration=row[5],
+                image_sm_url=row[6],
+                image_lg_url=row[7],
+                imdb_id=row[8],
+                thetvdb_id=row[9],
+                seasons=json.loads(row[10]),
+            ),
+        )
+        shows[db_show.id] = db_show.to_show_model()
+    return encode_json(shows, serializer=_litestar_serializer)
+
+
+def _run(
+    label: str, encode: Callable[[list[ShowRow]], bytes], rows: list[ShowRow]
+) -> float:
+    latencies: list[float] = []
+    for _ in range(max(SHOWS_ENCODED // len(rows), 5)):
+        start = time.perf_counter()
+        encode(rows)
+        latencies.append(time.perf_counter() - start)
+
+    print(format_latencies(label, latencies))
+    return sorted(latencies)[len(latencies) // 2]
+
+
+@pytest.mark.benchmark
+def test_shows_serialization_by_library_size() -> None:
+    print(f"\n{len(SEASON_LENGTHS)} seasons of {SEASON_LENGTHS[0]} episodes per show")
+    for show_count in LIBRARY_SIZES:
+        rows = _rows(show_count)
+        assert encode_shows(rows) == _legacy_encode(rows)
+
+        before = _run(f"/shows body, {show_count} shows (before)", _legacy_encode, rows)
+        after = _run(f"/shows body, {show_count} shows (after)", encode_shows, rows)
+        print(f"{'':<45} speedup x{before / after:.1f}")
+
+        assert after < before
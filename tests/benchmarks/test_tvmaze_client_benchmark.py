@@ -0,0 +1,100 @@
+"""Benchmarks for TVmaze client connection handling.
+
+Not run by default: use `pytest -m benchmark -s` (or `mise run bench`) to see the
+results.
+"""
+
+import asyncio
+import time
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager, nullcontext
+
+import httpx
+import pytest
+from helpers.sample_file_reader import SampleFileReader
+from helpers.utils.bench_utils import format_latencies
+from helpers.utils.stub_http_server import StubHTTPServer
+
+from tvmaze_api.client import TVmazeAPIClient, create_http_client
+from tvmaze_api.rate_limiter import TokenBucketRateLimiter
+
+"""Source directory for test files read by SampleFileReader"""
+TEST_DATA_DIR = "mock_responses/tvmaze/basic_responses"
+
+SEQUENTIAL_CALLS = 1000
+CONCURRENT_CALLS = 100
+CONCURRENT_ROUNDS = 10
+
+
+async def _timed_search(client: TVmazeAPIClient, n: int) -> float:
+    # a query of its own: identical searches in flight at once would be made once
+    start = time.perf_counter()
+    await client.search_shows(f"battlestar {n}")
+    return time.perf_counter() - start
+
+
+async def _run_scenarios(
+    server: StubHTTPServer,
+    label: str,
+    make_http_client: Callable[
+        [], AbstractAsyncContextManager[httpx.AsyncClient | None]
+    ],
+) -> int:
+    """Runs the sequential and concurrent scenarios, printing latencies; returns the
+    number of connections the server saw."""
+
+    connections_before = server.connection_count
+    async with make_http_client() as http_client:
+        client = TVmazeAPIClient(http_client=http_client)
+
+        sequential = [await _timed_search(client, n) for n in range(SEQUENTIAL_CALLS)]
+        print(format_latencies(f"{label}, sequential", sequential))
+
+        concurrent: list[float] = []
+        for _ in range(CONCURRENT_ROUNDS):
+            concurrent += await asyncio.gather(
+                *(_timed_search(client, n) for n in range(CONCURRENT_CALLS))
+            )
+        print(format_latencies(f"{label}, {CONCURRENT_CALLS} concurrent", concurrent))
+
+    connections = server.connection_count - connections_before
+    print(f"{label}: {connections} connections opened")
+    return connections
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_search_latency_per_request_vs_shared_client(
+    reader: SampleFileReader, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    body = reader.read("multiple_results.json")
+
+    async with StubHTTPServer(body) as server:
+        monkeypatch.setattr(TVmazeAPIClient, "BASE_URL", server.base_url)
+        # measure connection handling, not throttling
+        monkeypatch.setattr(
+            TVmazeAPIClient,
+            "rate_limiter",
+            TokenBucketRateLimiter(rate=1e9, burst=CONCURRENT_CALLS),
+        )
+        print()
+
+        unpooled_connections = await _run_scenarios(
+            server, "client per request", lambda: nullcontext(None)
+        )
+        pooled_connections = await _run_scenarios(
+            server,
+            "shared pooled client",
+            lambda: create_http_client(
+                max_connections=20,
+                max_keepalive_connections=20,
+                keepalive_expiry=30.0,
+                http2=False,
+                timeout=10.0,
+            ),
+        )
+
+    assert unpooled_connections == SEQUENTIAL_CALLS + (
+        CONCURRENT_CALLS * CONCURRENT_ROUNDS
+    )
+    assert pooled_connections <= 20
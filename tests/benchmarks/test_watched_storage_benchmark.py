@@ -0,0 +1,267 @@
+"""Benchmark of storing watched status as per-season bitmaps, compared with the old
+layout where each episode's entry in the seasons JSON had a "watched" flag: row size,
+loading a user's shows (as /shows does) and toggling an episode.
+
+The old layout is reproduced in a `legacy_show` table, filled with the same shows. (The
+shows' details have since moved to the shared catalog table, `tvmaze_show`; its rows'
+size is shown too.)
+
+Needs docker, for the database. Not run by default: use `pytest -m benchmark -s` (or
+`mise run bench`) to see the results.
+"""
+
+import random
+import time
+from collections.abc import Awaitable, Callable
+from uuid import UUID
+
+import pytest
+from helpers.utils.bench_utils import format_latencies
+from pydantic import HttpUrl
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from litestar_users_setup.models import User
+from models.show import EpisodeDescriptor, Show, ShowCreate
+from services.show_service import ShowService
+
+SHOWS = 100
+SEASON_LENGTHS = [22] * 8  # a long-running show
+REPEATS = 200
+
+LEGACY_COLUMNS = (
+    "id, user_id, tvmaze_id, title, favorite, source, duration, image_sm_url, "
+    "image_lg_url, imdb_id, thetvdb_id, seasons, user_channel, user_notes, "
+    "sa_orm_sentinel, created_at, updated_at"
+)
+
+CREATE_LEGACY_TABLE = [
+    "DROP TABLE IF EXISTS legacy_show",
+    # each user's show with its own copy of the details (now in the catalog)
+    """
+    CREATE TABLE legacy_show AS
+    SELECT s.id, s.user_id, s.tvmaze_id, c.title, s.favorite, c.source, c.duration,
+        c.image_sm_url, c.image_lg_url, c.imdb_id, c.thetvdb_id, c.seasons, s.watched,
+        s.user_channel, s.user_notes, s.sa_orm_sentinel, s.created_at, s.updated_at
+    FROM show s JOIN tvmaze_show c ON c.tvmaze_id = s.tvmaze_id
+    """,
+    "ALTER TABLE legacy_show ADD PRIMARY KEY (id)",
+    "CREATE INDEX ON legacy_show (user_id)",
+    # merge each episode's watched bit back into its JSON entry
+    """
+    UPDATE legacy_show l SET seasons = (
+        SELECT coalesce(jsonb_agg(
+            (
+                SELECT coalesce(jsonb_agg(
+                    ep || jsonb_build_object(
+                        'watched', get_bit(l.watched[season_num], ep_num::int - 1) = 1
+                    )
+                    ORDER BY ep_num
+                ), '[]')
+                FROM jsonb_array_elements(season) WITH ORDINALITY AS e(ep, ep_num)
+            )
+            ORDER BY season_num
+        ), '[]')
+        FROM jsonb_array_elements(l.seasons) WITH ORDINALITY AS x(season, season_num)
+    )
+    """,
+    "ALTER TABLE legacy_show DROP COLUMN watched",
+    "VACUUM FULL ANALYZE legacy_show",
+    "VACUUM ANALYZE show",
+    "VACUUM ANALYZE tvmaze_show",
+]
+
+# built once, as the service's statement for toggling an episode is (see
+# `services.show_service._toggle_statement`), so that both sides time running it
+LEGACY_TOGGLE = text(
+    """
+    UPDATE legacy_show
+    SET seasons = jsonb_set(
+            seasons, :path, to_jsonb(NOT (seasons #>> :path)::boolean)
+        ),
+        updated_at = now()
+    WHERE user_id = :user_id AND id = :id AND seasons #> :path IS NOT NULL
+    RETURNING (seasons #>> :path)::boolean
+    """
+)
+
+
+def _show(tvmaze_id: int, rng: random.Random) -> ShowCreate:
+    watched_seasons = rng.randint(0, len(SEASON_LENGTHS))
+    return ShowCreate(
+        tvmaze_id=tvmaze_id,
+        title=f"Show {tvmaze_id}",
+        favorite=False,
+        source="Somewhere",
+        duration=30,
+        image_sm_url=HttpUrl(f"https://images.example.com/{tvmaze_id}/sm.jpg"),
+        image_lg_url=HttpUrl(f"https://images.example.com/{tvmaze_id}/lg.jpg"),
+        imdb_id=None,
+        thetvdb_id=None,
+        seasons=[
+            [
+                EpisodeDescriptor(
+                    title=f"The One Where Episode {ep_num} Happens",
+                    ep_num=ep_num,
+                    watched=season_idx < watched_seasons,
+                )
+                for ep_num in range(1, length + 1)
+            ]
+            for season_idx, length in enumerate(SEASON_LENGTHS)
+        ],
+        user_channel=None,
+        user_notes=None,
+    )
+
+
+async def _setup(engine: AsyncEngine) -> UUID:
+    rng = random.Random(42)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        user = User(
+            email="watched-storage@example.com",
+            password_hash="not used",
+            is_active=True,
+            is_verified=True,
+        )
+        session.add(user)
+        await session.commit()
+        await ShowService(session, user.id).add_many_shows(
+            [_show(tvmaze_id, rng) for tvmaze_id in range(SHOWS)]
+        )
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for stmt in CREATE_LEGACY_TABLE:
+            await conn.execute(text(stmt))
+    return user.id
+
+
+async def _legacy_get_shows(session: AsyncSession, user_id: UUID) -> dict[UUID, Show]:
+    """Loads the user's shows from the old layout, as the service used to"""
+
+    rows = await session.execute(
+        text(f"SELECT {LEGACY_COLUMNS} FROM legacy_show WHERE user_id = :user_id"),
+        {"user_id": user_id},
+    )
+    return {
+        row.id: Show(
+            id=row.id,
+            tvmaze_id=row.tvmaze_id,
+            title=row.title,
+            favorite=row.favorite,
+            source=row.source,
+            duration=row.duration,
+            image_sm_url=HttpUrl(row.image_sm_url),
+            image_lg_url=HttpUrl(row.image_lg_url),
+            imdb_id=row.imdb_id,
+            thetvdb_id=row.thetvdb_id,
+            seasons=[
+                [
+                    EpisodeDescriptor(
+                        title=ep["title"], ep_num=ep["ep_num"], watched=ep["watched"]
+                    )
+                    for ep in season
+                ]
+                for season in row.seasons
+            ],
+            user_channel=row.user_channel,
+            user_notes=row.user_notes,
+        )
+        for row in rows
+    }
+
+
+async def _legacy_toggle(session: AsyncSession, user_id: UUID, show_id: UUID) -> None:
+    await session.execute(
+        LEGACY_TOGGLE,
+        {"path": ["0", "0", "watched"], "user_id": user_id, "id": show_id},
+    )
+    await session.commit()
+
+
+async def _time(
+    label: str, engine: AsyncEngine, op: Callable[[AsyncSession], Awaitable[object]]
+) -> float:
+    """Runs `op` REPEATS times, each in its own session (as each request gets its
+    own), and prints and returns the median latency, with the WAL written per run."""
+
+    async with engine.connect() as conn:
+        wal_before = await conn.scalar(text("SELECT pg_current_wal_lsn()"))
+
+    latencies: list[float] = []
+    for _ in range(REPEATS):
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            start = time.perf_counter()
+            await op(session)
+            latencies.append(time.perf_counter() - start)
+
+    async with engine.connect() as conn:
+        wal_bytes = await conn.scalar(
+            text("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), :before)"),
+            {"before": wal_before},
+        )
+
+    print(
+        format_latencies(label, latencies)
+        + f"  WAL/run={float(wal_bytes) / REPEATS:8.0f}B"
+    )
+    return sorted(latencies)[len(latencies) // 2]
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_watched_storage(bench_db_engine: AsyncEngine) -> None:
+    user_id = await _setup(bench_db_engine)
+    async with AsyncSession(bench_db_engine) as session:
+        show_ids = list(await ShowService(session, user_id).get_shows())
+    print(
+        f"\n{SHOWS} shows of {sum(SEASON_LENGTHS)} episodes; "
+        f"{REPEATS} runs per operation"
+    )
+
+    sizes = {}
+    async with bench_db_engine.connect() as conn:
+        for table, version in [("legacy_show", "before"), ("show", "after")]:
+            sizes[version] = await conn.scalar(
+                text(
+                    f"SELECT avg(pg_column_size(t.*)) FROM {table} t "
+                    "WHERE user_id = :user_id"
+                ),
+                {"user_id": user_id},
+            )
+            label = f"row size ({version})"
+            print(f"{label:<45} avg={float(sizes[version]):8.0f}B")
+        # shared by all the users who have saved the show
+        catalog_size = await conn.scalar(
+            text(
+                "SELECT avg(pg_column_size(c.*)) FROM tvmaze_show c "
+                "JOIN show s ON s.tvmaze_id = c.tvmaze_id WHERE s.user_id = :user_id"
+            ),
+            {"user_id": user_id},
+        )
+        print(f"{'catalog row size (after)':<45} avg={float(catalog_size):8.0f}B")
+
+    rng = random.Random(42)
+    await _time(
+        "/shows (before)",
+        bench_db_engine,
+        lambda session: _legacy_get_shows(session, user_id),
+    )
+    await _time(
+        "/shows (after)",
+        bench_db_engine,
+        lambda session: ShowService(session, user_id).get_shows(),
+    )
+    await _time(
+        "toggle episode (before)",
+        bench_db_engine,
+        lambda session: _legacy_toggle(session, user_id, rng.choice(show_ids)),
+    )
+    await _time(
+        "toggle episode (after)",
+        bench_db_engine,
+        lambda session: ShowService(session, user_id).toggle_episodes(
+            rng.choice(show_ids), [(0, 0)]
+        ),
+    )
+
+    assert sizes["after"] < sizes["before"]
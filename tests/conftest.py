@@ -2,6 +2,9 @@ import pytest
 from helpers.sample_file_reader import SampleFileReader
 from pathlib import Path
 
+from tvmaze_api.client import TVmazeAPIClient
+from tvmaze_api.rate_limiter import TokenBucketRateLimiter
+
 @pytest.fixture(scope="module")
 def reader(request: pytest.FixtureRequest) -> SampleFileReader:
     """Provides a `SampleFileReader` that reads test data files from a specific directory
@@ -27,3 +30,18 @@ def reader(request: pytest.FixtureRequest) -> SampleFileReader:
     """
     base_dir = Path(__file__).parent / "helpers/testing_data" / request.module.TEST_DATA_DIR  #FIXME handle missing
     return SampleFileReader(base_dir=base_dir)
+
+
+@pytest.fixture(autouse=True)
+def fresh_tvmaze_rate_limiter(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Gives each test its own full TVmaze rate limiter bucket, so that requests made
+    by earlier tests can't slow down (or be counted against) later ones."""
+
+    monkeypatch.setattr(
+        TVmazeAPIClient,
+        "rate_limiter",
+        TokenBucketRateLimiter(
+            rate=TVmazeAPIClient.DEFAULT_RATE_LIMIT_PER_SECOND,
+            burst=TVmazeAPIClient.DEFAULT_RATE_LIMIT_BURST,
+        ),
+    )
@@ -45,8 +45,11 @@ def test_app(test_db_container: PostgresContainer) -> Iterator[Litestar]:
     .env
     """
 
+    # no job workers: tests run jobs themselves, with `JobWorker.run_next`
     with temporarily_modified_environ(
-        APP_ENV="testing", DATABASE_URL=test_db_container.get_connection_url()
+        APP_ENV="testing",
+        DATABASE_URL=test_db_container.get_connection_url(),
+        JOB_WORKERS="0",
     ):
         app = create_app()
         yield app
@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from helpers.sample_file_reader import SampleFileReader
 from helpers.testing_data.types import FakeUser
@@ -15,7 +17,8 @@ def test_export_show_data(test_client: TestClient, login_as_user: FakeUser) -> N
     exported_data = test_client.get("/data/export").text
 
     # validate as if we were importing
-    ImportService.validate_import_data(exported_data)
+    exported = ImportService.validate_import_data(exported_data)
+    assert len(exported.shows) == 2
     # see integration tests for checks on full details of exported data
 
 
@@ -92,4 +95,76 @@ def test_import_show_data_invalid_JSON(
     rsp_json = rsp.json()
     assert rsp_json["error"] == "invalid or malformed JSON"
     assert rsp_json["message"] != ""
-    assert rsp_json["details"] != ""
\ No newline at end of file
+    assert rsp_json["details"] != ""
+
+
+@pytest.mark.parametrize("login_as_user", ["test_user2"], indirect=True)
+def test_import_show_data_merges_shows(
+    test_client: TestClient,
+    login_as_user: FakeUser,
+    reader: SampleFileReader,
+    csrf_token_header: dict[str, str],
+) -> None:
+    shows_before = test_client.get("/shows", params={"favorites": False}).json()
+    ids_before = {show["tvmaze_id"]: id for id, show in shows_before.items()}
+    data = json.loads(test_client.get("/data/export").text)
+    kept = data["shows"][0]  # and the other show is left out
+    kept["favorite"] = not kept["favorite"]
+    added = json.loads(reader.read("import_v0.0.1.json"))["shows"][0]
+    data["shows"] = [kept, added]
+
+    rsp = test_client.post(
+        "/data/import",
+        files={"file": json.dumps(data).encode("utf-8")},
+        headers=csrf_token_header,
+    )
+    rsp.raise_for_status()
+    assert rsp.json() == {
+        "imported_count": 2,
+        "inserted_count": 1,
+        "updated_count": 1,
+        "unchanged_count": 0,
+        "deleted_count": 1,
+    }
+
+    shows_after = test_client.get("/shows", params={"favorites": False}).json()
+    assert {show["tvmaze_id"] for show in shows_after.values()} == {
+        kept["tvmaze_id"],
+        added["tvmaze_id"],
+    }
+    # the kept show is changed in place
+    kept_id = ids_before[kept["tvmaze_id"]]
+    assert shows_after[kept_id]["favorite"] == kept["favorite"]
+
+    # importing the same again changes nothing
+    rsp = test_client.post(
+        "/data/import",
+        files={"file": json.dumps(data).encode("utf-8")},
+        headers=csrf_token_header,
+    )
+    assert rsp.json()["unchanged_count"] == 2
+    assert test_client.get("/shows", params={"favorites": False}).json() == shows_after
+
+
+@pytest.mark.parametrize("login_as_user", ["test_user2"], indirect=True)
+def test_import_show_data_replaces_shows(
+    test_client: TestClient, login_as_user: FakeUser, csrf_token_header: dict[str, str]
+) -> None:
+    shows_before = test_client.get("/shows", params={"favorites": False}).json()
+    exported = test_client.get("/data/export").text
+
+    rsp = test_client.post(
+        "/data/import?mode=replace",
+        files={"file": exported.encode("utf-8")},
+        headers=csrf_token_header,
+    )
+    rsp.raise_for_status()
+    assert rsp.json()["inserted_count"] == 2
+    assert rsp.json()["deleted_count"] == 2
+
+    # the same shows, but new rows
+    shows_after = test_client.get("/shows", params={"favorites": False}).json()
+    assert shows_after.keys().isdisjoint(shows_before.keys())
+    assert sorted(show["tvmaze_id"] for show in shows_after.values()) == sorted(
+        show["tvmaze_id"] for show in shows_before.values()
+    )
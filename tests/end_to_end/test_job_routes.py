@@ -0,0 +1,112 @@
+from uuid import uuid4
+
+import pytest
+from helpers.sample_file_reader import SampleFileReader
+from helpers.testing_data.types import FakeUser
+from litestar.status_codes import (
+    HTTP_202_ACCEPTED,
+    HTTP_404_NOT_FOUND,
+    HTTP_409_CONFLICT,
+)
+from litestar.testing import TestClient
+
+from services.import_service import ImportService
+
+"""Source directory for test files read by SampleFileReader"""
+TEST_DATA_DIR = "import_data_files"
+
+
+def run_jobs(test_client: TestClient) -> None:
+    """Runs the jobs waiting, as the app's workers would (the tests' app has none)"""
+
+    while test_client.blocking_portal.call(test_client.app.state.job_worker.run_next):
+        pass
+
+
+@pytest.mark.parametrize("login_as_user", ["test_user1"], indirect=True)
+def test_import_job(
+    test_client: TestClient,
+    login_as_user: FakeUser,
+    reader: SampleFileReader,
+    csrf_token_header: dict[str, str],
+) -> None:
+    import_file = reader.read("import_v0.0.1.json")
+    rsp = test_client.post(
+        "/jobs/import?mode=replace",
+        files={"file": import_file.encode("utf-8")},
+        headers=csrf_token_header,
+    )
+    assert rsp.status_code == HTTP_202_ACCEPTED
+    job = rsp.json()
+    assert job["kind"] == "import"
+    assert job["status"] == "queued"
+    assert job["result"] is None
+
+    run_jobs(test_client)
+
+    rsp = test_client.get(f"/jobs/{job['id']}")
+    rsp.raise_for_status()
+    job = rsp.json()
+    assert job["status"] == "succeeded"
+    assert job["result"]["imported_count"] == 2
+    assert job["result"]["inserted_count"] == 2
+    shows = test_client.get("/shows?favorites=False").json()
+    assert len(shows) == 2
+
+
+@pytest.mark.parametrize("login_as_user", ["test_user1"], indirect=True)
+def test_import_job_malformed_JSON(
+    test_client: TestClient, login_as_user: FakeUser, csrf_token_header: dict[str, str]
+) -> None:
+    rsp = test_client.post(
+        "/jobs/import",
+        files={"file": b'{malformed: "data"}'},
+        headers=csrf_token_header,
+    )
+    job_id = rsp.json()["id"]
+
+    run_jobs(test_client)
+
+    job = test_client.get(f"/jobs/{job_id}").json()
+    assert job["status"] == "failed"
+    assert job["result"]["error"] == "invalid or malformed JSON"
+
+
+@pytest.mark.parametrize("login_as_user", ["test_user2"], indirect=True)
+def test_export_job(
+    test_client: TestClient, login_as_user: FakeUser, csrf_token_header: dict[str, str]
+) -> None:
+    rsp = test_client.post("/jobs/export", headers=csrf_token_header)
+    assert rsp.status_code == HTTP_202_ACCEPTED
+    job_id = rsp.json()["id"]
+
+    run_jobs(test_client)
+
+    job = test_client.get(f"/jobs/{job_id}").json()
+    assert job["status"] == "succeeded"
+    assert job["has_output"]
+    rsp = test_client.get(f"/jobs/{job_id}/output")
+    rsp.raise_for_status()
+    assert "attachment" in rsp.headers["Content-Disposition"]
+    # as /data/export would have responded
+    assert rsp.text == test_client.get("/data/export").text
+    exported = ImportService.validate_import_data(rsp.text)
+    assert len(exported.shows) == 2
+
+
+# (a test of its own: an error response rolls back the test's transaction, job and all)
+@pytest.mark.parametrize("login_as_user", ["test_user2"], indirect=True)
+def test_export_job_output_not_until_run(
+    test_client: TestClient, login_as_user: FakeUser, csrf_token_header: dict[str, str]
+) -> None:
+    job_id = test_client.post("/jobs/export", headers=csrf_token_header).json()["id"]
+
+    rsp = test_client.get(f"/jobs/{job_id}/output")
+    assert rsp.status_code == HTTP_409_CONFLICT
+
+
+@pytest.mark.parametrize("login_as_user", ["test_user1"], indirect=True)
+def test_job_not_found(test_client: TestClient, login_as_user: FakeUser) -> None:
+    assert test_client.get(f"/jobs/{uuid4()}").status_code == HTTP_404_NOT_FOUND
+    rsp = test_client.get(f"/jobs/{uuid4()}/output")
+    assert rsp.status_code == HTTP_404_NOT_FOUND
@@ -1,10 +1,15 @@
+from uuid import uuid4
+
 import pytest
 import respx
 from helpers.sample_file_reader import SampleFileReader
 from helpers.testing_data.types import FakeUser
 from litestar.testing import TestClient
+from pytest_mock import MockerFixture
 
+from db.models import DbShow
 from models.prefs import UserPrefs
+from services.show_service import ShowService
 
 """Source directory for test files read by SampleFileReader"""
 TEST_DATA_DIR = "mock_responses/tvmaze/show_request_responses"
@@ -21,7 +26,7 @@ def test_user1_sees_own_shows(test_client: TestClient, login_as_user: FakeUser)
 
 @pytest.mark.parametrize("login_as_user", ["test_user2"], indirect=True)
 def test_user2_sees_own_shows(test_client: TestClient, login_as_user: FakeUser) -> None:
-    rsp = test_client.get("/shows")
+    rsp = test_client.get("/shows", params={"favorites": False})
     rsp.raise_for_status()
     rsp_contents = rsp.json()
     assert len(rsp_contents) == 2
@@ -30,6 +35,163 @@ def test_user2_sees_own_shows(test_client: TestClient, login_as_user: FakeUser)
     assert "Severance" in titles
 
 
+@pytest.mark.parametrize("login_as_user", ["test_user2"], indirect=True)
+def test_shows_favorites_only_by_prefs(
+    test_client: TestClient, login_as_user: FakeUser, csrf_token_header: dict[str, str]
+) -> None:
+    # user 2 has show-favorites-only turned on
+    rsp = test_client.get("/shows")
+    rsp.raise_for_status()
+    assert [show["title"] for show in rsp.json().values()] == ["Severance"]
+
+    test_client.put(
+        "/user-prefs", json={"show_favorites_only": False}, headers=csrf_token_header
+    ).raise_for_status()
+    assert len(test_client.get("/shows").json()) == 2
+
+    favorites_rsp = test_client.get(
+        "/shows", params={"favorites": True, "fields": "title"}
+    )
+    assert favorites_rsp.json() == {id: {"title": "Severance"} for id in rsp.json()}
+
+
+@pytest.mark.parametrize("login_as_user", ["test_user2"], indirect=True)
+def test_shows_in_pages_of_summaries(
+    test_client: TestClient, login_as_user: FakeUser
+) -> None:
+    params = {"favorites": False, "limit": 1, "summary": True}
+    all_shows = test_client.get("/shows", params={"favorites": False}).json()
+
+    rsp = test_client.get("/shows", params=params)
+    rsp.raise_for_status()
+    cursor = rsp.headers["X-Next-Cursor"]
+    next_rsp = test_client.get("/shows", params={**params, "cursor": cursor})
+    next_rsp.raise_for_status()
+
+    assert "X-Next-Cursor" not in next_rsp.headers
+    pages = rsp.json() | next_rsp.json()
+    assert pages.keys() == all_shows.keys()
+    for id, show in pages.items():
+        assert "seasons" not in show
+        assert show["season_counts"] == [
+            {"watched": sum(ep["watched"] for ep in season), "total": len(season)}
+            for season in all_shows[id]["seasons"]
+        ]
+
+
+@pytest.mark.parametrize("login_as_user", ["test_user2"], indirect=True)
+def test_shows_with_fields(test_client: TestClient, login_as_user: FakeUser) -> None:
+    rsp = test_client.get(
+        "/shows", params={"favorites": False, "fields": "title,favorite"}
+    )
+    rsp.raise_for_status()
+
+    assert len(rsp.json()) == 2
+    assert all(list(show) == ["title", "favorite"] for show in rsp.json().values())
+
+    bad_rsp = test_client.get("/shows", params={"fields": "title,password"})
+    assert bad_rsp.status_code == 400
+
+
+@pytest.mark.parametrize("login_as_user", ["test_user1"], indirect=True)
+def test_shows_not_modified(
+    test_client: TestClient,
+    login_as_user: FakeUser,
+    csrf_token_header: dict[str, str],
+    mocker: MockerFixture,
+) -> None:
+    rsp = test_client.get("/shows")
+    rsp.raise_for_status()
+    etag = rsp.headers["ETag"]
+    to_show_model = mocker.spy(DbShow, "to_show_model")
+    get_shows_json = mocker.spy(ShowService, "get_shows_json")
+
+    cached_rsp = test_client.get("/shows", headers={"If-None-Match": etag})
+
+    assert cached_rsp.status_code == 304
+    assert cached_rsp.headers["ETag"] == etag
+    assert cached_rsp.content == b""
+    to_show_model.assert_not_called()
+    get_shows_json.assert_not_called()
+
+    # a different listing of the same shows has a different ETag
+    summary_rsp = test_client.get(
+        "/shows", params={"summary": True}, headers={"If-None-Match": etag}
+    )
+    assert summary_rsp.status_code == 200
+    assert summary_rsp.headers["ETag"] != etag
+
+    show_id = next(iter(rsp.json()))
+    test_client.post(
+        "/toggle-favorite", json={"show_id": show_id}, headers=csrf_token_header
+    ).raise_for_status()
+    changed_rsp = test_client.get("/shows", headers={"If-None-Match": etag})
+
+    assert changed_rsp.status_code == 200
+    assert changed_rsp.headers["ETag"] != etag
+    assert not changed_rsp.json()[show_id]["favorite"]
+
+
+@pytest.mark.parametrize("login_as_user", ["test_user1"], indirect=True)
+def test_get_show_not_modified(
+    test_client: TestClient,
+    login_as_user: FakeUser,
+    csrf_token_header: dict[str, str],
+    mocker: MockerFixture,
+) -> None:
+    show_id = next(iter(test_client.get("/shows").json()))
+    rsp = test_client.get(f"/shows/{show_id}")
+    rsp.raise_for_status()
+    etag = rsp.headers["ETag"]
+    to_show_model = mocker.spy(DbShow, "to_show_model")
+
+    cached_rsp = test_client.get(
+        f"/shows/{show_id}", headers={"If-None-Match": f'W/"other", {etag}'}
+    )
+
+    assert cached_rsp.status_code == 304
+    assert cached_rsp.content == b""
+    to_show_model.assert_not_called()
+
+    test_client.post(
+        "/update-user-fields",
+        json={"show_id": show_id, "user_channel": "New", "user_notes": None},
+        headers=csrf_token_header,
+    ).raise_for_status()
+    changed_rsp = test_client.get(f"/shows/{show_id}", headers={"If-None-Match": etag})
+
+    assert changed_rsp.status_code == 200
+    assert changed_rsp.headers["ETag"] != etag
+    assert changed_rsp.json()["user_channel"] == "New"
+
+
+@pytest.mark.parametrize("login_as_user", ["test_user2"], indirect=True)
+def test_show_changes(
+    test_client: TestClient, login_as_user: FakeUser, csrf_token_header: dict[str, str]
+) -> None:
+    shows = test_client.get("/shows", params={"favorites": False}).json()
+    rsp = test_client.get("/shows/changes")
+    rsp.raise_for_status()
+    assert rsp.json()["changed"] == shows
+    assert rsp.json()["deleted"] == []
+    assert rsp.json()["full"] is True
+
+    since = rsp.json()["cursor"]
+    changed_id, deleted_id = shows
+    test_client.post(
+        "/toggle-favorite", json={"show_id": changed_id}, headers=csrf_token_header
+    ).raise_for_status()
+    test_client.delete(
+        f"/shows/{deleted_id}", headers=csrf_token_header
+    ).raise_for_status()
+
+    changes = test_client.get("/shows/changes", params={"since": since}).json()
+    assert list(changes["changed"]) == [changed_id]
+    assert changes["changed"][changed_id]["favorite"] != shows[changed_id]["favorite"]
+    assert changes["deleted"] == [deleted_id]
+    assert changes["full"] is False
+
+
 @pytest.mark.parametrize("login_as_user", ["test_user1"], indirect=True)
 def test_get_show(test_client: TestClient, login_as_user: FakeUser) -> None:
     rsp = test_client.get("/shows")
@@ -84,6 +246,22 @@ def test_add_show_adds_show_to_db(
     assert len(added["seasons"][1]) == 10
 
 
+@pytest.mark.parametrize("login_as_user", ["test_user1"], indirect=True)
+@respx.mock(assert_all_mocked=True)
+def test_add_show_already_added_conflicts(
+    test_client: TestClient,
+    login_as_user: FakeUser,
+    respx_mock: respx.MockRouter,
+) -> None:
+    shows_before = test_client.get("/shows").json()
+
+    # test_user1 already has "All Creatures Great & Small"
+    rsp = test_client.get("/add-show?tvmaze_id=42836")
+
+    assert rsp.status_code == 409
+    assert test_client.get("/shows").json() == shows_before
+
+
 @pytest.mark.parametrize("login_as_user", ["test_user1"], indirect=True)
 @respx.mock(assert_all_mocked=True)
 def test_get_episodes(
@@ -120,6 +298,33 @@ def test_get_episodes(
     assert episodes_json[0][0]["release_date"] == "2017-12-10"
 
 
+@pytest.mark.parametrize("login_as_user", ["test_user1"], indirect=True)
+@respx.mock(assert_all_mocked=True)
+def test_get_episodes_cached(
+    test_client: TestClient,
+    login_as_user: FakeUser,
+    respx_mock: respx.MockRouter,
+    reader: SampleFileReader,
+) -> None:
+    # this test uses TVmazeClient: mock out TVmaze URLs
+    fake_episodes_json = reader.read("network_show_episodes.json")
+    route = respx_mock.get("https://api.tvmaze.com/shows/42836/episodes").respond(
+        text=fake_episodes_json
+    )
+
+    shows_json = test_client.get("/shows").json()
+    all_creatures = next(
+        filter(lambda show: show["tvmaze_id"] == 42836, shows_json.values())
+    )
+
+    rsp1 = test_client.get(f"/episodes/{all_creatures['id']}")  # caches result
+    rsp2 = test_client.get(f"/episodes/{all_creatures['id']}")
+    rsp2.raise_for_status()
+
+    assert route.call_count == 1  # second call served from cache
+    assert rsp2.json() == rsp1.json()
+
+
 @pytest.mark.parametrize("login_as_user", ["test_user1"], indirect=True)
 @respx.mock(assert_all_mocked=True)
 def test_get_episodes_with_force_refresh(
@@ -173,7 +378,7 @@ def test_toggle_watched_status(
     assert all_creatures_json["seasons"][0][0]["watched"]
     assert not (all_creatures_json["seasons"][1][0]["watched"])
 
-    test_client.post(
+    rsp = test_client.post(
         "/toggle-watched-status",
         json={
             "show_id": all_creatures_id,
@@ -181,6 +386,11 @@ def test_toggle_watched_status(
         },
         headers=csrf_token_header,
     )
+    rsp.raise_for_status()
+    assert rsp.json() == {
+        "show_id": all_creatures_id,
+        "episodes": [[0, 0, False], [1, 0, True]],
+    }
 
     updated_json = test_client.get(f"/shows/{all_creatures_id}").json()
 
@@ -227,7 +437,7 @@ def test_toggle_favorite(
 def test_update_user_fields(
     test_client: TestClient, login_as_user: FakeUser, csrf_token_header: dict[str, str]
 ) -> None:
-    shows_before = test_client.get("/shows").json()
+    shows_before = test_client.get("/shows", params={"favorites": False}).json()
     show_to_edit = next(
         iter(filter(lambda show: show["title"] == "Pluribus", shows_before.values()))
     )
@@ -248,6 +458,54 @@ def test_update_user_fields(
     assert show_after["user_notes"] == "new notes"
 
 
+@pytest.mark.parametrize("login_as_user", ["test_user2"], indirect=True)
+def test_apply_show_operations(
+    test_client: TestClient, login_as_user: FakeUser, csrf_token_header: dict[str, str]
+) -> None:
+    shows_before = test_client.get("/shows", params={"favorites": False}).json()
+    show_id, show = next(iter(shows_before.items()))
+
+    rsp = test_client.post(
+        "/shows/batch",
+        headers=csrf_token_header,
+        json={
+            "operations": [
+                {"op": "toggle_favorite", "show_id": show_id},
+                {"op": "toggle_watched", "show_id": show_id, "episodes": [[0, 0]]},
+                {
+                    "op": "update_user_fields",
+                    "show_id": show_id,
+                    "user_channel": "new channel",
+                    "user_notes": None,
+                },
+                {"op": "toggle_favorite", "show_id": str(uuid4())},
+            ]
+        },
+    )
+
+    rsp.raise_for_status()
+    assert [result["ok"] for result in rsp.json()] == [True, True, True, False]
+    assert rsp.json()[0]["favorite"] != show["favorite"]
+    assert rsp.json()[3]["error"] == "show_not_found"
+    show_after = test_client.get(f"/shows/{show_id}").json()
+    assert show_after["favorite"] != show["favorite"]
+    assert show_after["seasons"][0][0]["watched"] != show["seasons"][0][0]["watched"]
+    assert show_after["user_channel"] == "new channel"
+
+
+@pytest.mark.parametrize("login_as_user", ["test_user2"], indirect=True)
+def test_apply_show_operations_rejects_unknown_operations(
+    test_client: TestClient, login_as_user: FakeUser, csrf_token_header: dict[str, str]
+) -> None:
+    rsp = test_client.post(
+        "/shows/batch",
+        headers=csrf_token_header,
+        json={"operations": [{"op": "rename", "show_id": str(uuid4())}]},
+    )
+
+    assert rsp.status_code == 400
+
+
 @pytest.mark.parametrize("login_as_user", ["test_user2"], indirect=True)
 def test_get_user_prefs(test_client: TestClient, login_as_user: FakeUser) -> None:
     prefs = test_client.get("/user-prefs").raise_for_status().json()
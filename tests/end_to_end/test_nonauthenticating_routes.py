@@ -18,3 +18,16 @@ def test_app_env(test_client: TestClient[Litestar]) -> None:
     # value is set in the environment variables set up for the
     # test_app fixture
     assert rsp.text == "testing"
+
+
+def test_openapi_schema_describes_shows(test_client: TestClient[Litestar]) -> None:
+    rsp = test_client.get("/schema/openapi.json")
+    assert rsp.status_code == HTTP_200_OK
+
+    # /shows returns already encoded JSON, so declares what it is
+    schema = rsp.json()["paths"]["/shows"]["get"]["responses"]["200"]["content"][
+        "application/json"
+    ]["schema"]
+    assert schema["type"] == "object"
+    assert schema["additionalProperties"] == {"$ref": "#/components/schemas/Show"}
+    assert "Show" in rsp.json()["components"]["schemas"]
@@ -0,0 +1,246 @@
+"""Behavior every episode cache backend must share. Subclass `EpisodeCacheContract`
+in a test module and provide the `cache` and `expire_all` fixtures for a backend to
+run the whole suite against it."""
+
+import asyncio
+import datetime
+from collections.abc import Awaitable, Callable
+
+import pytest
+
+from caching.episode_cache import CachedEpisodes, EpisodeCacheBackend, Episodes
+from models.show import EpisodeDetails, EpisodeType
+
+type ExpireAll = Callable[[], Awaitable[None]]
+
+
+def make_episodes(season_lengths: list[int], title_prefix: str = "") -> Episodes:
+    return [
+        [
+            EpisodeDetails(
+                title=f"{title_prefix}S{season + 1}E{ep + 1}",
+                type=EpisodeType.SPECIAL if ep == 0 else EpisodeType.EPISODE,
+                duration=60 if ep % 2 else None,
+                release_date=datetime.date(2020, 1, 1) + datetime.timedelta(days=ep),
+                summary="<p>summary</p>" if ep % 2 else None,
+            )
+            for ep in range(length)
+        ]
+        for season, length in enumerate(season_lengths)
+    ]
+
+
+def make_entry(
+    season_lengths: list[int],
+    title_prefix: str = "",
+    etag: str | None = None,
+    last_modified: str | None = None,
+) -> CachedEpisodes:
+    return CachedEpisodes(
+        episodes=make_episodes(season_lengths, title_prefix),
+        etag=etag,
+        last_modified=last_modified,
+    )
+
+
+class EpisodeCacheContract:
+    @pytest.fixture
+    def cache(self) -> EpisodeCacheBackend:
+        """Provides an empty cache with a TTL of a day"""
+        raise NotImplementedError
+
+    @pytest.fixture
+    def expire_all(self, cache: EpisodeCacheBackend) -> ExpireAll:
+        """Provides a function making every entry currently in `cache` expire"""
+        raise NotImplementedError
+
+    @pytest.mark.asyncio
+    async def test_missing_key_is_a_miss(self, cache: EpisodeCacheBackend) -> None:
+        assert await cache.get("missing") is None
+        assert cache.stats.misses == 1
+        assert cache.stats.hits == 0
+
+    @pytest.mark.asyncio
+    async def test_stored_episodes_round_trip(self, cache: EpisodeCacheBackend) -> None:
+        episodes = make_entry([3, 0, 2])
+
+        await cache.set("key", episodes)
+
+        assert await cache.get("key") == episodes
+        assert cache.stats.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_set_replaces_entry(self, cache: EpisodeCacheBackend) -> None:
+        await cache.set("key", make_entry([1], title_prefix="old "))
+        await cache.set("key", make_entry([2], title_prefix="new "))
+
+        assert await cache.get("key") == make_entry([2], title_prefix="new ")
+
+    @pytest.mark.asyncio
+    async def test_keys_are_independent(self, cache: EpisodeCacheBackend) -> None:
+        await cache.set("a", make_entry([1]))
+        await cache.set("b", make_entry([2]))
+
+        await cache.delete("a")
+
+        assert await cache.get("a") is None
+        assert await cache.get("b") == make_entry([2])
+
+    @pytest.mark.asyncio
+    async def test_delete_missing_key_is_harmless(
+        self, cache: EpisodeCacheBackend
+    ) -> None:
+        await cache.delete("missing")
+
+    @pytest.mark.asyncio
+    async def test_clear_removes_everything(self, cache: EpisodeCacheBackend) -> None:
+        await cache.set("a", make_entry([1]))
+        await cache.set("b", make_entry([2]))
+
+        await cache.clear()
+
+        assert await cache.get("a") is None
+        assert await cache.get("b") is None
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_misses(
+        self, cache: EpisodeCacheBackend, expire_all: ExpireAll
+    ) -> None:
+        await cache.set("key", make_entry([1]))
+
+        await expire_all()
+
+        assert await cache.get("key") is None
+        assert cache.stats.misses == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_can_be_replaced(
+        self, cache: EpisodeCacheBackend, expire_all: ExpireAll
+    ) -> None:
+        await cache.set("key", make_entry([1]))
+        await expire_all()
+
+        await cache.set("key", make_entry([2]))
+
+        assert await cache.get("key") == make_entry([2])
+
+    @pytest.mark.asyncio
+    async def test_hit_ratio(self, cache: EpisodeCacheBackend) -> None:
+        await cache.set("key", make_entry([1]))
+
+        for _ in range(3):
+            await cache.get("key")
+        await cache.get("missing")
+
+        assert cache.stats.hit_ratio == 0.75
+
+    @pytest.mark.asyncio
+    async def test_get_or_fetch_returns_cached_without_fetching(
+        self, cache: EpisodeCacheBackend
+    ) -> None:
+        await cache.set("key", make_entry([2]))
+
+        async def fetch(current: CachedEpisodes | None) -> CachedEpisodes:
+            raise AssertionError("should not fetch")
+
+        assert await cache.get_or_fetch("key", fetch) == make_entry([2])
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_fetch(
+        self, cache: EpisodeCacheBackend
+    ) -> None:
+        fetch_count = 0
+
+        async def fetch(current: CachedEpisodes | None) -> CachedEpisodes:
+            nonlocal fetch_count
+            fetch_count += 1
+            await asyncio.sleep(0.01)
+            return make_entry([3])
+
+        results = await asyncio.gather(
+            *(cache.get_or_fetch("key", fetch) for _ in range(10))
+        )
+
+        assert fetch_count == 1
+        assert results == [make_entry([3])] * 10
+        assert await cache.get("key") == make_entry([3])
+
+    @pytest.mark.asyncio
+    async def test_fetch_for_one_key_doesnt_block_another(
+        self, cache: EpisodeCacheBackend
+    ) -> None:
+        release_slow = asyncio.Event()
+
+        async def slow_fetch(current: CachedEpisodes | None) -> CachedEpisodes:
+            await release_slow.wait()
+            return make_entry([1])
+
+        async def fast_fetch(current: CachedEpisodes | None) -> CachedEpisodes:
+            return make_entry([2])
+
+        await cache.set("cached", make_entry([3]))
+        slow = asyncio.create_task(cache.get_or_fetch("slow", slow_fetch))
+
+        # both finish while the slow fetch is still waiting
+        assert await cache.get_or_fetch("fast", fast_fetch) == make_entry([2])
+        assert await cache.get("cached") == make_entry([3])
+        assert not slow.done()
+
+        release_slow.set()
+        assert await slow == make_entry([1])
+
+    @pytest.mark.asyncio
+    async def test_failed_fetch_propagates_and_caches_nothing(
+        self, cache: EpisodeCacheBackend
+    ) -> None:
+        async def fetch(current: CachedEpisodes | None) -> CachedEpisodes:
+            await asyncio.sleep(0)
+            raise ValueError("TVmaze is down")
+
+        results = await asyncio.gather(
+            cache.get_or_fetch("key", fetch),
+            cache.get_or_fetch("key", fetch),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(r, ValueError) for r in results)
+        assert await cache.get("key") is None
+
+    @pytest.mark.asyncio
+    async def test_refresh_replaces_cached_entry(
+        self, cache: EpisodeCacheBackend
+    ) -> None:
+        await cache.set("key", make_entry([1]))
+
+        async def fetch(current: CachedEpisodes | None) -> CachedEpisodes:
+            return make_entry([4])
+
+        assert await cache.refresh("key", fetch) == make_entry([4])
+        assert await cache.get("key") == make_entry([4])
+
+    @pytest.mark.asyncio
+    async def test_validators_round_trip(self, cache: EpisodeCacheBackend) -> None:
+        entry = make_entry(
+            [2], etag='W/"abc"', last_modified="Wed, 21 Oct 2015 07:28:00 GMT"
+        )
+
+        await cache.set("key", entry)
+
+        assert await cache.get("key") == entry
+
+    @pytest.mark.asyncio
+    async def test_refresh_passes_current_entry_to_fetch(
+        self, cache: EpisodeCacheBackend
+    ) -> None:
+        await cache.set("key", make_entry([1], etag='"v1"'))
+        seen: list[CachedEpisodes | None] = []
+
+        async def fetch(current: CachedEpisodes | None) -> CachedEpisodes:
+            seen.append(current)
+            return make_entry([1], etag='"v2"')
+
+        await cache.refresh("key", fetch)
+        await cache.get_or_fetch("other", fetch)
+
+        assert seen == [make_entry([1], etag='"v1"'), None]
+        assert await cache.get("key") == make_entry([1], etag='"v2"')
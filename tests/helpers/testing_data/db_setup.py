@@ -7,9 +7,10 @@ from sqlalchemy import NullPool
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from testcontainers.postgres import PostgresContainer  # type: ignore
 
-from db.models import DbShow, DbUserPrefs
+from db.models import DbShow, DbTVmazeShow, DbUserPrefs
 from helpers.testing_data.users import test_users
 from litestar_users_setup.models import User
+from models.show import EpisodeDescriptor
 
 
 async def _add_user(
@@ -73,29 +74,32 @@ async def _add_show(
                 next_episode_number += 1
 
             season_contents.append(
-                {
-                    "title": f"Episode index {ep_idx} title",
-                    "ep_num": episode_number,
-                    "watched": is_watched(season, ep_idx),
-                }
+                EpisodeDescriptor(
+                    title=f"Episode index {ep_idx} title",
+                    ep_num=episode_number,
+                    watched=is_watched(season, ep_idx),
+                )
             )
         seasons.append(season_contents)
 
     db_session.add(
         DbShow(
             user_id=user_id,
-            tvmaze_id=tvmaze_id,
-            title=title,
             favorite=favorite,
-            source=source,
-            duration=duration,
-            image_sm_url=image_sm_url,
-            image_lg_url=image_lg_url,
-            imdb_id=imdb_id,
-            thetvdb_id=thetvdb_id,
-            seasons=seasons,
+            watched=DbShow.seasons_to_watched(seasons),
             user_channel=user_channel,
             user_notes=user_notes,
+            catalog=DbTVmazeShow(
+                tvmaze_id=tvmaze_id,
+                title=title,
+                source=source,
+                duration=duration,
+                image_sm_url=image_sm_url,
+                image_lg_url=image_lg_url,
+                imdb_id=imdb_id,
+                thetvdb_id=thetvdb_id,
+                seasons=DbTVmazeShow.seasons_to_json(seasons),
+            ),
         )
     )
     await db_session.flush()
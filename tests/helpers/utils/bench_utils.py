@@ -0,0 +1,13 @@
+import statistics
+
+
+def format_latencies(label: str, samples: list[float]) -> str:
+    """Summarizes a list of latency samples (in seconds) as a one-line p50/p99
+    report in milliseconds."""
+
+    cut_points = statistics.quantiles(samples, n=100, method="inclusive")
+    p50, p99 = cut_points[49], cut_points[98]
+    return (
+        f"{label:<45} n={len(samples):<6} "
+        f"p50={p50 * 1000:8.3f}ms  p99={p99 * 1000:8.3f}ms"
+    )
@@ -0,0 +1,20 @@
+import asyncio
+
+
+class FakeClock:
+    """Manually advanced time source, for testing time-dependent code without
+    real waiting. Pass `time` as the clock function and `sleep` as the async sleep
+    function; sleeping advances the clock immediately."""
+
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+    async def sleep(self, seconds: float) -> None:
+        self.now += max(seconds, 0.0)
+        await asyncio.sleep(0)  # let other tasks run, as a real sleep would
@@ -0,0 +1,68 @@
+import asyncio
+from types import TracebackType
+from typing import Self
+
+
+class StubHTTPServer:
+    """Minimal local HTTP/1.1 server for benchmarks: answers every request with the
+    same JSON body and honors keep-alive, counting connections and requests.
+
+    Use as an async context manager; the server listens on an ephemeral port on
+    localhost, given by `base_url`.
+    """
+
+    def __init__(self, body: str, latency: float = 0.0):
+        """
+        Args:
+            body: response body for every request
+            latency: simulated server processing time per request, in seconds
+        """
+        self.body = body.encode("utf-8")
+        self.latency = latency
+        self.connection_count = 0
+        self.request_count = 0
+        self._server: asyncio.Server | None = None
+
+    @property
+    def base_url(self) -> str:
+        assert self._server is not None, "server is not running"
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def __aenter__(self) -> Self:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        assert self._server is not None
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.connection_count += 1
+        headers = (
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/json\r\n"
+            b"Content-Length: %d\r\n\r\n" % len(self.body)
+        )
+        try:
+            while await reader.readline():  # request line; empty at EOF
+                # skip request headers (GET requests have no body)
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                self.request_count += 1
+                writer.write(headers + self.body)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
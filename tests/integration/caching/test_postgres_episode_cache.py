@@ -0,0 +1,48 @@
+"""Runs the episode cache contract against the Postgres backend."""
+
+from collections.abc import AsyncIterator
+
+import pytest
+import pytest_asyncio
+from helpers.episode_cache_contract import (
+    EpisodeCacheContract,
+    ExpireAll,
+    make_entry,
+)
+from sqlalchemy import delete, func, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from caching.episode_cache import PostgresEpisodeCache
+from db.models import DbEpisodeCacheEntry
+
+
+class TestPostgresEpisodeCache(EpisodeCacheContract):
+    @pytest_asyncio.fixture
+    async def cache(
+        self, test_db_engine: AsyncEngine
+    ) -> AsyncIterator[PostgresEpisodeCache]:
+        # the cache commits its own transactions, so clean up explicitly
+        async with test_db_engine.begin() as conn:
+            await conn.execute(delete(DbEpisodeCacheEntry))
+        yield PostgresEpisodeCache(engine=test_db_engine, ttl=86400)
+        async with test_db_engine.begin() as conn:
+            await conn.execute(delete(DbEpisodeCacheEntry))
+
+    @pytest.fixture
+    def expire_all(self, test_db_engine: AsyncEngine) -> ExpireAll:
+        async def expire() -> None:
+            async with test_db_engine.begin() as conn:
+                await conn.execute(
+                    update(DbEpisodeCacheEntry).values(expires_at=func.now())
+                )
+
+        return expire
+
+    @pytest.mark.asyncio
+    async def test_entries_are_shared_between_instances(
+        self, cache: PostgresEpisodeCache, test_db_engine: AsyncEngine
+    ) -> None:
+        await cache.set("key", make_entry([2]))
+
+        other = PostgresEpisodeCache(engine=test_db_engine)
+        assert await other.get("key") == make_entry([2])
@@ -39,8 +39,13 @@ async def autorollback_db_session(
 
     async with test_db_engine.connect() as connection:
         async with connection.begin() as outer_transaction:
-            session = AsyncSession(connection, expire_on_commit=False)
-            await session.begin_nested()
+            # in a savepoint of its own, so that a rollback in the session (as when
+            # an import fails) rolls back to it rather than ending the outer transaction
+            session = AsyncSession(
+                connection,
+                expire_on_commit=False,
+                join_transaction_mode="create_savepoint",
+            )
 
             yield session
 
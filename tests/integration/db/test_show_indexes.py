@@ -0,0 +1,131 @@
+import datetime
+from uuid import UUID
+
+import pytest
+from helpers.testing_data.users import get_user_id
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def _explain(sess: AsyncSession, query: str, **params: object) -> str:
+    """Returns Postgres's plan for the query, as text.
+
+    The test database holds only a handful of shows, so the planner would rightly
+    prefer a sequential scan to any index: sequential scans are disabled here so that
+    the plan shows whether a usable index exists at all.
+    """
+
+    await sess.execute(text("SET LOCAL enable_seqscan = off"))
+    rows = await sess.execute(text(f"EXPLAIN {query}"), params)
+    return "\n".join(rows.scalars())
+
+
+@pytest.mark.asyncio
+async def test_user_shows_query_uses_index(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user1", sess)
+
+    plan = await _explain(
+        sess, "SELECT * FROM show WHERE user_id = :user_id", user_id=user_id
+    )
+
+    assert "Seq Scan" not in plan
+    assert "ix_show_user_id" in plan or "uq_show_user_id_tvmaze_id" in plan
+
+
+@pytest.mark.asyncio
+async def test_user_show_by_tvmaze_id_query_uses_unique_index(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user1", sess)
+
+    plan = await _explain(
+        sess,
+        "SELECT id FROM show WHERE user_id = :user_id AND tvmaze_id = :tvmaze_id",
+        user_id=user_id,
+        tvmaze_id=42836,
+    )
+
+    assert "Seq Scan" not in plan
+    assert "uq_show_user_id_tvmaze_id" in plan
+
+
+@pytest.mark.asyncio
+async def test_user_shows_page_query_reads_index_in_order(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+
+    plan = await _explain(
+        sess,
+        "SELECT id FROM show WHERE user_id = :user_id AND id > :after "
+        "ORDER BY id LIMIT 10",
+        user_id=user_id,
+        after=UUID(int=0),
+    )
+
+    assert "Seq Scan" not in plan
+    assert "Sort" not in plan
+    assert "ix_show_user_id_id" in plan
+
+
+@pytest.mark.asyncio
+async def test_user_favorite_shows_query_uses_partial_index(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+
+    plan = await _explain(
+        sess,
+        "SELECT id FROM show WHERE user_id = :user_id AND favorite = true ORDER BY id",
+        user_id=user_id,
+    )
+
+    assert "Seq Scan" not in plan
+    assert "ix_show_user_id_id_favorite" in plan
+
+
+@pytest.mark.asyncio
+async def test_user_show_changes_queries_use_indexes(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    # a recent sync's cursor: with statistics, the planner knows that few of the
+    # user's shows have changed since, as it would in a real database
+    await sess.execute(text("ANALYZE show"))
+    since = await sess.scalar(
+        text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+    )
+
+    plan = await _explain(
+        sess,
+        "SELECT id FROM show WHERE user_id = :user_id AND change_xid >= :since",
+        user_id=user_id,
+        since=since,
+    )
+    assert "Seq Scan" not in plan
+    assert "ix_show_user_id_change_xid" in plan
+
+    plan = await _explain(
+        sess,
+        "SELECT show_id FROM show_tombstone "
+        "WHERE user_id = :user_id AND change_xid >= :since",
+        user_id=user_id,
+        since=since,
+    )
+    assert "Seq Scan" not in plan
+    assert "ix_show_tombstone_user_id_change_xid" in plan
+
+    plan = await _explain(
+        sess,
+        "DELETE FROM show_tombstone WHERE deleted_at < :deleted_before",
+        deleted_before=datetime.datetime.now(datetime.UTC),
+    )
+    assert "Seq Scan" not in plan
+    assert "ix_show_tombstone_deleted_at" in plan
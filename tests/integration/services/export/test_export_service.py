@@ -65,3 +65,34 @@ async def test_export_service(autorollback_db_session: AsyncSession) -> None:
                 assert exported_episode.title == episode.title
                 assert exported_episode.ep_num == episode.ep_num
                 assert exported_episode.watched == episode.watched
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(("page_size", "fragment_count"), [(1, 4), (100, 3)])
+async def test_export_stream_matches_export(
+    autorollback_db_session: AsyncSession, page_size: int, fragment_count: int
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    show_service = ShowService(db_session=sess, user_id=user_id)
+    sut = ExportService(show_service=show_service)
+
+    streamed = [fragment async for fragment in sut.export_stream(page_size)]
+
+    assert "".join(streamed) == await sut.export()
+    # the document's start and end, and a fragment per page of the 2 shows
+    assert len(streamed) == fragment_count
+
+
+@pytest.mark.asyncio
+async def test_export_stream_of_no_shows(autorollback_db_session: AsyncSession) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    show_service = ShowService(db_session=sess, user_id=user_id)
+    await show_service.delete_all_shows()
+    sut = ExportService(show_service=show_service)
+
+    streamed = "".join([fragment async for fragment in sut.export_stream()])
+
+    assert streamed == await sut.export()
+    assert ImportService.validate_import_data(streamed).shows == []
@@ -1,10 +1,17 @@
+import json
+from collections.abc import AsyncIterator
+
 import pytest
 from helpers.sample_file_reader import SampleFileReader
 from helpers.testing_data.users import get_user_id
 from pydantic import HttpUrl, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from scripts.generate_import_file import generate_import_file, generate_show
+from services.export_service import EXPORT_VERSION
 from services.import_service import (
+    ImportCounts,
+    ImportMode,
     ImportService,
     InvalidImportDataError,
     InvalidImportVersionError,
@@ -15,6 +22,11 @@ from services.show_service import ShowService
 TEST_DATA_DIR = "import_data_files"
 
 
+async def chunked(data: bytes, size: int) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
 @pytest.mark.asyncio
 async def test_import_service(
     autorollback_db_session: AsyncSession, reader: SampleFileReader
@@ -154,3 +166,151 @@ async def test_import_service_raises_on_invalid_version_identifier(
     assert isinstance(ex.__cause__, InvalidImportVersionError)
     assert ex.message == 'Unknown import file version identifier: "nope"'
     assert ex.details is None
+
+
+@pytest.mark.asyncio
+async def test_import_service_raises_on_duplicate_shows(
+    autorollback_db_session: AsyncSession, reader: SampleFileReader
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    show_service = ShowService(db_session=sess, user_id=user_id)
+    sut = ImportService(show_service=show_service)
+    shows_before = await show_service.get_shows()
+    data = json.loads(reader.read("import_v0.0.1.json"))
+    data["shows"].append(data["shows"][0])
+
+    with pytest.raises(InvalidImportDataError) as excinfo:
+        await sut.import_(json.dumps(data))
+    ex = excinfo.value
+    assert isinstance(ex.__cause__, ValidationError)
+    assert ex.message == "Import file validation failed"
+    assert "Duplicate show: TVmaze ID 166" in ex.details
+
+    # the user's current shows are left alone
+    assert await show_service.get_shows() == shows_before
+
+
+@pytest.mark.asyncio
+async def test_import_stream_in_batches(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    show_service = ShowService(db_session=sess, user_id=user_id)
+    sut = ImportService(show_service=show_service)
+    data = "".join(generate_import_file(5)).encode()
+    progress: list[int] = []
+
+    counts = await sut.import_stream(
+        chunked(data, 100), on_progress=progress.append, batch_size=2
+    )
+
+    assert counts == ImportCounts(imported=5, inserted=5, deleted=2)
+    assert progress == [2, 4, 5]
+    shows = await show_service.get_shows()
+    assert sorted(show.tvmaze_id for show in shows.values()) == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.parametrize("mode", [ImportMode.MERGE, ImportMode.REPLACE])
+@pytest.mark.asyncio
+async def test_import_stream_merges_or_replaces(
+    autorollback_db_session: AsyncSession, mode: ImportMode
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    show_service = ShowService(db_session=sess, user_id=user_id)
+    sut = ImportService(show_service=show_service)
+    await sut.import_("".join(generate_import_file(5)))
+    ids_before = {
+        show.tvmaze_id: id for id, show in (await show_service.get_shows()).items()
+    }
+    data = json.loads("".join(generate_import_file(6)))
+    del data["shows"][0]  # deleted
+    data["shows"][0]["user_notes"] = "Changed"  # updated; shows 3-5 unchanged
+
+    counts = await sut.import_stream(
+        chunked(json.dumps(data).encode(), 100), batch_size=2, mode=mode
+    )
+
+    shows = {show.tvmaze_id: show for show in (await show_service.get_shows()).values()}
+    assert sorted(shows) == [2, 3, 4, 5, 6]
+    assert shows[2].user_notes == "Changed"
+    if mode == ImportMode.MERGE:
+        assert counts == ImportCounts(
+            imported=5, inserted=1, updated=1, unchanged=3, deleted=1
+        )
+        # the shows kept are changed in place
+        assert all(
+            shows[tvmaze_id].id == ids_before[tvmaze_id]
+            for tvmaze_id in shows
+            if tvmaze_id in ids_before
+        )
+    else:
+        assert counts == ImportCounts(imported=5, inserted=5, deleted=5)
+        assert not {show.id for show in shows.values()} & set(ids_before.values())
+
+
+@pytest.mark.parametrize("already_saved", [False, True])
+@pytest.mark.asyncio
+async def test_import_matches_episodes_to_changed_catalog(
+    autorollback_db_session: AsyncSession, already_saved: bool
+) -> None:
+    sess = autorollback_db_session
+    # the catalog has a special before the first episode that the file hasn't
+    catalogued = generate_show(1, [3])
+    catalogued["seasons"][0].insert(
+        0, {"title": "Special", "ep_num": None, "watched": False}
+    )
+    other_user_id = await get_user_id("test_user1", sess)
+    await ImportService(ShowService(db_session=sess, user_id=other_user_id)).import_(
+        json.dumps({"version": EXPORT_VERSION, "shows": [catalogued]})
+    )
+    user_id = await get_user_id("test_user2", sess)
+    show_service = ShowService(db_session=sess, user_id=user_id)
+    sut = ImportService(show_service=show_service)
+    exported = generate_show(1, [3])
+    if already_saved:
+        await sut.import_(json.dumps({"version": EXPORT_VERSION, "shows": [exported]}))
+    for episode in exported["seasons"][0]:
+        episode["watched"] = episode["ep_num"] in (1, 3)
+
+    await sut.import_stream(
+        chunked(
+            json.dumps({"version": EXPORT_VERSION, "shows": [exported]}).encode(), 100
+        )
+    )
+
+    show = next(iter((await show_service.get_shows()).values()))
+    assert [(ep.title, ep.watched) for ep in show.seasons[0]] == [
+        ("Special", False),
+        ("Episode 1", True),
+        ("Episode 2", False),
+        ("Episode 3", True),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_import_stream_rolls_back_on_invalid_later_batch(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    show_service = ShowService(db_session=sess, user_id=user_id)
+    sut = ImportService(show_service=show_service)
+    shows_before = await show_service.get_shows()
+    data = json.loads("".join(generate_import_file(5)))
+    data["shows"][4]["tvmaze_id"] = 1
+    progress: list[int] = []
+
+    with pytest.raises(InvalidImportDataError) as excinfo:
+        await sut.import_stream(
+            chunked(json.dumps(data).encode(), 100),
+            on_progress=progress.append,
+            batch_size=2,
+        )
+    assert "Duplicate show: TVmaze ID 1" in excinfo.value.details
+
+    # batches were inserted before the invalid show was read, and rolled back
+    assert progress == [2, 4]
+    assert await show_service.get_shows() == shows_before
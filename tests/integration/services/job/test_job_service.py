@@ -0,0 +1,402 @@
+import asyncio
+import datetime
+from collections.abc import AsyncIterator
+from typing import Any
+from uuid import UUID, uuid4
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app_config import JobSettings
+from db.models import (
+    DbJob,
+    DbJobData,
+    DbShow,
+    DbShowTombstone,
+    DbShowTombstoneHorizon,
+    DbTVmazeShow,
+)
+from litestar_users_setup.models import User
+from models.job import JobStatus
+from scripts.generate_import_file import generate_import_file
+from services.export_service import ExportService
+from services.import_service import ImportMode
+from services.job_service import (
+    MAX_UNFINISHED_JOBS,
+    JobHasNoOutput,
+    JobNotFound,
+    JobService,
+    JobWorker,
+    TooManyJobs,
+)
+from services.show_service import ShowService
+
+SHOW_COUNT = 3
+
+
+async def chunked(data: bytes, size: int) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+@pytest_asyncio.fixture
+async def session_maker(
+    test_db_engine: AsyncEngine,
+) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(test_db_engine, expire_on_commit=False)
+
+
+@pytest_asyncio.fixture
+async def user_id(
+    session_maker: async_sessionmaker[AsyncSession],
+) -> AsyncIterator[UUID]:
+    # jobs commit their own transactions, so a user of their own, cleaned up
+    # explicitly (with the catalog entries of the shows imported)
+    async with session_maker() as session:
+        user = User(
+            email="jobs@example.com",
+            password_hash="not used",
+            is_active=True,
+            is_verified=True,
+        )
+        session.add(user)
+        await session.commit()
+    yield user.id
+    async with session_maker() as session:
+        await session.execute(delete(DbJob).where(DbJob.user_id == user.id))
+        await session.execute(delete(DbShow).where(DbShow.user_id == user.id))
+        await session.execute(
+            delete(DbShowTombstone).where(DbShowTombstone.user_id == user.id)
+        )
+        await session.execute(
+            delete(DbShowTombstoneHorizon).where(
+                DbShowTombstoneHorizon.user_id == user.id
+            )
+        )
+        await session.execute(delete(User).where(User.id == user.id))
+        await session.execute(
+            delete(DbTVmazeShow).where(DbTVmazeShow.tvmaze_id <= SHOW_COUNT)
+        )
+        await session.commit()
+
+
+def make_worker(
+    session_maker: async_sessionmaker[AsyncSession],
+    settings: JobSettings | None = None,
+) -> JobWorker:
+    return JobWorker(session_maker=session_maker, settings=settings or JobSettings())
+
+
+async def abandon(
+    session_maker: async_sessionmaker[AsyncSession], job_id: UUID
+) -> None:
+    """Makes the job look abandoned: its last heartbeat longer ago than the timeout"""
+
+    heartbeat_at = datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=1)
+    async with session_maker() as session:
+        stmt = update(DbJob).where(DbJob.id == job_id).values(heartbeat_at=heartbeat_at)
+        await session.execute(stmt)
+        await session.commit()
+
+
+async def submit_import(
+    session_maker: async_sessionmaker[AsyncSession], user_id: UUID, data: bytes
+) -> UUID:
+    async with session_maker() as session:
+        job = await JobService(session, user_id).submit_import(
+            chunked(data, 100), mode=ImportMode.MERGE
+        )
+    return job.id
+
+
+@pytest.mark.asyncio
+async def test_import_job(
+    session_maker: async_sessionmaker[AsyncSession], user_id: UUID
+) -> None:
+    data = "".join(generate_import_file(SHOW_COUNT)).encode()
+    job_id = await submit_import(session_maker, user_id, data)
+    worker = make_worker(session_maker)
+
+    assert await worker.run_next()
+    assert not await worker.run_next()
+
+    async with session_maker() as session:
+        job = await JobService(session, user_id).get_job(job_id)
+        assert job.status == JobStatus.SUCCEEDED
+        assert job.attempts == 1
+        assert job.finished_at is not None
+        assert job.result == {
+            "imported_count": SHOW_COUNT,
+            "inserted_count": SHOW_COUNT,
+            "updated_count": 0,
+            "unchanged_count": 0,
+            "deleted_count": 0,
+        }
+        assert not job.has_output
+        shows = await ShowService(session, user_id).get_shows()
+        assert sorted(show.tvmaze_id for show in shows.values()) == [1, 2, 3]
+        # the file isn't kept once imported
+        stmt = select(func.count()).where(DbJobData.job_id == job_id)
+        assert (await session.execute(stmt)).scalar_one() == 0
+
+
+@pytest.mark.asyncio
+async def test_import_job_fails_on_invalid_file(
+    session_maker: async_sessionmaker[AsyncSession], user_id: UUID
+) -> None:
+    job_id = await submit_import(session_maker, user_id, b'[{ malformed: "data" }]')
+
+    assert await make_worker(session_maker).run_next()
+
+    async with session_maker() as session:
+        job = await JobService(session, user_id).get_job(job_id)
+        assert job.status == JobStatus.FAILED
+        assert job.result is not None
+        assert job.result["error"] == "invalid or malformed JSON"
+
+
+@pytest.mark.asyncio
+async def test_export_job_output(
+    session_maker: async_sessionmaker[AsyncSession], user_id: UUID
+) -> None:
+    data = "".join(generate_import_file(SHOW_COUNT)).encode()
+    await submit_import(session_maker, user_id, data)
+    async with session_maker() as session:
+        job = await JobService(session, user_id).submit_export()
+    worker = make_worker(session_maker)
+
+    assert await worker.run_next()  # the import
+    assert await worker.run_next()  # the export
+
+    async with session_maker() as session:
+        svc = JobService(session, user_id)
+        job = await svc.get_job(job.id)
+        assert job.status == JobStatus.SUCCEEDED
+        assert job.has_output
+        output = b"".join([chunk async for chunk in svc.read_output(job.id)])
+        expected = await ExportService(ShowService(session, user_id)).export()
+        assert output.decode() == expected
+        assert job.result == {"exported_bytes": len(output)}
+
+
+@pytest.mark.asyncio
+async def test_refresh_job_without_shows(
+    session_maker: async_sessionmaker[AsyncSession], user_id: UUID
+) -> None:
+    async with session_maker() as session:
+        job = await JobService(session, user_id).submit_refresh()
+
+    assert await make_worker(session_maker).run_next()
+
+    async with session_maker() as session:
+        job = await JobService(session, user_id).get_job(job.id)
+        assert job.status == JobStatus.SUCCEEDED
+        assert job.result == {"refreshed_count": 0, "failed_count": 0}
+
+
+@pytest.mark.asyncio
+async def test_job_not_found_or_without_output(
+    session_maker: async_sessionmaker[AsyncSession], user_id: UUID
+) -> None:
+    async with session_maker() as session:
+        svc = JobService(session, user_id)
+        job = await svc.submit_export()
+
+        with pytest.raises(JobHasNoOutput):
+            _ = [chunk async for chunk in svc.read_output(job.id)]
+        with pytest.raises(JobNotFound):
+            await svc.get_job(uuid4())
+        # another user's
+        with pytest.raises(JobNotFound):
+            await JobService(session, uuid4()).get_job(job.id)
+
+
+@pytest.mark.asyncio
+async def test_too_many_unfinished_jobs(
+    session_maker: async_sessionmaker[AsyncSession], user_id: UUID
+) -> None:
+    async with session_maker() as session:
+        svc = JobService(session, user_id)
+        for _ in range(MAX_UNFINISHED_JOBS):
+            await svc.submit_export()
+
+        with pytest.raises(TooManyJobs):
+            await svc.submit_refresh()
+
+
+@pytest.mark.asyncio
+async def test_too_many_unfinished_jobs_submitted_at_once(
+    session_maker: async_sessionmaker[AsyncSession], user_id: UUID
+) -> None:
+    async def submit() -> bool:
+        async with session_maker() as session:
+            try:
+                await JobService(session, user_id).submit_export()
+            except TooManyJobs:
+                return False
+            return True
+
+    submitted = await asyncio.gather(
+        *(submit() for _ in range(2 * MAX_UNFINISHED_JOBS))
+    )
+
+    assert submitted.count(True) == MAX_UNFINISHED_JOBS
+
+
+@pytest.mark.asyncio
+async def test_claim_skips_locked_jobs(
+    session_maker: async_sessionmaker[AsyncSession], user_id: UUID
+) -> None:
+    async with session_maker() as session:
+        svc = JobService(session, user_id)
+        first = await svc.submit_export()
+        second = await svc.submit_export()
+    worker = make_worker(session_maker)
+
+    # as if another worker were claiming the first
+    async with session_maker() as session:
+        stmt = select(DbJob).where(DbJob.id == first.id).with_for_update()
+        await session.execute(stmt)
+
+        claimed = await worker.claim()
+        assert claimed is not None
+        assert claimed.id == second.id
+
+    claimed = await worker.claim()
+    assert claimed is not None
+    assert claimed.id == first.id
+    assert await worker.claim() is None
+
+
+@pytest.mark.asyncio
+async def test_abandoned_job_is_claimed_again(
+    session_maker: async_sessionmaker[AsyncSession], user_id: UUID
+) -> None:
+    async with session_maker() as session:
+        job = await JobService(session, user_id).submit_export()
+    worker = make_worker(session_maker, JobSettings(timeout=60, max_attempts=2))
+
+    claimed = await worker.claim()
+    assert claimed is not None and claimed.attempt == 1
+    # still running, within the timeout
+    assert await worker.claim() is None
+
+    await abandon(session_maker, job.id)
+    claimed = await worker.claim()
+    assert claimed is not None
+    assert claimed.id == job.id
+    assert claimed.attempt == 2
+
+    await abandon(session_maker, job.id)
+    assert await worker.claim() is None
+    async with session_maker() as session:
+        failed = await JobService(session, user_id).get_job(job.id)
+        assert failed.status == JobStatus.FAILED
+        assert failed.result is not None
+        assert failed.result["error"] == "abandoned"
+
+
+@pytest.mark.asyncio
+async def test_running_job_kept_claimed_by_heartbeats(
+    session_maker: async_sessionmaker[AsyncSession],
+    user_id: UUID,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async with session_maker() as session:
+        job = await JobService(session, user_id).submit_export()
+    settings = JobSettings(timeout=0.4)
+    worker = make_worker(session_maker, settings)
+    run = worker._run
+    finish = asyncio.Event()
+
+    async def run_slowly(*args: Any) -> Any:
+        await finish.wait()
+        return await run(*args)
+
+    monkeypatch.setattr(worker, "_run", run_slowly)
+    running = asyncio.create_task(worker.run_next())
+
+    # running for twice the timeout, but not abandoned
+    await asyncio.sleep(0.8)
+    assert await make_worker(session_maker, settings).claim() is None
+
+    finish.set()
+    assert await running
+    async with session_maker() as session:
+        finished = await JobService(session, user_id).get_job(job.id)
+        assert finished.status == JobStatus.SUCCEEDED
+        assert finished.attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_attempt_claimed_again_changes_nothing(
+    session_maker: async_sessionmaker[AsyncSession], user_id: UUID
+) -> None:
+    data = "".join(generate_import_file(SHOW_COUNT)).encode()
+    import_id = await submit_import(session_maker, user_id, data)
+    async with session_maker() as session:
+        export = await JobService(session, user_id).submit_export()
+    worker = make_worker(session_maker)
+    first_attempts = [await worker.claim(), await worker.claim()]
+    await abandon(session_maker, import_id)
+    await abandon(session_maker, export.id)
+    second_attempts = [await worker.claim(), await worker.claim()]
+
+    for attempt in first_attempts:
+        assert attempt is not None and attempt.attempt == 1
+        await worker.run_job(attempt)
+    async with session_maker() as session:
+        svc = JobService(session, user_id)
+        for job_id in (import_id, export.id):
+            job = await svc.get_job(job_id)
+            assert job.status == JobStatus.RUNNING
+            assert job.attempts == 2
+        assert await ShowService(session, user_id).get_shows() == {}
+        stmt = select(func.count()).where(
+            DbJobData.job_id == export.id, DbJobData.output.is_(True)
+        )
+        assert (await session.execute(stmt)).scalar_one() == 0
+
+    for attempt in second_attempts:
+        assert attempt is not None and attempt.attempt == 2
+        await worker.run_job(attempt)
+    async with session_maker() as session:
+        svc = JobService(session, user_id)
+        for job_id in (import_id, export.id):
+            assert (await svc.get_job(job_id)).status == JobStatus.SUCCEEDED
+        assert len(await ShowService(session, user_id).get_shows()) == SHOW_COUNT
+
+
+@pytest.mark.asyncio
+async def test_expired_jobs_deleted_with_output(
+    session_maker: async_sessionmaker[AsyncSession], user_id: UUID
+) -> None:
+    async with session_maker() as session:
+        svc = JobService(session, user_id)
+        expired = await svc.submit_export()
+        kept = await svc.submit_export()
+        unfinished = await svc.submit_refresh()
+    worker = make_worker(session_maker, JobSettings(retention=3600))
+    for _ in range(2):
+        claimed = await worker.claim()
+        assert claimed is not None
+        await worker.run_job(claimed)
+    async with session_maker() as session:
+        finished_at = func.now() - datetime.timedelta(hours=2)
+        await session.execute(
+            update(DbJob).where(DbJob.id == expired.id).values(finished_at=finished_at)
+        )
+        await session.commit()
+
+    assert await worker.delete_expired() == 1
+
+    async with session_maker() as session:
+        svc = JobService(session, user_id)
+        with pytest.raises(JobNotFound):
+            await svc.get_job(expired.id)
+        assert (await svc.get_job(kept.id)).has_output
+        assert (await svc.get_job(unfinished.id)).status == JobStatus.QUEUED
+        stmt = select(func.count()).where(DbJobData.job_id == expired.id)
+        assert (await session.execute(stmt)).scalar_one() == 0
@@ -1,16 +1,37 @@
 import datetime
-from uuid import uuid4
+import json
+from uuid import UUID, uuid4
 
+import httpx
 import pytest
 import respx
 from helpers.sample_file_reader import SampleFileReader
 from helpers.testing_data.users import get_user_id
 from pydantic import HttpUrl
 from pytest_mock import MockerFixture
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from models.show import EpisodeDescriptor, EpisodeType, Show, ShowCreate
-from services.show_service import EpisodeNotFound, ShowNotFound, ShowService
+from sqlalchemy import BigInteger, Text, cast, func, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from caching.episode_cache import InMemoryEpisodeCache
+from db.models import DbShow, DbTVmazeShow
+from models.show import (
+    EpisodeDescriptor,
+    EpisodeType,
+    Show,
+    ShowCreate,
+    ShowOperationError,
+    ShowOperationResult,
+    ToggleFavoriteOperation,
+    ToggleWatchedOperation,
+    UpdateUserFieldsOperation,
+)
+from services.show_service import (
+    EpisodeNotFound,
+    ShowAlreadyExists,
+    ShowNotFound,
+    ShowService,
+    UnknownShowFields,
+)
 
 """Source directory for test files read by SampleFileReader"""
 TEST_DATA_DIR = "mock_responses/tvmaze/show_request_responses"
@@ -48,6 +69,253 @@ async def test_get_shows(autorollback_db_session: AsyncSession) -> None:
             assert ep.watched == (True if season_idx == 0 else False)
 
 
+@pytest.mark.asyncio
+async def test_get_shows_json_matches_get_shows(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+
+    shows_json = json.loads(await sut.get_shows_json())
+
+    assert shows_json == {
+        str(id): show.model_dump(mode="json")
+        for id, show in (await sut.get_shows()).items()
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_shows_page_json_pages_through_shows(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+    shows = await sut.get_shows()
+    assert len(shows) == 2  # precondition
+
+    pages = []
+    after = None
+    while True:
+        page_json, after = await sut.get_shows_page_json(limit=1, after=after)
+        pages.append(json.loads(page_json))
+        if after is None:
+            break
+
+    assert [list(page) for page in pages] == [[str(id)] for id in sorted(shows)]
+    assert {id: show for page in pages for id, show in page.items()} == {
+        str(id): show.model_dump(mode="json") for id, show in shows.items()
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_shows_page_json_with_fields_and_season_counts(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+    shows = await sut.get_shows()
+
+    page_json, after = await sut.get_shows_page_json(
+        ["title", "favorite", "season_counts"]
+    )
+
+    assert after is None
+    assert json.loads(page_json) == {
+        str(id): {
+            "title": show.title,
+            "favorite": show.favorite,
+            "season_counts": [
+                {
+                    "watched": sum(episode.watched for episode in season),
+                    "total": len(season),
+                }
+                for season in show.seasons
+            ],
+        }
+        for id, show in shows.items()
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_shows_page_json_season_counts_ignore_bits_past_season(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+    show = next(
+        show for show in (await sut.get_shows()).values() if show.title == "Severance"
+    )
+    # Severance's seasons have 9 and 10 episodes: the first's bitmap has bits set
+    # past its end, in its partial byte and a whole byte more, and only its first
+    # and ninth episodes watched
+    await sess.execute(
+        update(DbShow)
+        .where(DbShow.id == show.id)
+        .values(watched=[b"\x01\xff\xff", b"\x00\x02"])
+    )
+
+    page_json, _ = await sut.get_shows_page_json(["season_counts"])
+
+    assert json.loads(page_json)[str(show.id)]["season_counts"] == [
+        {"watched": 2, "total": 9},
+        {"watched": 1, "total": 10},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_shows_favorites_only(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+
+    favorites = await sut.get_shows(favorites_only=True)
+
+    assert [show.title for show in favorites.values()] == ["Severance"]
+    favorites_json = {
+        str(id): show.model_dump(mode="json") for id, show in favorites.items()
+    }
+    assert json.loads(await sut.get_shows_json(favorites_only=True)) == favorites_json
+    page_json, after = await sut.get_shows_page_json(favorites_only=True)
+    assert json.loads(page_json) == favorites_json
+    assert after is None
+
+
+@pytest.mark.asyncio
+async def test_get_shows_page_json_with_unknown_fields(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+
+    with pytest.raises(UnknownShowFields) as exc_info:
+        await sut.get_shows_page_json(["title", "watched", "user_id"])
+
+    assert exc_info.value.fields == ["watched", "user_id"]
+
+
+@pytest.mark.asyncio
+async def test_get_shows_version_changes_with_shows(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+    shows = await sut.get_shows()
+
+    version = await sut.get_shows_version()
+    assert version[0] == len(shows)
+    assert await sut.get_shows_version(favorites_only=True) != version
+
+    show_id = next(iter(shows))
+    show_version = await sut.get_show_version(show_id)
+    await sut.toggle_favorite(show_id)
+    assert await sut.get_show_version(show_id) != show_version
+    after_toggle = await sut.get_shows_version()
+    assert after_toggle[0] == version[0]
+    assert after_toggle != version
+
+    await sut.delete_show(show_id)
+    assert (await sut.get_shows_version())[0] == version[0] - 1
+    assert await sut.get_show_version(show_id) is None
+
+
+@pytest.mark.asyncio
+async def test_get_show_changes_json(autorollback_db_session: AsyncSession) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+    other_user_svc = ShowService(
+        db_session=sess, user_id=await get_user_id("test_user1", sess)
+    )
+
+    everything = json.loads(await sut.get_show_changes_json())
+    assert everything["changed"] == json.loads(await sut.get_shows_json())
+    assert everything["deleted"] == []
+    assert everything["full"] is True
+
+    since = everything["cursor"]
+    nothing = json.loads(await sut.get_show_changes_json(since))
+    assert nothing["changed"] == {}
+    assert nothing["deleted"] == []
+    assert nothing["full"] is False
+
+    changed_id, deleted_id = await sut.get_shows()
+    await sut.toggle_favorite(changed_id)
+    await sut.delete_show(deleted_id)
+    await other_user_svc.delete_all_shows()
+
+    changes = json.loads(await sut.get_show_changes_json(since))
+    assert list(changes["changed"]) == [str(changed_id)]
+    changed = Show.model_validate(changes["changed"][str(changed_id)])
+    assert changed == await sut.get_show(changed_id)
+    assert changes["deleted"] == [str(deleted_id)]
+    assert changes["full"] is False
+    # held back by this test's own transaction, still in progress, so its changes
+    # are sent again
+    assert changes["cursor"] <= since + 1
+    again = json.loads(await sut.get_show_changes_json(changes["cursor"]))
+    assert again["changed"] == changes["changed"]
+
+
+@pytest.mark.asyncio
+async def test_get_show_changes_json_cursor_is_before_uncommitted_changes(
+    autorollback_db_session: AsyncSession, test_db_engine: AsyncEngine
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+    show_id = next(iter(await sut.get_shows()))
+
+    # a change made, but not yet committed, when the sync is made
+    async with test_db_engine.connect() as other_connection:
+        other_sut = ShowService(AsyncSession(other_connection), user_id)
+        await other_sut.db_session.execute(other_sut._show_update(show_id))
+        stmt = select(cast(cast(func.pg_current_xact_id(), Text), BigInteger))
+        change_xid = (await other_connection.execute(stmt)).scalar_one()
+
+        changes = json.loads(await sut.get_show_changes_json())
+
+        # so the next sync is from before it, and sends it once it's committed
+        assert changes["cursor"] <= change_xid
+        await other_connection.rollback()
+
+
+@pytest.mark.asyncio
+async def test_delete_expired_tombstones_makes_older_syncs_full(
+    autorollback_db_session: AsyncSession, mocker: MockerFixture
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+    since = json.loads(await sut.get_show_changes_json())["cursor"]
+    deleted_id, kept_id = await sut.get_shows()
+    await sut.delete_show(deleted_id)
+
+    assert await ShowService.delete_expired_tombstones(sess) == 0
+    assert json.loads(await sut.get_show_changes_json(since))["deleted"] == [
+        str(deleted_id)
+    ]
+
+    mocker.patch.object(ShowService, "tombstone_retention", datetime.timedelta(0))
+    assert await ShowService.delete_expired_tombstones(sess) == 1
+
+    # the deletion is forgotten, so the sync from before it has to be a full one
+    changes = json.loads(await sut.get_show_changes_json(since))
+    assert changes["full"] is True
+    assert list(changes["changed"]) == [str(kept_id)]
+    assert changes["deleted"] == []
+    # but not one from after it
+    later = json.loads(await sut.get_show_changes_json(changes["cursor"] + 1))
+    assert later["full"] is False
+
+
 @pytest.mark.asyncio
 async def test_get_show(autorollback_db_session: AsyncSession) -> None:
     sess = autorollback_db_session
@@ -278,6 +546,101 @@ async def test_add_many_shows(autorollback_db_session: AsyncSession) -> None:
     assert other_user_show_count_after == other_user_show_count_before
 
 
+@pytest.mark.asyncio
+async def test_load_shows(autorollback_db_session: AsyncSession) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user1", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+    other_user_id = await get_user_id("test_user2", sess)
+    other_user_service = ShowService(db_session=sess, user_id=other_user_id)
+    other_user_shows_before = await other_user_service.get_shows()
+    new_show = ShowCreate(
+        tvmaze_id=1001,
+        title="Fictional Show 1",
+        favorite=True,
+        source="Source1",
+        duration=1,
+        image_sm_url=HttpUrl("https://images.com/fictional1/sm"),
+        image_lg_url=HttpUrl("https://images.com/fictional1/lg"),
+        imdb_id="tt1",
+        thetvdb_id=1,
+        seasons=[
+            [
+                EpisodeDescriptor(title="Episode 1", ep_num=1, watched=True),
+                EpisodeDescriptor(title="Episode 2", ep_num=2, watched=False),
+            ],
+        ],
+        user_channel="Channel 1",
+        user_notes="notes 1",
+    )
+    # already in the catalog (the other user's), with an episode the catalog hasn't
+    other_users_show = next(iter(other_user_shows_before.values()))
+    catalogued_show = ShowCreate.model_validate(other_users_show.model_dump())
+    catalogued_show.title = "Not the catalog's title"
+    catalogued_show.seasons[0].append(
+        EpisodeDescriptor(title="Extra", ep_num=None, watched=True)
+    )
+
+    count = await sut.load_shows([new_show, catalogued_show])
+    await sess.commit()
+
+    assert count == 2
+    shows = {show.tvmaze_id: show for show in (await sut.get_shows()).values()}
+    assert len(shows) == 3
+    loaded = shows[1001]
+    assert ShowCreate.model_validate(loaded.model_dump()) == new_show
+    # the catalog entry is left as it was
+    loaded = shows[other_users_show.tvmaze_id]
+    assert loaded.title == other_users_show.title
+    assert loaded.seasons == other_users_show.seasons
+
+    assert await other_user_service.get_shows() == other_user_shows_before
+    assert await sut.load_shows([]) == 0
+
+
+@pytest.mark.asyncio
+async def test_merge_shows_listing_a_show_twice(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user1", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+    saved = next(iter((await sut.get_shows()).values()))
+    saved_show = ShowCreate.model_validate(saved.model_dump())
+    new_show = ShowCreate(
+        tvmaze_id=1001,
+        title="Fictional Show",
+        favorite=False,
+        source="Source",
+        duration=30,
+        image_sm_url=HttpUrl("https://images.com/fictional/sm"),
+        image_lg_url=HttpUrl("https://images.com/fictional/lg"),
+        imdb_id=None,
+        thetvdb_id=None,
+        seasons=[[EpisodeDescriptor(title="Episode 1", ep_num=1, watched=False)]],
+        user_channel=None,
+        user_notes="first",
+    )
+
+    # each merged as listed last
+    added, updated = await sut.merge_shows(
+        [
+            new_show,
+            saved_show.model_copy(update={"user_notes": "first"}),
+            new_show.model_copy(update={"user_notes": "last"}),
+            saved_show.model_copy(update={"user_notes": "last"}),
+        ]
+    )
+    await sess.commit()
+
+    assert (added, updated) == (1, 1)
+    shows = {show.tvmaze_id: show for show in (await sut.get_shows()).values()}
+    assert len(shows) == 2
+    assert shows[1001].user_notes == "last"
+    assert shows[saved.tvmaze_id].user_notes == "last"
+    assert shows[saved.tvmaze_id].id == saved.id
+
+
 @pytest.mark.asyncio
 @respx.mock(assert_all_mocked=True)
 async def test_add_show_from_tvmaze_adds_show_to_db(
@@ -329,9 +692,8 @@ async def test_add_show_caches_episode_list(
 ) -> None:
     sess = autorollback_db_session
     user_id = await get_user_id("test_user1", sess)
-    sut = ShowService(db_session=sess, user_id=user_id)
-
-    ShowService.episodes_cache.clear()
+    episodes_cache = InMemoryEpisodeCache()
+    sut = ShowService(db_session=sess, user_id=user_id, episodes_cache=episodes_cache)
 
     # this test uses TVmazeClient: mock out TVmaze URLs
     show_json = reader.read("network_show.json")
@@ -348,12 +710,170 @@ async def test_add_show_caches_episode_list(
     # run test
     added = await sut.add_show_from_tvmaze(tvmaze_id=6456)
 
-    assert ShowService.episodes_cache.currsize == 1
-    cached = ShowService.episodes_cache[added.id]
+    assert len(episodes_cache) == 1
+    cached = await episodes_cache.get(str(added.tvmaze_id))
     assert cached is not None
-    assert len(cached) == 2
+    assert len(cached.episodes) == 2
     for season_idx in range(0, 1):
-        assert len(cached[season_idx]) == 10
+        assert len(cached.episodes[season_idx]) == 10
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_add_show_from_tvmaze_already_added_fails(
+    autorollback_db_session: AsyncSession, respx_mock: respx.MockRouter
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user1", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+
+    # "All Creatures Great & Small" is already saved; TVmaze isn't consulted
+    with pytest.raises(ShowAlreadyExists) as excinfo:
+        await sut.add_show_from_tvmaze(tvmaze_id=42836)
+    assert excinfo.value.tvmaze_id == 42836
+    assert not respx_mock.calls
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_add_show_from_tvmaze_in_catalog_skips_tvmaze(
+    autorollback_db_session: AsyncSession, respx_mock: respx.MockRouter
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user1", sess)
+    other_user_id = await get_user_id("test_user2", sess)
+    sut = ShowService(db_session=sess, user_id=other_user_id)
+    other_users_show = next(
+        iter((await ShowService(db_session=sess, user_id=user_id).get_shows()).values())
+    )
+
+    # "All Creatures Great & Small" is already in the catalog, saved by test_user1
+    added = await sut.add_show_from_tvmaze(tvmaze_id=other_users_show.tvmaze_id)
+
+    assert not respx_mock.calls
+    assert added.title == other_users_show.title
+    assert added.favorite
+    assert added.user_notes is None
+    assert [len(season) for season in added.seasons] == [
+        len(season) for season in other_users_show.seasons
+    ]
+    assert not any(ep.watched for season in added.seasons for ep in season)
+    assert (await sut.get_shows())[added.id] == added
+
+
+async def add_outdated_counterpart(sess: AsyncSession, user_id: UUID) -> Show:
+    """Adds Counterpart (TVmaze ID 6456) to the user's shows with its details as
+    the catalog had them before they changed on TVmaze (see the responses in
+    TEST_DATA_DIR): with a preview special, since dropped, before the first season's
+    episodes, and without the second season. The preview and the first season's
+    first and last episodes are watched. The catalog entry is older than its TTL.
+    """
+
+    first_season = [EpisodeDescriptor("Preview", None, True)] + [
+        EpisodeDescriptor(f"Episode {n}", n, n in (1, 10)) for n in range(1, 11)
+    ]
+    show = ShowCreate(
+        tvmaze_id=6456,
+        title="Counterpart (old title)",
+        favorite=True,
+        source="STARZ",
+        duration=60,
+        image_sm_url=HttpUrl("https://tvimages.com/counterpart/sm"),
+        image_lg_url=HttpUrl("https://tvimages.com/counterpart/lg"),
+        imdb_id=None,
+        thetvdb_id=None,
+        seasons=[first_season],
+        user_channel=None,
+        user_notes=None,
+    )
+    added = await ShowService(db_session=sess, user_id=user_id).add_show(show)
+    await sess.execute(
+        update(DbTVmazeShow)
+        .where(DbTVmazeShow.tvmaze_id == show.tvmaze_id)
+        .values(updated_at=func.now() - 2 * ShowService.catalog_ttl)
+    )
+    return added
+
+
+# the watched status of `add_outdated_counterpart`'s show once its details are updated
+UPDATED_COUNTERPART_WATCHED = [[True] + [False] * 8 + [True], [False] * 10]
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_add_show_from_tvmaze_in_outdated_catalog_updates_it(
+    autorollback_db_session: AsyncSession,
+    respx_mock: respx.MockRouter,
+    reader: SampleFileReader,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user1", sess)
+    other_user_id = await get_user_id("test_user2", sess)
+    other_users_svc = ShowService(db_session=sess, user_id=other_user_id)
+    other_users_show = await add_outdated_counterpart(sess, other_user_id)
+    version_before = await other_users_svc.get_show_version(other_users_show.id)
+    sut = ShowService(db_session=sess, user_id=user_id)
+
+    respx_mock.get("https://api.tvmaze.com/shows/6456").respond(
+        text=reader.read("network_show.json")
+    )
+    respx_mock.get("https://api.tvmaze.com/shows/6456/episodes").respond(
+        text=reader.read("network_show_episodes.json")
+    )
+
+    added = await sut.add_show_from_tvmaze(tvmaze_id=6456)
+
+    assert len(respx_mock.calls) == 2
+    assert added.title == "Counterpart"
+    assert [len(season) for season in added.seasons] == [10, 10]
+    assert not any(ep.watched for season in added.seasons for ep in season)
+    # the other user's copy has changed with the catalog, their episodes watched
+    # kept as they were
+    updated = await other_users_svc.get_show(other_users_show.id)
+    assert updated.title == "Counterpart"
+    assert updated.seasons[0][0].title == "The Crossing"
+    assert [
+        [ep.watched for ep in season] for season in updated.seasons
+    ] == UPDATED_COUNTERPART_WATCHED
+    version_after = await other_users_svc.get_show_version(other_users_show.id)
+    assert version_before is not None and version_after is not None
+    assert version_after > version_before
+
+    # up to date, so not fetched again
+    await sut.delete_show(added.id)
+    await sut.add_show_from_tvmaze(tvmaze_id=6456)
+    assert len(respx_mock.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_add_show_already_added_fails(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user1", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+    existing = next(iter((await sut.get_shows()).values()))
+
+    with pytest.raises(ShowAlreadyExists):
+        await sut.add_show(ShowCreate.model_validate(existing.model_dump()))
+
+
+@pytest.mark.asyncio
+async def test_add_show_already_added_by_other_user(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user1", sess)
+    other_user_id = await get_user_id("test_user2", sess)
+    sut = ShowService(db_session=sess, user_id=other_user_id)
+    other_users_show = next(
+        iter((await ShowService(db_session=sess, user_id=user_id).get_shows()).values())
+    )
+
+    added = await sut.add_show(ShowCreate.model_validate(other_users_show.model_dump()))
+
+    assert added.tvmaze_id == other_users_show.tvmaze_id
+    assert added.id != other_users_show.id
 
 
 @pytest.mark.asyncio
@@ -418,11 +938,14 @@ async def test_delete_all_shows(autorollback_db_session: AsyncSession) -> None:
 @pytest.mark.asyncio
 @respx.mock(assert_all_mocked=True)
 async def test_get_episodes_uncached(
-    autorollback_db_session: AsyncSession, reader: SampleFileReader, respx_mock: respx.MockRouter
+    autorollback_db_session: AsyncSession,
+    reader: SampleFileReader,
+    respx_mock: respx.MockRouter,
 ) -> None:
     sess = autorollback_db_session
     user_id = await get_user_id("test_user1", sess)
-    sut = ShowService(db_session=sess, user_id=user_id)
+    episodes_cache = InMemoryEpisodeCache()
+    sut = ShowService(db_session=sess, user_id=user_id, episodes_cache=episodes_cache)
     show = Show(
         id=uuid4(),
         tvmaze_id=1,
@@ -438,8 +961,6 @@ async def test_get_episodes_uncached(
         user_channel=None,
         user_notes=None,
     )
-    ShowService.episodes_cache.clear()
-
     # fake TVmaze response
     show_json = reader.read("network_show_episodes.json")
     respx_mock.route(method="GET").respond(text=show_json)
@@ -449,7 +970,7 @@ async def test_get_episodes_uncached(
     assert len(episodes) > 0
     # FIXME: more assertions
 
-    assert len(ShowService.episodes_cache) == 1
+    assert len(episodes_cache) == 1
 
 
 @pytest.mark.asyncio
@@ -462,7 +983,8 @@ async def test_get_episodes_cached(
 ) -> None:
     sess = autorollback_db_session
     user_id = await get_user_id("test_user1", sess)
-    sut = ShowService(db_session=sess, user_id=user_id)
+    episodes_cache = InMemoryEpisodeCache()
+    sut = ShowService(db_session=sess, user_id=user_id, episodes_cache=episodes_cache)
     show = Show(
         id=uuid4(),
         tvmaze_id=1,
@@ -479,8 +1001,7 @@ async def test_get_episodes_cached(
         user_notes=None,
     )
 
-    ShowService.episodes_cache.clear()
-    cache_spy = mocker.spy(ShowService.episodes_cache, "get")
+    cache_spy = mocker.spy(episodes_cache, "get")
 
     # fake TVmaze response
     show_json = reader.read("network_show_episodes.json")
@@ -513,7 +1034,8 @@ async def test_get_episodes_cached_with_force_refresh(
 ) -> None:
     sess = autorollback_db_session
     user_id = await get_user_id("test_user1", sess)
-    sut = ShowService(db_session=sess, user_id=user_id)
+    episodes_cache = InMemoryEpisodeCache()
+    sut = ShowService(db_session=sess, user_id=user_id, episodes_cache=episodes_cache)
     show = Show(
         id=uuid4(),
         tvmaze_id=1,
@@ -530,8 +1052,7 @@ async def test_get_episodes_cached_with_force_refresh(
         user_notes=None,
     )
 
-    ShowService.episodes_cache.clear()
-    cache_spy = mocker.spy(ShowService.episodes_cache, "get")
+    cache_spy = mocker.spy(episodes_cache, "get")
 
     # fake TVmaze response
     show_json = reader.read("network_show_episodes.json")
@@ -555,6 +1076,135 @@ async def test_get_episodes_cached_with_force_refresh(
     assert episodes2[0][0].release_date == datetime.date(2017, 12, 10)
 
 
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_get_episodes_force_refresh_revalidates(
+    autorollback_db_session: AsyncSession,
+    reader: SampleFileReader,
+    respx_mock: respx.MockRouter,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user1", sess)
+    episodes_cache = InMemoryEpisodeCache()
+    sut = ShowService(db_session=sess, user_id=user_id, episodes_cache=episodes_cache)
+    show = Show(
+        id=uuid4(),
+        tvmaze_id=1,
+        title="Fictional Show",
+        favorite=True,
+        source="Somewhere",
+        duration=30,
+        image_lg_url=None,
+        image_sm_url=None,
+        imdb_id=None,
+        thetvdb_id=None,
+        seasons=[],
+        user_channel=None,
+        user_notes=None,
+    )
+
+    # fake TVmaze responses: the full list, then "not modified"
+    show_json = reader.read("network_show_episodes.json")
+    route = respx_mock.route(method="GET")
+    route.side_effect = [
+        httpx.Response(200, text=show_json, headers={"ETag": '"v1"'}),
+        httpx.Response(304, headers={"ETag": '"v1"'}),
+    ]
+
+    episodes1 = await sut.get_episodes(show)
+    episodes2 = await sut.get_episodes(show, force_refresh=True)
+
+    assert route.call_count == 2
+    assert route.calls.last.request.headers["If-None-Match"] == '"v1"'
+    assert episodes2 == episodes1
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_get_episodes_cache_shared_between_users(
+    autorollback_db_session: AsyncSession,
+    reader: SampleFileReader,
+    respx_mock: respx.MockRouter,
+) -> None:
+    sess = autorollback_db_session
+    episodes_cache = InMemoryEpisodeCache()
+    services = [
+        ShowService(
+            db_session=sess,
+            user_id=await get_user_id(tag, sess),
+            episodes_cache=episodes_cache,
+        )
+        for tag in ("test_user1", "test_user2")
+    ]
+    # each user has their own copy of the same TVmaze show
+    shows = [
+        Show(
+            id=uuid4(),
+            tvmaze_id=1,
+            title="Fictional Show",
+            favorite=favorite,
+            source="Somewhere",
+            duration=30,
+            image_lg_url=None,
+            image_sm_url=None,
+            imdb_id=None,
+            thetvdb_id=None,
+            seasons=[],
+            user_channel=None,
+            user_notes=None,
+        )
+        for favorite in (True, False)
+    ]
+
+    show_json = reader.read("network_show_episodes.json")
+    route = respx_mock.route(method="GET").respond(text=show_json)
+
+    episodes1 = await services[0].get_episodes(shows[0])
+    episodes2 = await services[1].get_episodes(shows[1])
+
+    assert route.call_count == 1
+    assert len(episodes_cache) == 1
+    assert episodes1 == episodes2
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_get_episodes_refreshed_updates_catalog(
+    autorollback_db_session: AsyncSession,
+    reader: SampleFileReader,
+    respx_mock: respx.MockRouter,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user1", sess)
+    sut = ShowService(
+        db_session=sess, user_id=user_id, episodes_cache=InMemoryEpisodeCache()
+    )
+    show = await add_outdated_counterpart(sess, user_id)
+    respx_mock.get("https://api.tvmaze.com/shows/6456/episodes").respond(
+        text=reader.read("network_show_episodes.json")
+    )
+
+    episodes = await sut.get_episodes(show, force_refresh=True)
+
+    updated = await sut.get_show(show.id)
+    assert [len(season) for season in updated.seasons] == [
+        len(season) for season in episodes
+    ]
+    assert [
+        [ep.watched for ep in season] for season in updated.seasons
+    ] == UPDATED_COUNTERPART_WATCHED
+    assert [[ep.title for ep in season] for season in updated.seasons] == [
+        [ep.title for ep in season] for season in episodes
+    ]
+    # only the episodes were fetched: the other details are as they were
+    assert updated.title == "Counterpart (old title)"
+
+    # fetched again, unchanged: nothing's written
+    version = await sut.get_show_version(show.id)
+    await sut.get_episodes(show, force_refresh=True)
+    assert await sut.get_show_version(show.id) == version
+
+
 @pytest.mark.asyncio
 async def test_toggle_episodes_watched(autorollback_db_session: AsyncSession) -> None:
     sess = autorollback_db_session
@@ -607,6 +1257,65 @@ async def test_toggle_nonexistent_episodes_fails(
         await sut.toggle_episodes(show_to_modify.id, [(1000, 2000)])
 
 
+@pytest.mark.asyncio
+async def test_toggle_episodes_returns_changes(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user1", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+    show_before = next(iter((await sut.get_shows()).values()))
+
+    # (1, 0) is toggled twice, so is left as it was
+    changes = await sut.toggle_episodes(show_before.id, [(0, 0), (1, 0), (1, 0)])
+
+    assert changes == [(0, 0, not show_before.seasons[0][0].watched)]
+    show_after = await sut.get_show(show_before.id)
+    assert show_after.seasons[0][0].watched != show_before.seasons[0][0].watched
+    assert show_after.seasons[1][0].watched == show_before.seasons[1][0].watched
+    assert show_after.seasons[1:] == show_before.seasons[1:]
+
+
+@pytest.mark.asyncio
+async def test_toggle_episodes_beyond_first_byte_of_each_season(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+    show_before = next(
+        show for show in (await sut.get_shows()).values() if show.title == "Severance"
+    )
+
+    # Severance's seasons have 9 and 10 episodes: the 9th and 10th are each stored
+    # in the second byte of their season's bitmap
+    changes = await sut.toggle_episodes(show_before.id, [(0, 8), (1, 9), (1, 8)])
+
+    assert changes == [(0, 8, False), (1, 9, True), (1, 8, False)]
+    show_after = await sut.get_show(show_before.id)
+    expected = [[ep.watched for ep in season] for season in show_before.seasons]
+    for season_idx, ep_idx, watched in changes:
+        expected[season_idx][ep_idx] = watched
+    assert [[ep.watched for ep in season] for season in show_after.seasons] == expected
+
+
+@pytest.mark.asyncio
+async def test_toggle_nonexistent_episodes_changes_nothing(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user1", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+    show_before = next(iter((await sut.get_shows()).values()))
+
+    with pytest.raises(EpisodeNotFound) as excinfo:
+        await sut.toggle_episodes(show_before.id, [(0, 0), (0, 7)])
+    assert excinfo.value.season == 1
+    assert excinfo.value.episode_index == 7
+
+    assert await sut.get_show(show_before.id) == show_before
+
+
 @pytest.mark.asyncio
 async def test_mark_show_as_favorite(autorollback_db_session: AsyncSession) -> None:
     sess = autorollback_db_session
@@ -675,3 +1384,102 @@ async def test_update_clear_user_fields(autorollback_db_session: AsyncSession) -
     severance_after = await sut.get_show(severance.id)
     assert severance_after.user_channel is None
     assert severance_after.user_notes is None
+
+
+@pytest.mark.asyncio
+async def test_update_other_users_show_fails(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id1 = await get_user_id("test_user1", sess)
+    user_id2 = await get_user_id("test_user2", sess)
+    sut = ShowService(db_session=sess, user_id=user_id2)
+    other_user_svc = ShowService(db_session=sess, user_id=user_id1)
+    show_before = next(iter((await other_user_svc.get_shows()).values()))
+
+    with pytest.raises(ShowNotFound):
+        await sut.toggle_favorite(show_before.id)
+    with pytest.raises(ShowNotFound):
+        await sut.update_user_fields(show_before.id, user_channel="x", user_notes="x")
+    with pytest.raises(ShowNotFound):
+        await sut.toggle_episodes(show_before.id, [(0, 0)])
+
+    assert await other_user_svc.get_show(show_before.id) == show_before
+
+
+@pytest.mark.asyncio
+async def test_update_show_leaves_other_shows_alone(
+    autorollback_db_session: AsyncSession,
+) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+    shows_before = await sut.get_shows()
+    pluribus = next(
+        iter(filter(lambda show: show.title == "Pluribus", shows_before.values()))
+    )
+
+    updated = await sut.toggle_favorite(pluribus.id)
+
+    assert updated.favorite != pluribus.favorite
+    shows_after = await sut.get_shows()
+    assert shows_after[pluribus.id] == updated
+    for show_id, show in shows_before.items():
+        if show_id != pluribus.id:
+            assert shows_after[show_id] == show
+
+
+@pytest.mark.asyncio
+async def test_apply_operations(autorollback_db_session: AsyncSession) -> None:
+    sess = autorollback_db_session
+    user_id = await get_user_id("test_user2", sess)
+    sut = ShowService(db_session=sess, user_id=user_id)
+    other_user_svc = ShowService(
+        db_session=sess, user_id=await get_user_id("test_user1", sess)
+    )
+    other_users_show = next(iter((await other_user_svc.get_shows()).values()))
+    shows_before = await sut.get_shows()
+    severance = next(s for s in shows_before.values() if s.title == "Severance")
+    pluribus = next(s for s in shows_before.values() if s.title == "Pluribus")
+
+    results = await sut.apply_operations(
+        [
+            ToggleWatchedOperation(
+                op="toggle_watched", show_id=severance.id, episodes=[(0, 0), (1, 0)]
+            ),
+            ToggleFavoriteOperation(op="toggle_favorite", show_id=pluribus.id),
+            ToggleWatchedOperation(
+                op="toggle_watched", show_id=severance.id, episodes=[(0, 99)]
+            ),
+            UpdateUserFieldsOperation(
+                op="update_user_fields",
+                show_id=pluribus.id,
+                user_channel="Apple TV",
+                user_notes=None,
+            ),
+            ToggleFavoriteOperation(op="toggle_favorite", show_id=other_users_show.id),
+        ]
+    )
+
+    assert results == [
+        ShowOperationResult(
+            ok=True,
+            episodes=[
+                (0, 0, not severance.seasons[0][0].watched),
+                (1, 0, not severance.seasons[1][0].watched),
+            ],
+        ),
+        ShowOperationResult(ok=True, favorite=not pluribus.favorite),
+        ShowOperationResult(ok=False, error=ShowOperationError.EPISODE_NOT_FOUND),
+        ShowOperationResult(ok=True),
+        ShowOperationResult(ok=False, error=ShowOperationError.SHOW_NOT_FOUND),
+    ]
+    severance_after = await sut.get_show(severance.id)
+    assert severance_after.seasons[0][0].watched != severance.seasons[0][0].watched
+    assert severance_after.seasons[1][0].watched != severance.seasons[1][0].watched
+    assert severance_after.seasons[0][1:] == severance.seasons[0][1:]
+    pluribus_after = await sut.get_show(pluribus.id)
+    assert pluribus_after.favorite != pluribus.favorite
+    assert pluribus_after.user_channel == "Apple TV"
+    assert pluribus_after.user_notes is None
+    assert await other_user_svc.get_show(other_users_show.id) == other_users_show
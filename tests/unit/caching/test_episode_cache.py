@@ -0,0 +1,172 @@
+"""Runs the episode cache contract against the backends that don't need a database
+server; the Postgres backend is covered by the integration tests."""
+
+import sqlite3
+from pathlib import Path
+
+import pytest
+from helpers.episode_cache_contract import (
+    EpisodeCacheContract,
+    ExpireAll,
+    make_entry,
+)
+from helpers.utils.fake_clock import FakeClock
+
+from caching.episode_cache import (
+    CachedEpisodes,
+    EpisodeCacheBackend,
+    InMemoryEpisodeCache,
+    SQLiteEpisodeCache,
+)
+
+TTL = 86400
+
+
+class _FakeClockTests:
+    """Tests for backends whose clock can be replaced"""
+
+    @pytest.fixture
+    def clock(self) -> FakeClock:
+        return FakeClock()
+
+    @pytest.fixture
+    def expire_all(self, clock: FakeClock) -> ExpireAll:
+        async def expire() -> None:
+            clock.advance(TTL + 1)
+
+        return expire
+
+    @pytest.mark.asyncio
+    async def test_refresh_restarts_time_to_live(
+        self, cache: EpisodeCacheBackend, clock: FakeClock
+    ) -> None:
+        """An entry revalidated as unchanged is stored again, and so kept longer"""
+
+        await cache.set("key", make_entry([1]))
+        clock.advance(TTL - 10)
+
+        async def unchanged(current: CachedEpisodes | None) -> CachedEpisodes:
+            assert current is not None
+            return current
+
+        await cache.refresh("key", unchanged)
+        clock.advance(20)
+
+        assert await cache.get("key") == make_entry([1])
+
+    @pytest.mark.asyncio
+    async def test_refresh_of_unchanged_entry_only_touches_it(
+        self,
+        cache: EpisodeCacheBackend,
+        clock: FakeClock,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        await cache.set("key", make_entry([1]))
+
+        async def no_set(key: str, entry: CachedEpisodes) -> None:
+            raise AssertionError("unchanged entry stored again")
+
+        monkeypatch.setattr(cache, "set", no_set)
+
+        async def unchanged(current: CachedEpisodes | None) -> CachedEpisodes:
+            assert current is not None
+            return current
+
+        clock.advance(TTL - 10)
+        await cache.refresh("key", unchanged)
+        clock.advance(20)
+
+        assert await cache.get("key") == make_entry([1])
+
+    @pytest.mark.asyncio
+    async def test_touch_restarts_time_to_live(
+        self, cache: EpisodeCacheBackend, clock: FakeClock
+    ) -> None:
+        await cache.set("key", make_entry([1]))
+        clock.advance(TTL - 10)
+
+        await cache.touch("key")
+        await cache.touch("missing")  # harmless
+        clock.advance(20)
+
+        assert await cache.get("key") == make_entry([1])
+        assert await cache.get("missing") is None
+
+
+class TestInMemoryEpisodeCache(_FakeClockTests, EpisodeCacheContract):
+    @pytest.fixture
+    def cache(self, clock: FakeClock) -> InMemoryEpisodeCache:
+        return InMemoryEpisodeCache(max_episodes=1000, ttl=TTL, clock=clock.time)
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_used_beyond_max_episodes(self) -> None:
+        sut = InMemoryEpisodeCache(max_episodes=10)
+        await sut.set("a", make_entry([2, 2]))
+        await sut.set("b", make_entry([3]))
+        await sut.set("c", make_entry([1]))
+        await sut.get("a")
+
+        await sut.set("d", make_entry([6]))  # 14 episodes: evict b, then c
+
+        assert await sut.get("b") is None
+        assert await sut.get("c") is None
+        assert await sut.get("a") is not None
+        assert await sut.get("d") is not None
+        assert sut.cached_episode_count == 10
+        assert sut.stats.evictions == 2
+
+    @pytest.mark.asyncio
+    async def test_many_small_shows_fit_where_one_big_show_would(self) -> None:
+        sut = InMemoryEpisodeCache(max_episodes=100)
+
+        for n in range(50):
+            await sut.set(str(n), make_entry([2]))
+
+        assert len(sut) == 50
+        assert sut.stats.evictions == 0
+
+    @pytest.mark.asyncio
+    async def test_show_bigger_than_whole_cache_is_not_cached(self) -> None:
+        sut = InMemoryEpisodeCache(max_episodes=10)
+        await sut.set("small", make_entry([2]))
+        await sut.set("huge", make_entry([1]))
+
+        await sut.set("huge", make_entry([6, 6]))
+
+        assert await sut.get("huge") is None  # not even the old copy
+        assert await sut.get("small") is not None
+
+
+class TestSQLiteEpisodeCache(_FakeClockTests, EpisodeCacheContract):
+    @pytest.fixture
+    def cache(self, tmp_path: Path, clock: FakeClock) -> SQLiteEpisodeCache:
+        return SQLiteEpisodeCache(
+            path=str(tmp_path / "cache.sqlite3"), ttl=TTL, clock=clock.time
+        )
+
+    @pytest.mark.asyncio
+    async def test_entries_are_shared_between_instances(
+        self, cache: SQLiteEpisodeCache, clock: FakeClock
+    ) -> None:
+        """Separate instances on the same file stand in for separate worker processes,
+        or the same one before and after a restart"""
+
+        await cache.set("key", make_entry([2]))
+
+        other = SQLiteEpisodeCache(path=cache.path, ttl=TTL, clock=clock.time)
+        assert await other.get("key") == make_entry([2])
+
+    @pytest.mark.asyncio
+    async def test_file_in_older_layout_is_emptied(self, tmp_path: Path) -> None:
+        path = tmp_path / "cache.sqlite3"
+        conn = sqlite3.connect(path)
+        with conn:
+            conn.execute("CREATE TABLE episode_cache (key TEXT, value BLOB)")
+            conn.execute("INSERT INTO episode_cache VALUES ('key', '[[]]')")
+        conn.close()
+
+        sut = SQLiteEpisodeCache(path=str(path))
+
+        assert await sut.get("key") is None
+        await sut.set("key", make_entry([1]))
+        assert await sut.get("key") == make_entry([1])
@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+from caching.single_flight import SingleFlight
+
+
+class _Upstream:
+    """Stands in for an expensive call; blocks until released."""
+
+    def __init__(self) -> None:
+        self.call_count = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> str:
+        self.call_count += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return f"result {self.call_count}"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_for_same_key_share_one_call() -> None:
+    sut: SingleFlight[str, str] = SingleFlight()
+    upstream = _Upstream()
+
+    tasks = [asyncio.create_task(sut.do("key", upstream)) for _ in range(10)]
+    await asyncio.sleep(0)
+    assert sut.in_flight("key")
+    upstream.release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert upstream.call_count == 1
+    assert results == ["result 1"] * 10
+    assert not sut.in_flight("key")
+
+
+@pytest.mark.asyncio
+async def test_calls_for_different_keys_are_independent() -> None:
+    sut: SingleFlight[str, str] = SingleFlight()
+    upstream_a, upstream_b = _Upstream(), _Upstream()
+    upstream_a.release.set()
+    upstream_b.release.set()
+
+    await asyncio.gather(sut.do("a", upstream_a), sut.do("b", upstream_b))
+
+    assert upstream_a.call_count == 1
+    assert upstream_b.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_later_call_starts_afresh() -> None:
+    sut: SingleFlight[str, str] = SingleFlight()
+    upstream = _Upstream()
+    upstream.release.set()
+
+    assert await sut.do("key", upstream) == "result 1"
+    assert await sut.do("key", upstream) == "result 2"
+
+
+@pytest.mark.asyncio
+async def test_exception_propagates_to_every_caller() -> None:
+    sut: SingleFlight[str, str] = SingleFlight()
+    call_count = 0
+
+    async def failing() -> str:
+        nonlocal call_count
+        call_count += 1
+        await asyncio.sleep(0)
+        raise ValueError("upstream failed")
+
+    results = await asyncio.gather(
+        sut.do("key", failing), sut.do("key", failing), return_exceptions=True
+    )
+
+    assert call_count == 1
+    assert all(isinstance(r, ValueError) for r in results)
+    assert not sut.in_flight("key")
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_caller_leaves_the_others_waiting() -> None:
+    sut: SingleFlight[str, str] = SingleFlight()
+    upstream = _Upstream()
+
+    cancelled = asyncio.create_task(sut.do("key", upstream))
+    remaining = asyncio.create_task(sut.do("key", upstream))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+
+    upstream.release.set()
+    assert await remaining == "result 1"
+    assert not upstream.cancelled
+
+
+@pytest.mark.asyncio
+async def test_cancelling_every_caller_cancels_the_call() -> None:
+    sut: SingleFlight[str, str] = SingleFlight()
+    upstream = _Upstream()
+
+    tasks = [asyncio.create_task(sut.do("key", upstream)) for _ in range(3)]
+    await asyncio.sleep(0)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.sleep(0)  # let the cancellation reach the call
+
+    assert upstream.cancelled
+    assert not sut.in_flight("key")
+
+
+@pytest.mark.asyncio
+async def test_caller_after_every_caller_cancelled_starts_afresh() -> None:
+    sut: SingleFlight[str, str] = SingleFlight()
+    call_count = 0
+    cleaned_up = asyncio.Event()
+
+    async def slow_to_cancel() -> str:
+        nonlocal call_count
+        call_count += 1
+        if call_count == 1:
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                await cleaned_up.wait()  # still finishing when the next call comes
+                raise
+        return f"result {call_count}"
+
+    cancelled = asyncio.create_task(sut.do("key", slow_to_cancel))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+
+    # the cancelled call is still finishing, for nobody: not to be joined
+    asyncio.get_running_loop().call_soon(cleaned_up.set)
+    assert await sut.do("key", slow_to_cancel) == "result 2"
+    assert call_count == 2
+    assert not sut.in_flight("key")
@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+from helpers.utils.fake_clock import FakeClock
+
+from caching.swr_cache import StaleWhileRevalidateCache
+
+
+class _Source:
+    """Produces numbered values, counting calls"""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def fetch(self) -> str:
+        self.calls += 1
+        return f"value {self.calls}"
+
+
+def _cache(clock: FakeClock, maxsize: int = 10) -> StaleWhileRevalidateCache[str, str]:
+    return StaleWhileRevalidateCache(
+        maxsize=maxsize, ttl=10, stale_ttl=100, clock=clock.time
+    )
+
+
+@pytest.mark.asyncio
+async def test_fresh_entry_is_served_from_cache() -> None:
+    clock = FakeClock()
+    sut = _cache(clock)
+    source = _Source()
+
+    first = await sut.get_or_fetch("key", source.fetch)
+    clock.advance(5)
+    second = await sut.get_or_fetch("key", source.fetch)
+
+    assert first == second == "value 1"
+    assert source.calls == 1
+    assert sut.stats.misses == 1
+    assert sut.stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_while_refreshing() -> None:
+    clock = FakeClock()
+    sut = _cache(clock)
+    source = _Source()
+    await sut.get_or_fetch("key", source.fetch)
+
+    clock.advance(50)  # past ttl, within stale_ttl
+    stale = await sut.get_or_fetch("key", source.fetch)
+    await sut.wait_for_refreshes()
+    refreshed = await sut.get_or_fetch("key", source.fetch)
+
+    assert stale == "value 1"
+    assert refreshed == "value 2"
+    assert source.calls == 2
+    assert sut.stats.stale_hits == 1
+    assert sut.stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_only_one_refresh_runs_per_key() -> None:
+    clock = FakeClock()
+    sut = _cache(clock)
+    source = _Source()
+    await sut.get_or_fetch("key", source.fetch)
+    clock.advance(50)
+
+    await asyncio.gather(*(sut.get_or_fetch("key", source.fetch) for _ in range(5)))
+    await sut.wait_for_refreshes()
+
+    assert source.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_refresh_uses_refresh_function_and_survives_failure() -> None:
+    clock = FakeClock()
+    sut = _cache(clock)
+    source = _Source()
+    await sut.get_or_fetch("key", source.fetch)
+    clock.advance(50)
+
+    async def failing_refresh() -> str:
+        raise RuntimeError("upstream down")
+
+    stale = await sut.get_or_fetch("key", source.fetch, refresh=failing_refresh)
+    await sut.wait_for_refreshes()
+    still_stale = await sut.get_or_fetch("key", source.fetch, refresh=failing_refresh)
+
+    assert stale == still_stale == "value 1"
+    assert source.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_entry_past_stale_window_is_refetched() -> None:
+    clock = FakeClock()
+    sut = _cache(clock)
+    source = _Source()
+    await sut.get_or_fetch("key", source.fetch)
+
+    clock.advance(200)  # past ttl + stale_ttl
+    value = await sut.get_or_fetch("key", source.fetch)
+
+    assert value == "value 2"
+    assert sut.stats.misses == 2
+    assert sut.stats.stale_hits == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_propagates_and_caches_nothing() -> None:
+    clock = FakeClock()
+    sut = _cache(clock)
+
+    async def failing_fetch() -> str:
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        await sut.get_or_fetch("key", failing_fetch)
+    assert len(sut) == 0
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entry_is_evicted() -> None:
+    clock = FakeClock()
+    sut = _cache(clock, maxsize=2)
+    source = _Source()
+
+    await sut.get_or_fetch("a", source.fetch)
+    await sut.get_or_fetch("b", source.fetch)
+    await sut.get_or_fetch("a", source.fetch)  # "b" is now least recently used
+    await sut.get_or_fetch("c", source.fetch)  # evicts "b"
+
+    assert len(sut) == 2
+    assert sut.stats.evictions == 1
+    await sut.get_or_fetch("a", source.fetch)
+    assert source.calls == 3  # "a" still cached
+    await sut.get_or_fetch("b", source.fetch)
+    assert source.calls == 4  # "b" was evicted
+
+
+@pytest.mark.asyncio
+async def test_hit_ratio() -> None:
+    clock = FakeClock()
+    sut = _cache(clock)
+    source = _Source()
+
+    for _ in range(4):
+        await sut.get_or_fetch("key", source.fetch)
+
+    assert sut.stats.hit_ratio == 0.75
@@ -0,0 +1,25 @@
+import pytest
+
+from db.bitmaps import pack_bits, unpack_bits
+
+
+def test_pack_bits_numbers_bits_like_postgres() -> None:
+    # Postgres: get_bit('\x0180'::bytea, 0) = 1, get_bit('\x0180'::bytea, 15) = 1
+    flags = [n in (0, 15) for n in range(16)]
+
+    assert pack_bits(flags) == b"\x01\x80"
+
+
+@pytest.mark.parametrize("count", [0, 1, 7, 8, 9, 23])
+def test_pack_unpack_round_trip(count: int) -> None:
+    flags = [n % 3 == 0 for n in range(count)]
+
+    bitmap = pack_bits(flags)
+
+    assert len(bitmap) == (count + 7) // 8
+    assert unpack_bits(bitmap, count) == flags
+
+
+def test_unpack_bits_beyond_end_are_unset() -> None:
+    assert unpack_bits(b"\xff", 10) == [True] * 8 + [False] * 2
+    assert unpack_bits(b"", 3) == [False] * 3
@@ -0,0 +1,196 @@
+import json
+from uuid import UUID, uuid4
+
+import pytest
+from litestar import get
+from litestar.testing import create_test_client
+from pydantic import HttpUrl
+
+from db.models import DbShow
+from db.show_json import (
+    SELECTABLE_FIELDS,
+    SHOW_FIELDS,
+    ShowRow,
+    ShowStruct,
+    encode_show_fields,
+    encode_shows,
+)
+from models.show import EpisodeDescriptor, Show
+
+
+def _show(title: str, seasons: list[list[EpisodeDescriptor]], **fields: object) -> Show:
+    return Show.model_validate(
+        {
+            "id": uuid4(),
+            "tvmaze_id": 1,
+            "title": title,
+            "favorite": True,
+            "source": "PBS",
+            "duration": 60,
+            "image_sm_url": HttpUrl("http://images.com/small"),
+            "image_lg_url": HttpUrl("http://images.com"),
+            "imdb_id": "tt123",
+            "thetvdb_id": 1234,
+            "seasons": seasons,
+            "user_channel": None,
+            "user_notes": None,
+            **fields,
+        }
+    )
+
+
+def _row(show: Show) -> ShowRow:
+    """The show as the database returns it, in a row of `SHOW_COLUMNS`"""
+
+    db_show = DbShow.from_show_model(show, owner_id=uuid4())
+    return (
+        show.id,
+        db_show.tvmaze_id,
+        db_show.catalog.title,
+        db_show.favorite,
+        db_show.catalog.source,
+        db_show.catalog.duration,
+        db_show.catalog.image_sm_url,
+        db_show.catalog.image_lg_url,
+        db_show.catalog.imdb_id,
+        db_show.catalog.thetvdb_id,
+        # as Postgres formats JSONB as text
+        json.dumps(db_show.catalog.seasons),
+        db_show.watched,
+        db_show.user_channel,
+        db_show.user_notes,
+    )
+
+
+def _litestar_json(shows: dict[UUID, Show]) -> bytes:
+    """The shows as Litestar encodes them in a response"""
+
+    @get("/shows")
+    async def handler() -> dict[UUID, Show]:
+        return shows
+
+    with create_test_client([handler]) as client:
+        return client.get("/shows").content
+
+
+SHOWS = [
+    _show(
+        "Fictional Show",
+        [
+            [
+                EpisodeDescriptor("Normal episode", 1, True),
+                EpisodeDescriptor("Special episode", None, False),
+            ]
+        ],
+    ),
+    _show(
+        'Ünïcödé "quoted" \\ show',
+        [
+            # watched flags in the second byte of the bitmaps
+            [EpisodeDescriptor(f"S1E{n}", n, n % 3 == 0) for n in range(1, 12)],
+            [EpisodeDescriptor(None, n, n > 8) for n in range(1, 11)],
+            [],
+        ],
+        favorite=False,
+        imdb_id=None,
+        thetvdb_id=None,
+        user_channel="Netflix",
+        user_notes="Line 1\nLine 2 ✓",
+    ),
+]
+
+
+@pytest.mark.parametrize("shows", [[], SHOWS[:1], SHOWS])
+def test_encode_shows_matches_litestar(shows: list[Show]) -> None:
+    encoded = encode_shows([_row(show) for show in shows])
+
+    assert encoded == _litestar_json({show.id: show for show in shows})
+
+
+def test_encode_shows_ignores_missing_and_extra_watched_bits() -> None:
+    show = _show("Show", [[EpisodeDescriptor("E1", 1, False)] * 3] * 2)
+    row = _row(show)
+    # bits beyond the first season's end; no second bitmap
+    row = (*row[:11], [b"\xff"], *row[12:])
+
+    decoded = json.loads(encode_shows([row]))
+
+    assert [
+        [ep["watched"] for ep in season] for season in decoded[str(show.id)]["seasons"]
+    ] == [
+        [True] * 3,
+        [False] * 3,
+    ]
+
+
+def test_show_struct_fields_match_show_model() -> None:
+    assert ShowStruct.__struct_fields__ == tuple(Show.model_fields)
+
+
+# the fields of the columns in a `SHOW_COLUMNS` row, but for the seasons' two
+SHOW_COLUMN_FIELDS = [
+    "id",
+    "tvmaze_id",
+    "title",
+    "favorite",
+    "source",
+    "duration",
+    "image_sm_url",
+    "image_lg_url",
+    "imdb_id",
+    "thetvdb_id",
+    "seasons",
+    "watched",
+    "user_channel",
+    "user_notes",
+]
+
+
+def _field_row(show: Show, fields: list[str]) -> list[object]:
+    """The show as the database returns it, in a row of `show_field_columns(fields)`
+    (with the season counts as Postgres would count them)"""
+
+    row = _row(show)
+    values: dict[str, tuple[object, ...]] = {
+        field: (row[idx],) for idx, field in enumerate(SHOW_COLUMN_FIELDS)
+    }
+    values["seasons"] = (row[10], row[11])
+    values["season_counts"] = (
+        [
+            [sum(episode.watched for episode in season), len(season)]
+            for season in show.seasons
+        ],
+    )
+    return [show.id, *(value for field in fields for value in values[field])]
+
+
+def test_encode_show_fields_with_all_fields_matches_encode_shows() -> None:
+    rows = [_field_row(show, list(SHOW_FIELDS)) for show in SHOWS]
+
+    assert encode_show_fields(rows, SHOW_FIELDS) == encode_shows(
+        [_row(show) for show in SHOWS]
+    )
+
+
+def test_encode_show_fields_with_some_fields() -> None:
+    fields = ["favorite", "title", "season_counts"]
+
+    encoded = encode_show_fields([_field_row(show, fields) for show in SHOWS], fields)
+
+    decoded = json.loads(encoded)
+    show = SHOWS[1]
+    assert list(decoded) == [str(show.id) for show in SHOWS]
+    assert decoded[str(show.id)] == {
+        "favorite": False,
+        "title": show.title,
+        "season_counts": [
+            {"watched": 3, "total": 11},
+            {"watched": 2, "total": 10},
+            {"watched": 0, "total": 0},
+        ],
+    }
+    assert list(decoded[str(show.id)]) == fields
+
+
+def test_selectable_fields_are_show_fields_and_season_counts() -> None:
+    assert SELECTABLE_FIELDS == {*Show.model_fields, "season_counts"}
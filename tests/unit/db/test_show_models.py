@@ -2,7 +2,7 @@ from uuid import uuid4
 
 from pydantic import HttpUrl
 
-from db.models import DbShow
+from db.models import DbShow, DbTVmazeShow
 from models.show import EpisodeDescriptor, Show, ShowCreate
 
 
@@ -34,28 +34,27 @@ def test_domain_show_to_db_show_conversion() -> None:
     assert db_show.id == show.id
     assert db_show.user_id == user_id
     assert db_show.tvmaze_id == show.tvmaze_id
-    assert db_show.title == show.title
+    assert db_show.catalog.title == show.title
     assert db_show.favorite
-    assert db_show.source == show.source
-    assert db_show.duration == show.duration
-    assert db_show.image_sm_url == str(show.image_sm_url)
-    assert db_show.image_lg_url == str(show.image_lg_url)
-    assert db_show.imdb_id == show.imdb_id
-    assert db_show.thetvdb_id == show.thetvdb_id
-    assert db_show.seasons == [
+    assert db_show.catalog.source == show.source
+    assert db_show.catalog.duration == show.duration
+    assert db_show.catalog.image_sm_url == str(show.image_sm_url)
+    assert db_show.catalog.image_lg_url == str(show.image_lg_url)
+    assert db_show.catalog.imdb_id == show.imdb_id
+    assert db_show.catalog.thetvdb_id == show.thetvdb_id
+    assert db_show.catalog.seasons == [
         [
             {
                 "title": "Normal episode",
                 "ep_num": 1,
-                "watched": True,
             },
             {
                 "title": "Special episode",
                 "ep_num": None,
-                "watched": False,
             },
         ]
     ]
+    assert db_show.watched == [b"\x01"]
     assert db_show.user_channel == show.user_channel
     assert db_show.user_notes == show.user_notes
 
@@ -86,28 +85,27 @@ def test_domain_show_create_to_db_show_conversion() -> None:
     assert db_show.id is None
     assert db_show.user_id == user_id
     assert db_show.tvmaze_id == show.tvmaze_id
-    assert db_show.title == show.title
+    assert db_show.catalog.title == show.title
     assert db_show.favorite
-    assert db_show.source == show.source
-    assert db_show.duration == show.duration
-    assert db_show.image_sm_url == str(show.image_sm_url)
-    assert db_show.image_lg_url == str(show.image_lg_url)
-    assert db_show.imdb_id == show.imdb_id
-    assert db_show.thetvdb_id == show.thetvdb_id
-    assert db_show.seasons == [
+    assert db_show.catalog.source == show.source
+    assert db_show.catalog.duration == show.duration
+    assert db_show.catalog.image_sm_url == str(show.image_sm_url)
+    assert db_show.catalog.image_lg_url == str(show.image_lg_url)
+    assert db_show.catalog.imdb_id == show.imdb_id
+    assert db_show.catalog.thetvdb_id == show.thetvdb_id
+    assert db_show.catalog.seasons == [
         [
             {
                 "title": "Normal episode",
                 "ep_num": 1,
-                "watched": True,
             },
             {
                 "title": "Special episode",
                 "ep_num": None,
-                "watched": False,
             },
         ]
     ]
+    assert db_show.watched == [b"\x01"]
     assert db_show.user_channel == show.user_channel
     assert db_show.user_notes == show.user_notes
 
@@ -117,8 +115,87 @@ def test_db_show_to_show_conversion() -> None:
         id=uuid4(),
         user_id=uuid4(),
         tvmaze_id=1,
-        title="Fictional Show",
         favorite=True,
+        watched=[b"\x01"],
+        user_channel="Netflix",
+        user_notes="Not bad for a fictional show",
+        catalog=DbTVmazeShow(
+            tvmaze_id=1,
+            title="Fictional Show",
+            source="PBS",
+            duration=60,
+            image_sm_url="http://images.com/small",
+            image_lg_url="http://images.com/large",
+            imdb_id="tt123",
+            thetvdb_id=1234,
+            seasons=[
+                [
+                    {
+                        "title": "Normal episode",
+                        "ep_num": 1,
+                    },
+                    {
+                        "title": "Special episode",
+                        "ep_num": None,
+                    },
+                ]
+            ],
+        ),
+    )
+
+    show = db_show.to_show_model()
+
+    assert show.id == db_show.id
+    assert show.tvmaze_id == db_show.tvmaze_id
+    assert show.title == db_show.catalog.title
+    assert show.favorite
+    assert show.source == db_show.catalog.source
+    assert show.duration == db_show.catalog.duration
+    assert show.image_sm_url == HttpUrl(db_show.catalog.image_sm_url)
+    assert show.image_lg_url == HttpUrl(db_show.catalog.image_lg_url)
+    assert show.imdb_id == db_show.catalog.imdb_id
+    assert show.thetvdb_id == db_show.catalog.thetvdb_id
+    assert show.seasons == [
+        [
+            EpisodeDescriptor("Normal episode", 1, True),
+            EpisodeDescriptor("Special episode", None, False),
+        ]
+    ]
+    assert show.user_channel == db_show.user_channel
+    assert show.user_notes == db_show.user_notes
+
+
+def test_db_show_from_show_model_uses_given_catalog_entry() -> None:
+    catalog = DbTVmazeShow(
+        tvmaze_id=1,
+        title="Catalog Title",
+        seasons=[[{"title": "Catalog episode", "ep_num": 1}]],
+    )
+    show = ShowCreate(
+        tvmaze_id=1,
+        title="Imported Title",
+        favorite=False,
+        source="PBS",
+        duration=60,
+        image_sm_url=None,
+        image_lg_url=None,
+        imdb_id=None,
+        thetvdb_id=None,
+        seasons=[[EpisodeDescriptor("Imported episode", 1, True)]],
+        user_channel=None,
+        user_notes=None,
+    )
+
+    db_show = DbShow.from_show_model(show, owner_id=uuid4(), catalog=catalog)
+
+    assert db_show.catalog is catalog
+    assert db_show.watched == [b"\x01"]
+
+
+def test_catalog_show_to_show_create_conversion() -> None:
+    catalog = DbTVmazeShow(
+        tvmaze_id=1,
+        title="Fictional Show",
         source="PBS",
         duration=60,
         image_sm_url="http://images.com/small",
@@ -127,39 +204,177 @@ def test_db_show_to_show_conversion() -> None:
         thetvdb_id=1234,
         seasons=[
             [
-                {
-                    "title": "Normal episode",
-                    "ep_num": 1,
-                    "watched": True,
-                },
-                {
-                    "title": "Special episode",
-                    "ep_num": None,
-                    "watched": False,
-                },
+                {"title": "Normal episode", "ep_num": 1},
+                {"title": "Special episode", "ep_num": None},
             ]
         ],
-        user_channel="Netflix",
-        user_notes="Not bad for a fictional show",
     )
 
-    show = db_show.to_show_model()
+    show = catalog.to_show_create_model()
 
-    assert show.id == db_show.id
-    assert show.tvmaze_id == db_show.tvmaze_id
-    assert show.title == db_show.title
+    assert show.tvmaze_id == catalog.tvmaze_id
+    assert show.title == catalog.title
     assert show.favorite
-    assert show.source == db_show.source
-    assert show.duration == db_show.duration
-    assert show.image_sm_url == HttpUrl(db_show.image_sm_url)
-    assert show.image_lg_url == HttpUrl(db_show.image_lg_url)
-    assert show.imdb_id == db_show.imdb_id
-    assert show.thetvdb_id == db_show.thetvdb_id
+    assert show.source == catalog.source
+    assert show.image_sm_url == HttpUrl(catalog.image_sm_url)
     assert show.seasons == [
         [
-            EpisodeDescriptor("Normal episode", 1, True),
+            EpisodeDescriptor("Normal episode", 1, False),
             EpisodeDescriptor("Special episode", None, False),
         ]
     ]
-    assert show.user_channel == db_show.user_channel
-    assert show.user_notes == db_show.user_notes
+    assert show.user_channel is None
+    assert show.user_notes is None
+
+
+def test_db_show_from_show_model_sizes_watched_to_catalog_entry() -> None:
+    catalog = DbTVmazeShow(
+        tvmaze_id=1,
+        title="Catalog Title",
+        seasons=[
+            [{"title": f"S1E{n}", "ep_num": n} for n in range(1, 11)],
+            [{"title": "S2E1", "ep_num": 1}],
+            [{"title": "S3E1", "ep_num": 1}],
+        ],
+    )
+    show = ShowCreate(
+        tvmaze_id=1,
+        title="Imported Title",
+        favorite=False,
+        source="PBS",
+        duration=60,
+        image_sm_url=None,
+        image_lg_url=None,
+        imdb_id=None,
+        thetvdb_id=None,
+        # the first season's short, the second's long and the third's missing
+        seasons=[
+            [EpisodeDescriptor("S1E1", 1, True)],
+            [EpisodeDescriptor(f"S2E{n}", n, True) for n in range(1, 4)],
+        ],
+        user_channel=None,
+        user_notes=None,
+    )
+
+    db_show = DbShow.from_show_model(show, owner_id=uuid4(), catalog=catalog)
+
+    assert db_show.watched == [b"\x01\x00", b"\x01", b"\x00"]
+    assert [
+        [episode.watched for episode in season]
+        for season in catalog.episode_descriptors(db_show.watched)
+    ] == [[True] + [False] * 9, [True], [False]]
+
+
+def test_db_show_to_show_with_missing_watched_bitmaps() -> None:
+    catalog = DbTVmazeShow(
+        tvmaze_id=1,
+        title="Catalog Title",
+        seasons=[[{"title": "S1E1", "ep_num": 1}], [{"title": "S2E1", "ep_num": 1}]],
+    )
+
+    watched = catalog.episode_descriptors([None])
+
+    assert [[episode.watched for episode in season] for season in watched] == [
+        [False],
+        [False],
+    ]
+
+
+def test_catalog_watched_for_changed_seasons() -> None:
+    catalog = DbTVmazeShow(
+        tvmaze_id=1,
+        title="Catalog Title",
+        seasons=[
+            [{"title": f"S1E{n}", "ep_num": n} for n in range(1, 4)],
+            [{"title": "S2E1", "ep_num": 1}, {"title": "Special", "ep_num": None}],
+        ],
+    )
+    # a special's added to the first season, the second's special dropped and its
+    # first episode renamed, and a season added
+    seasons: list[list[dict]] = [
+        [
+            {"title": "S1E1", "ep_num": 1},
+            {"title": "Special", "ep_num": None},
+            {"title": "S1E2", "ep_num": 2},
+            {"title": "S1E3", "ep_num": 3},
+        ],
+        [{"title": "Pilot", "ep_num": 1}],
+        [{"title": "S3E1", "ep_num": 1}],
+    ]
+    # S1E1, S1E3, S2E1 and the second season's special watched
+    watched = [bytes([0b101]), bytes([0b11])]
+
+    assert not catalog.keeps_watched_for(seasons)
+    assert catalog.watched_for(watched, seasons) == [
+        bytes([0b1001]),
+        bytes([0b1]),
+        bytes([0b0]),
+    ]
+
+
+def test_catalog_keeps_watched_for_added_episodes() -> None:
+    catalog = DbTVmazeShow(
+        tvmaze_id=1,
+        title="Catalog Title",
+        seasons=[
+            [{"title": "S1E1", "ep_num": 1}, {"title": "Special", "ep_num": None}]
+        ],
+    )
+    seasons: list[list[dict]] = [
+        [
+            {"title": "S1E1", "ep_num": 1},
+            {"title": "Special", "ep_num": None},
+            {"title": "S1E2", "ep_num": 2},
+        ],
+        [{"title": "S2E1", "ep_num": 1}],
+    ]
+
+    assert catalog.keeps_watched_for(seasons)
+    assert catalog.watched_for([bytes([0b11])], seasons) == [
+        bytes([0b11]),
+        bytes([0b0]),
+    ]
+
+
+def test_db_show_from_show_model_matches_episodes_to_catalog_entry() -> None:
+    # the catalog has a special before the show's second episode, since it was
+    # exported, and has renamed the first
+    catalog = DbTVmazeShow(
+        tvmaze_id=1,
+        title="Catalog Title",
+        seasons=[
+            [
+                {"title": "Pilot", "ep_num": 1},
+                {"title": "Special", "ep_num": None},
+                {"title": "S1E2", "ep_num": 2},
+                {"title": "S1E3", "ep_num": 3},
+            ]
+        ],
+    )
+    show = ShowCreate(
+        tvmaze_id=1,
+        title="Imported Title",
+        favorite=False,
+        source="PBS",
+        duration=60,
+        image_sm_url=None,
+        image_lg_url=None,
+        imdb_id=None,
+        thetvdb_id=None,
+        seasons=[
+            [
+                EpisodeDescriptor("S1E1", 1, True),
+                EpisodeDescriptor("S1E2", 2, False),
+                EpisodeDescriptor("S1E3", 3, True),
+            ]
+        ],
+        user_channel=None,
+        user_notes=None,
+    )
+
+    db_show = DbShow.from_show_model(show, owner_id=uuid4(), catalog=catalog)
+
+    assert [
+        [episode.watched for episode in season]
+        for season in catalog.episode_descriptors(db_show.watched)
+    ] == [[True, False, False, True]]
@@ -0,0 +1,101 @@
+import json
+from collections.abc import AsyncIterator
+
+import pytest
+from helpers.sample_file_reader import SampleFileReader
+from pydantic import ValidationError
+
+from scripts.generate_import_file import generate_import_file
+from services.import_reader import ImportModel, ImportReader
+
+"""Source directory for test files read by SampleFileReader"""
+TEST_DATA_DIR = "import_data_files"
+
+
+async def chunked(data: bytes, size: int) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+async def read_all(data: bytes, size: int = 64 * 1024) -> ImportModel:
+    reader = ImportReader(chunked(data, size))
+    shows = [show async for show in reader.read_shows()]
+    skeleton = reader.read_skeleton()
+    return ImportModel(version=skeleton.version, shows=shows)
+
+
+# chunk sizes splitting the file everywhere, including within multi-byte characters
+@pytest.mark.parametrize("size", [1, 7, 1000, 64 * 1024])
+@pytest.mark.asyncio
+async def test_import_reader_reads_as_whole_file_validation(
+    reader: SampleFileReader, size: int
+) -> None:
+    data = reader.read("import_v0.0.1.json")
+    data = data.replace("Fun", "Fun ✓")  # not ASCII
+
+    read = await read_all(data.encode(), size)
+
+    assert read == ImportModel.model_validate_json(data, strict=True, extra="forbid")
+    assert len(read.shows) == 2
+
+
+@pytest.mark.asyncio
+async def test_import_reader_reads_generated_file() -> None:
+    data = "".join(generate_import_file(50)).encode()
+
+    read = await read_all(data, 4096)
+
+    assert read.version == "0.0.1"
+    assert [show.tvmaze_id for show in read.shows] == list(range(1, 51))
+
+
+@pytest.mark.asyncio
+async def test_import_reader_has_version_before_shows() -> None:
+    data = "".join(generate_import_file(3)).encode()
+    reader = ImportReader(chunked(data, 100))
+
+    async for _ in reader.read_shows():
+        assert reader.version == "0.0.1"
+        break
+
+
+@pytest.mark.parametrize("size", [1, 64 * 1024])
+@pytest.mark.parametrize(
+    ("data", "error"),
+    [
+        ('[{ malformed: "data" }]', "key must be a string at line 1 column 4"),
+        ("", "EOF while parsing a value"),
+        ('{"version": "0.0.1"}', "shows\n  Field required"),
+        ('{"version": "0.0.1", "shows": [], "x": 1}', "x\n  Extra inputs are not"),
+        ('{"version": "0.0.1", "shows": []} x', "trailing characters"),
+        ('{"version": "0.0.1", "shows": [1]}', "shows.0\n  Input should be a valid"),
+        ('{"version": "0.0.1", "shows": [{]}', "shows.0\n  Invalid JSON"),
+        ('{"version": "0.0.1", "shows": [{"a": 1}]}', "shows.0.tvmaze_id\n"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_import_reader_raises_on_invalid_file(
+    data: str, error: str, size: int
+) -> None:
+    with pytest.raises(ValidationError) as excinfo:
+        await read_all(data.encode(), size)
+    assert error in str(excinfo.value)
+
+
+@pytest.mark.asyncio
+async def test_import_reader_raises_on_duplicate_shows(
+    reader: SampleFileReader,
+) -> None:
+    data = json.loads(reader.read("import_v0.0.1.json"))
+    data["shows"].append(data["shows"][0])
+
+    with pytest.raises(ValidationError) as excinfo:
+        await read_all(json.dumps(data).encode())
+    assert "shows.2.tvmaze_id\n" in str(excinfo.value)
+    assert "Duplicate show: TVmaze ID 166" in str(excinfo.value)
+
+
+@pytest.mark.asyncio
+async def test_import_reader_raises_on_invalid_utf8() -> None:
+    with pytest.raises(UnicodeDecodeError):
+        await read_all(b'{"version": "\xff"}')
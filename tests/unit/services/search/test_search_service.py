@@ -1,14 +1,20 @@
+import httpx
 import pytest
 import respx
 from helpers.sample_file_reader import SampleFileReader
 from pydantic import HttpUrl
 
-from services.search_service import SearchError, SearchService
+from services.search_service import SearchError, SearchService, normalize_query
 
 """Source directory for test files read by SampleFileReader"""
 TEST_DATA_DIR = "mock_responses/tvmaze/basic_responses"
 
 
+@pytest.fixture(autouse=True)
+def empty_results_cache() -> None:
+    SearchService.results_cache.clear()
+
+
 @pytest.mark.asyncio
 async def test_search_service(
     respx_mock: respx.MockRouter, reader: SampleFileReader
@@ -67,3 +73,45 @@ async def test_search_service_server_error(respx_mock: respx.MockRouter) -> None
         print("GOING")
         _ = await svc.search("Battlestar Galactica")
         print("_")
+
+
+@pytest.mark.asyncio
+async def test_search_service_caches_results_by_normalized_query(
+    respx_mock: respx.MockRouter, reader: SampleFileReader
+) -> None:
+    text = reader.read("multiple_results.json")
+    route = respx_mock.route(method="GET").respond(text=text)
+    svc = SearchService()
+
+    first = await svc.search("Battlestar Galactica")
+    second = await svc.search("  battlestar   GALACTICA ")
+
+    assert route.call_count == 1
+    assert dict(route.calls.last.request.url.params) == {"q": "battlestar galactica"}
+    assert first == second
+    assert SearchService.results_cache.stats.misses == 1
+    assert SearchService.results_cache.stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_search_service_does_not_cache_errors(
+    respx_mock: respx.MockRouter, reader: SampleFileReader
+) -> None:
+    route = respx_mock.route(method="GET")
+    route.side_effect = [
+        httpx.Response(500),
+        httpx.Response(200, text=reader.read("multiple_results.json")),
+    ]
+    svc = SearchService()
+
+    with pytest.raises(SearchError):
+        await svc.search("Battlestar Galactica")
+    results = await svc.search("Battlestar Galactica")
+
+    assert len(results.results) == 2
+
+
+def test_normalize_query() -> None:
+    assert normalize_query("  The\tOffice  (US) ") == "the office (us)"
+    assert normalize_query("STRASSE") == normalize_query("straße")
+    assert normalize_query("ｆｕｌｌｗｉｄｔｈ") == "fullwidth"
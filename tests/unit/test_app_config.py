@@ -85,3 +85,133 @@ def test_cors_allowed_origins_is_list_of_strings(
     _omit_from_loaded_env(["CORS_ALLOWED_ORIGINS"], monkeypatch)
     os.environ["CORS_ALLOWED_ORIGINS"] = '["abc", "def"]'
     create_app()
+
+
+def test_tvmaze_http_settings_default(monkeypatch: pytest.MonkeyPatch) -> None:
+    import app_config
+
+    names = [
+        "TVMAZE_MAX_CONNECTIONS",
+        "TVMAZE_MAX_KEEPALIVE_CONNECTIONS",
+        "TVMAZE_KEEPALIVE_EXPIRY",
+        "TVMAZE_HTTP2",
+        "TVMAZE_TIMEOUT",
+    ]
+    _omit_from_loaded_env(names, monkeypatch)
+
+    assert app_config.get_tvmaze_http_settings() == app_config.TVmazeHTTPSettings()
+
+
+def test_tvmaze_http_settings_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    import app_config
+
+    _omit_from_loaded_env([], monkeypatch)
+    monkeypatch.setenv("TVMAZE_MAX_CONNECTIONS", "5")
+    monkeypatch.setenv("TVMAZE_KEEPALIVE_EXPIRY", "2.5")
+    monkeypatch.setenv("TVMAZE_TIMEOUT", "3")
+
+    settings = app_config.get_tvmaze_http_settings()
+
+    assert settings.max_connections == 5
+    assert settings.keepalive_expiry == 2.5
+    assert settings.timeout == 3.0
+
+
+def test_tvmaze_http_settings_must_be_numeric(monkeypatch: pytest.MonkeyPatch) -> None:
+    _omit_from_loaded_env([], monkeypatch)
+    monkeypatch.setenv("TVMAZE_MAX_CONNECTIONS", "lots")
+    with pytest.raises(ConfigurationError, match="TVMAZE_MAX_CONNECTIONS"):
+        create_app()
+
+
+def test_tvmaze_http2_requires_h2(monkeypatch: pytest.MonkeyPatch) -> None:
+    import importlib.util
+
+    import app_config
+
+    _omit_from_loaded_env([], monkeypatch)
+    monkeypatch.setenv("TVMAZE_HTTP2", "true")
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None)
+
+    with pytest.raises(ConfigurationError, match="TVMAZE_HTTP2"):
+        app_config.get_tvmaze_http_settings()
+
+
+def test_tvmaze_rate_limit_settings_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    import app_config
+
+    _omit_from_loaded_env([], monkeypatch)
+    monkeypatch.setenv("TVMAZE_RATE_LIMIT_PER_SECOND", "0.5")
+    monkeypatch.setenv("TVMAZE_RATE_LIMIT_BURST", "2")
+
+    settings = app_config.get_tvmaze_rate_limit_settings()
+
+    assert settings.per_second == 0.5
+    assert settings.burst == 2
+
+
+def test_tvmaze_rate_limit_must_be_positive(monkeypatch: pytest.MonkeyPatch) -> None:
+    _omit_from_loaded_env([], monkeypatch)
+    monkeypatch.setenv("TVMAZE_RATE_LIMIT_PER_SECOND", "0")
+    with pytest.raises(ConfigurationError, match="TVMAZE_RATE_LIMIT_PER_SECOND"):
+        create_app()
+
+
+def test_episode_cache_settings_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    import app_config
+
+    _omit_from_loaded_env([], monkeypatch)
+    monkeypatch.setenv("EPISODE_CACHE_BACKEND", "sqlite")
+    monkeypatch.setenv("EPISODE_CACHE_TTL", "600")
+    monkeypatch.setenv("EPISODE_CACHE_SQLITE_PATH", "/tmp/cache.sqlite3")
+
+    settings = app_config.get_episode_cache_settings()
+
+    assert settings.backend == "sqlite"
+    assert settings.ttl == 600.0
+    assert settings.sqlite_path == "/tmp/cache.sqlite3"
+
+
+def test_episode_cache_backend_must_be_known(monkeypatch: pytest.MonkeyPatch) -> None:
+    _omit_from_loaded_env([], monkeypatch)
+    monkeypatch.setenv("EPISODE_CACHE_BACKEND", "redis")
+    with pytest.raises(ConfigurationError, match="EPISODE_CACHE_BACKEND"):
+        create_app()
+
+
+def test_job_settings_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    import app_config
+
+    _omit_from_loaded_env([], monkeypatch)
+    monkeypatch.setenv("JOB_WORKERS", "0")
+    monkeypatch.setenv("JOB_POLL_INTERVAL", "0.5")
+    monkeypatch.setenv("JOB_TIMEOUT", "60")
+    monkeypatch.setenv("JOB_MAX_ATTEMPTS", "1")
+    monkeypatch.setenv("JOB_RETENTION", "3600")
+
+    settings = app_config.get_job_settings()
+
+    assert settings.workers == 0
+    assert settings.poll_interval == 0.5
+    assert settings.timeout == 60.0
+    assert settings.max_attempts == 1
+    assert settings.retention == 3600.0
+
+
+@pytest.mark.parametrize(
+    ("name", "value"),
+    [
+        ("JOB_WORKERS", "-1"),
+        ("JOB_POLL_INTERVAL", "0"),
+        ("JOB_TIMEOUT", "0"),
+        ("JOB_MAX_ATTEMPTS", "0"),
+        ("JOB_RETENTION", "0"),
+    ],
+)
+def test_job_settings_must_be_in_range(
+    monkeypatch: pytest.MonkeyPatch, name: str, value: str
+) -> None:
+    _omit_from_loaded_env([], monkeypatch)
+    monkeypatch.setenv(name, value)
+    with pytest.raises(ConfigurationError, match=name):
+        create_app()
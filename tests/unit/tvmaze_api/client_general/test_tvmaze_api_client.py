@@ -70,3 +70,21 @@ async def test_rate_limited_request_raises_after_using_up_attempts(
         except Exception:
             assert route.call_count == TVmazeAPIClient.RETRY_LIMIT
             raise
+
+
+@pytest.mark.asyncio
+async def test_shared_http_client_is_reused_and_left_open(
+    respx_mock: respx.MockRouter, mocker: MockerFixture
+) -> None:
+    route = respx_mock.route(method="GET").respond(text="{}")
+
+    async with httpx.AsyncClient() as http_client:
+        get_spy = mocker.spy(http_client, "get")
+        client = TVmazeAPIClient(http_client=http_client)
+
+        await client.test_query()
+        await client.test_query()
+
+        assert route.call_count == 2
+        assert get_spy.call_count == 2
+        assert not http_client.is_closed  # owned by the caller, not the API client
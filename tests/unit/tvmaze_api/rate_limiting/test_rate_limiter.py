@@ -0,0 +1,169 @@
+"""Tests for the client-side token bucket rate limiter, using a fake clock so that
+no test has to actually wait."""
+
+import asyncio
+
+import pytest
+import respx
+from helpers.utils.fake_clock import FakeClock
+from pytest_mock import MockerFixture
+
+from tvmaze_api.client import TVmazeAPIClient
+from tvmaze_api.rate_limiter import RequestPriority, TokenBucketRateLimiter
+
+
+def _limiter(clock: FakeClock, rate: float, burst: int) -> TokenBucketRateLimiter:
+    return TokenBucketRateLimiter(
+        rate=rate, burst=burst, clock=clock.time, sleep=clock.sleep
+    )
+
+
+@pytest.mark.asyncio
+async def test_burst_is_granted_without_waiting() -> None:
+    clock = FakeClock()
+    sut = _limiter(clock, rate=1, burst=3)
+    start = clock.now
+
+    for _ in range(3):
+        await sut.acquire()
+
+    assert clock.now == start
+    stats = sut.stats()
+    assert stats.acquired_count == 3
+    assert stats.waited_count == 0
+    assert stats.total_wait == 0
+
+
+@pytest.mark.asyncio
+async def test_requests_beyond_burst_wait_for_refill() -> None:
+    clock = FakeClock()
+    sut = _limiter(clock, rate=2, burst=2)
+    start = clock.now
+
+    for _ in range(6):
+        await sut.acquire()
+
+    # 2 immediately, then one every half second
+    assert clock.now - start == pytest.approx(2.0)
+    stats = sut.stats()
+    assert stats.waited_count == 4
+    assert stats.max_wait == pytest.approx(0.5)
+    assert stats.total_wait == pytest.approx(2.0)
+
+
+@pytest.mark.asyncio
+async def test_bucket_refills_while_idle_up_to_burst() -> None:
+    clock = FakeClock()
+    sut = _limiter(clock, rate=1, burst=2)
+    await sut.acquire()
+    await sut.acquire()
+
+    clock.advance(100)  # much longer than needed to refill
+    start = clock.now
+    await sut.acquire()
+    await sut.acquire()
+    assert clock.now == start  # burst was available again
+    await sut.acquire()
+    assert clock.now - start == pytest.approx(1.0)  # but no more than the burst
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_in_arrival_order() -> None:
+    clock = FakeClock()
+    sut = _limiter(clock, rate=1, burst=1)
+    await sut.acquire()  # empty the bucket
+    served: list[int] = []
+
+    async def request(n: int) -> None:
+        await sut.acquire()
+        served.append(n)
+
+    await asyncio.gather(*(request(n) for n in range(5)))
+
+    assert served == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_higher_priority_waiters_are_served_first() -> None:
+    clock = FakeClock()
+    sut = _limiter(clock, rate=1, burst=1)
+    await sut.acquire()  # empty the bucket
+    served: list[str] = []
+
+    async def request(label: str, priority: RequestPriority) -> None:
+        await sut.acquire(priority)
+        served.append(label)
+
+    await asyncio.gather(
+        request("background 1", RequestPriority.BACKGROUND),
+        request("normal", RequestPriority.NORMAL),
+        request("background 2", RequestPriority.BACKGROUND),
+        request("interactive", RequestPriority.INTERACTIVE),
+    )
+
+    assert served == ["interactive", "normal", "background 1", "background 2"]
+
+
+@pytest.mark.asyncio
+async def test_queue_depth_reports_waiting_requests() -> None:
+    clock = FakeClock()
+    sut = _limiter(clock, rate=1, burst=1)
+    await sut.acquire()  # empty the bucket
+
+    tasks = [asyncio.create_task(sut.acquire()) for _ in range(3)]
+    await asyncio.sleep(0)  # let them enqueue
+    assert sut.stats().queue_depth == 3
+
+    await asyncio.gather(*tasks)
+    assert sut.stats().queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_place() -> None:
+    clock = FakeClock()
+    sut = _limiter(clock, rate=1, burst=1)
+    await sut.acquire()  # empty the bucket
+
+    cancelled = asyncio.create_task(sut.acquire())
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+
+    start = clock.now
+    await sut.acquire()
+
+    assert clock.now - start == pytest.approx(1.0)  # only waited for one token
+    assert sut.stats().queue_depth == 0
+    assert sut.stats().acquired_count == 2
+
+
+def test_invalid_parameters_raise() -> None:
+    with pytest.raises(ValueError):
+        TokenBucketRateLimiter(rate=0, burst=1)
+    with pytest.raises(ValueError):
+        TokenBucketRateLimiter(rate=1, burst=0)
+
+
+@pytest.mark.asyncio
+async def test_client_waits_on_shared_limiter_with_endpoint_priority(
+    respx_mock: respx.MockRouter, mocker: MockerFixture
+) -> None:
+    respx_mock.route(method="GET").respond(text="[]")
+    acquire_spy = mocker.spy(TVmazeAPIClient.rate_limiter, "acquire")
+
+    await TVmazeAPIClient().search_shows("query")
+    await TVmazeAPIClient().get_show_episodes(tvmaze_id=1)
+
+    assert [call.args[0] for call in acquire_spy.call_args_list] == [
+        RequestPriority.INTERACTIVE,
+        RequestPriority.NORMAL,
+    ]
+
+
+def test_configure_rate_limit_replaces_shared_limiter() -> None:
+    TVmazeAPIClient.configure_rate_limit(rate=3, burst=7)
+
+    assert TVmazeAPIClient.rate_limiter.rate == 3
+    assert TVmazeAPIClient.rate_limiter.burst == 7
+    assert TVmazeAPIClient().rate_limiter is TVmazeAPIClient.rate_limiter
@@ -1,9 +1,15 @@
+import asyncio
+
 import pytest
 import respx
 from helpers.sample_file_reader import SampleFileReader
 from pydantic import HttpUrl
 
-from tvmaze_api.client import InvalidResponseError, TVmazeAPIClient
+from tvmaze_api.client import (
+    InvalidResponseError,
+    ResponseValidators,
+    TVmazeAPIClient,
+)
 from tvmaze_api.models import TVmazeExternals, TVmazeImage, TVmazeShow
 
 """Source directory for test files read by SampleFileReader"""
@@ -95,3 +101,101 @@ async def test_invalid_show_episodes_request_fails(
 
     with pytest.raises(InvalidResponseError):
         _ = await client.get_show_episodes(tvmaze_id=6456)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_are_coalesced(
+    respx_mock: respx.MockRouter, reader: SampleFileReader
+) -> None:
+    text = reader.read("network_show.json")
+    route = respx_mock.route(method="GET").respond(text=text)
+    client = TVmazeAPIClient()
+
+    first, second, other = await asyncio.gather(
+        client.get_show(tvmaze_id=6456),
+        client.get_show(tvmaze_id=6456),
+        client.get_show(tvmaze_id=1),
+    )
+
+    assert route.call_count == 2  # one for 6456, one for 1
+    assert first is second
+    assert other is not first
+
+    # once the request has completed, the next one goes to TVmaze again
+    _ = await client.get_show(tvmaze_id=6456)
+    assert route.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_show_episodes_request_returns_validators(
+    respx_mock: respx.MockRouter, reader: SampleFileReader
+) -> None:
+    text = reader.read("network_show_episodes.json")
+    route = respx_mock.route(method="GET").respond(
+        text=text,
+        headers={"ETag": '"v1"', "Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"},
+    )
+    client = TVmazeAPIClient()
+
+    rsp = await client.get_show_episodes_if_modified(
+        tvmaze_id=6456, validators=ResponseValidators()
+    )
+
+    # no validators to send: an ordinary request
+    request = route.calls.last.request
+    assert "If-None-Match" not in request.headers
+    assert "If-Modified-Since" not in request.headers
+
+    assert rsp.model is not None and len(rsp.model.root) > 0
+    assert rsp.validators == ResponseValidators(
+        etag='"v1"', last_modified="Wed, 21 Oct 2015 07:28:00 GMT"
+    )
+
+
+@pytest.mark.asyncio
+async def test_unchanged_show_episodes_not_parsed(respx_mock: respx.MockRouter) -> None:
+    route = respx_mock.route(method="GET").respond(
+        status_code=304, headers={"ETag": '"v1"'}
+    )
+    client = TVmazeAPIClient()
+    validators = ResponseValidators(
+        etag='"v1"', last_modified="Wed, 21 Oct 2015 07:28:00 GMT"
+    )
+
+    rsp = await client.get_show_episodes_if_modified(
+        tvmaze_id=6456, validators=validators
+    )
+
+    request = route.calls.last.request
+    assert request.headers["If-None-Match"] == '"v1"'
+    assert request.headers["If-Modified-Since"] == "Wed, 21 Oct 2015 07:28:00 GMT"
+
+    assert rsp.model is None
+    assert rsp.validators == validators  # kept where the 304 didn't repeat them
+
+
+@pytest.mark.asyncio
+async def test_changed_show_episodes_returned_with_new_validators(
+    respx_mock: respx.MockRouter, reader: SampleFileReader
+) -> None:
+    text = reader.read("network_show_episodes.json")
+    respx_mock.route(method="GET").respond(text=text, headers={"ETag": '"v2"'})
+    client = TVmazeAPIClient()
+
+    rsp = await client.get_show_episodes_if_modified(
+        tvmaze_id=6456, validators=ResponseValidators(etag='"v1"')
+    )
+
+    assert rsp.model is not None
+    assert rsp.validators.etag == '"v2"'
+
+
+@pytest.mark.asyncio
+async def test_not_modified_to_unconditional_request_fails(
+    respx_mock: respx.MockRouter,
+) -> None:
+    respx_mock.route(method="GET").respond(status_code=304)
+    client = TVmazeAPIClient()
+
+    with pytest.raises(InvalidResponseError):
+        await client.get_show_episodes(tvmaze_id=6456)